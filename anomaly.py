@@ -0,0 +1,200 @@
+import math
+from collections import deque
+
+from policy import auto_duty, AUTO_TABLE
+
+# Per-channel checks (status keys); a missing key switches that check off:
+#   z, min_std  rolling z-score limit over ANOMALY_WINDOW_S (std floored at min_std)
+#   step, rate  consecutive samples may differ by at most step + rate * dt
+#   flat_s      the value may not stay exactly the same for this long
+#   zero        exactly 0.0 is the firmware's stand-in for a failed read (DHT NaN)
+#   lo, hi      plausible range
+CHANNEL_CHECKS = {
+    "lm35":    {"z": 6.0, "min_std": 0.3, "step": 2.0, "rate": 1.0, "flat_s": 60.0, "lo": -10.0, "hi": 110.0},
+    "dhtTemp": {"zero": True, "step": 3.0, "rate": 0.5, "flat_s": 600.0, "lo": -20.0, "hi": 80.0},
+    "dhtHum":  {"zero": True, "flat_s": 600.0, "lo": 0.0, "hi": 100.0},
+    "dist":    {"flat_s": 120.0, "lo": 1.0, "hi": 150.0},
+}
+ANOMALY_KINDS = ("spike", "jump", "flatline", "dropout", "range", "fan")
+ANOMALY_WINDOW_S = 30.0
+ANOMALY_MIN_SAMPLES = 20    # z-score needs this many samples in the window
+ANOMALY_RECENT = 50         # onsets kept per device for display
+
+FAN_TEMP_MARGIN_C = 0.5     # the pad's own reading may sit on the other side of a step
+FAN_MISMATCH_S = 3.0        # AUTO duty off the table this long -> "fan" anomaly
+
+
+class RollingStats:
+    """
+    Mean / standard deviation of the samples in the last `window_s`:
+    - running sums, amortized O(1) per push (expired samples are subtracted)
+    - values are summed relative to the first one pushed, so the variance
+      doesn't cancel away at large offsets
+    """
+    def __init__(self, window_s: float):
+        self.window_s = window_s
+        self.clear()
+
+    def clear(self):
+        self.q = deque()
+        self.ref = None
+        self.s = 0.0
+        self.ss = 0.0
+
+    def __len__(self):
+        return len(self.q)
+
+    def push(self, t: float, x: float):
+        if self.ref is None:
+            self.ref = x
+        d = x - self.ref
+        self.q.append((t, d))
+        self.s += d
+        self.ss += d * d
+        t_min = t - self.window_s
+        q = self.q
+        while q[0][0] < t_min:
+            _, o = q.popleft()
+            self.s -= o
+            self.ss -= o * o
+
+    def mean(self) -> float:
+        return self.ref + self.s / len(self.q)
+
+    def std(self) -> float:
+        n = len(self.q)
+        return math.sqrt(max(0.0, self.ss / n - (self.s / n) ** 2))
+
+
+class ChannelMonitor:
+    """
+    Streaming checks on one channel (see CHANNEL_CHECKS). update() returns the kinds
+    that started with this sample; a kind that stays active is reported once and
+    re-arms after a clean sample. Spikes, dropouts and out-of-range samples stay out
+    of the rolling statistics and the rate-of-change reference (a spike doesn't also
+    count as a jump, there and back); a "spike" that lasts ANOMALY_MIN_SAMPLES is a
+    new level and restarts the statistics.
+    """
+    def __init__(self, checks: dict):
+        self.checks = checks
+        self.stats = RollingStats(ANOMALY_WINDOW_S)
+        self.reset()
+
+    def reset(self):
+        self.stats.clear()
+        self.last_t = None
+        self.last_x = None
+        self.flat_x = None
+        self.flat_since = None
+        self.spike_run = 0
+        self.active = set()
+
+    def update(self, t: float, x: float):
+        c = self.checks
+        now = set()
+        if c.get("zero") and x == 0.0:
+            now.add("dropout")
+        elif not c.get("lo", -math.inf) <= x <= c.get("hi", math.inf):
+            now.add("range")
+        else:
+            if "z" in c and len(self.stats) >= ANOMALY_MIN_SAMPLES:
+                std = max(c.get("min_std", 0.0), self.stats.std())
+                if abs(x - self.stats.mean()) > c["z"] * std:
+                    now.add("spike")
+            if now:
+                self.spike_run += 1
+                if self.spike_run >= ANOMALY_MIN_SAMPLES:
+                    self.stats.clear()
+                    now.clear()
+            else:
+                self.spike_run = 0
+            if not now:
+                if "step" in c and self.last_x is not None:
+                    if abs(x - self.last_x) > c["step"] + c.get("rate", 0.0) * max(0.0, t - self.last_t):
+                        now.add("jump")
+                self.stats.push(t, x)
+                self.last_t = t
+                self.last_x = x
+
+        if "flat_s" in c:
+            if x != self.flat_x or self.flat_since is None:
+                self.flat_x = x
+                self.flat_since = t
+            elif t - self.flat_since >= c["flat_s"]:
+                now.add("flatline")
+
+        started = now - self.active
+        self.active = now
+        return started
+
+
+class AnomalyDetector:
+    """
+    Sensor fault detection for one pad, one sample at a time:
+    - ChannelMonitor per configured channel (z-score spikes, rate-of-change jumps,
+      flatlines, firmware NaN dropouts, range)
+    - "fan": in AUTO, a fan duty off the pad's AUTO table for FAN_MISMATCH_S;
+      auto_table = (TEMP_LOW, TEMP_MED, present cm) as flashed, None switches the check
+      off (a pad with other thresholds would raise it on every AUTO sample)
+    update() returns the onsets [(channel, kind, value)]; `counts` ("channel.kind" -> n)
+    and `recent` [(t, channel, kind, value)] accumulate them.
+    """
+    def __init__(self, checks=None, auto_table=AUTO_TABLE):
+        self.checks = dict(CHANNEL_CHECKS if checks is None else checks)
+        self.auto_table = None if auto_table is None else tuple(auto_table)
+        self.monitors = {ch: ChannelMonitor(c) for ch, c in self.checks.items()}
+        self.counts = {}
+        self.recent = deque(maxlen=ANOMALY_RECENT)
+        self.samples = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the signal history (new link / time base); counts are kept."""
+        for m in self.monitors.values():
+            m.reset()
+        self.fan_off_since = None
+        self.fan_active = False
+
+    def update(self, data: dict, t: float):
+        self.samples += 1
+        found = []
+        for ch, m in self.monitors.items():
+            v = data.get(ch)
+            if v is None:
+                continue
+            x = float(v)
+            if x != x:
+                continue
+            for kind in m.update(t, x):
+                found.append((ch, kind, x))
+
+        if self._fan_mismatch(data, t):
+            if not self.fan_active:
+                self.fan_active = True
+                found.append(("fanDuty", "fan", data["fanDuty"]))
+        else:
+            self.fan_active = False
+
+        for ch, kind, x in found:
+            key = f"{ch}.{kind}"
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.recent.append((t, ch, kind, x))
+        return found
+
+    def _fan_mismatch(self, data: dict, t: float) -> bool:
+        table = self.auto_table
+        if (table is None or data.get("mode") != "AUTO" or "fanDuty" not in data or "lm35" not in data
+                or "dist" not in data):
+            self.fan_off_since = None
+            return False
+        lm35, dist, duty = float(data["lm35"]), float(data["dist"]), int(data["fanDuty"])
+        if duty in (auto_duty(lm35 - FAN_TEMP_MARGIN_C, dist, *table),
+                    auto_duty(lm35 + FAN_TEMP_MARGIN_C, dist, *table)):
+            self.fan_off_since = None
+            return False
+        if self.fan_off_since is None:
+            self.fan_off_since = t
+        return t - self.fan_off_since >= FAN_MISMATCH_S
+
+    def total(self) -> int:
+        return sum(self.counts.values())
@@ -1,17 +1,27 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import threading
 import time
 import math
-import random
-import socket
-import ipaddress
+import argparse
+import sys
+from collections import deque
 from queue import Queue, Empty
 
-import requests
-
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import numpy as np
+
+from telemetry import SlidingExtrema, HysteresisLimits, TelemetryStore
+from filters import FilterStage, parse_filter_args
+from anomaly import AnomalyDetector
+from policy import parse_auto_table, AUTO_TABLE
+from rules import RuleEngine, RULE_OVERTEMP, RULE_HIGH_TEMP, RULE_RGB
+from session import SessionRecorder, SessionReplay, REPLAY_SPEEDS
+from protocol import UDP_PORT, SERIAL_BAUD
+from diagnostics import StallWatchdog
+from service import CoolingPadService, scan_for_pad, LINK_TYPES, STREAM_RATE_MS
+from control import HostFanControl, PID_TARGET_C, OVERHEAT_C, OVERHEAT_WARN_S, PRECOOL_C
+from curves import CurveFanControl, ProfileStore, PROFILE_PATH
+from scope import ScopeTrigger, WelchSpectrum, SCOPE_CHANNELS, TRIGGER_MODES, TRIGGER_EDGES
 
 BG_COLOR       = "#050816"
 CARD_BG        = "#111827"
@@ -25,15 +35,32 @@ LINE_BLUE      = "#38bdf8"
 LINE_ORANGE    = "#f97316"
 LINE_PURPLE    = "#a855f7"
 
-POLL_BASE_INTERVAL_MS = 700
-POLL_MAX_INTERVAL_MS  = 2500
 HISTORY_SECONDS       = 300
-SCAN_TIMEOUT_S        = 0.35
-SCAN_THREADS          = 64
 SCOPE_WINDOW_S = 30.0   
+GRAPH_X_STEP_S        = 10.0
+SCOPE_GHOST_CAPTURES  = 3
+SPECTRUM_NPERSEG      = 32
+STALL_THRESHOLD_MS    = 250    # Tk loop this late -> sample the main thread's stack and report
+PID_TARGET_MIN_C      = 25.0   # host PID target range accepted from the entry
+PID_TARGET_MAX_C      = 60.0
+GRAPH_FORECAST_S      = 30.0   # future shown right of "now" on the main graph (thermal forecast)
+GRAPH_ANOMALY_MARKS   = 200    # anomaly markers kept for the main graph
+OVERTEMP_ALERT_TEXT   = "⚠ OVER TEMPERATURE! FAN AT MAX – CHECK LAPTOP COOLING"
 
 DEFAULT_ESP32_URL = "http://10.94.8.43"
 
+# matplotlib is by far the slowest import; load_plotting() fills these in
+# (on a worker thread while the splash is up, see __main__)
+Figure = None
+FigureCanvasTkAgg = None
+
+
+def load_plotting():
+    global Figure, FigureCanvasTkAgg
+    if FigureCanvasTkAgg is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
 
 def hsv_to_hex(h, s, v):
     h = float(h) % 360
@@ -83,79 +110,41 @@ def lerp_color(c1, c2, t):
     return rgb_to_hex((r, g, b))
 
 
-def get_local_ipv4():
-    """Best-effort local IP discover without internet calls."""
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return None
-
-
-def normalize_base_url(text: str) -> str:
-    t = text.strip()
-    if not t:
-        return ""
-    if not t.startswith("http://") and not t.startswith("https://"):
-        t = "http://" + t
-    return t.rstrip("/")
-
-
-class StableHttpClient:
+class BlitManager:
     """
-    Advanced stable HTTP:
-    - persistent session
-    - adaptive timeout
-    - exponential backoff + jitter on failure
+    Blitted redraw for a FigureCanvasTkAgg:
+    - static parts (axes, ticks, legend) cached on every full draw
+    - update() repaints only the animated artists unless full=True
     """
-    def __init__(self):
-        self.session = requests.Session()
-        self.base_url = ""
-        self.lock = threading.Lock()
-
-        self.ok_streak = 0
-        self.fail_streak = 0
-        self.poll_interval_ms = POLL_BASE_INTERVAL_MS
-        self.timeout_s = 0.9
-
-        self.session.headers.update({"Connection": "keep-alive"})
-
-    def set_base_url(self, base_url: str):
-        with self.lock:
-            self.base_url = base_url
-            self.ok_streak = 0
-            self.fail_streak = 0
-            self.poll_interval_ms = POLL_BASE_INTERVAL_MS
-            self.timeout_s = 0.9
-
-    def get(self, path: str, timeout=None):
-        with self.lock:
-            url = self.base_url + path
-            to = self.timeout_s if timeout is None else timeout
-        return self.session.get(url, timeout=to)
-
-    def mark_ok(self):
-        self.ok_streak += 1
-        self.fail_streak = 0
-        self.poll_interval_ms = max(POLL_BASE_INTERVAL_MS, int(self.poll_interval_ms * 0.88))
-        self.timeout_s = max(0.7, self.timeout_s * 0.92)
-
-    def mark_fail(self):
-        self.fail_streak += 1
-        self.ok_streak = 0
-        self.poll_interval_ms = min(POLL_MAX_INTERVAL_MS, int(self.poll_interval_ms * 1.35) + 60)
-        self.timeout_s = min(2.5, self.timeout_s * 1.18 + 0.05)
-
-    def next_sleep_s(self):
-        jitter = random.uniform(0.0, 0.10)
-        return (self.poll_interval_ms / 1000.0) + jitter
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.background = None
+        self.artists = list(artists)
+        for a in self.artists:
+            a.set_animated(True)
+        self.cid = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        fig = self.canvas.figure
+        for a in self.artists:
+            fig.draw_artist(a)
+
+    def update(self, full=False):
+        if full or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
 
 
 class CoolingPadGUI:
-    def __init__(self, root):
+    def __init__(self, root, replay_path=None, replay_speed="1x", stall_log=None, service=None):
+        load_plotting()
         self.root = root
         self.root.title("ESP32 Smart Gaming Laptop Cooling Pad (Stable)")
         self.root.configure(bg=BG_COLOR)
@@ -165,21 +154,30 @@ class CoolingPadGUI:
         except tk.TclError:
             self.root.attributes("-zoomed", True)
 
-        # Networking
-        self.http = StableHttpClient()
+        # Networking: links, polling and recording run in the (GUI-free) service
+        self.service = service if service is not None else CoolingPadService(Queue())
+        self.ui_queue = self.service.events
+        self.start_time = self.service.start_time
+        self.http = self.service.http
+        self.tracer = self.service.tracer
+        self.replay = None
         self.connected_online = False
-        self.stop_flag = False
-        self.ui_queue = Queue()
 
         # Data history
-        self.start_time = time.time()
-        self.time_hist = []
-        self.lm35_hist = []
-        self.dhtt_hist = []
+        # raw channels plus the service's filtered lm35 / IR distance (data["filtered"])
+        self.store = TelemetryStore(("lm35", "dht_t", "ir", "pot", "lm35_f", "ir_f"), HISTORY_SECONDS)
 
-        # Analog oscilloscope buffers
-        self.ir_hist = []
-        self.pot_hist = []
+        # Reusable x-offset buffer for the oscilloscope window
+        self.scope_x_buf = np.empty(256)
+
+        # Sliding-window extrema for autoscale (main graph / scope)
+        self.graph_lm35_ext = SlidingExtrema(HISTORY_SECONDS)
+        self.graph_dht_ext = SlidingExtrema(HISTORY_SECONDS)
+        self.scope_lm35_ext = SlidingExtrema(SCOPE_WINDOW_S)
+        self.scope_ir_ext = SlidingExtrema(SCOPE_WINDOW_S)
+        self.graph_ylim = HysteresisLimits(pad=2.0)
+        self.graph_x_hi = None
+        self.anomaly_marks = deque(maxlen=GRAPH_ANOMALY_MARKS)   # (t, channel, kind, value)
 
         # UI state
         self.rgb_hue = 0.0
@@ -190,6 +188,7 @@ class CoolingPadGUI:
         self.slider_dragging = False
         self.current_mode = "--"
         self.alert_visible = False
+        self.overheat_warned = False
 
         self.rgb_mode = "AUTO"
         self.rgb_enabled_sensor = False
@@ -203,8 +202,27 @@ class CoolingPadGUI:
         self.gauge_start_angle = 210
         self.gauge_end_angle = -150
 
+        # Session record / replay window
+        self.session_win = None
+        self.session_seek_dragging = False
+        self.replay_speed_var = tk.StringVar(value=replay_speed)
+        self.replay_ui_count = 0
+        self.replay_ui_t0 = time.monotonic()
+
+        # Diagnostics window handle
+        self.diag_win = None
+
         # Scope window handle
         self.scope_win = None
+        self.scope_dirty = False
+        self.scope_trigger = ScopeTrigger()
+        self.scope_view = "LIVE"
+        self.scope_capture_shown = None
+
+        # Noise spectra (Sharp IR / pot), updated incrementally as samples arrive
+        self.spec_ir = WelchSpectrum(SPECTRUM_NPERSEG)
+        self.spec_pot = WelchSpectrum(SPECTRUM_NPERSEG)
+        self.spec_dirty = False
 
         self.build_style()
         self.build_layout()
@@ -212,8 +230,14 @@ class CoolingPadGUI:
         self.root.after(50, self._process_ui_queue)
         self.start_animations()
 
-        self.poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
-        self.poll_thread.start()
+        self.stall_log = stall_log
+        self.watchdog = StallWatchdog(STALL_THRESHOLD_MS, on_stall=self._on_stall).attach(self.root)
+
+        if self.service.thread is None:
+            self.service.start()
+
+        if replay_path:
+            self.start_replay(replay_path, replay_speed)
 
     # ================== STYLES ==================
     def build_style(self):
@@ -279,36 +303,48 @@ class CoolingPadGUI:
         connect_card.pack()
 
         tk.Label(connect_card, text="ESP32 CONNECT",
-                 bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9, "bold")).grid(row=0, column=0, columnspan=5, sticky="w", padx=10, pady=(8, 0))
+                 bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9, "bold")).grid(row=0, column=0, columnspan=8, sticky="w", padx=10, pady=(8, 0))
 
         tk.Label(connect_card, text="URL / IP",
                  bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9)).grid(row=1, column=0, sticky="w", padx=10, pady=(6, 6))
 
-        self.url_var = tk.StringVar(value=DEFAULT_ESP32_URL)
+        connected = self.service.has_target()
+        self.url_var = tk.StringVar(value=self.service.target_label() if connected else DEFAULT_ESP32_URL)
         self.entry_url = tk.Entry(connect_card, textvariable=self.url_var,
                                   bg="#020617", fg=TEXT_MAIN, insertbackground=TEXT_MAIN,
                                   relief="flat", width=22, font=("Consolas", 10))
         self.entry_url.grid(row=1, column=1, padx=(0, 6), pady=(6, 6))
 
+        self.link_var = tk.StringVar(value=self.service.link if connected else LINK_TYPES[0])
+        ttk.Combobox(connect_card, textvariable=self.link_var, values=LINK_TYPES, width=6,
+                     state="readonly").grid(row=1, column=2, padx=(0, 6), pady=(6, 6))
+
         self.btn_connect = ttk.Button(connect_card, text="CONNECT", style="Accent.TButton", command=self.on_connect)
-        self.btn_connect.grid(row=1, column=2, padx=(0, 6), pady=(6, 6))
+        self.btn_connect.grid(row=1, column=3, padx=(0, 6), pady=(6, 6))
 
         self.btn_scan = ttk.Button(connect_card, text="SCAN", style="Secondary.TButton", command=self.on_scan)
-        self.btn_scan.grid(row=1, column=3, padx=(0, 6), pady=(6, 6))
+        self.btn_scan.grid(row=1, column=4, padx=(0, 6), pady=(6, 6))
 
         # NEW: oscilloscope window button (separate screen)
         self.btn_scope = ttk.Button(connect_card, text="ANALOG METERS", style="Secondary.TButton",
                                     command=self.open_scope_window)
-        self.btn_scope.grid(row=1, column=4, padx=(0, 10), pady=(6, 6))
+        self.btn_scope.grid(row=1, column=5, padx=(0, 6), pady=(6, 6))
+
+        self.btn_session = ttk.Button(connect_card, text="SESSIONS", style="Secondary.TButton",
+                                      command=self.open_session_window)
+        self.btn_session.grid(row=1, column=6, padx=(0, 6), pady=(6, 6))
+
+        self.btn_diag = ttk.Button(connect_card, text="DIAG", style="Secondary.TButton",
+                                   command=self.open_diag_window)
+        self.btn_diag.grid(row=1, column=7, padx=(0, 10), pady=(6, 6))
 
         self.lbl_small = tk.Label(connect_card, text="Status: not connected",
                                   bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 8))
-        self.lbl_small.grid(row=2, column=0, columnspan=5, sticky="w", padx=10, pady=(0, 10))
+        self.lbl_small.grid(row=2, column=0, columnspan=8, sticky="w", padx=10, pady=(0, 10))
 
         # Over-temp banner
         self.alert_frame = tk.Frame(self.content_root, bg=DANGER_RED)
-        self.alert_label = tk.Label(self.alert_frame,
-                                    text="⚠ OVER TEMPERATURE! FAN AT MAX – CHECK LAPTOP COOLING",
+        self.alert_label = tk.Label(self.alert_frame, text=OVERTEMP_ALERT_TEXT,
                                     bg=DANGER_RED, fg="#111827", font=("Consolas", 10, "bold"))
         self.alert_label.pack(padx=10, pady=2)
 
@@ -446,6 +482,38 @@ class CoolingPadGUI:
                                      command=lambda: self.send_mode("MANUAL"))
         self.btn_manual.pack(side="left", expand=True, fill="x", padx=(4, 0))
 
+        pid_row = tk.Frame(self.card_ctrl, bg=CARD_BG)
+        pid_row.pack(fill="x", padx=10, pady=(0, 6))
+
+        self.btn_pid = ttk.Button(pid_row, text="HOST PID", style="Grey.TButton", command=self.toggle_host_pid)
+        self.btn_pid.pack(side="left", expand=True, fill="x", padx=(0, 6))
+
+        tk.Label(pid_row, text="Target", bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9)).pack(side="left", padx=(0, 4))
+        self.pid_target_var = tk.StringVar(value=f"{PID_TARGET_C:.1f}")
+        entry_pid = tk.Entry(pid_row, textvariable=self.pid_target_var, bg="#020617", fg=TEXT_MAIN,
+                             insertbackground=TEXT_MAIN, relief="flat", width=5, font=("Consolas", 10))
+        entry_pid.pack(side="left")
+        entry_pid.bind("<Return>", lambda e: self._apply_pid_target())
+        tk.Label(pid_row, text="°C", bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9)).pack(side="left", padx=(4, 6))
+
+        self.btn_precool = ttk.Button(pid_row, text="PRE-COOL", style="Grey.TButton", command=self.toggle_precool)
+        self.btn_precool.pack(side="left", expand=True, fill="x")
+
+        curve_row = tk.Frame(self.card_ctrl, bg=CARD_BG)
+        curve_row.pack(fill="x", padx=10, pady=(0, 6))
+
+        self.btn_curve = ttk.Button(curve_row, text="HOST CURVE", style="Grey.TButton", command=self.toggle_curve)
+        self.btn_curve.pack(side="left", expand=True, fill="x", padx=(0, 6))
+
+        names = self.service.profiles.names()
+        self.curve_var = tk.StringVar(value="balanced" if "balanced" in names else names[0])
+        curve_box = ttk.Combobox(curve_row, textvariable=self.curve_var, values=names, width=12, state="readonly")
+        curve_box.pack(side="left", padx=(0, 6))
+        curve_box.bind("<<ComboboxSelected>>", lambda e: self._apply_curve())
+
+        ttk.Button(curve_row, text="PREVIEW", style="Grey.TButton",
+                   command=self.preview_curve).pack(side="left", expand=True, fill="x")
+
         slider_frame = tk.Frame(self.card_ctrl, bg=CARD_BG)
         slider_frame.pack(fill="x", padx=10, pady=(0, 4))
 
@@ -500,12 +568,21 @@ class CoolingPadGUI:
             spine.set_color("#374151")
         self.ax.grid(True, color="#1f2937", linestyle="--", linewidth=0.6, alpha=0.7)
 
-        self.line_lm35, = self.ax.plot([], [], label="LM35", linewidth=2.0, color=LINE_BLUE)
+        self.line_lm35, = self.ax.plot([], [], label="LM35 raw", linewidth=1.0, alpha=0.45, color=LINE_BLUE)
+        self.line_lm35_f, = self.ax.plot([], [], label="LM35", linewidth=2.0, color=LINE_BLUE)
         self.line_dht,  = self.ax.plot([], [], label="DHT Temp", linewidth=2.0, linestyle="--", color=LINE_ORANGE)
+        self.line_forecast, = self.ax.plot([], [], label="LM35 forecast", linewidth=1.5, linestyle=":", color=LINE_BLUE)
+        # anomalies: on the value for temperature spikes / jumps / flatlines, as ticks along the top otherwise
+        self.line_anomaly, = self.ax.plot([], [], label="Anomaly", linestyle="none", marker="x", markersize=8,
+                                          markeredgewidth=2.0, color=DANGER_RED)
+        self.line_anomaly_top, = self.ax.plot([], [], linestyle="none", marker="v", markersize=7, color=DANGER_RED,
+                                              transform=self.ax.get_xaxis_transform())
         self.ax.legend(facecolor="#020617", edgecolor="#4b5563", labelcolor=TEXT_MUTED, fontsize=8)
 
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_card)
         self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+        self.graph_blit = BlitManager(self.canvas, (self.line_lm35, self.line_lm35_f, self.line_dht,
+                                                    self.line_forecast, self.line_anomaly, self.line_anomaly_top))
 
         self._animate_heading(0)
         self._refresh_rgb_button_styles()
@@ -718,46 +795,106 @@ class CoolingPadGUI:
         self.fan_canvas.coords(self.fan_meter_needle, x_fill, 62, x_fill, 68)
         self.fan_canvas.itemconfig(self.fan_seven_label, text=f"FAN {int(p):03d} %")
 
-    def update_graph(self, lm35, dht_t):
-        now = time.time() - self.start_time
-        self.time_hist.append(now)
-        self.lm35_hist.append(lm35)
-        self.dhtt_hist.append(dht_t)
-
-        while self.time_hist and (now - self.time_hist[0]) > HISTORY_SECONDS:
-            self.time_hist.pop(0)
-            self.lm35_hist.pop(0)
-            self.dhtt_hist.pop(0)
-            if self.ir_hist: self.ir_hist.pop(0)
-            if self.pot_hist: self.pot_hist.pop(0)
-
-        self.line_lm35.set_data(self.time_hist, self.lm35_hist)
-        self.line_dht.set_data(self.time_hist, self.dhtt_hist)
-
-        if self.time_hist:
-            t_min = max(0, self.time_hist[-1] - HISTORY_SECONDS)
-            t_max = self.time_hist[-1] + 1
-            self.ax.set_xlim(t_min, t_max)
-
-            all_vals = self.lm35_hist + self.dhtt_hist
-            ymin = min(all_vals) - 2
-            ymax = max(all_vals) + 2
-            if ymin == ymax:
-                ymin -= 1
-                ymax += 1
-            self.ax.set_ylim(ymin, ymax)
-
-        self.canvas.draw_idle()
+    def _record_sample(self, lm35, dht_t, dist_cm, pot_percent, t=None, filtered=None, anomalies=None):
+        now = time.time() - self.start_time if t is None else t
+        filtered = filtered or {}
+        self.store.append(now, lm35=lm35, dht_t=dht_t, ir=dist_cm, pot=pot_percent,
+                          lm35_f=filtered.get("lm35", lm35), ir_f=filtered.get("dist", dist_cm))
+        for ch, kind, value in anomalies or ():
+            self.anomaly_marks.append((now, ch, kind, value))
+
+        self.graph_lm35_ext.push(now, lm35)
+        self.graph_dht_ext.push(now, dht_t)
+        self.scope_lm35_ext.push(now, lm35)
+        self.scope_ir_ext.push(now, dist_cm)
+        self.scope_trigger.push(now, lm35, dist_cm, pot_percent)
+        if self.spec_ir.push(now, dist_cm) | self.spec_pot.push(now, pot_percent):
+            self.spec_dirty = True
+
+    def _reset_history(self):
+        """Drop all plotted history (time base restarts, e.g. replay start / seek)."""
+        self.start_time = time.time()
+        self.store.clear()
+        for ext in (self.graph_lm35_ext, self.graph_dht_ext, self.scope_lm35_ext, self.scope_ir_ext):
+            ext.clear()
+        self.graph_ylim.reset()
+        self.graph_x_hi = None
+        self.anomaly_marks.clear()
+        self.spec_ir.reset()
+        self.spec_pot.reset()
+        self.scope_trigger.reset()
+
+    def update_graph(self):
+        if not len(self.store):
+            return
+        now = self.store.last("t")
+        t_col = self.store.column("t")
+        self.line_lm35.set_data(t_col, self.store.column("lm35"))
+        self.line_lm35_f.set_data(t_col, self.store.column("lm35_f"))
+        self.line_dht.set_data(t_col, self.store.column("dht_t"))
+        fx, fy = self._forecast_curve(now)
+        self.line_forecast.set_data(fx, fy)
+        on_temp = [(t, v) for t, ch, kind, v in self.anomaly_marks
+                   if ch in ("lm35", "dhtTemp") and kind not in ("dropout", "range")]
+        self.line_anomaly.set_data([t for t, _ in on_temp], [v for _, v in on_temp])
+        top = [t for t, ch, kind, _ in self.anomaly_marks
+               if ch not in ("lm35", "dhtTemp") or kind in ("dropout", "range")]
+        self.line_anomaly_top.set_data(top, [0.97] * len(top))
+
+        # x-axis advances in GRAPH_X_STEP_S steps, y-axis only when data leaves the band;
+        # in between only the lines are blitted.
+        full = False
+        x_hi = (math.floor(now / GRAPH_X_STEP_S) + 1) * GRAPH_X_STEP_S
+        if x_hi != self.graph_x_hi:
+            self.graph_x_hi = x_hi
+            self.ax.set_xlim(max(0, x_hi - HISTORY_SECONDS), x_hi + GRAPH_FORECAST_S)
+            full = True
+
+        lo = min(self.graph_lm35_ext.min(), self.graph_dht_ext.min(), *fy)
+        hi = max(self.graph_lm35_ext.max(), self.graph_dht_ext.max(), *fy)
+        if self.graph_ylim.update(lo, hi):
+            self.ax.set_ylim(self.graph_ylim.lo, self.graph_ylim.hi)
+            full = True
+
+        self.graph_blit.update(full)
+
+    def _forecast_curve(self, now):
+        """Service thermal forecast for the main graph; empty while replaying or when it's stale."""
+        fc = self.service.forecaster
+        model = fc.model
+        if self.replay is not None or model is None or not fc.ready or abs(model[0] - now) > 5.0:
+            return [], []
+        return fc.curve(GRAPH_FORECAST_S)
+
+    def _overheat_eta(self):
+        """Seconds until the forecast reaches OVERHEAT_C (0.0: already there), or None."""
+        fc = self.service.forecaster
+        if self.replay is not None or not fc.ready:
+            return None
+        return fc.time_to(OVERHEAT_C)
 
     # ================== CONNECT / SCAN ==================
     def on_connect(self):
-        url = normalize_base_url(self.url_var.get())
-        if not url:
-            messagebox.showwarning("Connect", "Please enter ESP32 IP or URL.")
+        link = self.link_var.get()
+        try:
+            target = self.service.connect(link, self.url_var.get())
+        except ValueError as e:
+            messagebox.showwarning("Connect", str(e))
+            return
+        except ImportError:
+            messagebox.showerror("Serial", "The SERIAL link needs pyserial:\npip install pyserial")
+            return
+        except OSError as e:
+            if link == "UDP":
+                messagebox.showerror("UDP", f"Cannot listen on UDP port {UDP_PORT}:\n{e}")
+            else:
+                messagebox.showerror("Serial", f"Cannot open {self.url_var.get().strip()}:\n{e}")
             return
-        self.http.set_base_url(url)
-        self._set_status(f"Connecting to {url} ...")
-        self.lbl_small.configure(text=f"Status: connecting to {url}")
+        self._set_status(f"Connecting to {target} ...")
+        if link == "SERIAL":
+            self.lbl_small.configure(text=f"Status: connecting to {target} @ {SERIAL_BAUD}")
+        else:
+            self.lbl_small.configure(text=f"Status: connecting to {target}")
 
     def on_scan(self):
         self._set_status("Scanning local network for ESP32...")
@@ -765,60 +902,22 @@ class CoolingPadGUI:
         threading.Thread(target=self._scan_worker, daemon=True).start()
 
     def _scan_worker(self):
-        local_ip = get_local_ipv4()
-        if not local_ip:
-            self.ui_queue.put(("scan_result", None, "Could not determine local IP for scan. Enter ESP32 IP manually."))
-            return
-
-        net = ipaddress.ip_network(local_ip + "/24", strict=False)
-        hosts = [str(h) for h in net.hosts()]
-
-        found = {"url": None}
-        q = Queue()
-        for h in hosts:
-            q.put(h)
-
-        def probe_host():
-            s = requests.Session()
-            while not q.empty() and found["url"] is None:
-                try:
-                    ip_ = q.get_nowait()
-                except Empty:
-                    return
-                try:
-                    url = f"http://{ip_}"
-                    r = s.get(url + "/status", timeout=SCAN_TIMEOUT_S)
-                    if r.status_code == 200:
-                        j = r.json()
-                        if "mode" in j and "lm35" in j and "fanDuty" in j:
-                            found["url"] = url
-                except Exception:
-                    pass
-                finally:
-                    q.task_done()
-
-        for _ in range(SCAN_THREADS):
-            threading.Thread(target=probe_host, daemon=True).start()
-
-        t0 = time.time()
-        while found["url"] is None and not q.empty() and (time.time() - t0) < 12.0:
-            time.sleep(0.05)
-
-        if found["url"]:
-            self.ui_queue.put(("scan_result", found["url"], f"Found ESP32 at {found['url']}"))
-        else:
-            self.ui_queue.put(("scan_result", None, "ESP32 not found. Please type the IP shown on Serial Monitor."))
+        url, msg = scan_for_pad()
+        self.ui_queue.put(("scan_result", url, msg))
 
     # ================== CONTROL COMMANDS ==================
     def send_mode(self, mode):
         mode = mode.upper()
-        if not self.http.base_url:
+        if not self.service.has_target():
             self._set_status("Not connected. Enter IP and press CONNECT.")
             return
+        self.service.stop_fan_control(restore_auto=False)
+        self.service.cancel_precool()
+        self._refresh_pid_button()
 
         def worker():
             try:
-                r = self.http.get(f"/setMode?mode={mode}", timeout=1.2)
+                r = self.service.command(f"/setMode?mode={mode}")
                 if r.status_code == 200:
                     self.ui_queue.put(("status", f"Set mode → {mode} ({r.text.strip()})"))
                 else:
@@ -829,13 +928,16 @@ class CoolingPadGUI:
         threading.Thread(target=worker, daemon=True).start()
 
     def send_fan_set(self, percent):
-        if not self.http.base_url:
+        if not self.service.has_target():
             return
         duty = int(max(0, min(100, percent)) * 255 / 100)
+        self.service.stop_fan_control(restore_auto=False)
+        self.service.cancel_precool()
+        self._refresh_pid_button()
 
         def worker():
             try:
-                r = self.http.get(f"/fan?duty={duty}", timeout=1.2)
+                r = self.service.command(f"/fan?duty={duty}")
                 if r.status_code == 200:
                     self.ui_queue.put(("status", f"Manual fan set {int(percent)}% ({r.text.strip()})"))
                 else:
@@ -845,23 +947,101 @@ class CoolingPadGUI:
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def _read_pid_target(self):
+        try:
+            target = float(self.pid_target_var.get().replace(",", "."))
+        except ValueError:
+            target = None
+        if target is None or not PID_TARGET_MIN_C <= target <= PID_TARGET_MAX_C:
+            self._set_status(f"PID target must be {PID_TARGET_MIN_C:.0f}-{PID_TARGET_MAX_C:.0f} °C.")
+            return None
+        return target
+
+    def toggle_host_pid(self):
+        """Host-side closed-loop fan control (service PID on lm35) on / off."""
+        if isinstance(self.service.fan_control, HostFanControl):
+            self.service.stop_fan_control()
+            self._set_status("Host PID off → pad back in AUTO")
+        elif not self.service.has_target():
+            self._set_status("Not connected. Enter IP and press CONNECT.")
+        else:
+            target = self._read_pid_target()
+            if target is not None:
+                self.service.start_fan_control(target)
+                self._set_status(f"Host PID driving the fan toward {target:.1f} °C")
+        self._refresh_pid_button()
+
+    def _apply_pid_target(self):
+        if not isinstance(self.service.fan_control, HostFanControl):
+            return
+        target = self._read_pid_target()
+        if target is not None:
+            self.service.start_fan_control(target)
+            self._set_status(f"Host PID target → {target:.1f} °C")
+
+    def toggle_curve(self):
+        """Host-side fan control from the selected fan-curve profile (see curves.py) on / off."""
+        if isinstance(self.service.fan_control, CurveFanControl):
+            self.service.stop_fan_control()
+            self._set_status("Fan curve off → pad back in AUTO")
+        elif not self.service.has_target():
+            self._set_status("Not connected. Enter IP and press CONNECT.")
+        else:
+            self._start_curve()
+        self._refresh_pid_button()
+
+    def _apply_curve(self):
+        # picking another profile while a curve drives the fan switches over at once
+        if isinstance(self.service.fan_control, CurveFanControl):
+            self._start_curve()
+            self._refresh_pid_button()
+
+    def _start_curve(self):
+        name = self.curve_var.get()
+        try:
+            self.service.start_curve_control(name)
+        except ValueError as e:
+            self._set_status(f"Fan curve: {e}")
+            return
+        self._set_status(f"Fan curve {name} driving the fan")
+
+    def preview_curve(self):
+        """The selected profile over the plotted history: what it would have asked for (open loop)."""
+        name = self.curve_var.get()
+        if len(self.store) < 2:
+            self._set_status("Fan curve preview needs some history first.")
+            return
+        try:
+            curve = self.service.profiles.get(name)
+        except ValueError as e:
+            self._set_status(f"Fan curve: {e}")
+            return
+        t = self.store.column("t")
+        duty = curve.evaluate(self.store.column("lm35"), self.store.column("ir_f"))
+        w = np.diff(t, append=t[-1])
+        span = max(float(t[-1] - t[0]), 1e-9)
+        on = 100.0 * float(np.sum((duty > 0) * w)) / span
+        mean = float(np.sum(duty * w)) / span
+        self._set_status(f"Curve {name} over the last {span / 60:.1f} min: fan on {on:.0f} %, "
+                         f"mean duty {mean:.0f}, now {duty[-1]}")
+
     def set_rgb_mode(self, mode):
         mode = mode.upper()
         self.rgb_mode = mode
         self._refresh_rgb_button_styles()
 
-        if not self.http.base_url:
+        if not self.service.has_target():
             self._set_status("Not connected. RGB command queued (connect first).")
             return
 
         def worker():
             try:
                 if mode == "AUTO":
-                    r = self.http.get("/rgb?release=1", timeout=1.2)
+                    r = self.service.command("/rgb?release=1")
                 elif mode == "ON":
-                    r = self.http.get("/rgb?state=ON", timeout=1.2)
+                    r = self.service.command("/rgb?state=ON")
                 else:
-                    r = self.http.get("/rgb?state=OFF", timeout=1.2)
+                    r = self.service.command("/rgb?state=OFF")
 
                 if r.status_code == 200:
                     self.ui_queue.put(("status", f"RGB mode → {mode} ({r.text.strip()})"))
@@ -876,7 +1056,7 @@ class CoolingPadGUI:
         if self.current_mode.upper() != "MANUAL":
             self._set_status("Test controls only in MANUAL MODE")
             return
-        if not self.http.base_url:
+        if not self.service.has_target():
             self._set_status("Not connected.")
             return
 
@@ -895,7 +1075,7 @@ class CoolingPadGUI:
                     self.ui_queue.put(("status", "Unknown test device"))
                     return
 
-                r = self.http.get(url_on, timeout=1.2)
+                r = self.service.command(url_on)
                 if r.status_code == 200:
                     self.ui_queue.put(("status", f"Test {device}: ON ({r.text.strip()})"))
                 else:
@@ -906,7 +1086,7 @@ class CoolingPadGUI:
                     time.sleep(0.05)
 
                 if url_off is not None:
-                    r2 = self.http.get(url_off, timeout=1.2)
+                    r2 = self.service.command(url_off)
                     if r2.status_code == 200:
                         self.ui_queue.put(("status", f"Test {device}: OFF ({r2.text.strip()})"))
                     else:
@@ -927,28 +1107,6 @@ class CoolingPadGUI:
             percent = self.fan_slider.get()
             self.send_fan_set(int(percent))
 
-    # ================== POLLING LOOP ==================
-    def _poll_loop(self):
-        while not self.stop_flag:
-            if not self.http.base_url:
-                time.sleep(0.2)
-                continue
-
-            try:
-                r = self.http.get("/status")
-                if r.status_code == 200:
-                    data = r.json()
-                    self.http.mark_ok()
-                    self.ui_queue.put(("status_data", data))
-                else:
-                    self.http.mark_fail()
-                    self.ui_queue.put(("offline", f"HTTP {r.status_code}"))
-            except Exception as e:
-                self.http.mark_fail()
-                self.ui_queue.put(("offline", str(e)))
-
-            time.sleep(self.http.next_sleep_s())
-
     # ================== UI QUEUE PROCESSOR ==================
     def _process_ui_queue(self):
         try:
@@ -963,8 +1121,25 @@ class CoolingPadGUI:
                     self._set_online(False, item[1])
 
                 elif kind == "status_data":
+                    t_deq = time.perf_counter_ns()
+                    if self.replay is None:
+                        self._set_online(True, "OK")
+                    self._update_ui_from_status(item[1], item[2] if len(item) > 2 else None)
+                    self.replay_ui_count += 1
+                    if len(item) > 3:
+                        self._trace_ui(item[1].get("seq"), item[3], t_deq)
+
+                elif kind == "status_batch":
+                    t_deq = time.perf_counter_ns()
                     self._set_online(True, "OK")
-                    self._update_ui_from_status(item[1])
+                    self._apply_status_batch(item[1])
+                    self._trace_ui(item[1][-1][0].get("seq"), item[2], t_deq)
+
+                elif kind == "replay_seek":
+                    self._reset_history()
+
+                elif kind == "replay_done":
+                    self._set_status(f"Replay finished ({item[1]} samples)")
 
                 elif kind == "scan_result":
                     url, msg = item[1], item[2]
@@ -972,7 +1147,8 @@ class CoolingPadGUI:
                     self.lbl_small.configure(text=f"Status: {msg}")
                     if url:
                         self.url_var.set(url)
-                        self.http.set_base_url(url)
+                        self.link_var.set("HTTP")
+                        self.service.connect("HTTP", url)
                         self._set_status(f"Connected target set to {url} (polling...)")
 
                 self.ui_queue.task_done()
@@ -980,8 +1156,19 @@ class CoolingPadGUI:
         except Empty:
             pass
 
+        if self.scope_dirty:
+            self.scope_dirty = False
+            self._scope_redraw()
+
         self.root.after(50, self._process_ui_queue)
 
+    def _trace_ui(self, seq, trace, t_deq: int):
+        origin, enqueued = trace
+        end = time.perf_counter_ns()
+        self.tracer.span("queue", enqueued, t_deq, seq)
+        self.tracer.span("ui", t_deq, end, seq)
+        self.tracer.span("e2e", origin, end, seq)
+
     # ================== UI UPDATES ==================
     def _set_status(self, msg):
         self.lbl_status.configure(text=msg)
@@ -992,13 +1179,27 @@ class CoolingPadGUI:
             fill = ACCENT_YELLOW if self.pulse_state else OK_GREEN
             self.conn_canvas.itemconfig(self.conn_dot, fill=fill)
             self.lbl_conn_text.configure(text="ONLINE", foreground=OK_GREEN)
-            base = self.http.base_url if self.http.base_url else "-"
-            self.lbl_small.configure(text=f"Status: online | {base} | poll={self.http.poll_interval_ms}ms | to={self.http.timeout_s:.2f}s")
+            base = self.service.target_label()
+            svc = self.service
+            if svc.link_mode == "serial":
+                text = f"Status: online | {base} | serial {SERIAL_BAUD}"
+            elif svc.link_mode == "stream":
+                text = f"Status: online | {base} | stream {STREAM_RATE_MS}ms"
+            elif svc.link_mode == "udp" and svc.udp is not None:
+                text = f"Status: online | {base} | udp:{svc.udp.port} pads={len(svc.udp.devices)}"
+            else:
+                text = f"Status: online | {base} | poll={self.http.poll_interval_ms}ms | to={self.http.timeout_s:.2f}s"
+            clk = svc.device_clock
+            if clk.received:
+                text += f" | seq={clk.last_seq} missed={clk.missed} dup={clk.duplicates}"
+                if clk.restarts:
+                    text += f" restarts={clk.restarts}"
+            self.lbl_small.configure(text=text)
             self.connected_online = True
         else:
             self.conn_canvas.itemconfig(self.conn_dot, fill=TEXT_MUTED)
             self.lbl_conn_text.configure(text="OFFLINE", foreground=DANGER_RED)
-            base = self.http.base_url if self.http.base_url else "-"
+            base = self.service.target_label()
             self.lbl_small.configure(text=f"Status: offline ({reason}) | {base} | retry={self.http.poll_interval_ms}ms")
             self.connected_online = False
 
@@ -1019,7 +1220,17 @@ class CoolingPadGUI:
                     break
         return (fan_duty / 255.0) * 100.0
 
-    def _update_ui_from_status(self, data: dict):
+    def _apply_status_batch(self, samples):
+        """Backfilled samples go straight into history; only the newest one refreshes the widgets."""
+        for data, t in samples[:-1]:
+            fan_duty = int(data.get("fanDuty", 0))
+            self._record_sample(float(data.get("lm35", 0.0)), float(data.get("dhtTemp", 0.0)),
+                                float(data.get("dist", 0.0)), self._extract_pot_percent(data, fan_duty), t,
+                                data.get("filtered"), data.get("anomalies"))
+        data, t = samples[-1]
+        self._update_ui_from_status(data, t)
+
+    def _update_ui_from_status(self, data: dict, t=None):
         mode = str(data.get("mode", "--"))
         self.current_mode = mode
 
@@ -1033,8 +1244,25 @@ class CoolingPadGUI:
 
         pot_percent = self._extract_pot_percent(data, fan_duty)
 
+        # labels and threshold decisions use the filtered channels (see filters.py),
+        # so sensor jitter doesn't flip them; the graph shows raw and filtered lm35
+        filtered = data.get("filtered", {})
+        lm35_f = filtered.get("lm35", lm35)
+        dist_f = filtered.get("dist", dist)
+        lux_f = filtered.get("lux", lux)
+        connected = filtered.get("connected", connected) >= 0.5
+        # threshold alarms and the RGB decision come from the service's rules (see rules.py)
+        alarms = data.get("alarms", ())
+
         # Mode UI
-        self.lbl_mode.configure(text=f"MODE: {mode}")
+        fan_control = self.service.fan_control
+        if isinstance(fan_control, CurveFanControl):
+            self.lbl_mode.configure(text=f"MODE: HOST CURVE {fan_control.name}")
+        elif fan_control is not None:
+            self.lbl_mode.configure(text=f"MODE: HOST PID {fan_control.target_c:.1f}°C")
+        else:
+            self.lbl_mode.configure(text=f"MODE: {mode}")
+        self._refresh_pid_button()
         if mode.upper() == "AUTO":
             self.btn_auto.configure(style="Accent.TButton")
             self.btn_manual.configure(style="Secondary.TButton")
@@ -1045,11 +1273,11 @@ class CoolingPadGUI:
             self.fan_slider.configure(state="normal")
 
         # Digital sensor labels
-        self.lbl_lm35.configure(text=f"{lm35:.1f} °C")
+        self.lbl_lm35.configure(text=f"{lm35_f:.1f} °C")
         self.lbl_dht_t.configure(text=f"{dht_t:.1f} °C")
         self.lbl_dht_h.configure(text=f"{dht_h:.0f} %")
-        self.lbl_dist.configure(text=f"{dist:.0f} cm")
-        self.lbl_lux.configure(text=f"{lux:.0f} lx")
+        self.lbl_dist.configure(text=f"{dist_f:.0f} cm")
+        self.lbl_lux.configure(text=f"{lux_f:.0f} lx")
         self.lbl_pot.configure(text=f"{pot_percent:.0f} %")
 
         self.lbl_digital_dht.configure(text=f"{dht_t:4.1f}°C")
@@ -1060,13 +1288,24 @@ class CoolingPadGUI:
         else:
             self.lbl_connected_status.configure(text="Laptop: NOT CONNECTED", fg=TEXT_MUTED)
 
-        # Overtemp banner
-        if lm35 > 50.0:
+        # Overtemp banner; the forecast warns before the threshold is reached and keeps
+        # warning until the predicted crossing moves out to twice the lead time. A
+        # smoothed lm35 already past it (eta 0) is an over-temperature, not a forecast.
+        eta = self._overheat_eta()
+        self.overheat_warned = eta is not None and eta <= OVERHEAT_WARN_S * (2 if self.overheat_warned else 1)
+        if RULE_OVERTEMP in alarms or eta == 0.0:
             self.lbl_temp_warn.configure(text="⚠ OVER-TEMPERATURE!", fg=DANGER_RED)
+            self.alert_label.configure(text=OVERTEMP_ALERT_TEXT)
             if not self.alert_visible:
                 self.alert_frame.pack(in_=self.content_root, fill="x", padx=18, pady=(0, 6))
                 self.alert_visible = True
-        elif lm35 > 40.0:
+        elif self.overheat_warned:
+            self.lbl_temp_warn.configure(text=f"Overheat forecast in ~{eta:.0f} s", fg=DANGER_RED)
+            self.alert_label.configure(text=f"⚠ {OVERHEAT_C:.0f} °C PREDICTED IN ~{eta:.0f} s – RAISE THE FAN / REDUCE LOAD")
+            if not self.alert_visible:
+                self.alert_frame.pack(in_=self.content_root, fill="x", padx=18, pady=(0, 6))
+                self.alert_visible = True
+        elif RULE_HIGH_TEMP in alarms:
             self.lbl_temp_warn.configure(text="High temperature, fan at MAX", fg=ACCENT_YELLOW)
             if self.alert_visible:
                 self.alert_frame.pack_forget()
@@ -1078,21 +1317,15 @@ class CoolingPadGUI:
                 self.alert_visible = False
 
         # RGB sensor-driven enable logic
-        sensor_rgb_on = False
-        if mode.upper() == "AUTO":
-            if connected and lux < 99.0:
-                sensor_rgb_on = True
-        else:
-            if connected:
-                sensor_rgb_on = True
-        self.rgb_enabled_sensor = sensor_rgb_on
+        rgb_auto = RULE_RGB in alarms
+        self.rgb_enabled_sensor = rgb_auto if mode.upper() == "AUTO" else connected
 
         if self.rgb_mode == "OFF":
             self.lbl_lux_mode.configure(text="RGB: FORCED OFF", fg=TEXT_MUTED)
         elif self.rgb_mode == "ON":
             self.lbl_lux_mode.configure(text="RGB: MANUAL ON", fg=ACCENT_YELLOW)
         else:
-            if connected and lux < 99.0:
+            if rgb_auto:
                 self.lbl_lux_mode.configure(text="RGB: CHASING (AUTO)", fg=ACCENT_YELLOW)
             elif connected:
                 self.lbl_lux_mode.configure(text="RGB: OFF (bright, AUTO)", fg=TEXT_MUTED)
@@ -1109,13 +1342,31 @@ class CoolingPadGUI:
             self.fan_slider.set(fan_percent)
 
         # Gauge / meter / main graph
-        self.update_gauge(lm35)
+        self.update_gauge(lm35_f)
         self.update_fan_meter(fan_percent)
-        self.update_graph(lm35, dht_t)
+        self._record_sample(lm35, dht_t, dist, pot_percent, t, filtered, data.get("anomalies"))
+        t_draw = time.perf_counter_ns()
+        self.update_graph()
+        self.tracer.span("draw", t_draw, time.perf_counter_ns(), data.get("seq"))
+
+        # oscilloscope redraw is coalesced to once per queue drain
+        self.scope_dirty = True
+
+    def toggle_precool(self):
+        """Forecast-driven pre-cooling (the service switches an AUTO pad to full fan early) on / off."""
+        if self.service.precool_c is None:
+            self.service.set_precool(PRECOOL_C)
+            self._set_status(f"Pre-cooling: full fan before {PRECOOL_C:.0f} °C is forecast")
+        else:
+            self.service.set_precool(None)
+            self._set_status("Pre-cooling off")
+        self._refresh_pid_button()
 
-        # oscilloscope buffers update + redraw if window open
-        self._scope_push(dist, pot_percent)
-        self._scope_redraw()
+    def _refresh_pid_button(self):
+        fan_control = self.service.fan_control
+        self.btn_pid.configure(style="Accent.TButton" if isinstance(fan_control, HostFanControl) else "Grey.TButton")
+        self.btn_curve.configure(style="Accent.TButton" if isinstance(fan_control, CurveFanControl) else "Grey.TButton")
+        self.btn_precool.configure(style="Accent.TButton" if self.service.precool_c is not None else "Grey.TButton")
 
     def _refresh_rgb_button_styles(self):
         if self.rgb_mode == "AUTO":
@@ -1131,6 +1382,260 @@ class CoolingPadGUI:
             self.btn_rgb_on.configure(style="Grey.TButton")
             self.btn_rgb_off.configure(style="Accent.TButton")
 
+    # ================== SESSION RECORD / REPLAY ==================
+    def toggle_recording(self):
+        if self.service.recorder is not None:
+            rec, self.service.recorder = self.service.recorder, None
+            rec.close()
+            self._set_status(f"Recording saved: {rec.count} samples → {rec.path}")
+            return
+
+        path = filedialog.asksaveasfilename(title="Record session", defaultextension=".jsonl",
+                                            filetypes=[("Session files", "*.jsonl"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.service.recorder = SessionRecorder(path)
+        except OSError as e:
+            messagebox.showerror("Record", f"Cannot open {path}: {e}")
+            return
+        self._set_status(f"Recording to {path}")
+
+    def start_replay(self, path, speed_label="1x"):
+        self.stop_replay()
+        try:
+            replay = SessionReplay(path, self.ui_queue, speed=REPLAY_SPEEDS.get(speed_label, 1.0),
+                                   filters=FilterStage(self.service.filters.specs), anomalies=AnomalyDetector(auto_table=self.service.auto_table),
+                                   rules=RuleEngine(self.service.rules.specs, self.service.rules.overrides))
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Replay", f"Cannot load session: {e}")
+            return
+        self.replay = replay
+        self.service.suspended = True
+        self._reset_history()
+        self.lbl_conn_text.configure(text="REPLAY", foreground=NEON_PURPLE)
+        self.lbl_small.configure(text=f"Status: replay | {path} | {len(replay.times)} samples, {replay.duration:.0f}s")
+        self.replay_ui_count = 0
+        self.replay_ui_t0 = time.monotonic()
+        replay.start()
+        self._set_status(f"Replaying {path} at {speed_label}")
+        if self.session_win and self.session_win.winfo_exists():
+            self.session_seek.configure(to=max(1.0, replay.duration))
+
+    def stop_replay(self):
+        replay, self.replay = self.replay, None
+        if replay is None:
+            return
+        replay.stop()
+        self.service.suspended = False
+        self._reset_history()
+        self._set_online(False, "replay stopped")
+        self._set_status("Replay stopped, back to live polling")
+
+    def open_session_window(self):
+        if self.session_win and self.session_win.winfo_exists():
+            self.session_win.lift()
+            return
+
+        self.session_win = tk.Toplevel(self.root)
+        self.session_win.title("Session Recorder / Replay")
+        self.session_win.configure(bg=BG_COLOR)
+
+        wrap = tk.Frame(self.session_win, bg=CARD_BG)
+        wrap.pack(fill="both", expand=True, padx=12, pady=12)
+
+        tk.Label(wrap, text="SESSIONS", bg=CARD_BG, fg=ACCENT_YELLOW,
+                 font=("Consolas", 14, "bold")).grid(row=0, column=0, columnspan=4, sticky="w", padx=8, pady=8)
+
+        self.btn_record = ttk.Button(wrap, text="START REC", style="Accent.TButton", command=self.toggle_recording)
+        self.btn_record.grid(row=1, column=0, sticky="ew", padx=8, pady=4)
+
+        def open_replay():
+            path = filedialog.askopenfilename(title="Replay session",
+                                              filetypes=[("Session files", "*.jsonl"), ("All files", "*.*")])
+            if path:
+                self.start_replay(path, self.replay_speed_var.get())
+
+        ttk.Button(wrap, text="OPEN REPLAY", style="Secondary.TButton",
+                   command=open_replay).grid(row=1, column=1, sticky="ew", padx=8, pady=4)
+
+        def on_speed(_event=None):
+            if self.replay is not None:
+                self.replay.set_speed(REPLAY_SPEEDS[self.replay_speed_var.get()])
+
+        speed_box = ttk.Combobox(wrap, textvariable=self.replay_speed_var, values=list(REPLAY_SPEEDS),
+                                 width=6, state="readonly")
+        speed_box.bind("<<ComboboxSelected>>", on_speed)
+        speed_box.grid(row=1, column=2, padx=8, pady=4)
+
+        def toggle_pause():
+            if self.replay is None:
+                return
+            if self.replay.paused:
+                self.replay.resume()
+            else:
+                self.replay.pause()
+
+        self.btn_replay_pause = ttk.Button(wrap, text="PAUSE", style="Secondary.TButton", command=toggle_pause)
+        self.btn_replay_pause.grid(row=2, column=0, sticky="ew", padx=8, pady=4)
+        ttk.Button(wrap, text="STOP REPLAY", style="Grey.TButton",
+                   command=self.stop_replay).grid(row=2, column=1, sticky="ew", padx=8, pady=4)
+
+        duration = self.replay.duration if self.replay is not None else 1.0
+        self.session_seek = tk.Scale(wrap, from_=0, to=max(1.0, duration), orient="horizontal",
+                                     bg=CARD_BG, troughcolor="#020617", highlightthickness=0, showvalue=False,
+                                     fg=TEXT_MAIN, relief="flat", length=420, sliderrelief="flat", sliderlength=16,
+                                     resolution=0.1)
+        self.session_seek.grid(row=3, column=0, columnspan=4, sticky="ew", padx=8, pady=(8, 4))
+        self.session_seek.bind("<ButtonPress-1>", lambda e: setattr(self, "session_seek_dragging", True))
+
+        def on_seek_release(_event):
+            self.session_seek_dragging = False
+            if self.replay is not None:
+                self.replay.seek(float(self.session_seek.get()))
+
+        self.session_seek.bind("<ButtonRelease-1>", on_seek_release)
+
+        self.lbl_session = tk.Label(wrap, text="", bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9), justify="left")
+        self.lbl_session.grid(row=4, column=0, columnspan=4, sticky="w", padx=8, pady=(4, 8))
+
+        self._refresh_session_window()
+
+    def _refresh_session_window(self):
+        if not (self.session_win and self.session_win.winfo_exists()):
+            return
+
+        rec = self.service.recorder
+        self.btn_record.configure(text="STOP REC" if rec is not None else "START REC")
+        lines = [f"Recording: {rec.count} samples → {rec.path}" if rec is not None else "Recording: off"]
+
+        replay = self.replay
+        if replay is not None:
+            pos = replay.position()
+            elapsed = max(1e-6, time.monotonic() - self.replay_ui_t0)
+            self.btn_replay_pause.configure(text="RESUME" if replay.paused else "PAUSE")
+            if not self.session_seek_dragging:
+                self.session_seek.set(pos)
+            lines.append(f"Replay: {pos:7.1f}/{replay.duration:.1f}s | sent {replay.sent} | "
+                         f"UI {self.replay_ui_count} samples, {self.replay_ui_count / elapsed:.0f}/s")
+        else:
+            lines.append("Replay: idle (live polling)")
+        self.lbl_session.configure(text="\n".join(lines))
+
+        self.root.after(250, self._refresh_session_window)
+
+    # ================== DIAGNOSTICS WINDOW ==================
+    def open_diag_window(self):
+        if self.diag_win and self.diag_win.winfo_exists():
+            self.diag_win.lift()
+            return
+
+        self.diag_win = tk.Toplevel(self.root)
+        self.diag_win.title("Diagnostics")
+        self.diag_win.configure(bg=BG_COLOR)
+
+        wrap = tk.Frame(self.diag_win, bg=CARD_BG)
+        wrap.pack(fill="both", expand=True, padx=12, pady=12)
+
+        tk.Label(wrap, text="HTTP REQUESTS", bg=CARD_BG, fg=ACCENT_YELLOW,
+                 font=("Consolas", 14, "bold")).grid(row=0, column=0, sticky="w", padx=8, pady=8)
+        ttk.Button(wrap, text="RESET", style="Grey.TButton",
+                   command=self.http.stats.reset).grid(row=0, column=1, sticky="e", padx=8, pady=8)
+
+        self.lbl_diag_http = tk.Label(wrap, text="", bg=CARD_BG, fg=TEXT_MAIN, font=("Consolas", 9), justify="left")
+        self.lbl_diag_http.grid(row=1, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 8))
+
+        tk.Label(wrap, text="PIPELINE (poll → pixels)", bg=CARD_BG, fg=ACCENT_YELLOW,
+                 font=("Consolas", 14, "bold")).grid(row=2, column=0, sticky="w", padx=8, pady=8)
+        btns = tk.Frame(wrap, bg=CARD_BG)
+        btns.grid(row=2, column=1, sticky="e", padx=8, pady=8)
+        ttk.Button(btns, text="SAVE TRACE", style="Secondary.TButton",
+                   command=self.save_trace).pack(side="left", padx=(0, 6))
+        ttk.Button(btns, text="RESET", style="Grey.TButton", command=self.tracer.reset).pack(side="left")
+
+        self.lbl_diag_trace = tk.Label(wrap, text="", bg=CARD_BG, fg=TEXT_MAIN, font=("Consolas", 9), justify="left")
+        self.lbl_diag_trace.grid(row=3, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 8))
+
+        tk.Label(wrap, text="UI LOOP", bg=CARD_BG, fg=ACCENT_YELLOW,
+                 font=("Consolas", 14, "bold")).grid(row=4, column=0, sticky="w", padx=8, pady=8)
+        self.lbl_diag_loop = tk.Label(wrap, text="", bg=CARD_BG, fg=TEXT_MAIN, font=("Consolas", 9), justify="left")
+        self.lbl_diag_loop.grid(row=5, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 8))
+
+        tk.Label(wrap, text="SENSOR ANOMALIES", bg=CARD_BG, fg=ACCENT_YELLOW,
+                 font=("Consolas", 14, "bold")).grid(row=6, column=0, sticky="w", padx=8, pady=8)
+        self.lbl_diag_anomaly = tk.Label(wrap, text="", bg=CARD_BG, fg=TEXT_MAIN, font=("Consolas", 9), justify="left")
+        self.lbl_diag_anomaly.grid(row=7, column=0, columnspan=2, sticky="w", padx=8, pady=(0, 8))
+
+        self._refresh_diag_window()
+
+    def _refresh_diag_window(self):
+        if not (self.diag_win and self.diag_win.winfo_exists()):
+            return
+
+        lines = [f"{'endpoint':<10}{'req':>7}{'err':>5}{'t/o':>5}{'new':>5}{'reuse':>7}{'in kB':>9}{'out kB':>8}"
+                 f"{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}  ms"]
+        for path, st in self.http.stats.snapshot().items():
+            lines.append(f"{path:<10}{st['requests']:>7}{st['errors']:>5}{st['timeouts']:>5}"
+                         f"{st['new_connections']:>5}{st['reused_connections']:>7}"
+                         f"{st['bytes_in'] / 1024:>9.1f}{st['bytes_out'] / 1024:>8.1f}"
+                         f"{st['p50_ms']:>8.1f}{st['p90_ms']:>8.1f}{st['p99_ms']:>8.1f}{st['max_ms']:>8.1f}")
+        if len(lines) == 1:
+            lines.append("(no requests yet)")
+        self.lbl_diag_http.configure(text="\n".join(lines))
+
+        lines = [f"{'stage':<10}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  ms"]
+        for stage, st in self.tracer.summary().items():
+            lines.append(f"{stage:<10}{st['count']:>7}{st['p50_ms']:>9.2f}{st['p90_ms']:>9.2f}"
+                         f"{st['p99_ms']:>9.2f}{st['max_ms']:>9.2f}")
+        if len(lines) == 1:
+            lines.append("(no samples yet)")
+        self.lbl_diag_trace.configure(text="\n".join(lines))
+
+        wd = self.watchdog
+        late = wd.lateness
+        lines = [f"heartbeat {wd.interval_ms}ms, {late.count} beats | late p50 {late.percentile(50) / 1000:.1f} "
+                 f"p99 {late.percentile(99) / 1000:.1f} max {late.max_us / 1000:.1f} ms",
+                 f"stalls > {wd.threshold_ms}ms: {len(wd.stalls)}"
+                 + (f" | worst {wd.worst.duration_ms:.0f} ms in {wd.worst.culprit()}" if wd.worst else "")]
+        for st in list(wd.stalls)[-5:]:
+            when = time.strftime("%H:%M:%S", time.localtime(st.started))
+            lines.append(f"  {when} {st.duration_ms:6.0f} ms  gc {st.gc_ms:4.0f} ms  {st.culprit()}")
+        self.lbl_diag_loop.configure(text="\n".join(lines))
+
+        lines = []
+        for device, st in self.service.anomaly_state().items():
+            counts = ", ".join(f"{k} {n}" for k, n in sorted(st["counts"].items())) or "none"
+            lines.append(f"{device}: {st['samples']} samples | {counts}")
+            for t, ch, kind, value in st["recent"][-5:]:
+                lines.append(f"  t={t:9.1f}s  {ch:<8} {kind:<9} {value:g}")
+        self.lbl_diag_anomaly.configure(text="\n".join(lines) or "(no samples yet)")
+
+        self.root.after(1000, self._refresh_diag_window)
+
+    def _on_stall(self, stall):
+        # watchdog thread
+        text = stall.format()
+        print(text, file=sys.stderr)
+        if self.stall_log:
+            try:
+                with open(self.stall_log, "a", encoding="utf-8") as f:
+                    f.write(text + "\n")
+            except OSError:
+                pass
+        self.ui_queue.put(("status", f"UI stalled {stall.duration_ms:.0f} ms in {stall.culprit()}"))
+
+    def save_trace(self):
+        path = filedialog.asksaveasfilename(title="Save pipeline trace", defaultextension=".json",
+                                            filetypes=[("Chrome trace", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            n = self.tracer.write_chrome_trace(path)
+        except OSError as e:
+            messagebox.showerror("Trace", f"Cannot write {path}: {e}")
+            return
+        self._set_status(f"Trace saved: {n} spans → {path} (open in chrome://tracing or Perfetto)")
+
     # ================== OSCILLOSCOPE WINDOW (SEPARATE) ==================
     def open_scope_window(self):
         if self.scope_win and self.scope_win.winfo_exists():
@@ -1152,91 +1657,263 @@ class CoolingPadGUI:
         tk.Label(header, text="LM35 / Sharp IR / Potentiometer", bg=CARD_BG, fg=TEXT_MUTED,
                  font=("Consolas", 10)).pack(side="left", padx=10)
 
-        def mk_plot(parent, title, ylab, line_color, fixed_ylim=None):
-            box = tk.Frame(parent, bg=CARD_BG)
-            box.pack(fill="both", expand=True, pady=(10, 0))
-
-            tk.Label(box, text=title, bg=CARD_BG, fg=TEXT_MUTED,
-                     font=("Consolas", 11, "bold")).pack(anchor="w", padx=8)
+        # Trigger controls
+        trig = tk.Frame(wrap, bg=CARD_BG)
+        trig.pack(fill="x", padx=8)
 
-            fig = Figure(figsize=(12, 2.6), dpi=100)
-            ax = fig.add_subplot(111)
+        def trig_field(label, var, width=7, values=None):
+            tk.Label(trig, text=label, bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9)).pack(side="left", padx=(0, 4))
+            if values:
+                w = ttk.Combobox(trig, textvariable=var, values=values, width=width, state="readonly")
+                w.bind("<<ComboboxSelected>>", lambda e: self._scope_apply_trigger())
+            else:
+                w = tk.Entry(trig, textvariable=var, bg="#020617", fg=TEXT_MAIN, insertbackground=TEXT_MAIN,
+                             relief="flat", width=width, font=("Consolas", 10))
+                w.bind("<Return>", lambda e: self._scope_apply_trigger())
+            w.pack(side="left", padx=(0, 10))
+
+        self.trig_mode_var = tk.StringVar(value=self.scope_trigger.mode)
+        self.trig_source_var = tk.StringVar(value=self.scope_trigger.source.upper())
+        self.trig_edge_var = tk.StringVar(value=self.scope_trigger.edge)
+        self.trig_level_var = tk.StringVar(value=f"{self.scope_trigger.level:g}")
+        self.trig_pre_var = tk.StringVar(value=f"{self.scope_trigger.pre_s:g}")
+        self.trig_post_var = tk.StringVar(value=f"{self.scope_trigger.post_s:g}")
+
+        trig_field("TRIGGER", self.trig_mode_var, values=TRIGGER_MODES)
+        trig_field("SRC", self.trig_source_var, width=5, values=[c.upper() for c in SCOPE_CHANNELS])
+        trig_field("EDGE", self.trig_edge_var, values=TRIGGER_EDGES)
+        trig_field("LEVEL", self.trig_level_var)
+        trig_field("PRE s", self.trig_pre_var, width=5)
+        trig_field("POST s", self.trig_post_var, width=5)
+
+        ttk.Button(trig, text="ARM", style="Accent.TButton",
+                   command=self._scope_apply_trigger).pack(side="left", padx=(0, 6))
+        ttk.Button(trig, text="CLEAR", style="Grey.TButton",
+                   command=self._scope_clear_captures).pack(side="left")
+
+        self.lbl_scope_trig = tk.Label(trig, text="", bg=CARD_BG, fg=ACCENT_YELLOW, font=("Consolas", 9, "bold"))
+        self.lbl_scope_trig.pack(side="left", padx=10)
+
+        # One figure, three stacked axes on a shared scrolling time axis:
+        # one blit per frame instead of three full canvas redraws.
+        fig = Figure(figsize=(12, 7.8), dpi=100)
+        fig.patch.set_facecolor(CARD_BG)
+        gs = fig.add_gridspec(1, 2, width_ratios=(3.0, 1.2), wspace=0.2)
+        axes = gs[0].subgridspec(3, 1, hspace=0.32).subplots(sharex=True)
+        spec_axes = gs[1].subgridspec(2, 1, hspace=0.32).subplots()
+        fig.subplots_adjust(left=0.06, right=0.98, top=0.95, bottom=0.07)
+
+        specs = (
+            ("LM35 (°C)", "°C", LINE_BLUE),
+            ("Sharp IR Distance (cm)", "cm", LINE_ORANGE),
+            ("Potentiometer (%)", "%", LINE_PURPLE),
+        )
+        lines = []
+        ghost_sets = []
+        marker_sets = []
+        for ax, (title, ylab, line_color) in zip(axes, specs):
             ax.set_facecolor("#020617")
-            fig.patch.set_facecolor(CARD_BG)
-
             ax.grid(True, color="#1f2937", linestyle="--", linewidth=0.9, alpha=0.85)
             ax.tick_params(colors=TEXT_MUTED, labelsize=9)
             for sp in ax.spines.values():
                 sp.set_color("#374151")
-            ax.set_xlabel("Time (s)", color=TEXT_MUTED, fontname="Consolas")
+            ax.set_title(title, color=TEXT_MUTED, fontname="Consolas", fontsize=11,
+                         fontweight="bold", loc="left")
             ax.set_ylabel(ylab, color=TEXT_MUTED, fontname="Consolas")
-
             line, = ax.plot([], [], linewidth=3.5, color=line_color)
-            if fixed_ylim:
-                ax.set_ylim(fixed_ylim[0], fixed_ylim[1])
-
-            canv = FigureCanvasTkAgg(fig, master=box)
-            canv.get_tk_widget().pack(fill="both", expand=True, padx=8, pady=(4, 8))
-            return ax, line, canv
-
-        self.scope_ax_lm35, self.scope_line_lm35, self.scope_canvas_lm35 = mk_plot(wrap, "LM35 (°C)", "°C", LINE_BLUE)
-        self.scope_ax_ir,   self.scope_line_ir,   self.scope_canvas_ir   = mk_plot(wrap, "Sharp IR Distance (cm)", "cm", LINE_ORANGE)
-        self.scope_ax_pot,  self.scope_line_pot,  self.scope_canvas_pot  = mk_plot(wrap, "Potentiometer (%)", "%", LINE_PURPLE, fixed_ylim=(0, 100))
+            lines.append(line)
+
+            # previous trigger captures, faded, for comparison
+            ghosts = [ax.plot([], [], linewidth=1.5, color=line_color, alpha=0.3)[0]
+                      for _ in range(SCOPE_GHOST_CAPTURES)]
+            ghost_sets.append(ghosts)
+            marker_sets.append((ax.axvline(0, color=ACCENT_YELLOW, linewidth=1.0, linestyle=":", visible=False),
+                                ax.axhline(0, color=ACCENT_YELLOW, linewidth=1.0, linestyle=":", visible=False)))
+
+        axes[-1].set_xlabel("Time (s, 0 = latest sample)", color=TEXT_MUTED, fontname="Consolas")
+        axes[-1].set_xlim(-SCOPE_WINDOW_S, 0)
+        axes[2].set_ylim(0, 100)
+
+        spec_lines = []
+        for ax, (title, line_color) in zip(spec_axes, (("Sharp IR noise (Welch)", LINE_ORANGE),
+                                                       ("Pot noise (Welch)", LINE_PURPLE))):
+            ax.set_facecolor("#020617")
+            ax.grid(True, color="#1f2937", linestyle="--", linewidth=0.9, alpha=0.85)
+            ax.tick_params(colors=TEXT_MUTED, labelsize=9)
+            for sp in ax.spines.values():
+                sp.set_color("#374151")
+            ax.set_title(title, color=TEXT_MUTED, fontname="Consolas", fontsize=11,
+                         fontweight="bold", loc="left")
+            ax.set_ylabel("PSD (dB)", color=TEXT_MUTED, fontname="Consolas")
+            line, = ax.plot([], [], linewidth=2.0, color=line_color)
+            spec_lines.append(line)
+        spec_axes[-1].set_xlabel("Frequency (Hz)", color=TEXT_MUTED, fontname="Consolas")
+
+        self.scope_ax_lm35, self.scope_ax_ir, self.scope_ax_pot = axes
+        self.scope_line_lm35, self.scope_line_ir, self.scope_line_pot = lines
+        self.scope_ghosts = ghost_sets
+        self.scope_markers = marker_sets
+        self.scope_view = "LIVE"
+        self.scope_capture_shown = None
+
+        self.scope_canvas = FigureCanvasTkAgg(fig, master=wrap)
+        self.scope_canvas.get_tk_widget().pack(fill="both", expand=True, padx=8, pady=(10, 8))
+        self.scope_blit = BlitManager(self.scope_canvas, lines + spec_lines)
+
+        self.spec_axes = spec_axes
+        self.spec_lines = spec_lines
+        self.spec_ylims = [HysteresisLimits(pad=3.0, min_span=10.0) for _ in spec_axes]
+        self.spec_x_hi = [None for _ in spec_axes]
+        self.spec_dirty = True
+
+        self.scope_lm35_ylim = HysteresisLimits(pad=2.0)
+        self.scope_ir_ylim = HysteresisLimits(pad=5.0)
 
         self._scope_redraw()
 
-    def _scope_push(self, dist_cm, pot_percent):
-        # Keep buffers aligned with time_hist
-        self.ir_hist.append(dist_cm)
-        self.pot_hist.append(pot_percent)
-
-        # If buffers grew more than time, trim
-        if len(self.ir_hist) > len(self.time_hist):
-            self.ir_hist = self.ir_hist[-len(self.time_hist):]
-        if len(self.pot_hist) > len(self.time_hist):
-            self.pot_hist = self.pot_hist[-len(self.time_hist):]
-
     def _scope_redraw(self):
         if not (self.scope_win and self.scope_win.winfo_exists()):
             return
-        if len(self.time_hist) < 2:
-            return
-
-        t_end = self.time_hist[-1]
-        t_start = t_end - SCOPE_WINDOW_S
-
-        start_idx = 0
-        for i, t in enumerate(self.time_hist):
-            if t >= t_start:
-                start_idx = i
-                break
-
-        vt = self.time_hist[start_idx:]
-        vlm = self.lm35_hist[start_idx:]
-        vir = self.ir_hist[start_idx:] if self.ir_hist else []
-        vpot = self.pot_hist[start_idx:] if self.pot_hist else []
+        spec_full = self._scope_update_spectrum()
 
-        if not vt:
+        if self.scope_trigger.mode != "FREE":
+            if self._scope_redraw_capture() or spec_full:
+                self.scope_blit.update(full=True)
+            elif spec_full is not None:
+                self.scope_blit.update()
             return
 
-        t0 = vt[0]
-        shifted = [x - t0 for x in vt]
-
-        self.scope_line_lm35.set_data(shifted, vlm)
-        self.scope_line_ir.set_data(shifted, vir if vir else [0]*len(shifted))
-        self.scope_line_pot.set_data(shifted, vpot if vpot else [0]*len(shifted))
+        n_all = len(self.store)
+        if n_all < 2:
+            return
 
-        for ax in (self.scope_ax_lm35, self.scope_ax_ir, self.scope_ax_pot):
-            ax.set_xlim(0, SCOPE_WINDOW_S)
+        full = bool(spec_full)
+        if self.scope_view != "LIVE":
+            self.scope_view = "LIVE"
+            for ghosts, markers in zip(self.scope_ghosts, self.scope_markers):
+                for g in ghosts:
+                    g.set_data([], [])
+                for m in markers:
+                    m.set_visible(False)
+            self.scope_ax_lm35.set_xlim(-SCOPE_WINDOW_S, 0)
+            self.lbl_scope_trig.configure(text="")
+            full = True
+
+        # Binary search for the window start, offsets written into a reused buffer:
+        # cost depends on the window length only, not on how much history is kept.
+        # Offsets are relative to the newest sample, so the x-axis never moves
+        # (scrolling window) and a frame is a single blit unless a y-limit changes.
+        t_col = self.store.column("t")
+        start_idx = self.store.index_at(t_col[-1] - SCOPE_WINDOW_S)
+        n = n_all - start_idx
+        if n > len(self.scope_x_buf):
+            self.scope_x_buf = np.empty(max(n, 2 * len(self.scope_x_buf)))
+        shifted = self.scope_x_buf[:n]
+        np.subtract(t_col[start_idx:], t_col[-1], out=shifted)
+
+        self.scope_line_lm35.set_data(shifted, self.store.column("lm35")[start_idx:])
+        self.scope_line_ir.set_data(shifted, self.store.column("ir")[start_idx:])
+        self.scope_line_pot.set_data(shifted, self.store.column("pot")[start_idx:])
+
+        if self.scope_lm35_ylim.update(self.scope_lm35_ext.min(), self.scope_lm35_ext.max()):
+            self.scope_ax_lm35.set_ylim(self.scope_lm35_ylim.lo, self.scope_lm35_ylim.hi)
+            full = True
+        if self.scope_ir_ylim.update(self.scope_ir_ext.min(), self.scope_ir_ext.max()):
+            self.scope_ax_ir.set_ylim(self.scope_ir_ylim.lo, self.scope_ir_ylim.hi)
+            full = True
+
+        self.scope_blit.update(full)
+
+    def _scope_apply_trigger(self):
+        try:
+            self.scope_trigger.configure(
+                mode=self.trig_mode_var.get(),
+                source=self.trig_source_var.get().lower(),
+                edge=self.trig_edge_var.get(),
+                level=float(self.trig_level_var.get()),
+                pre_s=float(self.trig_pre_var.get()),
+                post_s=float(self.trig_post_var.get()),
+            )
+        except ValueError as e:
+            self._set_status(f"Trigger settings error: {e}")
+            return
+        self.scope_capture_shown = None
+        self.scope_view = "LIVE" if self.scope_trigger.mode == "FREE" else "ARMING"
+        self._set_status(f"Scope trigger {self.scope_trigger.mode} on {self.scope_trigger.source.upper()} "
+                         f"{self.scope_trigger.edge.lower()} {self.scope_trigger.level:g}")
+        self._scope_redraw()
 
-        if vlm:
-            self.scope_ax_lm35.set_ylim(min(vlm) - 2, max(vlm) + 2)
-        if vir:
-            self.scope_ax_ir.set_ylim(min(vir) - 5, max(vir) + 5)
+    def _scope_clear_captures(self):
+        self.scope_trigger.captures.clear()
+        self.scope_capture_shown = None
+        self.scope_view = "ARMING"
+        self._scope_redraw()
 
-        self.scope_canvas_lm35.draw_idle()
-        self.scope_canvas_ir.draw_idle()
-        self.scope_canvas_pot.draw_idle()
+    def _scope_redraw_capture(self):
+        trig = self.scope_trigger
+        caps = trig.captures
+        latest = caps[-1] if caps else None
+
+        state = trig.state
+        if latest is not None:
+            state += f" | {len(caps)} captured" + (" (last forced)" if latest.forced else "")
+        self.lbl_scope_trig.configure(text=state)
+
+        # Frozen display: redraw only when a new capture lands or settings changed
+        if self.scope_view == "CAPTURE" and latest is self.scope_capture_shown:
+            return False
+        self.scope_view = "CAPTURE"
+        self.scope_capture_shown = latest
+
+        older = list(caps)[-1 - SCOPE_GHOST_CAPTURES:-1] if latest is not None else []
+        shown = older + ([latest] if latest is not None else [])
+        main_lines = (self.scope_line_lm35, self.scope_line_ir, self.scope_line_pot)
+
+        for c, line, ghosts, (vline, hline) in zip(SCOPE_CHANNELS, main_lines, self.scope_ghosts, self.scope_markers):
+            if latest is not None:
+                line.set_data(latest.t, latest.channels[c])
+            else:
+                line.set_data([], [])
+            for i, g in enumerate(ghosts):
+                if i < len(older):
+                    g.set_data(older[i].t, older[i].channels[c])
+                else:
+                    g.set_data([], [])
+            vline.set_visible(True)
+            hline.set_ydata([trig.level, trig.level])
+            hline.set_visible(c == trig.source)
+
+        self.scope_ax_lm35.set_xlim(-trig.pre_s, trig.post_s)
+        if shown:
+            for c, lim, ax in (("lm35", self.scope_lm35_ylim, self.scope_ax_lm35),
+                               ("ir", self.scope_ir_ylim, self.scope_ax_ir)):
+                lo = min(float(cap.channels[c].min()) for cap in shown)
+                hi = max(float(cap.channels[c].max()) for cap in shown)
+                if lim.update(lo, hi):
+                    ax.set_ylim(lim.lo, lim.hi)
+        return True
+
+    def _scope_update_spectrum(self):
+        """Push new PSDs into the spectrum lines. None = unchanged, False = blit, True = full draw."""
+        if not self.spec_dirty:
+            return None
+        self.spec_dirty = False
+
+        full = False
+        for i, spec in enumerate((self.spec_ir, self.spec_pot)):
+            if not spec.ready():
+                continue
+            self.spec_lines[i].set_data(spec.freqs, spec.psd_db)
+            x_hi = math.ceil(spec.freqs[-1] * 10.0) / 10.0
+            if x_hi != self.spec_x_hi[i]:
+                self.spec_x_hi[i] = x_hi
+                self.spec_axes[i].set_xlim(0, x_hi)
+                full = True
+            lim = self.spec_ylims[i]
+            if lim.update(float(spec.psd_db.min()), float(spec.psd_db.max())):
+                self.spec_axes[i].set_ylim(lim.lo, lim.hi)
+                full = True
+        return full
 
     # =============== OTHER UI HELPERS ===============
     def _animate_heading_color(self):
@@ -1248,7 +1925,8 @@ class CoolingPadGUI:
 
 
 # =============== SPLASH ===============
-def show_splash(root, on_done):
+def show_splash(root):
+    """Splash until close_splash(); `splash.status` says what startup is waiting for."""
     splash = tk.Toplevel(root)
     splash.overrideredirect(True)
     splash.configure(bg=BG_COLOR)
@@ -1265,35 +1943,96 @@ def show_splash(root, on_done):
 
     tk.Label(frame, text="Smart Laptop Cooling Pad",
              bg=CARD_BG, fg=ACCENT_YELLOW, font=("Consolas", 18, "bold")).pack(pady=(35, 6))
-    tk.Label(frame, text="Starting system...",
-             bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 10)).pack()
+    splash.status = tk.Label(frame, text="Starting system...",
+                             bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 10))
+    splash.status.pack()
 
     bar_frame = tk.Frame(frame, bg=CARD_BG)
     bar_frame.pack(pady=(30, 10))
-    pb = ttk.Progressbar(bar_frame, orient="horizontal", mode="indeterminate", length=340, maximum=120)
-    pb.pack()
+    splash.pb = ttk.Progressbar(bar_frame, orient="horizontal", mode="indeterminate", length=340, maximum=120)
+    splash.pb.pack()
 
     tk.Label(frame, text="Tip: use SCAN or type ESP32 IP shown in Serial Monitor.",
              bg=CARD_BG, fg=TEXT_MUTED, font=("Consolas", 9)).pack(pady=(6, 0))
 
-    pb.start(10)
+    splash.pb.start(10)
+    return splash
 
-    def finish():
-        pb.stop()
-        splash.destroy()
-        root.deiconify()
-        on_done()
 
-    root.after(1800, finish)
+def close_splash(root, splash):
+    splash.pb.stop()
+    root.deiconify()
+    root.update_idletasks()
+    splash.destroy()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ESP32 Smart Cooling Pad dashboard")
+    parser.add_argument("--connect", metavar="TARGET", help="pad URL / IP (or serial port) to connect at startup")
+    parser.add_argument("--link", default="HTTP", choices=LINK_TYPES, help="link type for --connect")
+    parser.add_argument("--replay", metavar="SESSION", help="replay a recorded session file instead of polling")
+    parser.add_argument("--speed", default="1x", choices=list(REPLAY_SPEEDS), help="replay speed")
+    parser.add_argument("--trace", metavar="FILE", help="write the pipeline trace (Chrome JSON) here on exit")
+    parser.add_argument("--stall-log", metavar="FILE", help="append UI stall reports (with stacks) to this file")
+    parser.add_argument("--filter", action="append", metavar="CHANNEL=SPEC",
+                        help="sample filter, e.g. lm35=kalman, dist=median:7, lux=ewma:2 or lux=off (repeatable)")
+    parser.add_argument("--profiles", metavar="FILE", default=PROFILE_PATH, help="fan-curve profile file")
+    parser.add_argument("--rules", metavar="FILE", help="alarm rules file (see rules.py), on top of the defaults")
+    parser.add_argument("--auto-table", metavar="LOW,MED,CM", default=",".join(f"{v:g}" for v in AUTO_TABLE),
+                        help="the pad's AUTO thresholds for the fan-mismatch check, or off")
+    args = parser.parse_args()
+    try:
+        filters = parse_filter_args(args.filter)
+        profiles = ProfileStore(args.profiles)
+        rules = RuleEngine.load(args.rules) if args.rules else None
+        auto_table = parse_auto_table(args.auto_table)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
     root = tk.Tk()
     root.configure(bg=BG_COLOR)
     root.withdraw()
 
-    def start_app():
-        CoolingPadGUI(root)
+    # networking first: samples queue up while matplotlib loads and the UI is built
+    service = CoolingPadService(Queue(), filters=filters, profiles=profiles, rules=rules,
+                                auto_table=auto_table).start()
+    if args.connect:
+        try:
+            service.connect(args.link, args.connect)
+        except (ValueError, OSError, ImportError) as e:
+            print(f"Connect {args.connect}: {e}", file=sys.stderr)
+
+    plotting_error = []
+
+    def load_plotting_worker():
+        try:
+            load_plotting()
+        except Exception as e:
+            plotting_error.append(e)
 
-    show_splash(root, start_app)
+    plotting = threading.Thread(target=load_plotting_worker, daemon=True)
+    plotting.start()
+
+    splash = show_splash(root)
+    splash.status.configure(text="Loading plots...")
+    gui = []
+
+    def start_app():
+        if plotting.is_alive():
+            root.after(20, start_app)
+            return
+        if plotting_error:
+            raise plotting_error[0]
+        splash.status.configure(text="Building dashboard...")
+        splash.update_idletasks()
+        gui.append(CoolingPadGUI(root, replay_path=args.replay, replay_speed=args.speed,
+                                 stall_log=args.stall_log, service=service))
+        root.after_idle(close_splash, root, splash)
+
+    root.after(20, start_app)
     root.mainloop()
+
+    if args.trace and gui:
+        n = gui[0].tracer.write_chrome_trace(args.trace)
+        print(f"Pipeline trace: {n} spans → {args.trace}")
+    service.stop()
@@ -0,0 +1,92 @@
+"""
+Host PID fan control vs. the firmware AUTO table on the simulator thermal model.
+
+    python benchmarks/bench_fan_control.py [--hours 2] [--target 38] [--seeds 5]
+
+Both controllers see the same seeded load profile (idle / gaming bursts) at
+accelerated time: SimDevice is stepped directly, one sample per 250 ms of
+device time, and host commands go through simulator.run_command like /fan
+requests would, applied one poll interval after the sample that caused them.
+Reported per controller: RMS deviation from the target (both ways, and only
+above it, since an idle laptop sits below the target with the fan off), worst
+overshoot, time spent more than 2 °C over the target, fan duty changes on the
+pad (hunting), commands sent and mean duty.
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from control import HostFanControl, PID_TARGET_C  # noqa: E402
+from simulator import SimDevice, SAMPLE_INTERVAL_MS, run_command  # noqa: E402
+
+POLL_INTERVAL_S = 0.7
+
+
+def run(seed, hours, target, host):
+    dev = SimDevice(seed=seed)
+    dev.advance(60)                      # let the model settle under AUTO first
+    ctl = HostFanControl(target) if host else None
+    if host:
+        run_command(dev, "/setMode", {"mode": "MANUAL"})
+
+    dt = SAMPLE_INTERVAL_MS / 1000.0
+    steps = int(hours * 3600 / dt)
+    poll_every = max(1, round(POLL_INTERVAL_S / dt))
+    pending = None
+    sq_err = sq_over = worst = over_s = duty_sum = 0.0
+    changes = commands = 0
+    last_duty = dev.fan_duty
+    for i in range(steps):
+        dev.tick()
+        snap = dev.status()
+        if pending is not None:
+            run_command(dev, "/fan", {"duty": str(pending)})
+            commands += 1
+            pending = None
+        if host and i % poll_every == 0:
+            pending = ctl.update(i * dt, snap["lm35"])
+
+        err = dev.temp - target
+        sq_err += err * err
+        if err > 0:
+            sq_over += err * err
+        worst = max(worst, err)
+        if err > 2.0:
+            over_s += dt
+        duty_sum += snap["fanDuty"]
+        if snap["fanDuty"] != last_duty:
+            changes += 1
+            last_duty = snap["fanDuty"]
+    return {
+        "rms_c": math.sqrt(sq_err / steps),
+        "rms_over_c": math.sqrt(sq_over / steps),
+        "worst_c": worst,
+        "over_min": over_s / 60.0,
+        "changes_h": changes / hours,
+        "commands_h": commands / hours,
+        "mean_duty": duty_sum / steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--target", type=float, default=PID_TARGET_C)
+    parser.add_argument("--seeds", type=int, default=5)
+    args = parser.parse_args()
+
+    cols = ("rms_c", "rms_over_c", "worst_c", "over_min", "changes_h", "commands_h", "mean_duty")
+    print(f"target {args.target:.1f} °C, {args.hours:g} h device time x {args.seeds} seeds (median)")
+    print(f"{'controller':<12}" + "".join(f"{c:>12}" for c in cols))
+    for name, host in (("AUTO table", False), ("host PID", True)):
+        results = [run(seed, args.hours, args.target, host) for seed in range(args.seeds)]
+        row = "".join(f"{statistics.median(r[c] for r in results):>12.2f}" for c in cols)
+        print(f"{name:<12}{row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Fan-curve profiles (curves.py): preview accuracy against live control, and engine cost.
+
+    python benchmarks/bench_fan_curves.py [--hours 2] [--seeds 3]
+
+A session is recorded from SimDevice in AUTO. Every built-in profile is previewed
+on that one recording (curves.preview), then really run: the same seed with the
+pad in MANUAL and CurveFanControl sending /fan through simulator.run_command, one
+sample after the sample that caused it, the IR distance median-filtered like the
+service does. Reported per profile: fan-on %, mean duty, peak (smoothed lm35) and
+pad duty switches/h, predicted vs. actual. Then the cost of FanCurve.evaluate()
+(hysteresis scan included) against step() in a loop, and of a full preview.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import simulator  # noqa: E402
+from curves import BUILTIN_PROFILES, FanCurve, CurveFanControl, preview  # noqa: E402
+from filters import MedianFilter  # noqa: E402
+from policy import SessionTrace  # noqa: E402
+
+DT = simulator.SAMPLE_INTERVAL_MS / 1000.0
+
+
+def record(seed, hours, curve=None):
+    """(times, payloads) from SimDevice in AUTO, or driven by `curve` from the host."""
+    dev = simulator.SimDevice(seed=seed)
+    dev.advance(60)
+    ctl = dist_f = None
+    if curve is not None:
+        simulator.run_command(dev, "/setMode", {"mode": "MANUAL"})
+        ctl = CurveFanControl(curve)
+        dist_f = MedianFilter()
+    times, payloads = [], []
+    pending = None
+    for i in range(int(hours * 3600 / DT)):
+        dev.tick()
+        snap = dev.status()
+        if pending is not None:
+            simulator.run_command(dev, "/fan", {"duty": str(pending)})
+            pending = None
+        if ctl is not None:
+            pending = ctl.update(i * DT, snap["lm35"], dist_f.update(i * DT, snap["dist"]))
+        times.append(i * DT)
+        payloads.append(snap)
+    return times, payloads
+
+
+def actual(trace):
+    d = trace.duty
+    hours = trace.duration_s / 3600.0
+    return (100.0 * np.mean(d > 0), float(np.mean(d)), float(trace.smooth.max()),
+            np.count_nonzero(d[1:] != d[:-1]) / hours)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    curves = [FanCurve.from_dict(d, name) for name, d in BUILTIN_PROFILES.items()]
+    rows = {c.name: [] for c in curves}
+    for seed in range(args.seeds):
+        res = preview(SessionTrace(*record(seed, args.hours)), curves)
+        for k, c in enumerate(curves):
+            pred = (res["fan_on_pct"][k], res["mean_duty"][k], res["peak_c"][k], res["switches_h"][k])
+            c.reset()
+            rows[c.name].append((pred, actual(SessionTrace(*record(seed, args.hours, c)))))
+
+    print(f"recorded in AUTO, {args.hours:g} h x {args.seeds} seeds (mean); predicted / actual")
+    cols = ("fan on %", "mean duty", "peak C", "switches/h")
+    print(f"{'profile':<13}" + "".join(f"{c:>22}" for c in cols))
+    for name, rs in rows.items():
+        cells = []
+        for k in range(4):
+            p = statistics.mean(r[0][k] for r in rs)
+            a = statistics.mean(r[1][k] for r in rs)
+            cells.append(f"{p:.2f} / {a:.2f}")
+        print(f"{name:<13}" + "".join(f"{c:>22}" for c in cells))
+
+    times, payloads = record(0, args.hours)
+    trace = SessionTrace(times, payloads)
+    lm35 = trace.lm35
+    dist = trace.dist
+    curve = FanCurve.from_dict(BUILTIN_PROFILES["quiet"])
+    t0 = time.perf_counter()
+    duty = curve.evaluate(lm35, dist)
+    t_eval = time.perf_counter() - t0
+    curve.reset()
+    t0 = time.perf_counter()
+    loop = [curve.step(x, d) for x, d in zip(lm35.tolist(), dist.tolist())]
+    t_loop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    preview(trace, curves)
+    t_prev = time.perf_counter() - t0
+    print(f"\n{len(lm35)} samples: evaluate() {t_eval * 1000:.1f} ms, step() loop {t_loop * 1000:.0f} ms, "
+          f"{np.count_nonzero(duty != np.array(loop))} differences; "
+          f"preview of {len(curves)} profiles {t_prev:.2f} s ({trace.duration_s / t_prev:,.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Sensor filter stage on simulator data: jitter on the dashboard's thresholds, and
+vectorized vs. per-sample filtering cost.
+
+    python benchmarks/bench_filters.py [--hours 2] [--seeds 4]
+
+SimDevice is stepped directly (one sample per 250 ms of device time) with the
+pad in MANUAL at a fixed duty, so the laptop crosses 40 °C now and then. For
+the raw and the filtered (DEFAULT_FILTERS) series:
+- flips/h: how often "Laptop: CONNECTED", the RGB "lux < 99" decision and the
+  "lm35 > 40" warning change state
+- lm35 rms: error against the model temperature; lag: the time shift that best
+  aligns the filtered series with it
+Then the whole session through FilterStage.process_batch (what backfill and
+replay use) against process() sample by sample, and the largest difference
+between the two.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from filters import FilterStage  # noqa: E402
+from simulator import SimDevice, SAMPLE_INTERVAL_MS, run_command  # noqa: E402
+
+DT = SAMPLE_INTERVAL_MS / 1000.0
+
+
+def record(seed, hours, duty):
+    dev = SimDevice(seed=seed)
+    run_command(dev, "/setMode", {"mode": "MANUAL"})
+    run_command(dev, "/fan", {"duty": str(duty)})
+    dev.advance(60)
+    samples, truth = [], []
+    for i in range(int(hours * 3600 / DT)):
+        dev.tick()
+        samples.append((dict(dev.status()), i * DT))
+        truth.append(dev.temp)
+    return samples, np.array(truth)
+
+
+def flips(values):
+    v = np.asarray(values, dtype=bool)
+    return int(np.count_nonzero(v[1:] != v[:-1]))
+
+
+def best_lag(series, truth):
+    """Shift (s) of `series` behind `truth` with the smallest rms difference, 0..5 s."""
+    errs = [np.sqrt(np.mean((series[k:] - truth[:len(truth) - k]) ** 2)) for k in range(int(5 / DT) + 1)]
+    return int(np.argmin(errs)) * DT
+
+
+def run(seed, hours, duty):
+    samples, truth = record(seed, hours, duty)
+    FilterStage().process_batch(samples)
+    col = {k: np.array([float(d[k]) for d, _ in samples]) for k in ("lm35", "lux", "connected")}
+    filt = {k: np.array([d["filtered"][k] for d, _ in samples]) for k in ("lm35", "lux", "connected")}
+    out = {}
+    for name, src in (("raw", col), ("filtered", filt)):
+        out[name] = (flips(src["connected"] >= 0.5) / hours, flips(src["lux"] < 99.0) / hours,
+                     flips(src["lm35"] > 40.0) / hours,
+                     float(np.sqrt(np.mean((src["lm35"] - truth) ** 2))), best_lag(src["lm35"], truth))
+    return out
+
+
+def timing(hours, duty):
+    samples, _ = record(0, hours, duty)
+    batch = [(dict(d), t) for d, t in samples]
+    t0 = time.perf_counter()
+    FilterStage().process_batch(batch)
+    t_batch = time.perf_counter() - t0
+    stage = FilterStage()
+    t0 = time.perf_counter()
+    for d, t in samples:
+        stage.process(d, t)
+    t_live = time.perf_counter() - t0
+    diff = max(abs(a[0]["filtered"][k] - b[0]["filtered"][k]) for a, b in zip(batch, samples)
+               for k in a[0]["filtered"])
+    return len(samples), t_batch, t_live, diff
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--seeds", type=int, default=4)
+    parser.add_argument("--duty", type=int, default=60, help="fixed MANUAL fan duty")
+    args = parser.parse_args()
+
+    runs = [run(s, args.hours, args.duty) for s in range(args.seeds)]
+    print(f"MANUAL duty {args.duty}, {args.hours:g} h x {args.seeds} seeds (mean)")
+    cols = ("connected/h", "lux<99/h", "lm35>40/h", "lm35 rms", "lag s")
+    print(f"{'series':<10}" + "".join(f"{c:>13}" for c in cols))
+    for name in ("raw", "filtered"):
+        print(f"{name:<10}" + "".join(f"{statistics.mean(r[name][i] for r in runs):>13.2f}" for i in range(5)))
+
+    n, t_batch, t_live, diff = timing(args.hours, args.duty)
+    print(f"\n{n} samples: process_batch {t_batch * 1000:.1f} ms, process() loop {t_live * 1000:.1f} ms, "
+          f"max difference {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Thermal forecast quality and pre-cooling on the simulator thermal model.
+
+    python benchmarks/bench_overheat_forecast.py [--hours 2] [--seeds 6]
+
+Accelerated time: SimDevice is stepped directly, one sample per 250 ms.
+
+1. forecast: the pad runs in MANUAL at a fixed duty while the load wanders.
+   Mean absolute error of ThermalForecaster 30 s / 60 s ahead vs. "stays where
+   it is" (persistence), then early warnings for crossings of --threshold: a
+   forecast warning (time-to-threshold <= lead, released at 2x lead, like the
+   dashboard banner) against a reactive "lm35 >= threshold - margin" alarm.
+   Lead = how long before the crossing the warning started; false = warnings
+   that cleared without a crossing.
+2. pre-cool: the pad in AUTO, with and without CoolingPadService pre-cooling
+   toward --precool; samples go through the service and its commands through
+   simulator.run_command, one sample later. Minutes above the pre-cool
+   temperature, peak temperature and mean duty. (The simulated AUTO table holds
+   a full-load laptop just under 39 C, so the default is below the dashboard's
+   PRECOOL_C.)
+"""
+import argparse
+import os
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from control import ThermalForecaster  # noqa: E402
+from service import CoolingPadService  # noqa: E402
+from simulator import SimDevice, SAMPLE_INTERVAL_MS, run_command, parse_request  # noqa: E402
+
+DT = SAMPLE_INTERVAL_MS / 1000.0
+REARM_C = 2.0       # a new crossing counts once the temperature was this far below the threshold
+
+
+class Alarm:
+    """Warning episodes -> lead times before crossings and false alarms."""
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.since = None
+        self.armed = False
+        self.leads = []
+        self.missed = 0
+        self.false = 0
+
+    def step(self, t, warn, temp):
+        if warn and self.since is None:
+            self.since = t
+        elif not warn and self.since is not None and temp < self.threshold:
+            self.false += 1
+            self.since = None
+        if temp < self.threshold - REARM_C:
+            self.armed = True
+        elif self.armed and temp >= self.threshold:
+            self.armed = False
+            if self.since is not None and t > self.since:
+                self.leads.append(t - self.since)
+            else:
+                self.missed += 1
+            self.since = None
+
+
+def run_forecast(seed, hours, duty, threshold, lead, margin):
+    dev = SimDevice(seed=seed)
+    run_command(dev, "/setMode", {"mode": "MANUAL"})
+    run_command(dev, "/fan", {"duty": str(duty)})
+    dev.advance(60)
+    fc = ThermalForecaster()
+    predictive, reactive = Alarm(threshold), Alarm(threshold)
+    temps, pending = [], []
+    warned = False
+    for i in range(int(hours * 3600 / DT)):
+        dev.tick()
+        s = dev.status()
+        t = i * DT
+        fc.update(t, s["lm35"], s["dhtTemp"])
+        temps.append(dev.temp)
+        if fc.ready:
+            for h in (30, 60):
+                pending.append((i + int(h / DT), h, fc.predict(h), fc.smooth))
+        eta = fc.time_to(threshold) if fc.ready else None
+        warned = eta is not None and eta <= lead * (2 if warned else 1)
+        predictive.step(t, warned, dev.temp)
+        reactive.step(t, fc.smooth >= threshold - margin, dev.temp)
+
+    err = {("model", 30): [], ("model", 60): [], ("persist", 30): [], ("persist", 60): []}
+    for k, h, pred, now in pending:
+        if k < len(temps):
+            err[("model", h)].append(abs(temps[k] - pred))
+            err[("persist", h)].append(abs(temps[k] - now))
+    out = {key: statistics.mean(v) for key, v in err.items()}
+    for name, alarm in (("forecast", predictive), ("reactive", reactive)):
+        out[name] = (len(alarm.leads) + alarm.missed, alarm.missed,
+                     statistics.median(alarm.leads) if alarm.leads else 0.0, alarm.false)
+    return out
+
+
+class BenchService(CoolingPadService):
+    """CoolingPadService whose commands are applied to a SimDevice on the next sample."""
+    def __init__(self, dev):
+        super().__init__()
+        self.dev = dev
+        self.queued = []
+        self.http.base_url = "sim"
+
+    def _send_async(self, path):
+        self.queued.append(path)
+
+    def command(self, path, timeout=1.2):
+        code, text = run_command(self.dev, *parse_request(path))
+        return SimpleNamespace(status_code=code, text=text)
+
+
+def run_precool(seed, hours, threshold, precool):
+    dev = SimDevice(seed=seed)
+    dev.advance(60)
+    svc = BenchService(dev)
+    if precool:
+        svc.set_precool(threshold)
+    above_s = duty_sum = 0.0
+    peak = 0.0
+    steps = int(hours * 3600 / DT)
+    for i in range(steps):
+        for path in svc.queued:
+            svc.command(path)
+        svc.queued.clear()
+        dev.tick()
+        s = dev.status()
+        svc._emit(("status_data", s, i * DT))
+        peak = max(peak, dev.temp)
+        if dev.temp > threshold:
+            above_s += DT
+        duty_sum += s["fanDuty"]
+    return above_s / 60.0, peak, duty_sum / steps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--seeds", type=int, default=6)
+    parser.add_argument("--duty", type=int, default=60, help="fixed MANUAL duty for the forecast runs")
+    parser.add_argument("--threshold", type=float, default=42.0, help="warning threshold for the forecast runs")
+    parser.add_argument("--lead", type=float, default=30.0, help="forecast warning lead (s)")
+    parser.add_argument("--precool", type=float, default=36.0, help="pre-cooling temperature for the AUTO runs")
+    args = parser.parse_args()
+    seeds = range(args.seeds)
+
+    print(f"forecast: MANUAL duty {args.duty}, {args.hours:g} h x {args.seeds} seeds (mean)")
+    runs = [run_forecast(s, args.hours, args.duty, args.threshold, args.lead, 3.0) for s in seeds]
+    print(f"{'':<10}{'MAE 30 s':>10}{'MAE 60 s':>10}")
+    for name in ("model", "persist"):
+        print(f"{name:<10}" + "".join(f"{statistics.mean(r[(name, h)] for r in runs):>9.2f}C" for h in (30, 60)))
+
+    print(f"\nwarnings for {args.threshold:.0f} C crossings (forecast lead {args.lead:.0f} s)")
+    print(f"{'alarm':<22}{'crossings':>10}{'missed':>8}{'lead s':>8}{'false':>8}")
+    rows = [("forecast", runs)]
+    for margin in (1.0, 2.0, 3.0):
+        rows.append((f"reactive -{margin:.0f} C",
+                     [run_forecast(s, args.hours, args.duty, args.threshold, args.lead, margin) for s in seeds]))
+    for label, rs in rows:
+        key = "forecast" if label == "forecast" else "reactive"
+        cols = [statistics.mean(r[key][i] for r in rs) for i in range(4)]
+        print(f"{label:<22}{cols[0]:>10.1f}{cols[1]:>8.1f}{cols[2]:>8.1f}{cols[3]:>8.1f}")
+
+    print(f"\npre-cool: AUTO, threshold {args.precool:.0f} C")
+    print(f"{'':<12}{'min above':>10}{'peak C':>8}{'duty':>8}")
+    for label, precool in (("AUTO", False), ("AUTO+pre", True)):
+        rs = [run_precool(s, args.hours, args.precool, precool) for s in seeds]
+        above, peak, duty = (statistics.mean(r[i] for r in rs) for i in range(3))
+        print(f"{label:<12}{above:>10.2f}{peak:>8.2f}{duty:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
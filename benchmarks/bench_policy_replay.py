@@ -0,0 +1,90 @@
+"""
+Counterfactual accuracy and speed of the offline AUTO-policy replay (policy.py).
+
+    python benchmarks/bench_policy_replay.py [--hours 2] [--seeds 3]
+
+A session is recorded from SimDevice in AUTO with the firmware thresholds. Then,
+for a few other (TEMP_LOW, TEMP_MED) pairs, the replay's prediction from that one
+recording is compared with what the simulator really does under the changed
+thresholds (same seed, so the same load). Reported: fan-on %, mean duty, peak
+(smoothed lm35) and switches/h, predicted vs. actual, then the full default grid
+in seconds and x real time.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import simulator  # noqa: E402
+from policy import SessionTrace, PolicyGrid, replay, parse_range, TEMP_MAX, LAPTOP_PRESENT_CM  # noqa: E402
+
+DT = simulator.SAMPLE_INTERVAL_MS / 1000.0
+PAIRS = ((30.0, 40.0), (26.0, 34.0), (28.0, 36.0), (32.0, 38.0), (34.0, 44.0))
+
+
+def record(seed, hours, low, med):
+    """(times, payloads) from SimDevice with its AUTO thresholds set to low / med."""
+    saved = simulator.TEMP_LOW, simulator.TEMP_MED
+    simulator.TEMP_LOW, simulator.TEMP_MED = low, med
+    try:
+        dev = simulator.SimDevice(seed=seed)
+        dev.advance(60)
+        times, payloads = [], []
+        for i in range(int(hours * 3600 / DT)):
+            dev.tick()
+            times.append(i * DT)
+            payloads.append(dev.status())
+        return times, payloads
+    finally:
+        simulator.TEMP_LOW, simulator.TEMP_MED = saved
+
+
+def actual(trace):
+    d = trace.duty
+    hours = trace.duration_s / 3600.0
+    return (100.0 * np.mean(d > 0), float(np.mean(d)), float(trace.smooth.max()),
+            np.count_nonzero(d[1:] != d[:-1]) / hours)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    grid = PolicyGrid([lo for lo, _ in PAIRS], [me for _, me in PAIRS], [LAPTOP_PRESENT_CM], [TEMP_MAX])
+    rows = {pair: [] for pair in PAIRS}
+    for seed in range(args.seeds):
+        res = replay(SessionTrace(*record(seed, args.hours, 30.0, 40.0)), grid)
+        for low, med in PAIRS:
+            i = int(np.flatnonzero((grid.low == low) & (grid.med == med))[0])
+            pred = (res["fan_on_pct"][i], res["mean_duty"][i], res["peak_c"][i], res["switches_h"][i])
+            rows[(low, med)].append((pred, actual(SessionTrace(*record(seed, args.hours, low, med)))))
+
+    print(f"recorded with 30/40, {args.hours:g} h x {args.seeds} seeds (mean); predicted / actual")
+    cols = ("fan on %", "mean duty", "peak C", "switches/h")
+    print(f"{'low/med':<10}" + "".join(f"{c:>22}" for c in cols))
+    for (low, med), rs in rows.items():
+        cells = []
+        for k in range(4):
+            p = statistics.mean(r[0][k] for r in rs)
+            a = statistics.mean(r[1][k] for r in rs)
+            cells.append(f"{p:.2f} / {a:.2f}")
+        print(f"{f'{low:.0f}/{med:.0f}':<10}" + "".join(f"{c:>22}" for c in cells))
+
+    trace = SessionTrace(*record(0, args.hours, 30.0, 40.0))
+    full = PolicyGrid(parse_range("26:34:2"), parse_range("34:44:2"), parse_range("20:50:10"), parse_range("46:54:2"))
+    t0 = time.perf_counter()
+    replay(trace, full)
+    el = time.perf_counter() - t0
+    print(f"\ndefault grid: {len(full)} policies x {len(trace.t)} samples in {el:.2f} s "
+          f"({trace.duration_s / el:,.0f}x real time for all of them)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Alarm rules engine (rules.py): decision chatter against the old hard-coded checks,
+and cost for many rules x many pads.
+
+    python benchmarks/bench_rules.py [--hours 2] [--seeds 4] [--duty 60] [--devices 200] [--rules 50]
+
+SimDevice is stepped directly (one sample per 250 ms of device time) in MANUAL at
+a fixed duty, samples go through the default FilterStage like in the service.
+Flips/h of the over-temperature, high-temperature and RGB decisions: the old
+`if` checks on the filtered channels against DEFAULT_RULES (with hysteresis).
+Then --devices pads x (DEFAULT_RULES + generated rules, --rules in total), samples
+interleaved: samples/s on one core, the share of rule evaluations the incremental
+update skips, and what compiling the rules on every sample would cost instead.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from filters import FilterStage  # noqa: E402
+from rules import RuleEngine, RuleSet, DEFAULT_RULES, RULE_OVERTEMP, RULE_HIGH_TEMP, RULE_RGB  # noqa: E402
+from simulator import SimDevice, SAMPLE_INTERVAL_MS, run_command  # noqa: E402
+
+DT = SAMPLE_INTERVAL_MS / 1000.0
+CHANNELS = (("lm35", 30.0, 50.0), ("dhtTemp", 20.0, 35.0), ("dhtHum", 30.0, 70.0), ("dist", 10.0, 60.0),
+            ("lux", 20.0, 200.0), ("fanDuty", 0.0, 255.0))
+
+
+def record(seed, seconds, duty):
+    dev = SimDevice(seed=seed)
+    run_command(dev, "/setMode", {"mode": "MANUAL"})
+    run_command(dev, "/fan", {"duty": str(duty)})
+    dev.advance(60)
+    samples = []
+    for i in range(int(seconds / DT)):
+        dev.tick()
+        samples.append((dict(dev.status()), i * DT))
+    FilterStage().process_batch(samples)
+    return samples
+
+
+def flips(values):
+    v = np.asarray(values, dtype=bool)
+    return int(np.count_nonzero(v[1:] != v[:-1]))
+
+
+def chatter(seed, hours, duty):
+    samples = record(seed, hours * 3600, duty)
+    engine = RuleEngine()
+    old = {RULE_OVERTEMP: [], RULE_HIGH_TEMP: [], RULE_RGB: []}
+    new = {k: [] for k in old}
+    for data, t in samples:
+        f = data["filtered"]
+        old[RULE_OVERTEMP].append(f["lm35"] > 50.0)
+        old[RULE_HIGH_TEMP].append(f["lm35"] > 40.0)
+        old[RULE_RGB].append(f["connected"] >= 0.5 and f["lux"] < 99.0)
+        engine.update("pad", data, t)
+        active = engine.active("pad")
+        for k in new:
+            new[k].append(k in active)
+    return {k: (flips(old[k]) / hours, flips(new[k]) / hours) for k in old}
+
+
+def generated_rules(n, rng):
+    specs = list(DEFAULT_RULES)
+    for k in range(n - len(specs)):
+        ch, lo, hi = CHANNELS[k % len(CHANNELS)]
+        op = rng.choice((">", "<"))
+        when = f"{ch} {op} {rng.uniform(lo, hi):.1f}"
+        if k % 3 == 0:
+            when += " and mode == MANUAL"
+        specs.append({"name": f"r{k}", "when": when, "hysteresis": 0.5, "for_s": rng.choice((0.0, 2.0)),
+                      "severity": "info"})
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--seeds", type=int, default=4)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--rules", type=int, default=50)
+    parser.add_argument("--duty", type=int, default=60, help="fixed MANUAL fan duty")
+    args = parser.parse_args()
+
+    runs = [chatter(s, args.hours, args.duty) for s in range(args.seeds)]
+    print(f"MANUAL duty {args.duty}, {args.hours:g} h x {args.seeds} seeds (mean flips/h)")
+    print(f"{'decision':<12}{'if checks':>11}{'rules':>9}")
+    for k in (RULE_OVERTEMP, RULE_HIGH_TEMP, RULE_RGB):
+        print(f"{k:<12}{statistics.mean(r[k][0] for r in runs):>11.1f}{statistics.mean(r[k][1] for r in runs):>9.1f}")
+
+    rng = random.Random(1)
+    specs = generated_rules(args.rules, rng)
+    streams = [record(s, 60.0, args.duty) for s in range(min(args.devices, 8))]
+    engine = RuleEngine(specs)
+    t0 = time.perf_counter()
+    n = 0
+    for i in range(len(streams[0])):
+        for d in range(args.devices):
+            data, t = streams[d % len(streams)][i]
+            engine.update(d, data, t)
+            n += 1
+    el = time.perf_counter() - t0
+    rate = n / el
+    rules_per_sample = len(engine.base.rules)
+    share = engine.evaluated / max(1, engine.samples * rules_per_sample)
+
+    t0 = time.perf_counter()
+    for _ in range(20):
+        RuleSet(specs)
+    compile_s = (time.perf_counter() - t0) / 20
+    print(f"\n{args.devices} pads x {rules_per_sample} rules: {rate:,.0f} samples/s on one core "
+          f"({rate * DT:,.0f} pads at {SAMPLE_INTERVAL_MS} ms), {100 * share:.0f}% of rule evaluations needed; "
+          f"compiling the rules per sample would take {compile_s * 1e6:,.0f} us each "
+          f"({1 / compile_s:,.0f} samples/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Dashboard startup: import time and time to first sample, against a budget.
+
+    python benchmarks/bench_startup.py [--runs 5]
+
+Each run is a fresh interpreter. "import app" is what has to happen before the
+splash can show; matplotlib loads afterwards on a worker thread, its cost is
+listed separately. "first sample" is wall time from spawning the process to the
+service's first status event from a local simulator (interpreter start +
+imports + connect + first response), i.e. what __main__ does before the UI is
+built. With a display, "UI ready" also builds CoolingPadGUI. Exits 1 when a
+median is over budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from simulator import Simulator  # noqa: E402
+
+IMPORT_BUDGET_MS = 200
+FIRST_SAMPLE_BUDGET_MS = 300
+UI_READY_BUDGET_MS = 1500
+
+CHILD_IMPORT = """
+import sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+eager = "matplotlib" in sys.modules
+app.load_plotting()
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000, eager)
+"""
+
+CHILD_FIRST_SAMPLE = """
+import sys, time
+from queue import Queue
+import app
+svc = app.CoolingPadService(Queue()).start()
+svc.connect("HTTP", sys.argv[1])
+while svc.events.get(timeout=5)[0] not in ("status_data", "status_batch"):
+    pass
+print(time.time())
+"""
+
+CHILD_UI_READY = """
+import sys, time
+import tkinter as tk
+from queue import Queue
+import app
+svc = app.CoolingPadService(Queue()).start()
+svc.connect("HTTP", sys.argv[1])
+root = tk.Tk()
+root.withdraw()
+app.CoolingPadGUI(root, service=svc)
+root.deiconify()
+root.update()
+print(time.time())
+"""
+
+
+def run_child(code, *argv):
+    t0 = time.time()
+    out = subprocess.run([sys.executable, "-c", code, *argv], cwd=ROOT, capture_output=True, text=True,
+                         check=True, timeout=30).stdout.split()
+    return t0, out
+
+
+def has_display():
+    if sys.platform != "linux":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    imports, plotting = [], []
+    for _ in range(args.runs):
+        _, (imp, plot, eager) = run_child(CHILD_IMPORT)
+        if eager == "True":
+            sys.exit("app imported matplotlib at module load")
+        imports.append(float(imp))
+        plotting.append(float(plot))
+
+    sim = Simulator(port=0).start()
+    first = []
+    ui = []
+    try:
+        for _ in range(args.runs):
+            t0, (t_sample,) = run_child(CHILD_FIRST_SAMPLE, sim.base_url)
+            first.append((float(t_sample) - t0) * 1000)
+        if has_display():
+            for _ in range(args.runs):
+                t0, (t_ready,) = run_child(CHILD_UI_READY, sim.base_url)
+                ui.append((float(t_ready) - t0) * 1000)
+    finally:
+        sim.stop()
+
+    rows = [("import app", imports, IMPORT_BUDGET_MS),
+            ("load_plotting (bg)", plotting, None),
+            ("first sample", first, FIRST_SAMPLE_BUDGET_MS)]
+    if ui:
+        rows.append(("UI ready", ui, UI_READY_BUDGET_MS))
+
+    failed = False
+    print(f"{args.runs} runs, fresh interpreter each")
+    print(f"{'stage':<20}{'median ms':>11}{'max ms':>9}{'budget':>9}")
+    for name, values, budget in rows:
+        med = statistics.median(values)
+        verdict = ""
+        if budget is not None:
+            ok = med <= budget
+            failed |= not ok
+            verdict = f"{budget:>9}  {'ok' if ok else 'OVER'}"
+        print(f"{name:<20}{med:>11.0f}{max(values):>9.0f}{verdict}")
+    if not ui:
+        print("(no display: UI ready not measured)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Payload size and decode time: JSON vs binary status frames.
+
+    python benchmarks/bench_status_frame.py
+
+Samples come from the simulator model so the JSON numbers have realistic
+digit counts. "decode" is what the dashboard does per response: parse plus
+the float()/int() conversions for JSON, one Struct unpack for binary.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from protocol import (decode_status_frame, decode_history_frames,  # noqa: E402
+                      encode_status_frame, encode_history_frames)
+from simulator import SimDevice, HISTORY_MAX_BATCH  # noqa: E402
+
+
+def convert(d):
+    # the conversions _update_ui_from_status does on a JSON payload
+    return (str(d.get("mode")), float(d["lm35"]), float(d["dhtTemp"]), float(d["dhtHum"]),
+            float(d["dist"]), float(d["lux"]), int(d["fanDuty"]), bool(d["connected"]),
+            int(d["seq"]), int(d["ms"]))
+
+
+def bench(fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    dev = SimDevice(seed=1)
+    dev.advance(90)
+    single = dev.status()
+    batch = dev.history_since(dev.seq - HISTORY_MAX_BATCH)
+    samples = [dict(zip(batch["fields"], row)) for row in batch["samples"]]
+
+    json_single = json.dumps(single, separators=(",", ":")).encode()
+    bin_single = encode_status_frame(single)
+    json_batch = json.dumps(batch, separators=(",", ":")).encode()
+    bin_batch = encode_history_frames(samples, batch["last"], batch["more"])
+
+    def json_single_decode():
+        convert(json.loads(json_single))
+
+    def bin_single_decode():
+        decode_status_frame(bin_single)
+
+    def json_batch_decode():
+        b = json.loads(json_batch)
+        fields = b["fields"]
+        for row in b["samples"]:
+            convert(dict(zip(fields, row)))
+
+    def bin_batch_decode():
+        decode_history_frames(bin_batch)
+
+    n = len(samples)
+    rows = [
+        ("single JSON", len(json_single), bench(json_single_decode, 20000)),
+        ("single binary", len(bin_single), bench(bin_single_decode, 20000)),
+        (f"batch x{n} JSON", len(json_batch), bench(json_batch_decode, 500)),
+        (f"batch x{n} binary", len(bin_batch), bench(bin_batch_decode, 500)),
+    ]
+    print(f"{'payload':<20}{'bytes':>8}{'decode us':>12}")
+    for name, size, us in rows:
+        print(f"{name:<20}{size:>8}{us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+UDP receiver throughput and loss accounting with a simulated pad fleet.
+
+    python benchmarks/bench_udp_receiver.py [--pads 50] [--seconds 3]
+
+A sender process replays pre-generated simulator samples for every pad at
+increasing datagram rates; the receiver runs in this process exactly as the
+dashboard uses it. Loss is what the per-pad DeviceClocks counted from the
+sequence numbers, CPU is this process's CPU time per received datagram.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from protocol import encode_udp_datagram  # noqa: E402
+from simulator import SimDevice  # noqa: E402
+from transport import UdpReceiver  # noqa: E402
+
+
+def sender(port, pads, rate, seconds, result):
+    import socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frames = []
+    for i in range(pads):
+        dev = SimDevice(seed=i)
+        per_pad = []
+        for _ in range(200):
+            dev.tick()
+            per_pad.append((dev.device_id, dev.status()))
+        frames.append(per_pad)
+
+    target = ("127.0.0.1", port)
+    sent = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        due = int((now - t0) * rate)
+        while sent < due:
+            pad = sent % pads
+            k = sent // pads
+            dev_id, snap = frames[pad][k % 200]
+            snap = dict(snap, seq=k + 1, ms=(k + 1) * 250)
+            sock.sendto(encode_udp_datagram(dev_id, snap), target)
+            sent += 1
+        time.sleep(0.0005)
+    result.put(sent)
+
+
+def run(pads, rate, seconds):
+    received = [0]
+
+    def on_sample(device_id, data, t):
+        received[0] += 1
+
+    rx = UdpReceiver(on_sample, port=0, host="127.0.0.1", rcvbuf=4 << 20).start()
+    result = mp.Queue()
+    proc = mp.Process(target=sender, args=(rx.port, pads, rate, seconds, result))
+    cpu0 = time.process_time()
+    proc.start()
+    sent = result.get()
+    proc.join()
+    time.sleep(0.2)
+    cpu = time.process_time() - cpu0
+    rx.stop()
+
+    missed = sum(c.missed for c in rx.devices.values())
+    return sent, received[0], missed, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pads", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{args.pads} pads, {args.seconds:g}s per rate")
+    print(f"{'target/s':>9}{'sent':>9}{'recv':>9}{'missed':>8}{'recv/s':>9}{'cpu us/dgram':>14}{'cpu %':>7}")
+    for rate in (1000, 2000, 5000, 10000, 20000, 40000):
+        sent, recv, missed, cpu = run(args.pads, rate, args.seconds)
+        per = cpu / recv * 1e6 if recv else 0.0
+        print(f"{rate:>9}{sent:>9}{recv:>9}{missed:>8}{recv / args.seconds:>9.0f}{per:>14.1f}"
+              f"{cpu / args.seconds * 100:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
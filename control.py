@@ -0,0 +1,255 @@
+import math
+from collections import deque
+
+PID_TARGET_C = 38.0
+PID_KP = 40.0               # duty counts per °C above target
+PID_KI = 1.5                # duty counts per °C·s
+PID_KD = 40.0               # duty counts per °C/s (on the measurement)
+PID_X_TAU_S = 4.0           # lm35 low-pass before P / D
+FAN_DEADBAND = 10           # duty counts; smaller corrections are not sent
+FAN_MAX_STEP_PER_S = 40.0
+FAN_MIN_INTERVAL_S = 4.0
+FAN_REFRESH_S = 30.0
+
+OVERHEAT_C = 50.0           # over-temperature banner threshold
+OVERHEAT_WARN_S = 30.0      # early warning when the forecast reaches OVERHEAT_C this soon
+FORECAST_WINDOW_S = 30.0    # samples the thermal model is fitted on
+FORECAST_SMOOTH_S = 4.0     # lm35 low-pass before differentiating
+FORECAST_HORIZON_S = 90.0   # how far ahead forecasts / time-to-threshold look
+FORECAST_MIN_SPAN_C = 0.4   # less temperature spread than this in the window -> straight-line trend
+PRECOOL_C = 40.0            # pre-cooling threshold (the AUTO table's full-fan step)
+PRECOOL_LEAD_S = 30.0       # full fan this long before the forecast reaches PRECOOL_C
+
+
+class PidController:
+    """
+    Discrete PID, reverse acting (output rises while the measurement is above the setpoint):
+    - derivative on the measurement, low-pass filtered, so setpoint changes don't kick
+    - anti-windup: the integrator stops while the output is saturated in the direction
+      the error pushes it, and is clamped to the output range
+    - the measurement is low-pass filtered (`x_tau` seconds) before P and D see it;
+      LM35 readings carry ~0.25 °C of noise and 0.1 °C steps
+    update() takes the sample time, so irregular sample spacing is fine.
+    """
+    def __init__(self, kp, ki, kd, setpoint, out_min=0.0, out_max=255.0, d_tau=2.0, x_tau=0.0):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.setpoint = setpoint
+        self.out_min = out_min
+        self.out_max = out_max
+        self.d_tau = d_tau
+        self.x_tau = x_tau
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.last_t = None
+        self.last_x = None
+        self.d_filt = 0.0
+        self.output = self.out_min
+
+    def update(self, t: float, x: float) -> float:
+        dt = 0.0 if self.last_t is None else t - self.last_t
+        if dt < 0:
+            # time went backwards (clock re-anchor): start over
+            self.reset()
+            dt = 0.0
+        if dt > 0:
+            x = self.last_x + (x - self.last_x) * dt / (self.x_tau + dt)
+            raw_d = (x - self.last_x) / dt
+            self.d_filt += (raw_d - self.d_filt) * dt / (self.d_tau + dt)
+        error = x - self.setpoint
+
+        p = self.kp * error
+        d = self.kd * self.d_filt
+        integral = self.integral + self.ki * error * dt
+        out = p + integral + d
+        saturated = (out > self.out_max and error > 0) or (out < self.out_min and error < 0)
+        if not saturated:
+            self.integral = min(self.out_max, max(self.out_min, integral))
+        out = p + self.integral + d
+
+        self.last_t = t
+        self.last_x = x
+        self.output = min(self.out_max, max(self.out_min, out))
+        return self.output
+
+
+class FanCommandLimiter:
+    """
+    Decides when a new fan duty is worth a command to the pad:
+    - deadband: corrections smaller than `deadband` counts are not sent
+      (full off / full on are always reachable)
+    - slew limit: the commanded duty moves at most `max_step_per_s` per second
+    - at most one command per `min_interval_s`; the current value is re-sent every
+      `refresh_s` in case the pad rebooted or someone else moved the fan
+    """
+    def __init__(self, deadband=FAN_DEADBAND, max_step_per_s=FAN_MAX_STEP_PER_S,
+                 min_interval_s=FAN_MIN_INTERVAL_S, refresh_s=FAN_REFRESH_S):
+        self.deadband = deadband
+        self.max_step_per_s = max_step_per_s
+        self.min_interval_s = min_interval_s
+        self.refresh_s = refresh_s
+        self.reset()
+
+    def reset(self):
+        self.sent = None
+        self.sent_t = None
+        self.commands = 0
+
+    def update(self, t: float, duty: float):
+        """Returns the duty (int 0..255) to send now, or None."""
+        if self.sent is not None:
+            elapsed = t - self.sent_t
+            if 0 <= elapsed < self.min_interval_s:
+                return None
+            step = self.max_step_per_s * max(elapsed, self.min_interval_s)
+            duty = min(self.sent + step, max(self.sent - step, duty))
+            target = int(round(duty))
+            small = abs(target - self.sent) < self.deadband and target not in (0, 255)
+            if (small or target == self.sent) and 0 <= elapsed < self.refresh_s:
+                return None
+        target = max(0, min(255, int(round(duty))))
+        self.sent = target
+        self.sent_t = t
+        self.commands += 1
+        return target
+
+
+class HostFanControl:
+    """
+    Closed-loop fan control on the host: LM35 samples in, /fan?duty= values out.
+    update() returns the duty to send, or None when the pad already has a close
+    enough value.
+    """
+    def __init__(self, target_c=PID_TARGET_C, kp=PID_KP, ki=PID_KI, kd=PID_KD, limiter=None):
+        self.pid = PidController(kp, ki, kd, target_c, x_tau=PID_X_TAU_S)
+        self.limiter = limiter if limiter is not None else FanCommandLimiter()
+
+    @property
+    def target_c(self) -> float:
+        return self.pid.setpoint
+
+    def set_target(self, target_c: float):
+        self.pid.setpoint = target_c
+
+    def reset(self):
+        self.pid.reset()
+        self.limiter.reset()
+
+    def update(self, t: float, lm35: float):
+        return self.limiter.update(t, self.pid.update(t, lm35))
+
+
+class ThermalForecaster:
+    """
+    Online first-order (RC) model of the pad temperature:
+        dT/dt = a + b * (T - ambient)
+    `a` is the heat input, `b` (< 0) the current cooling rate; T relaxes
+    exponentially toward T_inf = ambient - a / b.
+    - fitted by least squares over the last `window_s` of samples; running sums make an
+      update O(1) (add the new sample, subtract the expired ones)
+    - lm35 is low-pass filtered before the slope is taken
+    - with too little temperature spread in the window (or a fit without cooling) the
+      model degrades to a straight-line trend
+    `model` is an immutable tuple swapped in per update, so other threads read it lock-free
+    (`ready` included: the window span travels in the tuple).
+    """
+    def __init__(self, window_s=FORECAST_WINDOW_S, smooth_s=FORECAST_SMOOTH_S, horizon_s=FORECAST_HORIZON_S):
+        self.window_s = window_s
+        self.smooth_s = smooth_s
+        self.horizon_s = horizon_s
+        self.reset()
+
+    def reset(self):
+        self.model = None   # (t, T, ambient, a, b, window span s) as of the newest sample
+        self.window = deque()
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        self.last_t = None
+        self.smooth = None
+
+    def update(self, t: float, temp: float, ambient: float):
+        if self.last_t is not None and t <= self.last_t:
+            if t < self.last_t:
+                self.reset()    # time base restarted
+            else:
+                return
+        if self.smooth is None:
+            self.last_t = t
+            self.smooth = temp
+            return
+        dt = t - self.last_t
+        prev = self.smooth
+        self.smooth += (temp - prev) * dt / (self.smooth_s + dt)
+        self.last_t = t
+
+        x = prev - ambient
+        y = (self.smooth - prev) / dt
+        self.window.append((t, x, y))
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+        while self.window[0][0] < t - self.window_s:
+            _, ox, oy = self.window.popleft()
+            self.n -= 1
+            self.sx -= ox
+            self.sy -= oy
+            self.sxx -= ox * ox
+            self.sxy -= ox * oy
+
+        n = self.n
+        var_x = self.sxx / n - (self.sx / n) ** 2
+        b = 0.0
+        if var_x > (FORECAST_MIN_SPAN_C / 2) ** 2:
+            b = (self.sxy / n - self.sx * self.sy / (n * n)) / var_x
+            if b >= 0.0:
+                b = 0.0
+        a = (self.sy - b * self.sx) / n
+        if b == 0.0:
+            a = self.sy / n
+        self.model = (t, self.smooth, ambient, a, b, t - self.window[0][0])
+
+    @property
+    def ready(self) -> bool:
+        """At least half a window of samples behind the model."""
+        model = self.model
+        return model is not None and model[5] >= self.window_s / 2
+
+    def predict(self, h: float, model=None):
+        """Temperature `h` seconds after the newest sample (None before the model is ready)."""
+        model = model or self.model
+        if model is None:
+            return None
+        _, temp, ambient, a, b, _ = model
+        if b == 0.0:
+            return temp + a * h
+        t_inf = ambient - a / b
+        return t_inf + (temp - t_inf) * math.exp(b * h)
+
+    def time_to(self, threshold: float, model=None):
+        """Seconds until the forecast reaches `threshold`, 0 when already there, None if not within the horizon."""
+        model = model or self.model
+        if model is None:
+            return None
+        _, temp, ambient, a, b, _ = model
+        if temp >= threshold:
+            return 0.0
+        if b == 0.0:
+            eta = (threshold - temp) / a if a > 0 else None
+        else:
+            t_inf = ambient - a / b
+            eta = math.log((threshold - t_inf) / (temp - t_inf)) / b if t_inf > threshold else None
+        return eta if eta is not None and eta <= self.horizon_s else None
+
+    def curve(self, horizon_s=None, points=24):
+        """([t], [T]) forecast from the newest sample to `horizon_s` ahead (default: the horizon)."""
+        model = self.model
+        if model is None:
+            return [], []
+        horizon_s = self.horizon_s if horizon_s is None else horizon_s
+        hs = [horizon_s * i / (points - 1) for i in range(points)]
+        return [model[0] + h for h in hs], [self.predict(h, model) for h in hs]
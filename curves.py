@@ -0,0 +1,408 @@
+"""
+User-defined fan curves: named profiles evaluated on the host, live or over whole sessions.
+
+    python curves.py session.jsonl [--profile quiet --profile balanced] [--cooling 0.02,0.05]
+    python curves.py --list
+    python curves.py --save mine --points 32:0,36:90,44:200,48:255 --kind spline --hysteresis 1.5
+
+A curve maps lm35 (°C) to a fan duty (0..255) through its points: piecewise-linear,
+a monotone cubic spline (PCHIP, never overshoots the points) or steps. Hysteresis
+works on the temperature the curve looks at: it follows lm35 up at once, but only
+follows it down once lm35 has dropped `hysteresis` °C below it, so the duty doesn't
+chatter on sensor noise around a knee. With `present_cm`, the fan is off while the
+IR distance says no laptop is on the pad (like the firmware's AUTO table).
+
+Profiles live in a JSON file (PROFILE_PATH, {name: curve}) next to the built-in ones.
+The service drives the pad in MANUAL from the active profile, so a curve change is
+a /curve?profile=.. away, not a reflash.
+
+The same engine runs over a recorded session as whole arrays: FanCurve.evaluate()
+gives the duty the curve would have commanded at the recorded temperatures (the
+hysteresis recurrence as a prefix scan, no per-sample loop), and preview() re-runs
+the session counterfactually with policy.simulate (the curve's fan changes the
+temperature; see policy.py for the model).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from control import FanCommandLimiter
+from filters import MedianFilter
+from policy import SessionTrace, simulate, COOLING, TEMP_LOW, TEMP_MED, FAN_MID_DUTY, LAPTOP_PRESENT_CM
+
+CURVE_KINDS = ("linear", "spline", "step")
+PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".coolingpad_profiles.json")
+TABLE_STEP_C = 0.05         # preview(): curves are tabulated at this temperature step
+TABLE_RANGE_C = (0.0, 110.0)
+
+BUILTIN_PROFILES = {
+    # the firmware's AUTO table as a curve
+    "firmware": {"kind": "step", "points": [[0, 0], [TEMP_LOW, FAN_MID_DUTY], [TEMP_MED, 255]],
+                 "present_cm": LAPTOP_PRESENT_CM},
+    "quiet": {"kind": "spline", "points": [[34, 0], [38, 70], [44, 170], [48, 255]],
+              "hysteresis": 1.5, "present_cm": LAPTOP_PRESENT_CM},
+    "balanced": {"kind": "linear", "points": [[30, 0], [34, 90], [40, 180], [45, 255]],
+                 "hysteresis": 1.0, "present_cm": LAPTOP_PRESENT_CM},
+    "performance": {"kind": "linear", "points": [[28, 60], [34, 160], [38, 255]],
+                    "hysteresis": 0.5, "present_cm": LAPTOP_PRESENT_CM},
+}
+
+
+def parse_points(text: str):
+    """"32:0,36:90,44:200" -> [(32.0, 0.0), (36.0, 90.0), (44.0, 200.0)]"""
+    try:
+        points = [tuple(float(v) for v in item.split(":")) for item in text.split(",") if item.strip()]
+    except ValueError:
+        raise ValueError(f"Bad curve points {text!r} (TEMP:DUTY,TEMP:DUTY,...)")
+    if not points or any(len(p) != 2 for p in points):
+        raise ValueError(f"Bad curve points {text!r} (TEMP:DUTY,TEMP:DUTY,...)")
+    return points
+
+
+def _pchip_slopes(x, y):
+    """Fritsch-Carlson slopes: a cubic Hermite through the points that keeps their monotonicity."""
+    h = np.diff(x)
+    d = np.diff(y) / h
+    m = np.empty(len(x))
+    m[0], m[-1] = d[0], d[-1]
+    if len(x) > 2:
+        w1 = 2 * h[1:] + h[:-1]
+        w2 = h[1:] + 2 * h[:-1]
+        same = d[:-1] * d[1:] > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m[1:-1] = np.where(same, (w1 + w2) / (w1 / d[:-1] + w2 / d[1:]), 0.0)
+    return m
+
+
+def hysteresis_scan(x, width, start=None):
+    """
+    y[i] = clip(y[i-1], x[i], x[i] + width), y[-1] = start (default x[0]), for a whole array:
+    a clip composed with a clip is a clip, so the recurrence is a prefix scan over
+    (lo, hi) pairs, done in log2(n) whole-array passes.
+    """
+    lo = np.asarray(x, dtype=np.float64).copy()
+    hi = lo + width
+    n = len(lo)
+    if n == 0:
+        return lo
+    s = 1
+    while s < n:
+        # element i becomes (clamps i-2s+1 .. i) = (clamps i-s+1 .. i) after (clamps i-2s+1 .. i-s)
+        new_lo = np.clip(lo[:-s], lo[s:], hi[s:])
+        new_hi = np.clip(hi[:-s], lo[s:], hi[s:])
+        lo[s:] = new_lo
+        hi[s:] = new_hi
+        s *= 2
+    return np.clip(lo[0] if start is None else start, lo, hi)
+
+
+class FanCurve:
+    """
+    lm35 -> fan duty:
+    - points (temp °C, duty 0..255), temps strictly increasing; flat beyond the ends
+    - kind "linear", "spline" (PCHIP) or "step" (each point's duty from its temp up)
+    - hysteresis °C on the way down (see the module docstring)
+    - present_cm: fan off unless 0 < dist < present_cm (None = ignore the IR sensor)
+    Raises ValueError on a bad definition.
+    """
+    def __init__(self, points, kind="linear", hysteresis=0.0, present_cm=None, name=""):
+        if kind not in CURVE_KINDS:
+            raise ValueError(f"Unknown curve kind {kind!r} (one of {', '.join(CURVE_KINDS)})")
+        pts = sorted((float(t), float(d)) for t, d in points)
+        if not pts:
+            raise ValueError("A fan curve needs at least one point")
+        if any(b[0] <= a[0] for a, b in zip(pts, pts[1:])):
+            raise ValueError("Fan curve temperatures must be distinct")
+        if any(not 0 <= d <= 255 for _, d in pts):
+            raise ValueError("Fan curve duties must be 0-255")
+        if hysteresis < 0:
+            raise ValueError("Hysteresis must be >= 0 °C")
+        self.name = name
+        self.kind = kind
+        self.points = pts
+        self.hysteresis = float(hysteresis)
+        self.present_cm = None if present_cm is None else float(present_cm)
+        self.x = np.array([t for t, _ in pts])
+        self.y = np.array([d for _, d in pts])
+        self.m = _pchip_slopes(self.x, self.y) if kind == "spline" and len(pts) > 1 else None
+        self.reset()
+
+    @classmethod
+    def from_dict(cls, d: dict, name=""):
+        return cls(d.get("points", ()), d.get("kind", "linear"), float(d.get("hysteresis", 0.0)),
+                   d.get("present_cm"), name)
+
+    def to_dict(self) -> dict:
+        d = {"kind": self.kind, "points": [[t, duty] for t, duty in self.points]}
+        if self.hysteresis:
+            d["hysteresis"] = self.hysteresis
+        if self.present_cm is not None:
+            d["present_cm"] = self.present_cm
+        return d
+
+    def duty_at(self, temp):
+        """The curve itself (no hysteresis, no presence) at temp, scalar or array; float duty."""
+        t = np.asarray(temp, dtype=np.float64)
+        x, y = self.x, self.y
+        if len(x) == 1:
+            return np.full(t.shape, y[0])[()]
+        if self.kind == "step":
+            return y[np.maximum(np.searchsorted(x, t, side="right") - 1, 0)][()]
+        if self.kind == "linear":
+            return np.interp(t, x, y)[()]
+        tc = np.clip(t, x[0], x[-1])
+        k = np.clip(np.searchsorted(x, tc, side="right") - 1, 0, len(x) - 2)
+        h = x[k + 1] - x[k]
+        s = (tc - x[k]) / h
+        s2 = s * s
+        s3 = s2 * s
+        out = ((2 * s3 - 3 * s2 + 1) * y[k] + (s3 - 2 * s2 + s) * h * self.m[k]
+               + (3 * s2 - 2 * s3) * y[k + 1] + (s3 - s2) * h * self.m[k + 1])
+        return np.clip(out, 0.0, 255.0)[()]
+
+    def _present(self, dist):
+        if self.present_cm is None or dist is None:
+            return True
+        return (dist > 0) & (dist < self.present_cm)
+
+    # ---- live: one sample at a time ----
+    def reset(self):
+        self.t_eff = None
+
+    def step(self, lm35: float, dist=None) -> int:
+        """Duty for the next sample, with hysteresis state carried between calls."""
+        if self.t_eff is None:
+            self.t_eff = lm35
+        self.t_eff = min(max(self.t_eff, lm35), lm35 + self.hysteresis)
+        if not self._present(dist):
+            return 0
+        return int(round(float(self.duty_at(self.t_eff))))
+
+    # ---- offline: whole arrays ----
+    def evaluate(self, lm35, dist=None):
+        """step() over a whole session (fresh state) as int duties."""
+        lm35 = np.asarray(lm35, dtype=np.float64)
+        t_eff = hysteresis_scan(lm35, self.hysteresis) if self.hysteresis else lm35
+        duty = np.rint(self.duty_at(t_eff)).astype(np.int64)
+        if self.present_cm is not None and dist is not None:
+            duty = np.where(self._present(np.asarray(dist, dtype=np.float64)), duty, 0)
+        return duty
+
+
+class CurveFanControl:
+    """
+    Open-loop fan control from a FanCurve: lm35 (and IR distance) samples in,
+    /fan?duty= values out through a FanCommandLimiter, like HostFanControl.
+    """
+    def __init__(self, curve: FanCurve, limiter=None):
+        self.curve = curve
+        self.limiter = limiter if limiter is not None else FanCommandLimiter()
+        self.output = 0
+
+    @property
+    def name(self) -> str:
+        return self.curve.name
+
+    def reset(self):
+        self.curve.reset()
+        self.limiter.reset()
+
+    def update(self, t: float, lm35: float, dist=None):
+        self.output = self.curve.step(lm35, dist)
+        return self.limiter.update(t, self.output)
+
+
+class ProfileStore:
+    """
+    Named fan curves: BUILTIN_PROFILES plus the user's from a JSON file ({name: curve dict});
+    a user profile with a built-in's name replaces it. Raises ValueError when the file
+    holds something that isn't a valid curve, OSError when it can't be read / written.
+    """
+    def __init__(self, path=PROFILE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.user = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                user = json.load(f)
+            if not isinstance(user, dict):
+                raise ValueError(f"{path}: expected {{name: curve}}")
+            for name, d in user.items():
+                try:
+                    FanCurve.from_dict(d, name)
+                except (ValueError, TypeError, AttributeError) as e:
+                    raise ValueError(f"{path}: profile {name!r}: {e}")
+            self.user = user
+
+    def names(self):
+        with self.lock:
+            return list(BUILTIN_PROFILES) + sorted(n for n in self.user if n not in BUILTIN_PROFILES)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {**BUILTIN_PROFILES, **self.user}
+
+    def get(self, name: str) -> FanCurve:
+        with self.lock:
+            d = self.user.get(name, BUILTIN_PROFILES.get(name))
+        if d is None:
+            raise ValueError(f"Unknown fan profile {name!r}")
+        return FanCurve.from_dict(d, name)
+
+    def save(self, name: str, curve: FanCurve):
+        if not name or not name.strip():
+            raise ValueError("Profile name is empty")
+        with self.lock:
+            self.user[name] = curve.to_dict()
+            self._write()
+        curve.name = name
+
+    def delete(self, name: str):
+        with self.lock:
+            if name not in self.user:
+                raise ValueError(f"{name!r} is not a user profile")
+            del self.user[name]
+            self._write()
+
+    def _write(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.user, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def curve_table(curves):
+    """(temps, duties (len(curves), len(temps))): the curves tabulated every TABLE_STEP_C."""
+    temps = np.arange(TABLE_RANGE_C[0], TABLE_RANGE_C[1] + TABLE_STEP_C / 2, TABLE_STEP_C)
+    return temps, np.rint(np.array([c.duty_at(temps) for c in curves]))
+
+
+class LimiterArray:
+    """
+    FanCommandLimiter.update() for n fan curves at once (preview): `sent` is each curve's
+    duty on the pad, NaN before its first command. Rule for rule the same decisions as
+    control.FanCommandLimiter; tests/test_curves.py runs the two side by side.
+    """
+    def __init__(self, n: int, limiter=None):
+        self.lim = limiter if limiter is not None else FanCommandLimiter()
+        self.sent = np.full(n, np.nan)
+        self.sent_t = np.full(n, -np.inf)
+
+    def update(self, t: float, duty):
+        """Wanted duties (n,) at time t -> the duties on the pad after this sample (n,)."""
+        lim = self.lim
+        sent, sent_t = self.sent, self.sent_t
+        first = np.isnan(sent)
+        elapsed = t - sent_t
+        step = lim.max_step_per_s * np.maximum(elapsed, lim.min_interval_s)
+        target = np.rint(np.where(first, duty, np.clip(duty, sent - step, sent + step)))
+        small = (np.abs(target - sent) < lim.deadband) & (target != 0) & (target != 255)
+        hold = ~first & ((elapsed < lim.min_interval_s) | ((small | (target == sent)) & (elapsed < lim.refresh_s)))
+        self.sent = np.where(hold, sent, np.clip(target, 0, 255))
+        self.sent_t = np.where(hold, sent_t, t)
+        return self.sent
+
+
+def preview(trace: SessionTrace, curves) -> dict:
+    """
+    The session re-simulated with each curve driving the fan the whole time (MANUAL
+    stretches included, as under host control), all curves at once. Like the service,
+    the IR distance goes through the default median filter and the duty through
+    FanCommandLimiter's rules before it reaches the pad. Returns policy.simulate's
+    per-curve arrays.
+    """
+    p = len(curves)
+    _, table = curve_table(curves)
+    rows = np.arange(p)
+    hyst = np.array([c.hysteresis for c in curves])
+    present = np.array([np.inf if c.present_cm is None else c.present_cm for c in curves])
+    ignore = np.array([c.present_cm is None for c in curves])
+    dist = MedianFilter().apply(trace.t, trace.dist)
+    limiter = LimiterArray(p)
+    state = {"t_eff": None}
+
+    def decide(i, meas):
+        t_eff = state["t_eff"]
+        t_eff = meas.copy() if t_eff is None else np.minimum(np.maximum(t_eff, meas), meas + hyst)
+        state["t_eff"] = t_eff
+        idx = np.clip(np.rint((t_eff - TABLE_RANGE_C[0]) / TABLE_STEP_C).astype(np.int64), 0, table.shape[1] - 1)
+        on = ignore | ((dist[i] > 0) & (dist[i] < present))
+        want = np.where(on, table[rows, idx], 0.0)
+        return limiter.update(trace.t[i], want)
+
+    return simulate(trace, p, decide, controlled=np.ones(len(trace.t), dtype=bool))
+
+
+def recorded_stats(trace: SessionTrace, curves) -> dict:
+    """Open loop: what each curve asks for at the recorded temperatures (fan on %, mean duty)."""
+    dist = MedianFilter().apply(trace.t, trace.dist)
+    w = trace.dt / max(trace.dt.sum(), 1e-9)
+    duty = np.array([c.evaluate(trace.lm35, dist) for c in curves])
+    return {"fan_on_pct": 100.0 * ((duty > 0) * w).sum(axis=1), "mean_duty": (duty * w).sum(axis=1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-curve profiles: list, save, preview on recorded sessions")
+    parser.add_argument("session", nargs="*", help="recorded session file(s) to preview the profiles on")
+    parser.add_argument("--profiles", metavar="FILE", default=PROFILE_PATH, help="user profile file")
+    parser.add_argument("--profile", action="append", metavar="NAME", help="profile(s) to preview (default: all)")
+    parser.add_argument("--list", action="store_true", help="print the profiles")
+    parser.add_argument("--save", metavar="NAME", help="save a profile from --points / --kind / --hysteresis / --present")
+    parser.add_argument("--delete", metavar="NAME", help="delete a user profile")
+    parser.add_argument("--points", help="TEMP:DUTY,TEMP:DUTY,... for --save")
+    parser.add_argument("--kind", default="linear", choices=CURVE_KINDS)
+    parser.add_argument("--hysteresis", type=float, default=0.0, help="°C")
+    parser.add_argument("--present", type=float, metavar="CM", help="fan off unless the IR distance is below this")
+    parser.add_argument("--cooling", metavar="C0,C1", default=",".join(map(str, COOLING)),
+                        help="passive and full-fan cooling rates of the pad, per s (see policy.py)")
+    args = parser.parse_args()
+
+    try:
+        store = ProfileStore(args.profiles)
+        if args.save:
+            if not args.points:
+                raise ValueError("--save needs --points")
+            store.save(args.save, FanCurve(parse_points(args.points), args.kind, args.hysteresis, args.present))
+            print(f"Saved {args.save} to {store.path}")
+        if args.delete:
+            store.delete(args.delete)
+            print(f"Deleted {args.delete}")
+        names = args.profile or store.names()
+        curves = [store.get(n) for n in names]
+        cooling = tuple(float(v) for v in args.cooling.split(","))
+        if len(cooling) != 2 or min(cooling) < 0:
+            raise ValueError("--cooling takes C0,C1 (>= 0)")
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    if args.list or not args.session:
+        for name, d in store.as_dict().items():
+            pts = ",".join(f"{t:g}:{duty:g}" for t, duty in d["points"])
+            extra = "".join(f" {k}={d[k]:g}" for k in ("hysteresis", "present_cm") if d.get(k) is not None)
+            print(f"{name:<14}{d.get('kind', 'linear'):<8}{pts}{extra}")
+
+    for path in args.session:
+        try:
+            trace = SessionTrace.load(path, cooling)
+        except (OSError, ValueError, KeyError) as e:
+            sys.exit(f"{path}: {e}")
+        res = preview(trace, curves)
+        rec = recorded_stats(trace, curves)
+        hours = trace.duration_s / 3600.0
+        print(f"\n{path}: {len(trace.t)} samples, {trace.duration_s / 60:.1f} min; "
+              f"as recorded: fan on {100 * np.mean(trace.duty > 0):.1f} %, "
+              f"peak {trace.smooth.max():.2f} C, {np.count_nonzero(np.diff(trace.duty)) / hours:.0f} switches/h")
+        print(f"{'profile':<14}{'fan on %':>10}{'duty':>7}{'peak C':>8}{'sw/h':>8}{'>med %':>8}"
+              f"{'open-loop: on %':>17}{'duty':>7}")
+        for k, c in enumerate(curves):
+            print(f"{c.name:<14}{res['fan_on_pct'][k]:>10.1f}{res['mean_duty'][k]:>7.0f}{res['peak_c'][k]:>8.2f}"
+                  f"{res['switches_h'][k]:>8.0f}{res['hot_pct'][k]:>8.1f}"
+                  f"{rec['fan_on_pct'][k]:>17.1f}{rec['mean_duty'][k]:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram in microseconds:
+    - log-linear buckets, 32 per power of two (<= ~3% relative error)
+    - record() is one bit_length and a list increment, no allocation
+    - percentiles walk the ~700 buckets only when asked
+    Values above `limit_us` land in the top bucket; the largest value is kept exact in `max_us`.
+    """
+    SUB_BITS = 5
+
+    def __init__(self, limit_us: int = 60_000_000):
+        self.top = self._index(limit_us)
+        self.counts = [0] * (self.top + 1)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, v: int) -> int:
+        e = v.bit_length() - cls.SUB_BITS - 1
+        if e <= 0:
+            return v
+        return (e << cls.SUB_BITS) + (v >> e)
+
+    @classmethod
+    def _value(cls, idx: int) -> int:
+        """Midpoint of a bucket."""
+        e = (idx >> cls.SUB_BITS) - 1
+        if e <= 0:
+            return idx
+        return ((idx - (e << cls.SUB_BITS)) << e) + (1 << (e - 1))
+
+    def record(self, us: int):
+        if us < 0:
+            us = 0
+        idx = self._index(us)
+        self.counts[idx if idx < self.top else self.top] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def reset(self):
+        self.counts = [0] * (self.top + 1)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        target = max(1, int(self.count * p / 100.0 + 0.5))
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._value(idx), self.max_us)
+        return self.max_us
+
+    def mean(self) -> float:
+        return self.total_us / self.count if self.count else 0.0
+
+
+class EndpointStats:
+    """Counters for one HTTP path (query string stripped)."""
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.responses = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.new_connections = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def as_dict(self) -> dict:
+        h = self.latency
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "new_connections": self.new_connections,
+            "reused_connections": max(0, self.responses - self.new_connections),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "p50_ms": h.percentile(50) / 1000.0,
+            "p90_ms": h.percentile(90) / 1000.0,
+            "p99_ms": h.percentile(99) / 1000.0,
+            "max_ms": h.max_us / 1000.0,
+        }
+
+
+class HttpStats:
+    """
+    Per-endpoint request statistics for StableHttpClient:
+    - record() is called once per request from whatever thread made it
+    - snapshot() -> {path: EndpointStats.as_dict()} for the diagnostics panel / callers
+    Cheap enough to stay on all the time (one lock, a few integer adds).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, path: str, latency_us: int, status=None, timeout=False, new_connections=0,
+               bytes_in=0, bytes_out=0):
+        key = path.split("?", 1)[0]
+        with self.lock:
+            ep = self.endpoints.get(key)
+            if ep is None:
+                ep = self.endpoints[key] = EndpointStats()
+            ep.requests += 1
+            ep.latency.record(latency_us)
+            ep.new_connections += new_connections
+            ep.bytes_in += bytes_in
+            ep.bytes_out += bytes_out
+            if status is not None:
+                ep.responses += 1
+            if timeout:
+                ep.timeouts += 1
+            elif status is None or status >= 400:
+                ep.errors += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {path: ep.as_dict() for path, ep in sorted(self.endpoints.items())}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+PIPELINE_STAGES = ("http", "decode", "queue", "ui", "draw", "e2e")
+
+
+class PipelineTracer:
+    """
+    Span tracing for the sample pipeline (poll -> decode -> queue -> UI -> draw):
+    - span(stage, start_ns, end_ns, sample_id) from any thread, perf_counter_ns timestamps
+    - the last `capacity` spans are kept for write_chrome_trace() (chrome://tracing, Perfetto)
+    - one LatencyHistogram per stage feeds summary()
+    "e2e" runs from when the sample's request started (or it arrived, for pushed links)
+    to the end of its draw.
+    """
+    def __init__(self, capacity=50_000, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=capacity)
+        self.stages = {}
+        self.t0_ns = time.perf_counter_ns()
+
+    def span(self, stage: str, start_ns: int, end_ns: int, sample_id=None):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.events.append((stage, start_ns, end_ns, sample_id, threading.get_ident()))
+            h = self.stages.get(stage)
+            if h is None:
+                h = self.stages[stage] = LatencyHistogram()
+            h.record((end_ns - start_ns) // 1000)
+
+    def summary(self) -> dict:
+        """{stage: {count, p50_ms, p90_ms, p99_ms, max_ms}} in PIPELINE_STAGES order."""
+        with self.lock:
+            stages = dict(self.stages)
+            out = {}
+            for name in PIPELINE_STAGES + tuple(sorted(set(stages) - set(PIPELINE_STAGES))):
+                h = stages.get(name)
+                if h is None or not h.count:
+                    continue
+                out[name] = {
+                    "count": h.count,
+                    "p50_ms": h.percentile(50) / 1000.0,
+                    "p90_ms": h.percentile(90) / 1000.0,
+                    "p99_ms": h.percentile(99) / 1000.0,
+                    "max_ms": h.max_us / 1000.0,
+                }
+            return out
+
+    def reset(self):
+        with self.lock:
+            self.events.clear()
+            self.stages.clear()
+
+    def write_chrome_trace(self, path: str) -> int:
+        """Chrome trace-event JSON ("X" complete events, one track per thread). Returns the span count."""
+        with self.lock:
+            events = list(self.events)
+        names = {t.ident: t.name for t in threading.enumerate()}
+        pid = os.getpid()
+
+        trace = []
+        for tid in sorted({e[4] for e in events}):
+            trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                          "args": {"name": names.get(tid, str(tid))}})
+        for stage, start, end, sample_id, tid in events:
+            ev = {"name": stage, "cat": "pipeline", "ph": "X", "pid": pid, "tid": tid,
+                  "ts": (start - self.t0_ns) / 1000.0, "dur": (end - start) / 1000.0}
+            if sample_id is not None:
+                ev["args"] = {"seq": sample_id}
+            trace.append(ev)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+class Stall:
+    """One Tk loop stall: how long, and where the main thread was while it lasted."""
+    def __init__(self, started: float, duration_ms: float, samples: int, gc_ms: float, stack):
+        self.started = started          # time.time() when the loop stopped answering
+        self.duration_ms = duration_ms
+        self.samples = samples
+        self.gc_ms = gc_ms
+        self.stack = stack              # [(filename, lineno, name, line)], outermost first
+
+    def culprit(self) -> str:
+        if not self.stack:
+            return "?"
+        filename, lineno, name, _ = self.stack[-1]
+        return f"{os.path.basename(filename)}:{lineno} {name}"
+
+    def format(self) -> str:
+        when = time.strftime("%H:%M:%S", time.localtime(self.started))
+        lines = [f"[STALL] {when} UI loop blocked {self.duration_ms:.0f} ms "
+                 f"({self.samples} stack samples, gc {self.gc_ms:.0f} ms) in {self.culprit()}"]
+        for filename, lineno, name, line in self.stack:
+            lines.append(f'    {filename}:{lineno} in {name}' + (f"\n        {line}" if line else ""))
+        return "\n".join(lines)
+
+
+class StallWatchdog:
+    """
+    Detects Tk main-loop stalls:
+    - a heartbeat is scheduled with root.after every `interval_ms`; how late each beat
+      runs goes into `lateness`
+    - a watchdog thread checks twice per interval; once the loop is more than
+      `threshold_ms` late it samples the main thread's stack until the loop recovers
+    - the most-sampled stack becomes a Stall, passed to on_stall (watchdog thread)
+    GC time inside the stall is tracked through gc.callbacks.
+    """
+    def __init__(self, threshold_ms=250, interval_ms=50, on_stall=None, max_frames=16):
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.on_stall = on_stall
+        self.max_frames = max_frames
+        self.main_ident = threading.main_thread().ident
+
+        self.lateness = LatencyHistogram()
+        self.stalls = deque(maxlen=50)
+        self.worst = None
+        self.root = None
+        self.last_beat = time.perf_counter()
+        self.last_late_ms = 0.0
+        self.stop_flag = False
+        self.thread = None
+
+        self.gc_total_s = 0.0
+        self._gc_t0 = None
+
+    def attach(self, root):
+        self.root = root
+        gc.callbacks.append(self._on_gc)
+        self.last_beat = time.perf_counter()
+        root.after(self.interval_ms, self._beat)
+        self.thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_flag = True
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_t0 = time.perf_counter()
+        elif self._gc_t0 is not None:
+            self.gc_total_s += time.perf_counter() - self._gc_t0
+            self._gc_t0 = None
+
+    def _beat(self):
+        now = time.perf_counter()
+        late_ms = max(0.0, (now - self.last_beat) * 1000.0 - self.interval_ms)
+        self.lateness.record(int(late_ms * 1000))
+        self.last_late_ms = late_ms
+        self.last_beat = now
+        if not self.stop_flag:
+            self.root.after(self.interval_ms, self._beat)
+
+    def _run(self):
+        check_s = self.interval_ms / 2000.0
+        limit_s = (self.threshold_ms + self.interval_ms) / 1000.0
+        stacks = {}
+        stall_beat = None
+        gc0 = 0.0
+        while not self.stop_flag:
+            time.sleep(check_s)
+            beat = self.last_beat
+            if time.perf_counter() - beat > limit_s:
+                if stall_beat is None:
+                    stall_beat = beat
+                    gc0 = self.gc_total_s
+                frame = sys._current_frames().get(self.main_ident)
+                if frame is not None:
+                    stack = tuple((f.filename, f.lineno, f.name, f.line)
+                                  for f in traceback.extract_stack(frame, limit=self.max_frames))
+                    stacks[stack] = stacks.get(stack, 0) + 1
+                    del frame
+            elif stall_beat is not None:
+                stack = max(stacks, key=stacks.get) if stacks else ()
+                stall = Stall(time.time() - (time.perf_counter() - stall_beat), self.last_late_ms,
+                              sum(stacks.values()), (self.gc_total_s - gc0) * 1000.0, list(stack))
+                self.stalls.append(stall)
+                if self.worst is None or stall.duration_ms > self.worst.duration_ms:
+                    self.worst = stall
+                stacks = {}
+                stall_beat = None
+                if self.on_stall is not None:
+                    self.on_stall(stall)
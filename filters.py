@@ -0,0 +1,275 @@
+import math
+from collections import deque
+
+import numpy as np
+
+# channel -> filter spec; "ewma[:tau_s]", "median[:n]", "kalman[:q[:r]]" (see make_filter)
+DEFAULT_FILTERS = {
+    "lm35": "kalman",
+    "dist": "median:5",         # Sharp IR: single-sample spikes
+    "lux": "ewma:1.5",
+    "connected": "median:5",    # 0 / 1 -> majority of the last 5
+}
+EWMA_TAU_S = 2.0
+MEDIAN_N = 5
+KALMAN_Q = 0.02             # process noise, °C² per second (how fast the pad really moves)
+KALMAN_R = 0.06             # measurement noise, °C² (LM35 ~0.25 °C rms)
+RECURRENCE_BLOCK = 32       # samples per closed-form block in smooth_recurrence
+
+
+def smooth_recurrence(y0, alpha, x):
+    """
+    y[i] = y[i-1] + alpha[i] * (x[i] - y[i-1]) for whole arrays, starting from y0:
+    - closed form per block of RECURRENCE_BLOCK samples, all blocks at once:
+      y = D * (y_start + cumsum(alpha * x / D)), D = cumprod(1 - alpha)
+    - only the block start values are chained in a loop
+    - blocks are short enough (and 1 - alpha is floored) that 1 / D can't overflow
+    alpha = 0 holds the previous value (use it for missing samples).
+    """
+    n = len(x)
+    pad = -n % RECURRENCE_BLOCK
+    a = np.concatenate((np.asarray(alpha, dtype=np.float64), np.zeros(pad))).reshape(-1, RECURRENCE_BLOCK)
+    xs = np.concatenate((np.asarray(x, dtype=np.float64), np.zeros(pad))).reshape(-1, RECURRENCE_BLOCK)
+    d = np.exp(np.cumsum(np.log(np.maximum(1.0 - a, 1e-9)), axis=1))
+    c = np.cumsum(a * xs / d, axis=1)
+    starts = []
+    for d_end, c_end in zip(d[:, -1].tolist(), c[:, -1].tolist()):
+        starts.append(y0)
+        y0 = d_end * (y0 + c_end)
+    return (d * (np.array(starts)[:, None] + c)).ravel()[:n]
+
+
+class EwmaFilter:
+    """
+    Exponential moving average with a time constant, so irregular sample spacing is fine:
+    alpha = dt / (tau_s + dt). NaN samples are skipped (the output holds).
+    """
+    def __init__(self, tau_s=EWMA_TAU_S):
+        self.tau_s = tau_s
+        self.reset()
+
+    def reset(self):
+        self.y = None
+        self.last_t = None
+
+    def update(self, t: float, x: float) -> float:
+        if x != x:
+            return math.nan if self.y is None else self.y
+        if self.y is None:
+            self.y = x
+        else:
+            dt = max(0.0, t - self.last_t)
+            self.y += (x - self.y) * dt / (self.tau_s + dt)
+        self.last_t = t
+        return self.y
+
+    def apply(self, t, x):
+        """update() over arrays of sample times / values; continues from (and updates) the state."""
+        t = np.asarray(t, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        valid = ~np.isnan(x)
+        prev = self.y
+        if not valid.any():
+            return np.full(len(x), math.nan if prev is None else prev)
+        first = int(np.argmax(valid))
+        if prev is None:
+            self.y = float(x[first])
+            self.last_t = float(t[first])
+        tv = t[valid]
+        dt = np.maximum(0.0, np.diff(tv, prepend=self.last_t))
+        alpha = np.zeros(len(x))
+        alpha[valid] = dt / (self.tau_s + dt)
+        y = smooth_recurrence(self.y, alpha, np.where(valid, x, 0.0))
+        if prev is None:
+            y[:first] = math.nan
+        self.y = float(y[-1])
+        self.last_t = float(tv[-1])
+        return y
+
+
+class MedianFilter:
+    """
+    Median of the last `n` samples (fewer while it fills up); kills single-sample spikes
+    without lagging steps by more than n // 2 samples. NaN samples are skipped.
+    """
+    def __init__(self, n=MEDIAN_N):
+        self.n = n
+        self.reset()
+
+    def reset(self):
+        self.window = deque(maxlen=self.n)
+        self.y = None
+
+    def update(self, t: float, x: float) -> float:
+        if x != x:
+            return math.nan if self.y is None else self.y
+        self.window.append(x)
+        s = sorted(self.window)
+        m = len(s) // 2
+        self.y = s[m] if len(s) % 2 else (s[m - 1] + s[m]) / 2
+        return self.y
+
+    def apply(self, t, x):
+        """update() over arrays; sliding windows of the history + the new samples, one np.median."""
+        x = np.asarray(x, dtype=np.float64)
+        prev = self.y
+        valid = ~np.isnan(x)
+        xv = x[valid]
+        ys = np.empty(len(xv))
+        # outputs while the window is still filling up go through update()
+        head = min(len(xv), self.n - len(self.window))
+        for i in range(head):
+            ys[i] = self.update(0.0, float(xv[i]))
+        if head < len(xv):
+            tail = list(self.window)[len(self.window) - (self.n - 1):] if self.n > 1 else []
+            hist = np.concatenate((np.asarray(tail, dtype=np.float64), xv[head:]))
+            ys[head:] = np.median(np.lib.stride_tricks.sliding_window_view(hist, self.n), axis=1)
+            self.window.extend(xv[head:][-self.n:].tolist())
+            self.y = float(ys[-1])
+        # skipped samples repeat the previous output
+        out = np.full(len(x), math.nan if prev is None else prev)
+        if len(xv):
+            idx = np.maximum.accumulate(np.where(valid, np.cumsum(valid) - 1, -1))
+            out[idx >= 0] = ys[idx[idx >= 0]]
+        return out
+
+
+class KalmanFilter1D:
+    """
+    Scalar Kalman filter on a random-walk model (the true value drifts by `q` variance per
+    second, readings carry `r` variance). Steady state it is an EWMA whose gain follows
+    from q / r; the gain sequence doesn't depend on the readings, so apply() runs the
+    variance recursion in a plain loop and the state update through smooth_recurrence.
+    NaN samples are skipped (the variance still grows).
+    """
+    def __init__(self, q=KALMAN_Q, r=KALMAN_R):
+        self.q = q
+        self.r = r
+        self.reset()
+
+    def reset(self):
+        self.y = None
+        self.p = None
+        self.last_t = None
+
+    def _gain(self, dt: float) -> float:
+        p = self.p + self.q * dt
+        k = p / (p + self.r)
+        self.p = (1.0 - k) * p
+        return k
+
+    def update(self, t: float, x: float) -> float:
+        if x != x:
+            return math.nan if self.y is None else self.y
+        if self.y is None:
+            self.y = x
+            self.p = self.r
+        else:
+            self.y += (x - self.y) * self._gain(max(0.0, t - self.last_t))
+        self.last_t = t
+        return self.y
+
+    def apply(self, t, x):
+        """update() over arrays of sample times / values; continues from (and updates) the state."""
+        t = np.asarray(t, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+        prev = self.y
+        valid = ~np.isnan(x)
+        if not valid.any():
+            return np.full(len(x), math.nan if prev is None else prev)
+        first = int(np.argmax(valid))
+        if prev is None:
+            self.y = float(x[first])
+            self.p = self.r
+            self.last_t = float(t[first])
+        tv = t[valid]
+        dts = np.maximum(0.0, np.diff(tv, prepend=self.last_t)).tolist()
+        if prev is None:
+            dts[0] = None
+        gains = [0.0 if dt is None else self._gain(dt) for dt in dts]
+        alpha = np.zeros(len(x))
+        alpha[valid] = gains
+        y = smooth_recurrence(self.y, alpha, np.where(valid, x, 0.0))
+        if prev is None:
+            y[:first] = math.nan
+        self.y = float(y[-1])
+        self.last_t = float(tv[-1])
+        return y
+
+
+FILTER_TYPES = {"ewma": EwmaFilter, "median": MedianFilter, "kalman": KalmanFilter1D}
+
+
+def make_filter(spec: str):
+    """
+    "ewma", "ewma:1.5" (tau s), "median", "median:7" (n), "kalman", "kalman:0.02:0.06" (q, r).
+    Raises ValueError for anything else.
+    """
+    name, *args = spec.strip().lower().split(":")
+    if name not in FILTER_TYPES:
+        raise ValueError(f"Unknown filter {name!r} (expected one of {', '.join(FILTER_TYPES)})")
+    try:
+        params = [int(a) if name == "median" else float(a) for a in args]
+        f = FILTER_TYPES[name](*params)
+    except (TypeError, ValueError):
+        raise ValueError(f"Bad filter parameters in {spec!r}") from None
+    if (name == "median" and f.n < 1) or any(v <= 0 for v in params):
+        raise ValueError(f"Bad filter parameters in {spec!r}")
+    return f
+
+
+def parse_filter_args(items, base=None) -> dict:
+    """["lm35=ewma:3", "lux=off"] (CLI --filter) on top of `base` -> channel -> spec."""
+    specs = dict(DEFAULT_FILTERS if base is None else base)
+    for item in items or ():
+        channel, sep, spec = item.partition("=")
+        if not sep or not channel:
+            raise ValueError(f"Expected CHANNEL=SPEC, got {item!r}")
+        if spec.strip().lower() == "off":
+            specs.pop(channel, None)
+        else:
+            make_filter(spec)
+            specs[channel] = spec
+    return specs
+
+
+class FilterStage:
+    """
+    Per-channel filters between parsing and the stores:
+    - `specs` maps a status key (lm35, dist, lux, connected, ...) to a filter spec
+    - the raw keys stay untouched; filtered values go to data["filtered"] (same keys),
+      channels missing from a sample are left out
+    - process() for live samples, process_batch() for /history backfills and replays:
+      one vectorized apply() per channel, same result as sample by sample
+    Booleans filter as 0 / 1 (a median is a majority vote); `t` None = host time now.
+    """
+    def __init__(self, specs=None):
+        self.specs = dict(DEFAULT_FILTERS if specs is None else specs)
+        self.filters = {c: make_filter(s) for c, s in self.specs.items()}
+
+    def reset(self):
+        for f in self.filters.values():
+            f.reset()
+
+    def process(self, data: dict, t: float) -> dict:
+        out = {}
+        for c, f in self.filters.items():
+            if c in data:
+                v = data[c]
+                out[c] = f.update(t, math.nan if v is None else float(v))
+        data["filtered"] = out
+        return out
+
+    def process_batch(self, samples):
+        """samples: [(data, t)] oldest first; fills in every data["filtered"]."""
+        t = np.fromiter((s[1] for s in samples), dtype=np.float64, count=len(samples))
+        outs = [{} for _ in samples]
+        for c, f in self.filters.items():
+            rows = [i for i, (d, _) in enumerate(samples) if c in d]
+            if not rows:
+                continue
+            x = np.array([math.nan if samples[i][0][c] is None else float(samples[i][0][c]) for i in rows])
+            for i, v in zip(rows, f.apply(t[rows], x).tolist()):
+                outs[i][c] = v
+        for (data, _), out in zip(samples, outs):
+            data["filtered"] = out
@@ -4,12 +4,14 @@
 #include <math.h>
 #include <WiFi.h>
 #include <WebServer.h>
+#include <WiFiUdp.h>
 
 // ================= WIFI CONFIG =================
 const char* WIFI_SSID = "Students";      // <-- change this
 const char* WIFI_PASS = "Students";      // <-- change this
 
 WebServer server(80);
+WiFiServer streamServer(81);   // /events (SSE) lives on its own port, see acceptStreamClient()
 
 // ================= OLED CONFIG (SH1106 1.3", I2C) =================
 // Use HARDWARE I2C so it shares the bus with BH1750 on SDA=21, SCL=22
@@ -117,6 +119,83 @@ float g_distCm    = 0;
 float g_lux       = 0;
 int   g_potRaw    = 0;
 bool  g_connected = false;
+uint32_t g_seq      = 0;   // bumped once per published sample
+uint32_t g_sampleMs = 0;   // millis() when that sample was taken
+unsigned long lastSampleMillis = 0;
+const uint32_t SAMPLE_INTERVAL = 250;
+
+// ================= SAMPLE HISTORY (for /history backfill) =================
+struct StatusSample {
+  uint32_t seq;
+  uint32_t ms;
+  float    lm35;
+  float    dhtTemp;
+  float    dhtHum;
+  float    distCm;
+  float    lux;
+  uint8_t  fanDuty;
+  bool     autoMode;
+  bool     connected;
+};
+
+const int HISTORY_LEN       = 240;   // 60 s at SAMPLE_INTERVAL
+const int HISTORY_MAX_BATCH = 120;   // samples per /history response
+StatusSample historyBuf[HISTORY_LEN];
+int historyHead  = 0;                // next slot to write
+int historyCount = 0;
+
+// ================= BINARY STATUS FRAME (?fmt=bin, see protocol.py) =================
+const uint8_t FRAME_VERSION = 1;
+
+struct __attribute__((packed)) StatusFrame {
+  uint8_t  version;
+  uint8_t  flags;      // bit0 AUTO, bit1 laptop connected
+  uint8_t  fanDuty;
+  uint8_t  reserved;
+  uint32_t seq;
+  uint32_t ms;
+  float    lm35;
+  float    dhtTemp;
+  float    dhtHum;
+  float    distCm;
+  float    lux;
+};
+
+struct __attribute__((packed)) HistoryHeader {
+  uint8_t  version;
+  uint8_t  flags;      // bit0 more samples waiting
+  uint16_t count;
+  uint32_t last;
+};
+
+uint8_t frameBuf[sizeof(HistoryHeader) + HISTORY_MAX_BATCH * sizeof(StatusFrame)];
+
+// ================= SSE STREAM (/events) =================
+WiFiClient streamClient;
+uint32_t streamLastSeq = 0;
+uint32_t streamRateMs  = SAMPLE_INTERVAL;
+unsigned long streamLastSend = 0;
+
+// ================= UDP PUSH (/udp?port=<n>, see protocol.py) =================
+struct __attribute__((packed)) UdpDatagram {
+  char        magic[2];   // "CP"
+  uint8_t     version;
+  uint8_t     reserved;
+  uint8_t     deviceId[6];
+  StatusFrame frame;
+};
+
+WiFiUDP udp;
+IPAddress udpTarget;
+uint16_t udpPort = 0;      // 0 = push off
+uint8_t deviceId[6];       // WiFi MAC
+
+// ================= SERIAL LINK (status "@json*CS", commands "!/path?query tag") =================
+String serialCmdLine;
+String serialCmdQuery;
+String serialCmdTag;              // echoed in the reply so the host can match it to its command
+bool   serialCmdActive = false;   // handlers reply over Serial instead of HTTP
+const unsigned int SERIAL_CMD_MAX = 96;
 
 // ========== NEW: REMOTE CONTROL FLAGS (from Python GUI) ==========
 bool   remoteFanOverride     = false;   // if true, use remoteFanDutyCmd in MANUAL mode
@@ -595,42 +674,312 @@ void handleRoot() {
   server.send(200, "text/html", MAIN_page);
 }
 
-void handleStatus() {
-  // Avoid NaN in JSON (replace with 0 if needed)
-  float dhtT = isnan(g_dhtTemp) ? 0.0 : g_dhtTemp;
-  float dhtH = isnan(g_dhtHum) ? 0.0 : g_dhtHum;
-  float lux  = (g_lux < 0) ? 0.0 : g_lux;
+void fillSample(StatusSample &h) {
+  h.seq       = g_seq;
+  h.ms        = g_sampleMs;
+  h.lm35      = g_lm35TempC;
+  h.dhtTemp   = isnan(g_dhtTemp) ? 0.0 : g_dhtTemp;
+  h.dhtHum    = isnan(g_dhtHum) ? 0.0 : g_dhtHum;
+  h.distCm    = g_distCm;
+  h.lux       = (g_lux < 0) ? 0.0 : g_lux;
+  h.fanDuty   = currentFanDuty;
+  h.autoMode  = autoMode;
+  h.connected = g_connected;
+}
+
+void pushHistory() {
+  fillSample(historyBuf[historyHead]);
+  historyHead = (historyHead + 1) % HISTORY_LEN;
+  if (historyCount < HISTORY_LEN) historyCount++;
+}
+
+bool wantsBinary() {
+  return server.arg("fmt") == "bin" ||
+         server.header("Accept").indexOf("application/octet-stream") >= 0;
+}
+
+void packFrame(const StatusSample &h, StatusFrame *f) {
+  f->version  = FRAME_VERSION;
+  f->flags    = (h.autoMode ? 0x01 : 0) | (h.connected ? 0x02 : 0);
+  f->fanDuty  = h.fanDuty;
+  f->reserved = 0;
+  f->seq      = h.seq;
+  f->ms       = h.ms;
+  f->lm35     = h.lm35;
+  f->dhtTemp  = h.dhtTemp;
+  f->dhtHum   = h.dhtHum;
+  f->distCm   = h.distCm;
+  f->lux      = h.lux;
+}
 
+String statusJson(const StatusSample &h) {
   String json = "{";
-  json += "\"mode\":\"";
-  json += (autoMode ? "AUTO" : "MANUAL");
-  json += "\",";
-  json += "\"lm35\":"     + String(g_lm35TempC, 1) + ",";
-  json += "\"dhtTemp\":"  + String(dhtT, 1)        + ",";
-  json += "\"dhtHum\":"   + String(dhtH, 1)        + ",";
-  json += "\"dist\":"     + String(g_distCm, 1)    + ",";
-  json += "\"lux\":"      + String(lux, 1)         + ",";
-  json += "\"fanDuty\":"  + String(currentFanDuty) + ",";
-  json += "\"connected\":"+ String(g_connected ? "true" : "false");
+  json += "\"mode\":\""; json += (h.autoMode ? "AUTO" : "MANUAL"); json += "\",";
+  json += "\"lm35\":"     + String(h.lm35, 1)      + ",";
+  json += "\"dhtTemp\":"  + String(h.dhtTemp, 1)   + ",";
+  json += "\"dhtHum\":"   + String(h.dhtHum, 1)    + ",";
+  json += "\"dist\":"     + String(h.distCm, 1)    + ",";
+  json += "\"lux\":"      + String(h.lux, 1)       + ",";
+  json += "\"fanDuty\":"  + String(h.fanDuty)      + ",";
+  json += "\"connected\":"+ String(h.connected ? "true" : "false") + ",";
+  json += "\"seq\":"      + String(h.seq)          + ",";
+  json += "\"ms\":"       + String(h.ms);
   json += "}";
+  return json;
+}
+
+void handleStatus() {
+  StatusSample h;
+  fillSample(h);
+
+  if (wantsBinary()) {
+    StatusFrame f;
+    packFrame(h, &f);
+    server.send_P(200, "application/octet-stream", (const char *)&f, sizeof(f));
+    return;
+  }
+  server.send(200, "application/json", statusJson(h));
+}
+
+// /history?since=<seq> -> samples with seq > since, oldest first, as rows of "fields"
+void handleHistory() {
+  uint32_t since = 0;
+  if (server.hasArg("since")) since = strtoul(server.arg("since").c_str(), NULL, 10);
+  if (since > g_seq) since = 0;   // device restarted since the client's last read
+
+  int oldest = (historyHead - historyCount + HISTORY_LEN) % HISTORY_LEN;
+  int skip = 0;
+  if (historyCount > 0 && since >= historyBuf[oldest].seq) {
+    skip = min((uint32_t)historyCount, since - historyBuf[oldest].seq + 1);
+  }
+  int n = historyCount - skip;
+  bool more = (n > HISTORY_MAX_BATCH);
+  if (more) n = HISTORY_MAX_BATCH;
+
+  if (wantsBinary()) {
+    HistoryHeader *hdr = (HistoryHeader *)frameBuf;
+    hdr->version = FRAME_VERSION;
+    hdr->flags   = more ? 0x01 : 0;
+    hdr->count   = n;
+    hdr->last    = g_seq;
+    StatusFrame *frames = (StatusFrame *)(frameBuf + sizeof(HistoryHeader));
+    for (int i = 0; i < n; i++) {
+      packFrame(historyBuf[(oldest + skip + i) % HISTORY_LEN], &frames[i]);
+    }
+    server.send_P(200, "application/octet-stream", (const char *)frameBuf,
+                  sizeof(HistoryHeader) + n * sizeof(StatusFrame));
+    return;
+  }
+
+  String json;
+  json.reserve(160 + n * 64);
+  json += "{\"last\":" + String(g_seq) + ",\"more\":" + String(more ? "true" : "false") + ",";
+  json += "\"fields\":[\"seq\",\"ms\",\"mode\",\"lm35\",\"dhtTemp\",\"dhtHum\",\"dist\",\"lux\",\"fanDuty\",\"connected\"],";
+  json += "\"samples\":[";
+  for (int i = 0; i < n; i++) {
+    const StatusSample &h = historyBuf[(oldest + skip + i) % HISTORY_LEN];
+    if (i > 0) json += ",";
+    json += "[" + String(h.seq) + "," + String(h.ms) + ",";
+    json += h.autoMode ? "\"AUTO\"," : "\"MANUAL\",";
+    json += String(h.lm35, 1) + "," + String(h.dhtTemp, 1) + "," + String(h.dhtHum, 1) + ",";
+    json += String(h.distCm, 1) + "," + String(h.lux, 1) + "," + String(h.fanDuty) + ",";
+    json += h.connected ? "true]" : "false]";
+  }
+  json += "]}";
   server.send(200, "application/json", json);
 }
 
+// /events on port 80 points at the stream port (WebServer can't hold a connection open)
+void handleEvents() {
+  String loc = "http://" + WiFi.localIP().toString() + ":81/events";
+  if (server.hasArg("rate_ms")) loc += "?rate_ms=" + server.arg("rate_ms");
+  server.sendHeader("Location", loc);
+  server.send(307, "text/plain", "Stream on port 81");
+}
+
+// One HTTP chunk (the stream is Transfer-Encoding: chunked)
+void streamChunk(const String &s) {
+  streamClient.print(String(s.length(), HEX));
+  streamClient.print("\r\n");
+  streamClient.print(s);
+  streamClient.print("\r\n");
+}
+
+void sendStreamEvent(const StatusSample &h) {
+  streamChunk("id: " + String(h.seq) + "\nevent: status\ndata: " + statusJson(h) + "\n\n");
+  streamLastSeq = h.seq;
+}
+
+void acceptStreamClient() {
+  WiFiClient c = streamServer.available();
+  if (!c) return;
+
+  c.setTimeout(200);
+  String req = c.readStringUntil('\n');
+  uint32_t lastId = 0;
+  bool resume = false;
+  while (c.connected()) {
+    String line = c.readStringUntil('\n');
+    line.trim();
+    if (line.length() == 0) break;
+    if (line.startsWith("Last-Event-ID:")) {
+      lastId = strtoul(line.substring(14).c_str(), NULL, 10);
+      resume = true;
+    }
+  }
+
+  if (!req.startsWith("GET /events")) {
+    c.print("HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n");
+    c.stop();
+    return;
+  }
+
+  uint32_t rate = SAMPLE_INTERVAL;
+  int q = req.indexOf("rate_ms=");
+  if (q >= 0) rate = max((uint32_t)req.substring(q + 8).toInt(), SAMPLE_INTERVAL);
+
+  if (streamClient) streamClient.stop();   // one viewer at a time, newest wins
+  streamClient = c;
+  streamRateMs = rate;
+  streamClient.print("HTTP/1.1 200 OK\r\n"
+                     "Content-Type: text/event-stream\r\n"
+                     "Cache-Control: no-cache\r\n"
+                     "Transfer-Encoding: chunked\r\n"
+                     "Connection: keep-alive\r\n\r\n");
+  streamChunk("retry: 2000\n\n");
+
+  // resume: replay what the client missed from the history ring
+  if (resume && lastId <= g_seq) {
+    int oldest = (historyHead - historyCount + HISTORY_LEN) % HISTORY_LEN;
+    for (int i = 0; i < historyCount; i++) {
+      const StatusSample &h = historyBuf[(oldest + i) % HISTORY_LEN];
+      if (h.seq > lastId) sendStreamEvent(h);
+    }
+  }
+  streamLastSend = 0;
+}
+
+void serviceStream() {
+  acceptStreamClient();
+  if (!streamClient) return;
+  if (!streamClient.connected()) {
+    streamClient.stop();
+    return;
+  }
+
+  unsigned long now = millis();
+  if (g_seq != streamLastSeq && now - streamLastSend >= streamRateMs) {
+    StatusSample h;
+    fillSample(h);
+    sendStreamEvent(h);
+    streamLastSend = now;
+  }
+}
+
+// /udp?port=<n>[&host=<ip>] -> push every sample to host:port (default: the caller), /udp?off=1 stops
+void handleUdp() {
+  if (server.hasArg("off")) {
+    udpPort = 0;
+    server.send(200, "text/plain", "UDP push off");
+    return;
+  }
+  if (!server.hasArg("port")) {
+    server.send(400, "text/plain", "Missing port param");
+    return;
+  }
+
+  IPAddress target = server.client().remoteIP();
+  if (server.hasArg("host") && !target.fromString(server.arg("host"))) {
+    server.send(400, "text/plain", "Bad host param");
+    return;
+  }
+  udpTarget = target;
+  udpPort = server.arg("port").toInt();
+  WiFi.macAddress(deviceId);
+
+  char id[13];
+  snprintf(id, sizeof(id), "%02x%02x%02x%02x%02x%02x",
+           deviceId[0], deviceId[1], deviceId[2], deviceId[3], deviceId[4], deviceId[5]);
+  server.send(200, "application/json", "{\"id\":\"" + String(id) + "\",\"port\":" + String(udpPort) + "}");
+}
+
+void sendUdpSample() {
+  if (udpPort == 0 || WiFi.status() != WL_CONNECTED) return;
+
+  UdpDatagram d;
+  d.magic[0] = 'C';
+  d.magic[1] = 'P';
+  d.version  = FRAME_VERSION;
+  d.reserved = 0;
+  memcpy(d.deviceId, deviceId, sizeof(deviceId));
+  StatusSample h;
+  fillSample(h);
+  packFrame(h, &d.frame);
+
+  udp.beginPacket(udpTarget, udpPort);
+  udp.write((const uint8_t *)&d, sizeof(d));
+  udp.endPacket();
+}
+
+// Handlers below serve both HTTP and serial commands through these
+bool serialQueryValue(const char *name, String *out) {
+  String key = String(name) + "=";
+  int start = 0;
+  while (start < (int)serialCmdQuery.length()) {
+    int end = serialCmdQuery.indexOf('&', start);
+    if (end < 0) end = serialCmdQuery.length();
+    String part = serialCmdQuery.substring(start, end);
+    if (part == name || part.startsWith(key)) {
+      if (out) *out = (part.length() > key.length()) ? part.substring(key.length()) : String("");
+      return true;
+    }
+    start = end + 1;
+  }
+  return false;
+}
+
+bool cmdHasArg(const char *name) {
+  if (!serialCmdActive) return server.hasArg(name);
+  return serialQueryValue(name, NULL);
+}
+
+String cmdArg(const char *name) {
+  if (!serialCmdActive) return server.arg(name);
+  String v;
+  serialQueryValue(name, &v);
+  return v;
+}
+
+void cmdReply(int code, const char *text) {
+  if (!serialCmdActive) {
+    server.send(code, "text/plain", text);
+    return;
+  }
+  Serial.print('#');
+  Serial.print(code);
+  if (serialCmdTag.length()) {
+    Serial.print('/');
+    Serial.print(serialCmdTag);
+  }
+  Serial.print(' ');
+  Serial.println(text);
+}
+
 void handleSetMode() {
-  if (!server.hasArg("mode")) {
-    server.send(400, "text/plain", "Missing mode param");
+  if (!cmdHasArg("mode")) {
+    cmdReply(400, "Missing mode param");
     return;
   }
-  String m = server.arg("mode");
+  String m = cmdArg("mode");
   m.toUpperCase();
   if (m == "AUTO") {
     setMode(true);
-    server.send(200, "text/plain", "OK AUTO");
+    cmdReply(200, "OK AUTO");
   } else if (m == "MANUAL") {
     setMode(false);
-    server.send(200, "text/plain", "OK MANUAL");
+    cmdReply(200, "OK MANUAL");
   } else {
-    server.send(400, "text/plain", "Unknown mode");
+    cmdReply(400, "Unknown mode");
   }
 }
 
@@ -638,20 +987,20 @@ void handleSetMode() {
 //  - /fan?duty=0..255  -> sets fan speed and enables override (MANUAL mode)
 //  - /fan?release=1    -> disable override, back to POT
 void handleFan() {
-  if (server.hasArg("release")) {
+  if (cmdHasArg("release")) {
     remoteFanOverride = false;
-    server.send(200, "text/plain", "Fan override released");
+    cmdReply(200, "Fan override released");
     return;
   }
-  if (!server.hasArg("duty")) {
-    server.send(400, "text/plain", "Missing duty param (0-255)");
+  if (!cmdHasArg("duty")) {
+    cmdReply(400, "Missing duty param (0-255)");
     return;
   }
-  int duty = server.arg("duty").toInt();
+  int duty = cmdArg("duty").toInt();
   duty = constrain(duty, 0, 255);
   remoteFanDutyCmd = (uint8_t)duty;
   remoteFanOverride = true;
-  server.send(200, "text/plain", "Fan duty set");
+  cmdReply(200, "Fan duty set");
 }
 
 // ===== NEW: /rgb HTTP handler (remote RGB ON/OFF) =====
@@ -659,27 +1008,27 @@ void handleFan() {
 //  - /rgb?state=OFF    -> all OFF (override)
 //  - /rgb?release=1    -> release override, revert to normal logic
 void handleRgb() {
-  if (server.hasArg("release")) {
+  if (cmdHasArg("release")) {
     remoteRgbOverride = false;
-    server.send(200, "text/plain", "RGB override released");
+    cmdReply(200, "RGB override released");
     return;
   }
-  if (!server.hasArg("state")) {
-    server.send(400, "text/plain", "Missing state param (ON/OFF)");
+  if (!cmdHasArg("state")) {
+    cmdReply(400, "Missing state param (ON/OFF)");
     return;
   }
-  String st = server.arg("state");
+  String st = cmdArg("state");
   st.toUpperCase();
   if (st == "ON") {
     remoteRgbOverride  = true;
     remoteRgbEnableCmd = true;
-    server.send(200, "text/plain", "RGB ON");
+    cmdReply(200, "RGB ON");
   } else if (st == "OFF") {
     remoteRgbOverride  = true;
     remoteRgbEnableCmd = false;
-    server.send(200, "text/plain", "RGB OFF");
+    cmdReply(200, "RGB OFF");
   } else {
-    server.send(400, "text/plain", "Unknown state (use ON/OFF)");
+    cmdReply(400, "Unknown state (use ON/OFF)");
   }
 }
 
@@ -688,35 +1037,81 @@ void handleRgb() {
 //  - /buzzer?state=ON  -> continuous ON (until state=OFF)
 //  - /buzzer?state=OFF -> stop continuous and patterns
 void handleBuzzerHttp() {
-  if (server.hasArg("pattern")) {
-    int count = server.arg("pattern").toInt();
+  if (cmdHasArg("pattern")) {
+    int count = cmdArg("pattern").toInt();
     if (count < 1) count = 1;
     remoteBuzzerContinuous = false;   // pattern mode, not continuous
     startBeepPattern(count);
-    server.send(200, "text/plain", "Beep pattern started");
+    cmdReply(200, "Beep pattern started");
     return;
   }
 
-  if (server.hasArg("state")) {
-    String st = server.arg("state");
+  if (cmdHasArg("state")) {
+    String st = cmdArg("state");
     st.toUpperCase();
     if (st == "ON") {
       remoteBuzzerContinuous = true;
       buzzerState = BUZZER_IDLE;    // stop pattern, use continuous
       digitalWrite(PIN_BUZZER, HIGH);
-      server.send(200, "text/plain", "Buzzer continuous ON");
+      cmdReply(200, "Buzzer continuous ON");
     } else if (st == "OFF") {
       remoteBuzzerContinuous = false;
       buzzerState = BUZZER_IDLE;
       digitalWrite(PIN_BUZZER, LOW);
-      server.send(200, "text/plain", "Buzzer OFF");
+      cmdReply(200, "Buzzer OFF");
     } else {
-      server.send(400, "text/plain", "Unknown state (use ON/OFF)");
+      cmdReply(400, "Unknown state (use ON/OFF)");
     }
     return;
   }
 
-  server.send(400, "text/plain", "Provide pattern or state param");
+  cmdReply(400, "Provide pattern or state param");
+}
+
+// "!/fan?duty=200 17" -> same handler as GET /fan?duty=200, reply "#200/17 Fan duty set"
+// (the tag after the space is optional; without it the reply is "#200 Fan duty set")
+void runSerialCommand(String cmd) {
+  int sp = cmd.lastIndexOf(' ');
+  serialCmdTag = (sp >= 0) ? cmd.substring(sp + 1) : String("");
+  if (sp >= 0) cmd = cmd.substring(0, sp);
+  int q = cmd.indexOf('?');
+  String path = (q >= 0) ? cmd.substring(0, q) : cmd;
+  serialCmdQuery = (q >= 0) ? cmd.substring(q + 1) : String("");
+
+  serialCmdActive = true;
+  if (path == "/setMode")     handleSetMode();
+  else if (path == "/fan")    handleFan();
+  else if (path == "/rgb")    handleRgb();
+  else if (path == "/buzzer") handleBuzzerHttp();
+  else cmdReply(404, "Not found");
+  serialCmdActive = false;
+}
+
+void handleSerialCommands() {
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (c == '\r') continue;
+    if (c != '\n') {
+      if (serialCmdLine.length() < SERIAL_CMD_MAX) serialCmdLine += c;
+      continue;
+    }
+    if (serialCmdLine.startsWith("!")) runSerialCommand(serialCmdLine.substring(1));
+    serialCmdLine = "";
+  }
+}
+
+// One framed status line; XOR checksum lets the host skip lines mangled by debug prints
+void sendSerialSample() {
+  StatusSample h;
+  fillSample(h);
+  String json = statusJson(h);
+  uint8_t cs = 0;
+  for (unsigned int i = 0; i < json.length(); i++) cs ^= (uint8_t)json[i];
+  char tail[4];
+  snprintf(tail, sizeof(tail), "*%02X", cs);
+  Serial.print('@');
+  Serial.print(json);
+  Serial.println(tail);
 }
 
 // ================= SETUP =================
@@ -770,6 +1165,9 @@ void setup() {
   // HTTP routes
   server.on("/",        handleRoot);
   server.on("/status",  handleStatus);
+  server.on("/history", handleHistory);
+  server.on("/events",  handleEvents);
+  server.on("/udp",     handleUdp);
   server.on("/setMode", handleSetMode);
 
   // NEW routes for Python GUI
@@ -777,7 +1175,11 @@ void setup() {
   server.on("/rgb",     handleRgb);
   server.on("/buzzer",  handleBuzzerHttp);
 
+  const char *headerKeys[] = {"Accept"};
+  server.collectHeaders(headerKeys, 1);
+
   server.begin();
+  streamServer.begin();
   Serial.println("HTTP server started");
 }
 
@@ -785,6 +1187,8 @@ void setup() {
 void loop() {
   // 1) Handle HTTP clients
   server.handleClient();
+  serviceStream();
+  handleSerialCommands();
 
   // 2) Handle button (mode switch)
   handleModeButton();
@@ -936,14 +1340,22 @@ void loop() {
   Serial.print(" % | FanDuty: ");
   Serial.println(currentFanDuty);
 
-  // Save to globals for /status
-  g_lm35TempC = lm35TempC;
-  g_dhtTemp   = dhtTemp;
-  g_dhtHum    = dhtHum;
-  g_distCm    = distCm;
-  g_lux       = lux;
-  g_potRaw    = potRaw;
-  g_connected = connected;
+  // Save to globals for /status (one numbered sample per SAMPLE_INTERVAL)
+  if (millis() - lastSampleMillis >= SAMPLE_INTERVAL) {
+    lastSampleMillis = millis();
+    g_lm35TempC = lm35TempC;
+    g_dhtTemp   = dhtTemp;
+    g_dhtHum    = dhtHum;
+    g_distCm    = distCm;
+    g_lux       = lux;
+    g_potRaw    = potRaw;
+    g_connected = connected;
+    g_sampleMs  = lastSampleMillis;
+    g_seq++;
+    pushHistory();
+    sendUdpSample();
+    sendSerialSample();
+  }
 
   // ------------ OLED STATUS SCREEN (U8g2) ------------
   if (showModeOverlay && (millis() < modeOverlayUntil)) {
@@ -0,0 +1,305 @@
+"""
+Offline AUTO fan-policy search: replays a recorded session through the firmware's
+AUTO decision logic with candidate thresholds, far faster than real time.
+
+    python policy.py session.jsonl [--low 26:34:2] [--med 34:44:2] [--present 20:50:10] [--max 46:54:2]
+    python policy.py session.jsonl --cooling 0.02,0.05 --top 20
+
+A different policy changes the fan and with it the temperature, so the replay is
+counterfactual: the heat the laptop put in is recovered from the recording with a
+first-order model,
+
+    dT/dt = heat(t) - (c0 + c1 * duty / 255) * (T - ambient)
+
+and every candidate is re-simulated on that heat trace with its own duty. With the
+recorded policy the replay reproduces the recording. c0 / c1 (--cooling) describe
+the pad, not the session: in AUTO the fan follows the temperature, so a recording
+can't separate the fan's effect from the load's. The defaults are simulator.py's
+model; measure a real pad once (MANUAL, fan off then full at steady load). The
+firmware decides on its noisy LM35 reading, so the recorded measurement noise is
+added back before each candidate's decision. MANUAL stretches keep their recorded
+duty for every candidate.
+
+All candidates step through the session together (numpy arrays over the policy
+axis), so a 2 h session against a few hundred policies takes about a second.
+"""
+import argparse
+import math
+import sys
+from itertools import product
+
+import numpy as np
+
+from session import load_session
+
+# firmware AUTO table (cooling_pad_esp32.ino)
+TEMP_LOW = 30.0             # below: fan off
+TEMP_MED = 40.0             # below: FAN_MID_DUTY, above: full
+TEMP_MAX = 50.0             # above: over-temperature buzzer
+LAPTOP_PRESENT_CM = 40.0    # IR distance under which a laptop is on the pad
+FAN_MID_DUTY = 140
+AUTO_TABLE = (TEMP_LOW, TEMP_MED, LAPTOP_PRESENT_CM)
+
+COOLING = (0.02, 0.05)      # c0, c1 per s: passive / full-fan cooling rate (simulator.py's model)
+SMOOTH_S = 2.0              # centered LM35 smoothing before differentiating
+RESYNC_GAP_S = 5.0          # recording gap longer than this -> candidates restart from the recording
+
+# ranking: cost = W_FAN * fan-on % + W_PEAK * peak °C over --peak-limit + W_SWITCH * switches / h
+W_FAN = 1.0
+W_PEAK = 20.0
+W_SWITCH = 0.2
+PEAK_LIMIT_C = 45.0
+
+
+def auto_duty(lm35: float, dist: float, low=TEMP_LOW, med=TEMP_MED, present_cm=LAPTOP_PRESENT_CM) -> int:
+    """The firmware's AUTO fan duty for one reading."""
+    if not 0 < dist < present_cm or lm35 < low:
+        return 0
+    return FAN_MID_DUTY if lm35 < med else 255
+
+
+def parse_auto_table(text: str):
+    """"30,40,40" -> (TEMP_LOW, TEMP_MED, present cm); "off" -> None (the pad's table is unknown)."""
+    if text.strip().lower() == "off":
+        return None
+    try:
+        low, med, present_cm = (float(v) for v in text.split(","))
+    except ValueError:
+        raise ValueError(f"Bad AUTO table {text!r} (TEMP_LOW,TEMP_MED,PRESENT_CM or off)")
+    if not 0 < present_cm or not low < med:
+        raise ValueError(f"Bad AUTO table {text!r} (need TEMP_LOW < TEMP_MED, PRESENT_CM > 0)")
+    return low, med, present_cm
+
+
+def auto_duty_grid(lm35, dist, low, med, present_cm):
+    """auto_duty() over arrays (broadcasting): one reading against many policies or vice versa."""
+    duty = np.where(lm35 < med, FAN_MID_DUTY, 255)
+    return np.where((dist > 0) & (dist < present_cm) & (lm35 >= low), duty, 0)
+
+
+class SessionTrace:
+    """
+    A recorded session as arrays: t, lm35 (raw and centered-smoothed), ambient, dist,
+    recorded duty, AUTO mask, and the heat input recovered with cooling (c0, c1).
+    """
+    def __init__(self, times, payloads, cooling=COOLING):
+        rows = [(t, d) for t, d in zip(times, payloads) if "lm35" in d and "fanDuty" in d]
+        if len(rows) < 10:
+            raise ValueError("session has too few samples with lm35 / fanDuty")
+        self.t = np.array([t for t, _ in rows])
+        self.lm35 = np.array([float(d["lm35"]) for _, d in rows])
+        self.duty = np.array([float(d["fanDuty"]) for _, d in rows])
+        self.dist = np.array([float(d.get("dist", 0.0)) for _, d in rows])
+        self.auto = np.array([str(d.get("mode", "")).upper() == "AUTO" for _, d in rows])
+        self.ambient = self._ambient([d.get("dhtTemp") for _, d in rows])
+        self.dt = np.diff(self.t, append=self.t[-1])
+        self.smooth = self._smooth(self.lm35)
+        self.noise = self.lm35 - self.smooth
+        self.cooling = tuple(cooling)
+        self.heat = self._heat()
+
+    @classmethod
+    def load(cls, path: str, cooling=COOLING):
+        times, payloads = load_session(path)
+        return cls(times, payloads, cooling)
+
+    @property
+    def duration_s(self) -> float:
+        return float(self.t[-1] - self.t[0])
+
+    def _ambient(self, values):
+        # the firmware sends 0.0 when the DHT read failed: hold the last good value
+        a = np.array([math.nan if v is None or float(v) == 0.0 else float(v) for v in values])
+        good = ~np.isnan(a)
+        if not good.any():
+            return np.full(len(a), self.lm35.min())
+        idx = np.maximum.accumulate(np.where(good, np.arange(len(a)), 0))
+        a = a[idx]
+        a[:int(np.argmax(good))] = a[int(np.argmax(good))]
+        return a
+
+    def _smooth(self, x):
+        step = float(np.median(np.diff(self.t))) or 1.0
+        n = max(1, int(round(SMOOTH_S / step)) | 1)
+        if n == 1 or len(x) <= n:
+            return x.copy()
+        pad = n // 2
+        xp = np.concatenate((np.full(pad, x[0]), x, np.full(pad, x[-1])))
+        return np.convolve(xp, np.ones(n) / n, mode="valid")
+
+    def _slope(self):
+        dt = np.diff(self.t)
+        s = np.zeros(len(self.t))
+        ok = dt > 0
+        s[:-1][ok] = np.diff(self.smooth)[ok] / dt[ok]
+        return s
+
+    def _heat(self):
+        c0, c1 = self.cooling
+        return self._slope() + (c0 + c1 * self.duty / 255.0) * (self.smooth - self.ambient)
+
+
+class PolicyGrid:
+    """Candidate AUTO policies: all (low, med, present_cm, max) combinations with low < med."""
+    def __init__(self, lows, meds, presents, maxes):
+        combos = [c for c in product(lows, meds, presents, maxes) if c[0] < c[1]]
+        if not combos:
+            raise ValueError("empty policy grid (need TEMP_LOW < TEMP_MED)")
+        arr = np.array(combos, dtype=np.float64)
+        self.low, self.med, self.present, self.max = arr.T
+
+    def __len__(self):
+        return len(self.low)
+
+
+def simulate(trace: SessionTrace, n: int, decide, controlled=None, alarm_c=TEMP_MAX) -> dict:
+    """
+    Re-simulates the session for `n` fan policies at once. decide(i, meas) returns the
+    duties (n,) at sample i from each policy's measured lm35 `meas`; it is called in
+    order, once per `controlled` sample (default: the AUTO ones), and the other samples
+    keep the recorded duty. Returns per-policy arrays: fan_on_pct, mean_duty, peak_c,
+    switches_h, alarm_s_h (controlled time above `alarm_c`), hot_pct (time above TEMP_MED).
+    """
+    controlled = trace.auto if controlled is None else controlled
+    c0, c1 = trace.cooling
+    temp = np.full(n, trace.smooth[0])
+    prev = np.full(n, -1.0)
+    fan_on = np.zeros(n)
+    duty_sum = np.zeros(n)
+    switches = np.zeros(n)
+    alarm = np.zeros(n)
+    hot = np.zeros(n)
+    peak = np.full(n, -np.inf)
+    total = 0.0
+    for i in range(len(trace.t)):
+        dt = trace.dt[i]
+        if dt > RESYNC_GAP_S:
+            temp = np.full(n, trace.smooth[i + 1])
+            continue
+        meas = temp + trace.noise[i]
+        if controlled[i]:
+            duty = decide(i, meas)
+            alarm = alarm + (meas > alarm_c) * dt
+        else:
+            duty = np.full(n, trace.duty[i])
+        switches = switches + ((duty != prev) & (prev >= 0))
+        prev = duty
+        fan_on = fan_on + (duty > 0) * dt
+        duty_sum = duty_sum + duty * dt
+        hot = hot + (temp > TEMP_MED) * dt
+        peak = np.maximum(peak, temp)
+        total += dt
+        temp = temp + (trace.heat[i] - (c0 + c1 * duty / 255.0) * (temp - trace.ambient[i])) * dt
+    hours = max(total, 1e-9) / 3600.0
+    return {
+        "fan_on_pct": 100.0 * fan_on / max(total, 1e-9),
+        "mean_duty": duty_sum / max(total, 1e-9),
+        "peak_c": peak,
+        "switches_h": switches / hours,
+        "alarm_s_h": alarm / hours,
+        "hot_pct": 100.0 * hot / max(total, 1e-9),
+    }
+
+
+def replay(trace: SessionTrace, grid: PolicyGrid) -> dict:
+    """Every AUTO policy of the grid through simulate(); alarm_s_h is the over-temperature buzzer time."""
+    return simulate(trace, len(grid),
+                    lambda i, meas: auto_duty_grid(meas, trace.dist[i], grid.low, grid.med, grid.present),
+                    alarm_c=grid.max)
+
+
+def rank(results: dict, peak_limit=PEAK_LIMIT_C, w_fan=W_FAN, w_peak=W_PEAK, w_switch=W_SWITCH):
+    """Policy indices best first, and the cost of each policy."""
+    cost = (w_fan * results["fan_on_pct"] + w_peak * np.maximum(0.0, results["peak_c"] - peak_limit)
+            + w_switch * results["switches_h"])
+    return np.argsort(cost, kind="stable"), cost
+
+
+def parse_range(text: str):
+    """"26:34:2" -> [26, 28, 30, 32, 34]; "40" -> [40]; "30,35" -> [30, 35]."""
+    if "," in text:
+        return [float(v) for v in text.split(",")]
+    parts = [float(v) for v in text.split(":")]
+    if len(parts) == 1:
+        return parts
+    if len(parts) != 3 or parts[2] <= 0:
+        raise ValueError(f"Expected START:STOP:STEP, got {text!r}")
+    start, stop, step = parts
+    return [round(start + k * step, 6) for k in range(int(math.floor((stop - start) / step + 1e-9)) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank AUTO fan policies on a recorded session")
+    parser.add_argument("session", nargs="+", help="recorded session file(s) (dashboard / service --record)")
+    parser.add_argument("--low", default="26:34:2", help="TEMP_LOW candidates, START:STOP:STEP or a,b,c")
+    parser.add_argument("--med", default="34:44:2", help="TEMP_MED candidates")
+    parser.add_argument("--present", default="20:50:10", help="laptop-present distance candidates (cm)")
+    parser.add_argument("--max", default="46:54:2", help="TEMP_MAX (buzzer) candidates")
+    parser.add_argument("--cooling", metavar="C0,C1", default=",".join(map(str, COOLING)),
+                        help="passive and full-fan cooling rates of the pad, per s")
+    parser.add_argument("--peak-limit", type=float, default=PEAK_LIMIT_C, help="peak °C above which cost rises fast")
+    parser.add_argument("--w-fan", type=float, default=W_FAN, help="cost per fan-on %%")
+    parser.add_argument("--w-peak", type=float, default=W_PEAK, help="cost per °C of peak over --peak-limit")
+    parser.add_argument("--w-switch", type=float, default=W_SWITCH, help="cost per duty switch per hour")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    try:
+        grid = PolicyGrid(parse_range(args.low), parse_range(args.med), parse_range(args.present),
+                          parse_range(args.max))
+        cooling = tuple(float(v) for v in args.cooling.split(","))
+        if len(cooling) != 2 or min(cooling) < 0:
+            raise ValueError("--cooling takes C0,C1 (>= 0)")
+    except ValueError as e:
+        parser.error(str(e))
+
+    merged = None
+    hours = 0.0
+    for path in args.session:
+        try:
+            trace = SessionTrace.load(path, cooling)
+        except (OSError, ValueError, KeyError) as e:
+            sys.exit(f"{path}: {e}")
+        print(f"{path}: {len(trace.t)} samples, {trace.duration_s / 60:.1f} min, {100 * trace.auto.mean():.0f}% AUTO")
+        res = replay(trace, grid)
+        h = trace.duration_s / 3600.0
+        if merged is None:
+            merged = {k: v * h for k, v in res.items()}
+            merged["peak_c"] = res["peak_c"]
+        else:
+            for k, v in res.items():
+                merged[k] = np.maximum(merged[k], v) if k == "peak_c" else merged[k] + v * h
+        hours += h
+    results = {k: (v if k == "peak_c" else v / max(hours, 1e-9)) for k, v in merged.items()}
+
+    order, cost = rank(results, args.peak_limit, args.w_fan, args.w_peak, args.w_switch)
+    current = np.flatnonzero((grid.low == TEMP_LOW) & (grid.med == TEMP_MED) &
+                             (grid.present == LAPTOP_PRESENT_CM) & (grid.max == TEMP_MAX))
+    current = int(current[0]) if len(current) else None
+    cols = ("fan_on_pct", "mean_duty", "peak_c", "switches_h", "alarm_s_h", "hot_pct")
+
+    # policies with identical results next to each other in the ranking share a row ("+n")
+    groups = []
+    for rank_no, i in enumerate(order, 1):
+        key = tuple(round(float(results[c][i]), 3) for c in cols)
+        if groups and groups[-1][2] == key and i != current:
+            groups[-1][3] += 1
+        else:
+            groups.append([rank_no, int(i), key, 0])
+    shown = groups[:args.top]
+    if current is not None and all(g[1] != current for g in shown):
+        shown += [g for g in groups if g[1] == current]
+
+    print(f"\n{len(grid)} policies, cooling c0={cooling[0]:g} c1={cooling[1]:g}, ranked by cost (lower is better)")
+    print(f"{'#':>4}{'low':>6}{'med':>6}{'present':>9}{'max':>6}{'fan on %':>10}{'duty':>7}{'peak C':>8}"
+          f"{'sw/h':>8}{'alarm s/h':>11}{'>med %':>8}{'cost':>9}")
+    for rank_no, i, _, same in shown:
+        tag = "  <- firmware" if i == current else (f"  (+{same} equal)" if same else "")
+        print(f"{rank_no:>4}{grid.low[i]:>6.1f}{grid.med[i]:>6.1f}"
+              f"{grid.present[i]:>9.0f}{grid.max[i]:>6.1f}{results['fan_on_pct'][i]:>10.1f}"
+              f"{results['mean_duty'][i]:>7.0f}{results['peak_c'][i]:>8.2f}{results['switches_h'][i]:>8.0f}"
+              f"{results['alarm_s_h'][i]:>11.0f}{results['hot_pct'][i]:>8.1f}{cost[i]:>9.1f}{tag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import struct
+
+# Binary status frame, little-endian, mirrors `StatusFrame` in cooling_pad_esp32.ino:
+#   u8 version, u8 flags (bit0 AUTO, bit1 laptop connected), u8 fanDuty, u8 reserved,
+#   u32 seq, u32 ms, f32 lm35, f32 dhtTemp, f32 dhtHum, f32 dist, f32 lux
+FRAME_VERSION = 1
+STATUS_FRAME = struct.Struct("<BBBxII5f")
+
+# /history?fmt=bin: u8 version, u8 flags (bit0 more), u16 count, u32 last seq, then `count` frames
+HISTORY_HEADER = struct.Struct("<BBHI")
+
+FLAG_AUTO = 0x01
+FLAG_CONNECTED = 0x02
+FLAG_MORE = 0x01
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+# /history JSON: {"last", "more", "fields": HISTORY_FIELDS, "samples": [[...], ...]}
+HISTORY_FIELDS = ("seq", "ms", "mode", "lm35", "dhtTemp", "dhtHum", "dist", "lux", "fanDuty", "connected")
+
+# UDP push datagram: "CP", u8 version, u8 reserved, 6-byte device ID (ESP32 MAC), then a status frame
+UDP_PORT = 4210
+UDP_MAGIC = b"CP"
+UDP_DATAGRAM = struct.Struct("<2sBx6s" + STATUS_FRAME.format[1:])
+
+# USB serial lines: "@<status json>*<XOR checksum hex>" from the pad, "!<path>?<query> <tag>"
+# commands to the pad, answered "#<code>/<tag> <text>" (tag optional, echoed so a late reply
+# can't be taken for the next command's); everything else is firmware debug output
+SERIAL_BAUD = 115200
+
+
+def _frame_to_status(fields) -> dict:
+    version, flags, fan_duty, seq, ms, lm35, dht_t, dht_h, dist, lux = fields
+    return {
+        "mode": "AUTO" if flags & FLAG_AUTO else "MANUAL",
+        "lm35": lm35,
+        "dhtTemp": dht_t,
+        "dhtHum": dht_h,
+        "dist": dist,
+        "lux": lux,
+        "fanDuty": fan_duty,
+        "connected": bool(flags & FLAG_CONNECTED),
+        "seq": seq,
+        "ms": ms,
+    }
+
+
+def decode_status_frame(buf) -> dict:
+    """One binary /status frame -> the same dict r.json() gives for the JSON form."""
+    if len(buf) < STATUS_FRAME.size:
+        raise ValueError("Truncated status frame")
+    fields = STATUS_FRAME.unpack_from(buf)
+    if fields[0] != FRAME_VERSION:
+        raise ValueError(f"Unsupported status frame version {fields[0]}")
+    return _frame_to_status(fields)
+
+
+def decode_history_frames(buf):
+    """Binary /history batch -> (last_seq, more, [status dicts, oldest first])."""
+    if len(buf) < HISTORY_HEADER.size:
+        raise ValueError("Truncated history frame")
+    version, flags, count, last = HISTORY_HEADER.unpack_from(buf)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported history frame version {version}")
+    body = memoryview(buf)[HISTORY_HEADER.size:HISTORY_HEADER.size + count * STATUS_FRAME.size]
+    if len(body) != count * STATUS_FRAME.size:
+        raise ValueError("Truncated history frame")
+    samples = [_frame_to_status(f) for f in STATUS_FRAME.iter_unpack(body)]
+    return last, bool(flags & FLAG_MORE), samples
+
+
+def decode_udp_datagram(buf):
+    """UDP datagram -> (device ID as hex, status dict). Raises ValueError on foreign packets."""
+    if len(buf) != UDP_DATAGRAM.size:
+        raise ValueError("Bad datagram size")
+    fields = UDP_DATAGRAM.unpack_from(buf)
+    if fields[0] != UDP_MAGIC or fields[1] != FRAME_VERSION:
+        raise ValueError("Not a cooling pad datagram")
+    return fields[2].hex(), _frame_to_status(fields[3:])
+
+
+def encode_status_frame(data: dict) -> bytes:
+    flags = (FLAG_AUTO if str(data.get("mode", "")).upper() == "AUTO" else 0) | \
+            (FLAG_CONNECTED if data.get("connected") else 0)
+    return STATUS_FRAME.pack(FRAME_VERSION, flags, int(data.get("fanDuty", 0)),
+                             int(data.get("seq", 0)), int(data.get("ms", 0)),
+                             float(data.get("lm35", 0.0)), float(data.get("dhtTemp", 0.0)),
+                             float(data.get("dhtHum", 0.0)), float(data.get("dist", 0.0)),
+                             float(data.get("lux", 0.0)))
+
+
+def encode_history_frames(samples, last_seq: int, more: bool) -> bytes:
+    parts = [HISTORY_HEADER.pack(FRAME_VERSION, FLAG_MORE if more else 0, len(samples), last_seq)]
+    parts.extend(encode_status_frame(s) for s in samples)
+    return b"".join(parts)
+
+
+def encode_udp_datagram(device_id: bytes, data: dict) -> bytes:
+    return UDP_MAGIC + bytes((FRAME_VERSION, 0)) + device_id + encode_status_frame(data)
+
+
+def serial_checksum(payload: bytes) -> int:
+    cs = 0
+    for b in payload:
+        cs ^= b
+    return cs
+
+
+def encode_serial_status(data: dict) -> bytes:
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return b"@%s*%02X\r\n" % (payload, serial_checksum(payload))
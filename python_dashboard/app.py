@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk
+import argparse
 import requests
 import threading
 import time
@@ -8,9 +9,20 @@ import math
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from host_sensors import HostSensorSampler
+
 # ================== CONFIG ==================
 ESP32_IP = "http://10.10.2.64"   # <-- CHANGE THIS (e.g. "http://192.168.4.1")
 POLL_INTERVAL_MS = 1000          # ms
+HOST_POLL_INTERVAL_MS = 500      # laptop CPU load / temperature sampling (own thread)
+PROC_ROOT = "/proc"              # where /proc/stat and /sys/class/thermal are read from
+SYS_ROOT = "/sys"
+
+# CPU -> FAN: in MANUAL the fan follows the laptop, whichever ramp asks for more
+CPU_FAN_LOAD_RAMP = (20.0, 90.0)   # CPU load %      -> 0..100 % fan
+CPU_FAN_TEMP_RAMP = (50.0, 85.0)   # CPU package °C  -> 0..100 % fan
+CPU_FAN_MIN_STEP = 5               # % change worth a /fan command
+CPU_FAN_MIN_INTERVAL_S = 2.0
 
 # Theme colors (black + yellow)
 BG_COLOR       = "#050816"
@@ -78,7 +90,7 @@ def lerp_color(c1, c2, t):
 
 
 class CoolingPadGUI:
-    def __init__(self, root):
+    def __init__(self, root, proc_root=PROC_ROOT, sys_root=SYS_ROOT):
         self.root = root
         self.root.title("ESP32 Smart Gaming Laptop Cooling Pad")
         self.root.configure(bg=BG_COLOR)
@@ -106,6 +118,17 @@ class CoolingPadGUI:
         self.lm35_hist = []
         self.dhtt_hist = []
 
+        # laptop CPU, sampled on its own schedule
+        self.host_time_hist = []
+        self.cpu_load_hist = []
+        self.cpu_temp_hist = []
+        self.cpu_load = None
+        self.cpu_temp = None
+        self.last_lm35 = None
+        self.cpu_fan_feed = False
+        self.cpu_fan_sent = None
+        self.cpu_fan_sent_t = 0.0
+
         self.graph_mode = "Temperature"
         self.slider_dragging = False
 
@@ -131,6 +154,13 @@ class CoolingPadGUI:
         self.start_animations()
         self.poll_status()
 
+        self.host_sampler = HostSensorSampler(
+            lambda t, load, temp: self.root.after(0, lambda: self.on_host_sample(t, load, temp)),
+            interval_s=HOST_POLL_INTERVAL_MS / 1000.0,
+            proc_root=proc_root,
+            sys_root=sys_root
+        ).start()
+
     # =============== STYLES ===============
     def build_style(self):
         style = ttk.Style()
@@ -596,6 +626,13 @@ class CoolingPadGUI:
         )
         self.btn_manual.pack(side="left", expand=True, fill="x", padx=(4, 0))
 
+        self.btn_cpu_fan = ttk.Button(
+            self.card_fan, text="CPU → FAN",
+            style="Grey.TButton",
+            command=self.toggle_cpu_fan
+        )
+        self.btn_cpu_fan.pack(fill="x", padx=10, pady=(0, 4))
+
         # Manual fan slider
         slider_frame = tk.Frame(self.card_fan, bg=CARD_BG)
         slider_frame.pack(fill="x", padx=10, pady=(4, 2))
@@ -703,6 +740,18 @@ class CoolingPadGUI:
                                        linewidth=2.0, linestyle="--",
                                        color="#f97316")
 
+        # laptop CPU (Usage tab): package temp on the °C axis, load on its own 0-100 % axis
+        self.line_cpu_temp, = self.ax.plot([], [], label="CPU Package",
+                                           linewidth=2.0, color=NEON_PURPLE)
+        self.ax_load = self.ax.twinx()
+        self.ax_load.set_ylim(0, 100)
+        self.ax_load.set_ylabel("CPU Load (%)", color=TEXT_MUTED,
+                                fontname="Consolas")
+        self.ax_load.tick_params(colors=TEXT_MUTED, labelsize=8)
+        self.line_cpu_load, = self.ax_load.plot([], [], label="CPU Load",
+                                                linewidth=1.5, linestyle=":",
+                                                color=OK_GREEN)
+
         self.ax.legend(facecolor="#020617", edgecolor="#4b5563",
                        labelcolor=TEXT_MUTED, fontsize=8)
 
@@ -754,6 +803,15 @@ class CoolingPadGUI:
         )
         self.btn_tab_voltage.pack(side="left", padx=(4, 0))
 
+        self.lbl_host = tk.Label(
+            tabs_frame,
+            text="CPU: --",
+            bg=CARD_BG,
+            fg=TEXT_MUTED,
+            font=("Consolas", 9)
+        )
+        self.lbl_host.pack(side="right")
+
         self.set_graph_mode("Temperature")
 
     # ---------- static big temp gauge ----------
@@ -1096,10 +1154,10 @@ class CoolingPadGUI:
             dht_label = "DHT Temp"
         elif mode == "Usage":
             self.btn_tab_usage.configure(bg=active_bg, fg=active_fg)
-            title = "CPU Usage View (scaled)"
-            ylabel = "Value (arb. units)"
-            lm_label = "CPU Load"
-            dht_label = "Ambient Load"
+            title = "Laptop CPU vs Pad"
+            ylabel = "Temperature (°C)"
+            lm_label = "LM35 (pad)"
+            dht_label = "DHT Temp"
         elif mode == "Fan":
             self.btn_tab_fan.configure(bg=active_bg, fg=active_fg)
             title = "Fan Response View"
@@ -1113,13 +1171,22 @@ class CoolingPadGUI:
             lm_label = "LM35 Channel"
             dht_label = "DHT Channel"
 
+        usage = mode == "Usage"
+        self.line_dhtt.set_visible(not usage)
+        self.line_cpu_temp.set_visible(usage)
+        self.ax_load.set_visible(usage)
+
         self.graph_title_label.configure(text=title)
         self.ax.set_ylabel(ylabel, color=TEXT_MUTED, fontname="Consolas")
         self.line_lm35.set_label(lm_label)
         self.line_dhtt.set_label(dht_label)
-        self.ax.legend(facecolor="#020617", edgecolor="#4b5563",
+        lines = [line for line in (self.line_lm35, self.line_dhtt, self.line_cpu_temp)
+                 if line.get_visible()]
+        if usage:
+            lines.append(self.line_cpu_load)
+        self.ax.legend(handles=lines, facecolor="#020617", edgecolor="#4b5563",
                        labelcolor=TEXT_MUTED, fontsize=8)
-        self.canvas.draw_idle()
+        self.redraw_graph()
 
     # =============== SLIDER EVENTS ===============
     def on_slider_press(self, event):
@@ -1128,6 +1195,7 @@ class CoolingPadGUI:
     def on_slider_release(self, event):
         self.slider_dragging = False
         if self.current_mode.upper() == "MANUAL":
+            self.set_cpu_fan_feed(False)
             percent = self.fan_slider.get()
             self.send_fan_set(int(percent))
 
@@ -1148,6 +1216,8 @@ class CoolingPadGUI:
         self.root.after(POLL_INTERVAL_MS, self.poll_status)
 
     def send_mode(self, mode):
+        self.set_cpu_fan_feed(False)
+
         def worker():
             try:
                 r = requests.get(f"{ESP32_IP}/setMode?mode={mode}", timeout=0.8)
@@ -1178,6 +1248,75 @@ class CoolingPadGUI:
             self.root.after(0, lambda: self.set_status(msg))
         threading.Thread(target=worker, daemon=True).start()
 
+    # =============== LAPTOP CPU ===============
+    def on_host_sample(self, t, load, temp):
+        self.cpu_load = load
+        self.cpu_temp = temp
+        now = t - self.start_time
+        self.host_time_hist.append(now)
+        self.cpu_load_hist.append(load if load is not None else float("nan"))
+        self.cpu_temp_hist.append(temp if temp is not None else float("nan"))
+
+        while self.host_time_hist and (now - self.host_time_hist[0]) > MAX_HISTORY_SECONDS:
+            self.host_time_hist.pop(0)
+            self.cpu_load_hist.pop(0)
+            self.cpu_temp_hist.pop(0)
+
+        load_txt = f"{load:.0f} %" if load is not None else "--"
+        temp_txt = f"{temp:.1f} °C" if temp is not None else "--"
+        self.lbl_host.configure(text=f"CPU: {load_txt}  {temp_txt}")
+
+        if self.graph_mode == "Usage":
+            self.redraw_graph()
+        self.feed_cpu_fan()
+
+    def cpu_fan_percent(self):
+        """Fan % asked for by the laptop: the larger of the load and package temperature
+        ramps, never less than the pad's own AUTO table would run at the current LM35."""
+        def ramp(value, lo_hi):
+            if value is None:
+                return 0.0
+            lo, hi = lo_hi
+            return max(0.0, min(100.0, (value - lo) * 100.0 / (hi - lo)))
+
+        pad = 0.0
+        if self.last_lm35 is not None:
+            pad = 0.0 if self.last_lm35 < 30.0 else 55.0 if self.last_lm35 < 40.0 else 100.0
+        return int(round(max(ramp(self.cpu_load, CPU_FAN_LOAD_RAMP),
+                             ramp(self.cpu_temp, CPU_FAN_TEMP_RAMP),
+                             pad)))
+
+    def feed_cpu_fan(self):
+        if not self.cpu_fan_feed or self.current_mode.upper() != "MANUAL":
+            return
+        percent = self.cpu_fan_percent()
+        now = time.time()
+        if self.cpu_fan_sent is not None:
+            if now - self.cpu_fan_sent_t < CPU_FAN_MIN_INTERVAL_S:
+                return
+            small = abs(percent - self.cpu_fan_sent) < CPU_FAN_MIN_STEP
+            if percent == self.cpu_fan_sent or (small and percent not in (0, 100)):
+                return
+        self.cpu_fan_sent = percent
+        self.cpu_fan_sent_t = now
+        self.send_fan_set(percent)
+
+    def set_cpu_fan_feed(self, enabled):
+        self.cpu_fan_feed = enabled
+        self.cpu_fan_sent = None
+        self.btn_cpu_fan.configure(style="Accent.TButton" if enabled else "Grey.TButton")
+
+    def toggle_cpu_fan(self):
+        if self.cpu_fan_feed:
+            self.send_mode("AUTO")
+            return
+        if self.cpu_load is None and self.cpu_temp is None:
+            self.set_status("No CPU load / temperature on this host")
+            return
+        self.send_mode("MANUAL")
+        self.set_cpu_fan_feed(True)
+        self.set_status("CPU → FAN: fan follows the laptop CPU")
+
     # ---- TEST BUTTONS: ONLY IN MANUAL, 4s pulse + slider animation ----
     def send_test(self, device):
         if self.current_mode.upper() != "MANUAL":
@@ -1410,6 +1549,9 @@ class CoolingPadGUI:
         if not self.slider_dragging:
             self.fan_slider.set(fan_percent)
 
+        self.last_lm35 = lm35
+        self.feed_cpu_fan()
+
         self.update_gauge(lm35)
         self.update_fan_meter(fan_percent)
         self.update_graph(lm35, dht_t)
@@ -1457,15 +1599,27 @@ class CoolingPadGUI:
             self.lm35_hist.pop(0)
             self.dhtt_hist.pop(0)
 
+        self.redraw_graph()
+
+    def redraw_graph(self):
+        usage = self.graph_mode == "Usage"
         self.line_lm35.set_data(self.time_hist, self.lm35_hist)
         self.line_dhtt.set_data(self.time_hist, self.dhtt_hist)
+        self.line_cpu_temp.set_data(self.host_time_hist, self.cpu_temp_hist)
+        self.line_cpu_load.set_data(self.host_time_hist, self.cpu_load_hist)
 
-        if self.time_hist:
-            t_min = max(0, self.time_hist[-1] - MAX_HISTORY_SECONDS)
-            t_max = self.time_hist[-1] + 1
+        last = self.time_hist[-1:] + (self.host_time_hist[-1:] if usage else [])
+        if usage:
+            all_temp = self.lm35_hist + [v for v in self.cpu_temp_hist if v == v]  # skip NaN gaps
+        else:
+            all_temp = self.lm35_hist + self.dhtt_hist
+
+        if last:
+            t_min = max(0, max(last) - MAX_HISTORY_SECONDS)
+            t_max = max(last) + 1
             self.ax.set_xlim(t_min, t_max)
 
-            all_temp = self.lm35_hist + self.dhtt_hist
+        if all_temp:
             ymin = min(all_temp) - 2
             ymax = max(all_temp) + 2
             if ymin == ymax:
@@ -1541,12 +1695,17 @@ def show_splash(root, on_done):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ESP32 Smart Cooling Pad dashboard")
+    parser.add_argument("--proc-root", default=PROC_ROOT, help="procfs to read CPU load from (e.g. a fake tree)")
+    parser.add_argument("--sys-root", default=SYS_ROOT, help="sysfs to read CPU temperature from")
+    args = parser.parse_args()
+
     root = tk.Tk()
     root.configure(bg=BG_COLOR)
     root.withdraw()
 
     def start_app():
-        CoolingPadGUI(root)
+        CoolingPadGUI(root, proc_root=args.proc_root, sys_root=args.sys_root)
 
     show_splash(root, start_app)
     root.mainloop()
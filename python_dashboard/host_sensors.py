@@ -0,0 +1,147 @@
+"""
+Host (laptop) CPU load and package temperature, straight from procfs / sysfs.
+
+    sampler = HostSensorSampler(on_sample, interval_s=0.5).start()
+
+Linux only; elsewhere (or without thermal zones) the values are None. The
+roots are parameters so the readers can be pointed at a fake tree:
+
+    HostSensorSampler(on_sample, proc_root="/tmp/fake/proc", sys_root="/tmp/fake/sys")
+"""
+import glob
+import os
+import threading
+import time
+
+# thermal zone types that are the CPU package, best first
+CPU_ZONE_TYPES = ("x86_pkg_temp", "cpu-thermal", "cpu_thermal", "cpu0-thermal", "soc_thermal", "acpitz")
+
+
+class CpuLoadReader:
+    """
+    Overall CPU utilization from the aggregate "cpu" line of /proc/stat:
+    - the file is opened once and re-read with a single pread (the first line fits
+      in 256 bytes whatever the core count)
+    - read() returns busy % since the previous read, None on the first call
+    """
+    def __init__(self, proc_root="/proc"):
+        self.path = os.path.join(proc_root, "stat")
+        self.fd = None
+        self.last = None
+
+    def open(self):
+        self.fd = os.open(self.path, os.O_RDONLY)
+        return self
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def read(self):
+        if self.fd is None:
+            self.open()
+        line = os.pread(self.fd, 256, 0).split(b"\n", 1)[0]
+        fields = line.split()
+        if not fields or fields[0] != b"cpu":
+            raise ValueError(f"unexpected {self.path} line: {line[:40]!r}")
+        # user nice system idle iowait irq softirq steal (guest time is already in user)
+        ticks = [int(v) for v in fields[1:9]]
+        total = sum(ticks)
+        idle = ticks[3] + (ticks[4] if len(ticks) > 4 else 0)
+
+        last, self.last = self.last, (total, idle)
+        if last is None or total <= last[0]:
+            return None
+        d_total = total - last[0]
+        return max(0.0, min(100.0, 100.0 * (d_total - (idle - last[1])) / d_total))
+
+
+def find_cpu_zone(sys_root="/sys"):
+    """Path of the thermal zone that best represents the CPU package, or None."""
+    zones = {}
+    for zone in sorted(glob.glob(os.path.join(sys_root, "class", "thermal", "thermal_zone*"))):
+        try:
+            with open(os.path.join(zone, "type")) as f:
+                zones.setdefault(f.read().strip(), zone)
+        except OSError:
+            continue
+    for kind in CPU_ZONE_TYPES:
+        if kind in zones:
+            return zones[kind]
+    return next(iter(zones.values()), None)
+
+
+class CpuTempReader:
+    """Package temperature (°C) from a thermal zone's millidegree `temp` file, kept open."""
+    def __init__(self, sys_root="/sys", zone=None):
+        self.zone = zone or find_cpu_zone(sys_root)
+        self.fd = None
+
+    @property
+    def available(self) -> bool:
+        return self.zone is not None
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def read(self):
+        if self.zone is None:
+            return None
+        if self.fd is None:
+            self.fd = os.open(os.path.join(self.zone, "temp"), os.O_RDONLY)
+        return int(os.pread(self.fd, 32, 0)) / 1000.0
+
+
+class HostSensorSampler:
+    """
+    Samples CPU load and package temperature every `interval_s` on its own thread and
+    calls on_sample(t, load_pct, temp_c) there (t = time.time()). A reader that fails
+    once (no /proc, zone gone) reports None from then on.
+    """
+    def __init__(self, on_sample, interval_s=0.5, proc_root="/proc", sys_root="/sys"):
+        self.on_sample = on_sample
+        self.interval_s = interval_s
+        self.load = CpuLoadReader(proc_root)
+        self.temp = CpuTempReader(sys_root)
+        self.stop_flag = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="host-sensors", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_flag = True
+
+    def sample(self):
+        load = temp = None
+        if self.load is not None:
+            try:
+                load = self.load.read()
+            except (OSError, ValueError):
+                self.load.close()
+                self.load = None
+        if self.temp is not None:
+            try:
+                temp = self.temp.read()
+            except (OSError, ValueError):
+                self.temp.close()
+                self.temp = None
+        return load, temp
+
+    def _run(self):
+        next_t = time.monotonic()
+        while not self.stop_flag:
+            load, temp = self.sample()
+            if load is not None or temp is not None:
+                self.on_sample(time.time(), load, temp)
+            next_t += self.interval_s
+            time.sleep(max(0.0, next_t - time.monotonic()))
+        if self.load is not None:
+            self.load.close()
+        if self.temp is not None:
+            self.temp.close()
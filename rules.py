@@ -0,0 +1,341 @@
+"""
+Alarm rules: declarative conditions on status channels, compiled once and evaluated
+incrementally per sample, per device.
+
+A rule is a dict (or a JSON object in a --rules file):
+
+    {"name": "overtemp", "when": "lm35 > 50", "hysteresis": 1.0, "for_s": 0, "clear_s": 0,
+     "severity": "alarm", "message": "Over-temperature: {lm35:.1f} °C",
+     "action": "/buzzer?state=ON", "clear_action": "/buzzer?state=OFF"}
+
+- when: comparisons `channel OP value` (OP one of > >= < <= == !=) joined with and /
+  or / not and parentheses; a bare channel is true when >= 0.5 (0 / 1 flags, also
+  after median filtering); non-numeric values compare as strings (mode == AUTO)
+- hysteresis: once raised, every numeric comparison needs to be off by this much
+  more to let go (lm35 > 50 clears at lm35 <= 49; not (lm35 < 40) raises at 40 and
+  clears below 39, like lm35 >= 40)
+- for_s / clear_s: the condition must hold (or be gone) this long before the rule
+  raises (or clears)
+- severity: "alarm", "warning" or "info" (info rules are state for the UI, not logged)
+- message: str.format over the channel values; action / clear_action: a pad command
+  sent when the rule raises / clears
+- enabled: false switches a rule off (e.g. a default one from a rules file)
+
+Channels read the filtered value (filters.py) when there is one, else the raw one.
+A rules file holds {"rules": [...], "devices": {device: {rule name: {field: value}}}}.
+Its rules are added, or override fields of the default of the same name; the device
+entries override fields of single rules for one pad (device = UDP pad id or target,
+as in the anomaly stats).
+
+Each sample only re-evaluates the rules that read a channel whose value changed, or
+that wait out a for_s / clear_s; nothing is parsed after compile time.
+"""
+import json
+import re
+
+from control import OVERHEAT_C
+from policy import TEMP_MED
+
+RULE_OVERTEMP = "overtemp"
+RULE_HIGH_TEMP = "high_temp"
+RULE_RGB = "rgb_auto"
+RGB_LUX_ON = 99.0           # firmware: the RGB strip chases below this light level
+SEVERITIES = ("alarm", "warning", "info")
+ACTION_ROUTES = ("/setMode", "/fan", "/rgb", "/buzzer")    # pad commands a rule may send
+RULE_FIELDS = ("name", "when", "hysteresis", "for_s", "clear_s", "severity", "message",
+               "action", "clear_action", "enabled")
+
+DEFAULT_RULES = [
+    {"name": RULE_OVERTEMP, "when": f"lm35 > {OVERHEAT_C:g}", "hysteresis": 1.0, "severity": "alarm",
+     "message": "Over-temperature: lm35 {lm35:.1f} °C"},
+    {"name": RULE_HIGH_TEMP, "when": f"lm35 > {TEMP_MED:g}", "hysteresis": 0.5, "severity": "warning",
+     "message": "High temperature: lm35 {lm35:.1f} °C"},
+    {"name": RULE_RGB, "when": f"connected and lux < {RGB_LUX_ON:g}", "hysteresis": 5.0, "severity": "info"},
+]
+
+_TOKEN = re.compile(r"\s*(?:(>=|<=|==|!=|>|<|\(|\))|([A-Za-z_][A-Za-z0-9_]*)|(-?\d+(?:\.\d*)?|-?\.\d+))")
+_OPS = {
+    ">": lambda x, v: x > v,
+    ">=": lambda x, v: x >= v,
+    "<": lambda x, v: x < v,
+    "<=": lambda x, v: x <= v,
+    "==": lambda x, v: x == v,
+    "!=": lambda x, v: x != v,
+}
+
+
+def _tokenize(text: str):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise ValueError(f"Unexpected {text[pos:].strip()!r}")
+        tokens.append(m.group(1) or m.group(2) or float(m.group(3)))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """
+    when-expression -> closure cond(values, bias) -> bool, plus the channels it reads.
+    `bias` picks the thresholds of the numeric comparisons: 0 as written, 1 moved by the
+    hysteresis so the comparison holds longer (a raised rule letting go), -1 moved the
+    other way (a comparison under a not, in a raised rule).
+    """
+    def __init__(self, text: str, hysteresis: float):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.h = hysteresis
+        self.channels = set()
+
+    def parse(self):
+        cond = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.pos]!r}")
+        return cond
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        tok = self._peek()
+        if tok is None:
+            raise ValueError("Condition ends too early")
+        self.pos += 1
+        return tok
+
+    def _or(self):
+        parts = [self._and()]
+        while self._peek() == "or":
+            self.pos += 1
+            parts.append(self._and())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda vals, bias: any(p(vals, bias) for p in parts)
+
+    def _and(self):
+        parts = [self._not()]
+        while self._peek() == "and":
+            self.pos += 1
+            parts.append(self._not())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda vals, bias: all(p(vals, bias) for p in parts)
+
+    def _not(self):
+        if self._peek() == "not":
+            self.pos += 1
+            inner = self._not()
+            # keeping the not true means keeping the inner part false: flip the bias
+            return lambda vals, bias: not inner(vals, -bias)
+        return self._atom()
+
+    def _atom(self):
+        tok = self._next()
+        if tok == "(":
+            inner = self._or()
+            if self._next() != ")":
+                raise ValueError("Missing )")
+            return inner
+        if not isinstance(tok, str) or tok in _OPS or tok in ("and", "or", "not", ")"):
+            raise ValueError(f"Expected a channel, got {tok!r}")
+        ch = tok
+        self.channels.add(ch)
+        if self._peek() not in _OPS:
+            return lambda vals, bias: _number(vals[ch]) >= 0.5
+        op = self._next()
+        value = self._next()
+        if value in ("(", ")") or value in _OPS:
+            raise ValueError(f"Expected a value after {ch} {op}")
+        test = _OPS[op]
+        if not isinstance(value, float):
+            return lambda vals, bias: test(str(vals[ch]), value)
+        # by bias 0 / 1 / -1: holding a > / >= moves its threshold down, a < / <= up
+        h = self.h if op in (">", ">=") else -self.h if op in ("<", "<=") else 0.0
+        thresholds = (value, value - h, value + h)
+        return lambda vals, bias: test(_number(vals[ch]), thresholds[bias])
+
+
+def _number(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class Rule:
+    """One compiled rule (see the module docstring for the fields). Raises ValueError on a bad one."""
+    def __init__(self, spec: dict):
+        unknown = set(spec) - set(RULE_FIELDS)
+        name = spec.get("name")
+        if not name:
+            raise ValueError("Rule without a name")
+        try:
+            if unknown:
+                raise ValueError(f"unknown field(s) {', '.join(sorted(unknown))}")
+            self.name = name
+            self.spec = dict(spec)
+            self.when = spec["when"]
+            self.hysteresis = float(spec.get("hysteresis", 0.0))
+            self.for_s = float(spec.get("for_s", 0.0))
+            self.clear_s = float(spec.get("clear_s", 0.0))
+            self.severity = spec.get("severity", "warning")
+            self.message = spec.get("message") or f"{name}: {self.when}"
+            self.action = spec.get("action")
+            self.clear_action = spec.get("clear_action")
+            self.enabled = bool(spec.get("enabled", True))
+            if self.severity not in SEVERITIES:
+                raise ValueError(f"severity must be one of {', '.join(SEVERITIES)}")
+            if min(self.hysteresis, self.for_s, self.clear_s) < 0:
+                raise ValueError("hysteresis / for_s / clear_s must be >= 0")
+            for path in (self.action, self.clear_action):
+                if path is not None and path.split("?", 1)[0] not in ACTION_ROUTES:
+                    raise ValueError(f"action {path!r} is not a pad command ({', '.join(ACTION_ROUTES)})")
+            parser = _Parser(self.when, self.hysteresis)
+            self.cond = parser.parse()
+            self.channels = tuple(sorted(parser.channels))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Rule {name!r}: {e}")
+
+    def format(self, vals: dict) -> str:
+        try:
+            return self.message.format_map(vals)
+        except (KeyError, ValueError, IndexError):
+            return self.message
+
+
+class RuleSet:
+    """
+    Rules compiled together: the channels they read and, per channel, the rules to
+    re-evaluate when it changes (indices into `rules`).
+    """
+    def __init__(self, specs):
+        self.rules = []
+        seen = set()
+        for spec in specs:
+            rule = Rule(spec)
+            if rule.name in seen:
+                raise ValueError(f"Rule {rule.name!r} defined twice")
+            seen.add(rule.name)
+            if rule.enabled:
+                self.rules.append(rule)
+        self.channels = tuple(sorted({ch for r in self.rules for ch in r.channels}))
+        self.by_channel = {ch: [i for i, r in enumerate(self.rules) if ch in r.channels] for ch in self.channels}
+
+
+class _DeviceState:
+    def __init__(self, ruleset: RuleSet):
+        self.ruleset = ruleset
+        self.values = {}            # channel -> last value seen
+        n = len(ruleset.rules)
+        self.active = [False] * n
+        self.since = [None] * n     # t the condition first disagreed with `active`
+        self.waiting = set()        # rules with a for_s / clear_s running
+        self.active_names = ()      # for data["alarms"]; rebuilt only on a change
+
+
+class RuleEngine:
+    """
+    Rules for any number of devices. update(device, data, t) evaluates one sample and
+    returns the events [{t, device, rule, state ("raised" / "cleared"), severity,
+    message, action}]; active(device) is the tuple of raised rule names. `samples` and
+    `evaluated` count the updates and the rule evaluations they needed.
+    Devices without overrides share one compiled RuleSet; an override set is compiled
+    the first time its device shows up.
+    """
+    def __init__(self, rules=None, devices=None):
+        self.specs = [dict(r) for r in (DEFAULT_RULES if rules is None else rules)]
+        self.overrides = {d: {name: dict(o) for name, o in ov.items()} for d, ov in (devices or {}).items()}
+        self.base = RuleSet(self.specs)
+        self.sets = {}
+        self.states = {}
+        self.samples = 0
+        self.evaluated = 0
+        for device in self.overrides:
+            self._ruleset(device)   # compile (and check) the overrides up front
+
+    @classmethod
+    def load(cls, path: str):
+        """From a rules file (module docstring). Raises ValueError / OSError."""
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        if not isinstance(cfg, dict):
+            raise ValueError(f"{path}: expected {{\"rules\": [...], \"devices\": {{...}}}}")
+        rules = {r["name"]: dict(r) for r in DEFAULT_RULES}
+        for r in cfg.get("rules", []):
+            if not isinstance(r, dict) or "name" not in r:
+                raise ValueError(f"{path}: every rule needs a name")
+            rules[r["name"]] = dict(rules.get(r["name"], {}), **r)
+        return cls(list(rules.values()), cfg.get("devices"))
+
+    def _ruleset(self, device) -> RuleSet:
+        rs = self.sets.get(device)
+        if rs is None:
+            ov = self.overrides.get(device)
+            if ov is None:
+                rs = self.base
+            else:
+                unknown = set(ov) - {s["name"] for s in self.specs}
+                if unknown:
+                    raise ValueError(f"Device {device!r}: no rule(s) {', '.join(sorted(unknown))}")
+                rs = RuleSet([dict(s, **ov.get(s["name"], {})) for s in self.specs])
+            self.sets[device] = rs
+        return rs
+
+    def reset(self):
+        """Forget every device's rule state (new link / time base)."""
+        self.states.clear()
+
+    def active(self, device) -> tuple:
+        st = self.states.get(device)
+        return st.active_names if st is not None else ()
+
+    def update(self, device, data: dict, t: float):
+        st = self.states.get(device)
+        if st is None:
+            st = self.states[device] = _DeviceState(self._ruleset(device))
+        rs = st.ruleset
+        filtered = data.get("filtered") or {}
+        values = st.values
+        todo = set(st.waiting)
+        for ch in rs.channels:
+            v = filtered.get(ch, data.get(ch))
+            if v is None:
+                continue    # not in this sample: rules on it keep their state
+            if ch not in values or values[ch] != v:
+                values[ch] = v
+                todo.update(rs.by_channel[ch])
+        self.samples += 1
+        self.evaluated += len(todo)
+        if not todo:
+            return []
+
+        events = []
+        changed = False
+        for i in sorted(todo):
+            rule = rs.rules[i]
+            if any(ch not in values for ch in rule.channels):
+                continue
+            active = st.active[i]
+            if rule.cond(values, 1 if active else 0) == active:
+                st.since[i] = None
+                st.waiting.discard(i)
+                continue
+            if st.since[i] is None:
+                st.since[i] = t
+            if t - st.since[i] < (rule.clear_s if active else rule.for_s):
+                st.waiting.add(i)
+                continue
+            st.active[i] = not active
+            st.since[i] = None
+            st.waiting.discard(i)
+            changed = True
+            events.append({"t": t, "device": device, "rule": rule.name,
+                           "state": "cleared" if active else "raised", "severity": rule.severity,
+                           "message": rule.format(values),
+                           "action": rule.clear_action if active else rule.action})
+        if changed:
+            st.active_names = tuple(r.name for r, a in zip(rs.rules, st.active) if a)
+        return events
@@ -0,0 +1,220 @@
+from collections import deque
+
+import numpy as np
+
+SCOPE_CHANNELS = ("lm35", "ir", "pot")
+
+TRIGGER_MODES = ("FREE", "AUTO", "NORMAL", "SINGLE")
+TRIGGER_EDGES = ("RISING", "FALLING")
+
+
+class TriggerCapture:
+    """Frozen trigger capture: times relative to the trigger point, one array per channel."""
+    def __init__(self, t_trig, samples, forced=False):
+        self.t_trig = t_trig
+        self.forced = forced
+        arr = np.asarray(samples, dtype=np.float64).reshape(-1, 1 + len(SCOPE_CHANNELS))
+        self.t = arr[:, 0] - t_trig
+        self.channels = {c: arr[:, i + 1] for i, c in enumerate(SCOPE_CHANNELS)}
+
+
+class ScopeTrigger:
+    """
+    Oscilloscope trigger over the incoming sample stream:
+    - rising / falling threshold on one channel, checked per sample in O(1)
+    - pre-trigger ring buffer keeps `pre_s` seconds before the event
+    - capture completes `post_s` seconds after the event
+    Modes: NORMAL re-arms after each capture, SINGLE stops after one,
+    AUTO also forces a capture when nothing triggers for `pre_s + post_s`.
+    """
+    def __init__(self, source="lm35", edge="RISING", level=40.0, mode="FREE",
+                 pre_s=5.0, post_s=10.0, max_captures=6):
+        self.captures = deque(maxlen=max_captures)
+        self._ring = deque()
+        self.configure(source=source, edge=edge, level=level, mode=mode, pre_s=pre_s, post_s=post_s)
+
+    def configure(self, source=None, edge=None, level=None, mode=None, pre_s=None, post_s=None):
+        if source is not None:
+            if source not in SCOPE_CHANNELS:
+                raise ValueError(f"Unknown trigger source: {source}")
+            self.source = source
+        if edge is not None:
+            edge = edge.upper()
+            if edge not in TRIGGER_EDGES:
+                raise ValueError(f"Unknown trigger edge: {edge}")
+            self.edge = edge
+        if level is not None:
+            self.level = float(level)
+        if mode is not None:
+            mode = mode.upper()
+            if mode not in TRIGGER_MODES:
+                raise ValueError(f"Unknown trigger mode: {mode}")
+            self.mode = mode
+        if pre_s is not None:
+            self.pre_s = max(0.0, float(pre_s))
+        if post_s is not None:
+            self.post_s = max(0.0, float(post_s))
+        self.arm()
+
+    def arm(self):
+        self.state = "ARMED" if self.mode != "FREE" else "FREE"
+        self._src_idx = 1 + SCOPE_CHANNELS.index(self.source)
+        self._prev = None
+        self._armed_at = None
+        self._t_trig = None
+        self._forced = False
+        self._capture = None
+
+    def reset(self):
+        """Drop the pre-trigger ring (e.g. when the time base restarts) and re-arm."""
+        self._ring.clear()
+        self.arm()
+
+    def push(self, t, lm35, ir, pot):
+        """Feed one sample. Returns a TriggerCapture when one completes, else None."""
+        if self.state == "FREE":
+            return None
+
+        sample = (t, lm35, ir, pot)
+        ring = self._ring
+        ring.append(sample)
+        while ring and ring[0][0] < t - self.pre_s:
+            ring.popleft()
+
+        v = sample[self._src_idx]
+        prev = self._prev
+        self._prev = v
+        if self._armed_at is None:
+            self._armed_at = t
+
+        if self.state == "CAPTURING":
+            self._capture.append(sample)
+            if t - self._t_trig >= self.post_s:
+                return self._finish(t)
+            return None
+
+        if self.state != "ARMED":
+            return None
+
+        if prev is not None:
+            if self.edge == "RISING":
+                crossed = prev < self.level <= v
+            else:
+                crossed = prev > self.level >= v
+        else:
+            crossed = False
+
+        forced = (not crossed and self.mode == "AUTO"
+                  and t - self._armed_at >= self.pre_s + self.post_s)
+        if crossed or forced:
+            self.state = "CAPTURING"
+            self._t_trig = t
+            self._forced = forced
+            self._capture = list(ring)
+            if self.post_s <= 0:
+                return self._finish(t)
+        return None
+
+    def _finish(self, t):
+        cap = TriggerCapture(self._t_trig, self._capture, forced=self._forced)
+        self.captures.append(cap)
+        self._capture = None
+        self._t_trig = None
+        self._armed_at = t
+        self.state = "STOPPED" if self.mode == "SINGLE" else "ARMED"
+        return cap
+
+
+class WelchSpectrum:
+    """
+    Incremental Welch power spectrum for one channel:
+    - Hann window, scaling and FFT-bin tables precomputed once
+    - one segment is transformed every `step` samples (50% overlap by default)
+    - the last `n_avg` segment periodograms are averaged with a running sum
+    Sample rate is estimated from the segment timestamps, so uneven polling
+    only smears the frequency axis. `psd`, `psd_db` and `freqs` are reused
+    arrays updated in place.
+    """
+    def __init__(self, nperseg=32, overlap=0.5, n_avg=8):
+        self.nperseg = nperseg
+        self.step = max(1, int(round(nperseg * (1.0 - overlap))))
+        self.n_avg = n_avg
+
+        n = np.arange(nperseg)
+        self.window = 0.5 - 0.5 * np.cos(2.0 * np.pi * n / nperseg)
+        nbins = nperseg // 2 + 1
+        self._bins = np.fft.rfftfreq(nperseg)
+        onesided = np.full(nbins, 2.0)
+        onesided[0] = 1.0
+        if nperseg % 2 == 0:
+            onesided[-1] = 1.0
+        self._scale = onesided / np.sum(self.window ** 2)
+
+        self._x = np.zeros(nperseg)
+        self._t = np.zeros(nperseg)
+        self._seg = np.empty(nperseg)
+        self._periodograms = np.zeros((n_avg, nbins))
+        self._sum = np.zeros(nbins)
+
+        self.psd = np.zeros(nbins)
+        self.psd_db = np.zeros(nbins)
+        self.freqs = np.zeros(nbins)
+        self.reset()
+
+    def reset(self):
+        self._n = 0
+        self._since = 0
+        self._slot = 0
+        self._count = 0
+        self._periodograms.fill(0.0)
+        self._sum.fill(0.0)
+        self.fs = 0.0
+
+    def ready(self):
+        return self._count > 0
+
+    def push(self, t, v) -> bool:
+        """Feed one sample. Returns True when the spectrum was updated."""
+        i = self._n % self.nperseg
+        self._x[i] = v
+        self._t[i] = t
+        self._n += 1
+        self._since += 1
+        if self._n < self.nperseg or self._since < self.step:
+            return False
+        self._since = 0
+        return self._transform()
+
+    def _transform(self):
+        N = self.nperseg
+        oldest = self._n % N
+        span = self._t[oldest - 1] - self._t[oldest]
+        if span <= 0:
+            return False
+        fs = (N - 1) / span
+
+        seg = self._seg
+        k = N - oldest
+        seg[:k] = self._x[oldest:]
+        seg[k:] = self._x[:oldest]
+        seg -= seg.mean()
+        seg *= self.window
+
+        p = self._periodograms[self._slot]
+        self._sum -= p
+        np.abs(np.fft.rfft(seg), out=p)
+        np.square(p, out=p)
+        p *= self._scale
+        p /= fs
+        self._sum += p
+
+        self._slot = (self._slot + 1) % self.n_avg
+        self._count = min(self._count + 1, self.n_avg)
+        self.fs = fs if self.fs == 0.0 else 0.8 * self.fs + 0.2 * fs
+
+        np.multiply(self._sum, 1.0 / self._count, out=self.psd)
+        np.maximum(self.psd, 1e-12, out=self.psd_db)
+        np.log10(self.psd_db, out=self.psd_db)
+        self.psd_db *= 10.0
+        np.multiply(self._bins, self.fs, out=self.freqs)
+        return True
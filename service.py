@@ -0,0 +1,1162 @@
+"""
+Headless cooling pad service: links, polling, recording and a local control API
+without tkinter or matplotlib.
+
+    python service.py --target 192.168.1.50 [--link UDP] [--record session.jsonl]
+    python service.py --scan
+    python service.py --link SERIAL --target /dev/ttyUSB0
+    python service.py --target 192.168.1.50 --pid 38
+    python service.py --target 192.168.1.50 --precool 40
+    python service.py --target 192.168.1.50 --curve quiet [--profiles my_profiles.json]
+    python service.py --target 192.168.1.50 --filter lm35=ewma:3 --filter lux=off
+    python service.py --target 192.168.1.50 --rules my_rules.json
+
+The control API (default http://127.0.0.1:8765) speaks the pad's own protocol
+(/status, /history, /setMode, /fan, /rgb, /buzzer, JSON or ?fmt=bin), so the Tk
+dashboard can CONNECT to it like to a pad. /connect?link=..&target=.., /scan and
+/stats manage the service itself, /pid?target=38 (or ?off=1) runs the host-side
+fan controller, /precool?at=40 (or ?off=1) the forecast-driven pre-cooling. /curve?profile=quiet
+(or ?off=1) drives the fan from a fan-curve profile, /profiles lists them (?save=NAME&points=..
+[&kind=..&hysteresis=..&present=..] or ?delete=NAME edits them, see curves.py). /alarms has
+the raised alarm rules per pad and the recent alarm events (see rules.py). app.py runs the
+same CoolingPadService in-process.
+"""
+import argparse
+import ipaddress
+import json
+import random
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Empty
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+from anomaly import AnomalyDetector
+from control import HostFanControl, ThermalForecaster, PRECOOL_LEAD_S
+from curves import CurveFanControl, FanCurve, ProfileStore, parse_points, PROFILE_PATH
+from diagnostics import HttpStats, PipelineTracer
+from filters import FilterStage, parse_filter_args
+from policy import parse_auto_table, AUTO_TABLE
+from protocol import (decode_status_frame, decode_history_frames, encode_status_frame, encode_history_frames,
+                      BINARY_CONTENT_TYPE, HISTORY_FIELDS, UDP_PORT)
+from rules import RuleEngine
+from session import SessionRecorder
+from telemetry import DeviceClock
+from transport import SseStream, SseUnavailable, UdpReceiver, SerialLink
+
+POLL_BASE_INTERVAL_MS = 700
+POLL_MAX_INTERVAL_MS  = 2500
+HISTORY_POLL_INTERVAL_MS = 2000
+USE_BINARY_FRAMES     = True
+USE_EVENT_STREAM      = True
+STREAM_RATE_MS        = 250
+LINK_TYPES            = ("HTTP", "UDP", "SERIAL")
+LINK_STALE_S          = 2.0    # no pushed sample (UDP / serial) for this long -> offline
+SCAN_TIMEOUT_S        = 0.35
+SCAN_THREADS          = 64
+
+API_PORT              = 8765
+API_HISTORY_LEN       = 1200   # samples kept for /history (5 min at 250 ms)
+API_MAX_BATCH         = 120
+ALARM_LOG_LEN         = 100    # alarm events kept for /alarms
+COMMAND_ROUTES        = ("/setMode", "/fan", "/rgb", "/buzzer")
+FAN_MANUAL_RESEND_S   = 5.0    # pad reports AUTO under host control (reboot) -> MANUAL again, at most this often
+
+
+def get_local_ipv4():
+    """Best-effort local IP discover without internet calls."""
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return None
+
+
+def normalize_base_url(text: str) -> str:
+    t = text.strip()
+    if not t:
+        return ""
+    if not t.startswith("http://") and not t.startswith("https://"):
+        t = "http://" + t
+    return t.rstrip("/")
+
+
+def _header_bytes(headers) -> int:
+    return sum(len(k) + len(v) + 4 for k, v in headers.items())
+
+
+class StableHttpClient:
+    """
+    Advanced stable HTTP:
+    - persistent session
+    - adaptive timeout
+    - exponential backoff + jitter on failure
+    - per-endpoint latency / connection / byte stats in `stats`
+    """
+    def __init__(self):
+        self.session = requests.Session()
+        self.base_url = ""
+        self.lock = threading.Lock()
+        self.stats = HttpStats()
+
+        self.ok_streak = 0
+        self.fail_streak = 0
+        self.base_interval_ms = POLL_BASE_INTERVAL_MS
+        self.poll_interval_ms = POLL_BASE_INTERVAL_MS
+        self.timeout_s = 0.9
+
+        self.session.headers.update({"Connection": "keep-alive"})
+
+    def set_base_url(self, base_url: str):
+        with self.lock:
+            self.base_url = base_url
+            self.ok_streak = 0
+            self.fail_streak = 0
+            self.poll_interval_ms = self.base_interval_ms
+            self.timeout_s = 0.9
+
+    def set_base_interval(self, interval_ms: int):
+        """Poll interval when healthy (longer when each request returns a batch)."""
+        self.base_interval_ms = interval_ms
+        self.poll_interval_ms = interval_ms
+
+    def get(self, path: str, timeout=None):
+        with self.lock:
+            url = self.base_url + path
+            to = self.timeout_s if timeout is None else timeout
+        conns = self._connections_opened(url)
+        t0 = time.perf_counter_ns()
+        try:
+            r = self.session.get(url, timeout=to)
+        except requests.RequestException as e:
+            self.stats.record(path, (time.perf_counter_ns() - t0) // 1000,
+                              timeout=isinstance(e, requests.Timeout),
+                              new_connections=self._connections_opened(url) - conns)
+            raise
+        self.stats.record(path, (time.perf_counter_ns() - t0) // 1000, status=r.status_code,
+                          new_connections=self._connections_opened(url) - conns,
+                          bytes_in=_header_bytes(r.headers) + len(r.content),
+                          bytes_out=len(r.request.path_url) + _header_bytes(r.request.headers) + 16)
+        return r
+
+    def _connections_opened(self, url: str) -> int:
+        """Connections urllib3 has opened so far (a request that bumps this did not reuse one)."""
+        try:
+            pools = self.session.get_adapter(url).poolmanager.pools
+        except requests.RequestException:
+            return 0
+        total = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def mark_ok(self):
+        self.ok_streak += 1
+        self.fail_streak = 0
+        self.poll_interval_ms = max(self.base_interval_ms, int(self.poll_interval_ms * 0.88))
+        self.timeout_s = max(0.7, self.timeout_s * 0.92)
+
+    def mark_fail(self):
+        self.fail_streak += 1
+        self.ok_streak = 0
+        self.poll_interval_ms = min(max(POLL_MAX_INTERVAL_MS, self.base_interval_ms), int(self.poll_interval_ms * 1.35) + 60)
+        self.timeout_s = min(2.5, self.timeout_s * 1.18 + 0.05)
+
+    def next_sleep_s(self):
+        jitter = random.uniform(0.0, 0.10)
+        return (self.poll_interval_ms / 1000.0) + jitter
+
+
+def scan_for_pad():
+    """Probe the local /24 for a pad's /status. Returns (url or None, message)."""
+    local_ip = get_local_ipv4()
+    if not local_ip:
+        return None, "Could not determine local IP for scan. Enter ESP32 IP manually."
+
+    net = ipaddress.ip_network(local_ip + "/24", strict=False)
+    hosts = [str(h) for h in net.hosts()]
+
+    found = {"url": None}
+    q = Queue()
+    for h in hosts:
+        q.put(h)
+
+    def probe_host():
+        s = requests.Session()
+        while not q.empty() and found["url"] is None:
+            try:
+                ip_ = q.get_nowait()
+            except Empty:
+                return
+            try:
+                url = f"http://{ip_}"
+                r = s.get(url + "/status", timeout=SCAN_TIMEOUT_S)
+                if r.status_code == 200:
+                    j = r.json()
+                    if "mode" in j and "lm35" in j and "fanDuty" in j:
+                        found["url"] = url
+            except Exception:
+                pass
+            finally:
+                q.task_done()
+
+    for _ in range(SCAN_THREADS):
+        threading.Thread(target=probe_host, daemon=True).start()
+
+    t0 = time.time()
+    while found["url"] is None and not q.empty() and (time.time() - t0) < 12.0:
+        time.sleep(0.05)
+
+    if found["url"]:
+        return found["url"], f"Found ESP32 at {found['url']}"
+    return None, "ESP32 not found. Please type the IP shown on Serial Monitor."
+
+
+class CoolingPadService:
+    """
+    Everything between the pad and a UI, on its own thread:
+    - HTTP poll (/history batches or /status), SSE stream, UDP push or USB serial link
+    - samples and link state go to `events` as dashboard queue items:
+      ("status_data", data, t, trace), ("status_batch", [(data, t)], trace),
+      ("offline", reason), ("status", text)
+    - per-channel filters (`filters`, see filters.py) add data["filtered"] to every sample
+      before anything else sees it; recordings keep the raw payload
+    - sensor anomaly detection on the raw values (see anomaly.py), one detector per
+      device; onsets go to data["anomalies"] as [channel, kind, value] and to a status line.
+      `auto_table` is the pads' AUTO table for the fan check (None: check off)
+    - alarm rules (`rules`, see rules.py) per device: data["alarms"] lists the raised rule
+      names; raise / clear events go to a status line, `alarm_log` and the rule's command
+    - optional session recorder; recent samples are kept for the control API
+    - optional host-side fan control fed from every sample: PID on lm35 (see control.py)
+      or a fan-curve profile from `profiles` (see curves.py)
+    - an online thermal model (`forecaster`) for overheat forecasts; with `precool_c` set,
+      a pad in AUTO goes to full fan before the forecast reaches that temperature
+    `t` is plot time, seconds since `start_time`. Set `suspended` to pause the
+    links (the dashboard does while it replays a session).
+    """
+    def __init__(self, events=None, start_time=None, filters=None, profiles=None, rules=None,
+                 auto_table=AUTO_TABLE):
+        self.events = events
+        self.start_time = time.time() if start_time is None else start_time
+        self.http = StableHttpClient()
+        self.tracer = PipelineTracer()
+        self.device_clock = DeviceClock()
+        self.filters = FilterStage(filters)     # filters: channel -> spec, None = DEFAULT_FILTERS
+        self.anomaly_lock = threading.Lock()
+        self.anomalies = {}         # device (UDP id / target) -> AnomalyDetector
+        self.auto_table = auto_table
+        self.rules_lock = threading.Lock()
+        self.rules = rules if rules is not None else RuleEngine()
+        self.alarm_log = deque(maxlen=ALARM_LOG_LEN)
+        self.link = "HTTP"          # link type picked in connect()
+        self.link_mode = "poll"     # what is actually delivering samples
+        self.udp = None
+        self.udp_device_id = None
+        self.serial = None
+        self.recorder = None
+        self.suspended = False
+        self.stop_flag = False
+        self.thread = None
+        self.wake = threading.Event()   # set by connect() so an idle poll loop starts at once
+
+        self.online = False
+        self.last_error = "not connected"
+        self.samples_lock = threading.Lock()
+        self.samples = deque(maxlen=API_HISTORY_LEN)   # (api seq, data) for the control API
+        self.api_seq = 0
+
+        self.fan_control = None     # HostFanControl / CurveFanControl while the host drives the fan
+        self.profiles = profiles if profiles is not None else ProfileStore()
+        self.forecaster = ThermalForecaster()
+        self.precool_c = None       # pre-cool toward this lm35 forecast threshold (None = off)
+        self.precooling = False
+        self.fan_lock = threading.Lock()
+        self.fan_duty_sent = None
+        self.fan_manual_t = None
+        self.send_lock = threading.Lock()
+        self.send_pending = {}      # route -> latest path; older commands for a route are dropped
+        self.send_busy = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._poll_loop, name="poll", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_flag = True
+        if self.fan_control is not None or self.precooling:
+            # don't leave the pad in MANUAL at whatever duty was last sent
+            self.fan_control = None
+            self.precooling = False
+            try:
+                self.command("/setMode?mode=AUTO", timeout=1.0)
+            except Exception:
+                pass
+        self._stop_udp()
+        self._stop_serial()
+        rec, self.recorder = self.recorder, None
+        if rec is not None:
+            rec.close()
+
+    def _emit(self, item):
+        kind = item[0]
+        if kind == "status_data":
+            self.filters.process(item[1], time.time() - self.start_time if item[2] is None else item[2])
+            self._detect([(item[1], item[2])])
+            self._check_rules([(item[1], item[2])])
+            self._store([(item[1], item[2])])
+            self._forecast([(item[1], item[2])])
+            self._drive_fan(item[1], item[2])
+        elif kind == "status_batch":
+            self.filters.process_batch(item[1])
+            self._detect(item[1])
+            self._check_rules(item[1])
+            self._store(item[1])
+            if item[1]:
+                self._forecast(item[1])
+                self._drive_fan(*item[1][-1])
+        elif kind == "offline":
+            self.online = False
+            self.last_error = item[1]
+        if self.events is not None:
+            self.events.put(item)
+
+    def _store(self, samples):
+        with self.samples_lock:
+            for data, t in samples:
+                self.api_seq += 1
+                if t is None:
+                    t = time.time() - self.start_time
+                # service seq / ms so clients never see a device reboot; device ones kept.
+                # A backfill right after start predates the service: ms clamps at 0 (u32 in frames)
+                self.samples.append((self.api_seq, dict(data, seq=self.api_seq, ms=max(0, int(t * 1000)),
+                                                        devSeq=data.get("seq"), devMs=data.get("ms"))))
+        self.online = True
+        self.last_error = ""
+
+    # ================== CONTROL API DATA ==================
+    def latest(self):
+        with self.samples_lock:
+            return self.samples[-1][1] if self.samples else None
+
+    def history_since(self, since: int) -> dict:
+        """Same payload as the firmware /history handler, on service seq numbers."""
+        with self.samples_lock:
+            if since > self.api_seq:
+                since = 0
+            rows = [[d.get(k) for k in HISTORY_FIELDS] for seq, d in self.samples if seq > since]
+            return {
+                "last": self.api_seq,
+                "more": len(rows) > API_MAX_BATCH,
+                "fields": list(HISTORY_FIELDS),
+                "samples": rows[:API_MAX_BATCH],
+            }
+
+    def stats(self) -> dict:
+        clk = self.device_clock
+        return {
+            "link": self.link_mode,
+            "target": self.target_label(),
+            "online": self.online,
+            "error": self.last_error,
+            "clock": {"seq": clk.last_seq, "received": clk.received, "missed": clk.missed,
+                      "duplicates": clk.duplicates, "restarts": clk.restarts},
+            "http": self.http.stats.snapshot(),
+            "pipeline": self.tracer.summary(),
+            "fan_control": self.fan_control_state(),
+            "forecast": self.forecast_state(),
+            "filters": self.filters.specs,
+            "anomalies": self.anomaly_state(),
+            "alarms": self.alarm_state(),
+        }
+
+    # ================== LINKS ==================
+    def target_label(self) -> str:
+        if self.serial is not None:
+            return self.serial.port
+        return self.http.base_url if self.http.base_url else "-"
+
+    def connect(self, link: str, target: str) -> str:
+        """
+        Switch to `link` ("HTTP", "UDP", "SERIAL") at `target` (URL / IP, or a serial port).
+        Returns the normalized target. Raises ValueError for an empty target, OSError when
+        the UDP port / serial port can't be opened, ImportError without pyserial.
+        """
+        if link == "SERIAL":
+            port = target.strip()
+            if not port:
+                raise ValueError("Please enter the serial port (e.g. COM3 or /dev/ttyUSB0).")
+            self._stop_udp()
+            self.http.set_base_url("")
+            self._reset_target_state()
+            self._start_serial(port)
+            self.link = link
+            self.wake.set()
+            return port
+
+        url = normalize_base_url(target)
+        if not url:
+            raise ValueError("Please enter ESP32 IP or URL.")
+        self._stop_serial()
+        self.http.set_base_url(url)
+        self._reset_target_state()
+        if link == "UDP":
+            self._start_udp()
+        else:
+            self._stop_udp()
+        self.link = link
+        self.wake.set()
+        return url
+
+    def _reset_target_state(self):
+        """New target: nothing learned from the previous pad's samples carries over."""
+        self.device_clock = DeviceClock()
+        self.filters.reset()
+        self._reset_anomalies()
+        self._reset_rules()
+        self.forecaster = ThermalForecaster()     # swapped, not reset: link threads may be mid-update
+        self.precooling = False
+        with self.samples_lock:
+            # api_seq keeps counting so /history clients' `since` stays valid
+            self.samples.clear()
+
+    def _start_udp(self):
+        """Listen for pushed datagrams; commands keep going over HTTP."""
+        if self.udp is None:
+            self.udp = UdpReceiver(self._on_udp_sample, port=UDP_PORT,
+                                   host_time=lambda: time.time() - self.start_time).start()
+        self.udp_device_id = None
+        self.link_mode = "udp"
+        threading.Thread(target=self._udp_subscribe_worker, daemon=True).start()
+
+    def _stop_udp(self):
+        if self.udp is None:
+            return
+        self.udp.stop()
+        self.udp = None
+        self.udp_device_id = None
+        self.device_clock = DeviceClock()
+        self.link_mode = "poll"
+
+        def worker():
+            try:
+                self.http.get("/udp?off=1", timeout=1.2)
+            except Exception:
+                pass
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _udp_subscribe_worker(self):
+        try:
+            r = self.http.get(f"/udp?port={UDP_PORT}", timeout=1.2)
+            if r.status_code == 200:
+                self.udp_device_id = r.json()["id"]
+                self._emit(("status", f"UDP push from pad {self.udp_device_id} on port {UDP_PORT}"))
+            else:
+                self._emit(("status", f"Pad has no UDP push (HTTP {r.status_code})"))
+        except Exception as e:
+            self._emit(("status", f"UDP subscribe failed: {e}"))
+
+    def _on_udp_sample(self, device_id, data, t):
+        # receiver thread; other pads on the LAN are only counted by the receiver
+        if device_id != self.udp_device_id:
+            return
+        self.device_clock = self.udp.devices[device_id]
+        rec = self.recorder
+        if rec is not None:
+            rec.write(data)
+        now = time.perf_counter_ns()
+        self._emit(("status_data", data, t, (now, now)))
+
+    def _check_udp_link(self):
+        udp = self.udp
+        seen = udp.last_seen.get(self.udp_device_id) if udp is not None else None
+        if seen is None or time.time() - self.start_time - seen > LINK_STALE_S:
+            self._emit(("offline", "no UDP datagrams"))
+
+    def _start_serial(self, port: str):
+        """Status frames and commands both go over the cable; no Wi-Fi needed."""
+        self._stop_serial()
+        self.serial = SerialLink(port, self._on_serial_status,
+                                 host_time=lambda: time.time() - self.start_time).open()
+        self.device_clock = DeviceClock()
+        self.link_mode = "serial"
+
+    def _stop_serial(self):
+        if self.serial is None:
+            return
+        self.serial.close()
+        self.serial = None
+        self.device_clock = DeviceClock()
+        self.link_mode = "poll"
+
+    def _on_serial_status(self, data: dict):
+        # serial reader thread
+        self._handle_status(data)
+
+    def _check_serial_link(self):
+        link = self.serial
+        if link is None:
+            return
+        err, link.callback_error = link.callback_error, None
+        if err:
+            self._emit(("status", f"Serial status handling failed: {err}"))
+        if link.error:
+            self._emit(("offline", link.error))
+        elif link.last_status is None or time.time() - self.start_time - link.last_status > LINK_STALE_S:
+            self._emit(("offline", "no serial frames"))
+
+    # ================== CONTROL COMMANDS ==================
+    def has_target(self) -> bool:
+        return self.serial is not None or bool(self.http.base_url)
+
+    def command(self, path: str, timeout=1.2):
+        """Control command over whichever link is active; returns something with status_code / text."""
+        link = self.serial
+        if link is not None:
+            return link.request(path, timeout=timeout)
+        return self.http.get(path, timeout=timeout)
+
+    def _send_async(self, path: str):
+        """Fire-and-forget command on one worker thread; only the newest path per route is sent."""
+        with self.send_lock:
+            self.send_pending[path.split("?", 1)[0]] = path
+            if self.send_busy:
+                return
+            self.send_busy = True
+        threading.Thread(target=self._send_worker, name="commands", daemon=True).start()
+
+    def _send_worker(self):
+        while True:
+            with self.send_lock:
+                if not self.send_pending:
+                    self.send_busy = False
+                    return
+                path = self.send_pending.pop(next(iter(self.send_pending)))
+            try:
+                r = self.command(path)
+                if r.status_code != 200:
+                    self._emit(("status", f"{path} -> HTTP {r.status_code}"))
+            except Exception as e:
+                self._emit(("status", f"{path} failed: {e}"))
+
+    # ================== HOST FAN CONTROL ==================
+    def start_fan_control(self, target_c: float) -> HostFanControl:
+        """Put the pad in MANUAL and drive /fan?duty= from lm35 toward target_c (°C)."""
+        with self.fan_lock:
+            if isinstance(self.fan_control, HostFanControl):
+                self.precooling = False
+                self.fan_control.set_target(target_c)
+                return self.fan_control
+        return self._take_fan(HostFanControl(target_c))
+
+    def start_curve_control(self, profile: str) -> CurveFanControl:
+        """Put the pad in MANUAL and drive /fan?duty= from a fan-curve profile (ValueError if unknown)."""
+        return self._take_fan(CurveFanControl(self.profiles.get(profile)))
+
+    def _take_fan(self, controller):
+        self.precooling = False
+        with self.fan_lock:
+            self.fan_control = controller
+            self.fan_duty_sent = None
+            self.fan_manual_t = time.time()
+        self._send_async("/setMode?mode=MANUAL")
+        return controller
+
+    def stop_fan_control(self, restore_auto=True):
+        """Stop driving the fan; restore_auto hands it back to the firmware AUTO table."""
+        with self.fan_lock:
+            if self.fan_control is None:
+                return
+            self.fan_control = None
+        if restore_auto and self.has_target():
+            self._send_async("/setMode?mode=AUTO")
+
+    def fan_control_state(self):
+        fc = self.fan_control
+        if fc is None:
+            return None
+        if isinstance(fc, CurveFanControl):
+            return {"profile": fc.name, "duty": self.fan_duty_sent, "output": fc.output,
+                    "commands": fc.limiter.commands}
+        return {"target": fc.target_c, "duty": self.fan_duty_sent, "output": round(fc.pid.output, 1),
+                "commands": fc.limiter.commands}
+
+    def _drive_fan(self, data: dict, t):
+        # link threads, once per sample (last one of a batch)
+        if self.fan_control is None or self.suspended or "lm35" not in data:
+            return
+        if t is None:
+            t = time.time() - self.start_time
+        with self.fan_lock:
+            fc = self.fan_control
+            if fc is None:
+                return
+            if data.get("mode") == "AUTO":
+                # pad rebooted (or was switched back by hand): take it over again
+                now = time.time()
+                if now - self.fan_manual_t < FAN_MANUAL_RESEND_S:
+                    return
+                self.fan_manual_t = now
+                fc.limiter.reset()
+                self._send_async("/setMode?mode=MANUAL")
+            if isinstance(fc, CurveFanControl):
+                # presence on the filtered IR distance: single-sample spikes would stop the fan
+                dist = data.get("filtered", {}).get("dist", data.get("dist"))
+                duty = fc.update(t, float(data["lm35"]), dist)
+            else:
+                duty = fc.update(t, float(data["lm35"]))
+            if duty is None:
+                return
+            self.fan_duty_sent = duty
+        self._send_async(f"/fan?duty={duty}")
+
+    # ================== SENSOR ANOMALIES ==================
+    def _detect(self, samples):
+        # link threads; raw values, before the store so API clients see data["anomalies"] too
+        device = self.udp_device_id or self.target_label()
+        found = []
+        with self.anomaly_lock:
+            det = self.anomalies.get(device)
+            if det is None:
+                det = self.anomalies[device] = AnomalyDetector(auto_table=self.auto_table)
+            for data, t in samples:
+                onsets = det.update(data, time.time() - self.start_time if t is None else t)
+                if onsets:
+                    data["anomalies"] = [list(a) for a in onsets]
+                    found.extend(onsets)
+        if found:
+            ch, kind, x = found[-1]
+            more = f" (+{len(found) - 1} more)" if len(found) > 1 else ""
+            self._emit(("status", f"Sensor anomaly: {ch} {kind} at {x:g}{more}"))
+
+    def _reset_anomalies(self):
+        """New link / target: signal history restarts, per-device counts stay."""
+        with self.anomaly_lock:
+            for det in self.anomalies.values():
+                det.reset()
+
+    def anomaly_state(self) -> dict:
+        with self.anomaly_lock:
+            return {device: {"samples": det.samples, "counts": dict(det.counts),
+                             "recent": [[round(t, 2), ch, kind, x] for t, ch, kind, x in list(det.recent)[-10:]]}
+                    for device, det in self.anomalies.items()}
+
+    # ================== ALARM RULES ==================
+    def _check_rules(self, samples):
+        # link threads; after the filters, so rules see data["filtered"]
+        device = self.udp_device_id or self.target_label()
+        events = []
+        with self.rules_lock:
+            for data, t in samples:
+                events.extend(self.rules.update(device, data, time.time() - self.start_time if t is None else t))
+                data["alarms"] = list(self.rules.active(device))
+            self.alarm_log.extend(events)
+        for ev in events:
+            if ev["severity"] != "info":
+                verb = "Alarm" if ev["state"] == "raised" else "Cleared"
+                self._emit(("status", f"{verb} [{ev['rule']}]: {ev['message']}"))
+            if ev["action"] and not self.suspended:
+                # newest command per route wins, so raise + clear within one batch sends the clear
+                self._send_async(ev["action"])
+
+    def _reset_rules(self):
+        with self.rules_lock:
+            self.rules.reset()
+
+    def alarm_state(self) -> dict:
+        with self.rules_lock:
+            return {"active": {device: list(self.rules.active(device)) for device in self.rules.states},
+                    "recent": [dict(ev, t=round(ev["t"], 2)) for ev in list(self.alarm_log)[-10:]]}
+
+    # ================== THERMAL FORECAST ==================
+    def _forecast(self, samples):
+        # link threads; every sample goes into the model, pre-cooling looks at the newest
+        fc = self.forecaster
+        for data, t in samples:
+            if "lm35" not in data:
+                continue
+            if t is None:
+                t = time.time() - self.start_time
+            ambient = data.get("dhtTemp")
+            if ambient is None or ambient != ambient:   # DHT read failed (None / NaN): keep the last one
+                ambient = fc.model[2] if fc.model else data["lm35"]
+            fc.update(t, float(data["lm35"]), float(ambient))
+        if self.precool_c is None or self.suspended or not fc.ready:
+            return
+        mode = samples[-1][0].get("mode")
+        eta = fc.time_to(self.precool_c)
+        if not self.precooling:
+            if mode == "AUTO" and self.fan_control is None and eta is not None and eta <= PRECOOL_LEAD_S:
+                self.precooling = True
+                self._emit(("status", f"Pre-cooling: {self.precool_c:.0f} °C forecast in {eta:.0f} s"))
+                self._send_async("/setMode?mode=MANUAL")
+                self._send_async("/fan?duty=255")
+        elif mode == "AUTO":
+            # pad rebooted or someone switched it back: it's the firmware's fan again
+            self.precooling = False
+        elif eta is None and fc.predict(0.0) < self.precool_c - 1.0:
+            self.precooling = False
+            self._emit(("status", "Pre-cooling done, pad back in AUTO"))
+            self._send_async("/setMode?mode=AUTO")
+
+    def set_precool(self, threshold_c=None):
+        """Pre-cool (full fan in MANUAL) before the forecast reaches threshold_c; None turns it off."""
+        self.precool_c = threshold_c
+        if threshold_c is None and self.precooling:
+            self.precooling = False
+            self._send_async("/setMode?mode=AUTO")
+
+    def cancel_precool(self):
+        """Someone else took the fan over: stop pre-cooling without touching the pad."""
+        self.precooling = False
+
+    def forecast_state(self):
+        fc = self.forecaster
+        model = fc.model
+        if model is None or not fc.ready:
+            return None
+        _, temp, ambient, a, b, _ = model
+        return {"temp": round(temp, 2), "in_30s": round(fc.predict(30.0, model), 2),
+                "t_inf": round(ambient - a / b, 2) if b else None,
+                "precool_at": self.precool_c, "precooling": self.precooling}
+
+    # ================== POLLING LOOP ==================
+    def _poll_loop(self):
+        clock_url = None
+        history_ok = None   # None = /history not probed yet on this device
+        stream_ok = None    # same for /events
+        # binary frames are negotiated per request; firmware without them just answers JSON
+        status_path = "/status?fmt=bin" if USE_BINARY_FRAMES else "/status"
+        history_fmt = "&fmt=bin" if USE_BINARY_FRAMES else ""
+        while not self.stop_flag:
+            if self.serial is not None and not self.suspended:
+                # frames arrive on the serial reader thread
+                clock_url = None
+                self._check_serial_link()
+                time.sleep(0.5)
+                continue
+
+            if not self.http.base_url or self.suspended:
+                clock_url = None
+                self.wake.wait(0.2)
+                self.wake.clear()
+                continue
+
+            if self.udp is not None:
+                # samples arrive on the UDP receiver thread
+                clock_url = None
+                self._check_udp_link()
+                time.sleep(0.5)
+                continue
+
+            if self.http.base_url != clock_url:
+                clock_url = self.http.base_url
+                self.device_clock.reset()
+                history_ok = None
+                stream_ok = None if USE_EVENT_STREAM else False
+                self.http.set_base_interval(POLL_BASE_INTERVAL_MS)
+
+            if stream_ok is not False:
+                try:
+                    self._consume_stream(clock_url)
+                    stream_ok = True
+                except SseUnavailable:
+                    # no /events on this firmware: poll instead
+                    stream_ok = False
+                    self.link_mode = "poll"
+                    continue
+                except Exception as e:
+                    self.http.mark_fail()
+                    self._emit(("offline", str(e)))
+                time.sleep(self.http.next_sleep_s())
+                continue
+
+            more = False
+            try:
+                if history_ok is not False:
+                    t_req = time.perf_counter_ns()
+                    r = self.http.get(f"/history?since={self.device_clock.last_seq or 0}{history_fmt}")
+                    t_resp = time.perf_counter_ns()
+                    if r.status_code == 404:
+                        # older firmware: plain /status polling
+                        history_ok = False
+                        continue
+                    if r.status_code == 200:
+                        parsed = self._parse_history(r)
+                        self._trace_fetch(t_req, t_resp, parsed[0][-1].get("seq") if parsed[0] else None)
+                        more = self._handle_history(parsed, t_req)
+                        if history_ok is None:
+                            history_ok = True
+                            self.http.set_base_interval(HISTORY_POLL_INTERVAL_MS)
+                else:
+                    t_req = time.perf_counter_ns()
+                    r = self.http.get(status_path)
+                    t_resp = time.perf_counter_ns()
+                    if r.status_code == 200:
+                        if r.headers.get("Content-Type", "").startswith(BINARY_CONTENT_TYPE):
+                            data = decode_status_frame(r.content)
+                        else:
+                            data = r.json()
+                        self._trace_fetch(t_req, t_resp, data.get("seq"))
+                        self._handle_status(data, t_req)
+
+                if r.status_code == 200:
+                    self.http.mark_ok()
+                else:
+                    self.http.mark_fail()
+                    self._emit(("offline", f"HTTP {r.status_code}"))
+            except Exception as e:
+                self.http.mark_fail()
+                self._emit(("offline", str(e)))
+
+            if not more:
+                time.sleep(self.http.next_sleep_s())
+
+    def _consume_stream(self, url: str):
+        """
+        Read /events until it drops or the target changes. Reconnects resume
+        from the last sample the UI has (Last-Event-ID = device seq).
+        """
+        stream = SseStream(self.http.session, f"{url}/events?rate_ms={STREAM_RATE_MS}")
+        stream.last_id = self.device_clock.last_seq
+        for event, payload, _ in stream.events():
+            if event == "status":
+                self.link_mode = "stream"
+                self.http.mark_ok()
+                t_rx = time.perf_counter_ns()
+                data = json.loads(payload)
+                self.tracer.span("decode", t_rx, time.perf_counter_ns(), data.get("seq"))
+                self._handle_status(data, t_rx)
+            if self.stop_flag or self.suspended or self.http.base_url != url:
+                break
+
+    def _trace_fetch(self, t_req: int, t_resp: int, seq):
+        """Request and decode spans of a polled response (decode ends now)."""
+        self.tracer.span("http", t_req, t_resp, seq)
+        self.tracer.span("decode", t_resp, time.perf_counter_ns(), seq)
+
+    def _handle_status(self, data: dict, origin_ns=None):
+        # firmware with seq/ms: plot on device time, drop repeats;
+        # older firmware: host receive time
+        # origin_ns: perf_counter_ns when the request started / the sample arrived (tracing)
+        t = None
+        if "seq" in data and "ms" in data:
+            t = self.device_clock.observe(int(data["seq"]), int(data["ms"]),
+                                          time.time() - self.start_time)
+            if t is None:
+                return
+
+        rec = self.recorder
+        if rec is not None:
+            rec.write(data)
+        now = time.perf_counter_ns()
+        self._emit(("status_data", data, t, (origin_ns or now, now)))
+
+    def _parse_history(self, r):
+        """/history response (binary frames or JSON rows) -> (samples oldest first, more)."""
+        if r.headers.get("Content-Type", "").startswith(BINARY_CONTENT_TYPE):
+            _, more, samples = decode_history_frames(r.content)
+            return samples, more
+        batch = r.json()
+        fields = batch["fields"]
+        return [dict(zip(fields, row)) for row in batch["samples"]], bool(batch.get("more"))
+
+    def _handle_history(self, parsed, origin_ns=None) -> bool:
+        """
+        Queue the new samples of a /history batch (backfills any outage in one go).
+        Returns True when the device has more samples waiting.
+        """
+        rows, more = parsed
+        if rows:
+            newest_ms = rows[-1]["ms"]
+            host_t = time.time() - self.start_time
+            rec = self.recorder
+            samples = []
+            for data in rows:
+                age_s = (newest_ms - data["ms"]) / 1000.0
+                t = self.device_clock.observe(int(data["seq"]), int(data["ms"]), host_t - age_s)
+                if t is None:
+                    continue
+                if rec is not None:
+                    rec.write(data, age_s=age_s)
+                samples.append((data, t))
+            if samples:
+                now = time.perf_counter_ns()
+                self._emit(("status_batch", samples, (origin_ns or now, now)))
+        return more
+
+
+class ControlApiHandler(BaseHTTPRequestHandler):
+    server_version = "CoolingPadService/1.0"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, code, body, content_type="text/plain"):
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, obj):
+        self._send(200, json.dumps(obj, separators=(",", ":")), "application/json")
+
+    def do_GET(self):
+        svc = self.server.service
+        url = urlsplit(self.path)
+        route = url.path
+        args = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        binary = args.get("fmt") == "bin"
+
+        if route == "/status":
+            data = svc.latest()
+            if data is None:
+                self._send(503, "No sample yet")
+            elif binary:
+                self._send(200, encode_status_frame(data), BINARY_CONTENT_TYPE)
+            else:
+                self._send_json(data)
+        elif route == "/history":
+            try:
+                since = int(args.get("since", "0"))
+            except ValueError:
+                since = 0
+            batch = svc.history_since(since)
+            if binary:
+                fields = batch["fields"]
+                samples = [dict(zip(fields, row)) for row in batch["samples"]]
+                self._send(200, encode_history_frames(samples, batch["last"], batch["more"]), BINARY_CONTENT_TYPE)
+            else:
+                self._send_json(batch)
+        elif route == "/stats":
+            self._send_json(svc.stats())
+        elif route == "/connect":
+            link = args.get("link", "HTTP").upper()
+            if link not in LINK_TYPES:
+                self._send(400, f"Unknown link {link}")
+                return
+            try:
+                target = svc.connect(link, args.get("target", ""))
+            except (ValueError, OSError, ImportError) as e:
+                self._send(400, str(e))
+                return
+            self._send(200, f"OK {link} {target}")
+        elif route == "/pid":
+            if "off" in args:
+                if isinstance(svc.fan_control, HostFanControl):
+                    svc.stop_fan_control(restore_auto=args.get("off") != "keep")
+            elif "target" in args:
+                try:
+                    target_c = float(args["target"])
+                except ValueError:
+                    self._send(400, "Bad target param (degC)")
+                    return
+                if not svc.has_target():
+                    self._send(503, "Not connected")
+                    return
+                svc.start_fan_control(target_c)
+            self._send_json(svc.fan_control_state())
+        elif route == "/curve":
+            if "off" in args:
+                if isinstance(svc.fan_control, CurveFanControl):
+                    svc.stop_fan_control(restore_auto=args.get("off") != "keep")
+            elif "profile" in args:
+                if not svc.has_target():
+                    self._send(503, "Not connected")
+                    return
+                try:
+                    svc.start_curve_control(args["profile"])
+                except ValueError as e:
+                    self._send(400, str(e))
+                    return
+            self._send_json(svc.fan_control_state())
+        elif route == "/profiles":
+            try:
+                if "save" in args:
+                    try:
+                        hysteresis = float(args.get("hysteresis", "0"))
+                        present = float(args["present"]) if args.get("present") else None
+                    except ValueError:
+                        raise ValueError("Bad hysteresis / present param (degC / cm)")
+                    curve = FanCurve(parse_points(args.get("points", "")), args.get("kind", "linear"),
+                                     hysteresis, present)
+                    svc.profiles.save(args["save"], curve)
+                    fc = svc.fan_control
+                    if isinstance(fc, CurveFanControl) and fc.name == args["save"]:
+                        svc.start_curve_control(args["save"])   # edited the live profile: pick it up
+                elif "delete" in args:
+                    svc.profiles.delete(args["delete"])
+            except ValueError as e:
+                self._send(400, str(e))
+                return
+            except OSError as e:
+                self._send(500, str(e))
+                return
+            fc = svc.fan_control
+            self._send_json({"active": fc.name if isinstance(fc, CurveFanControl) else None,
+                             "profiles": svc.profiles.as_dict()})
+        elif route == "/alarms":
+            self._send_json(svc.alarm_state())
+        elif route == "/precool":
+            if "off" in args:
+                svc.set_precool(None)
+            elif "at" in args:
+                try:
+                    svc.set_precool(float(args["at"]))
+                except ValueError:
+                    self._send(400, "Bad at param (degC)")
+                    return
+            self._send_json(svc.forecast_state())
+        elif route == "/scan":
+            url_found, msg = scan_for_pad()
+            if url_found:
+                svc.connect("HTTP", url_found)
+            self._send(200 if url_found else 404, msg)
+        elif route in COMMAND_ROUTES:
+            if not svc.has_target():
+                self._send(503, "Not connected")
+                return
+            if route in ("/setMode", "/fan"):
+                # a client taking the fan over by hand ends host control
+                svc.stop_fan_control(restore_auto=False)
+                svc.cancel_precool()
+            try:
+                r = svc.command(self.path)
+            except Exception as e:
+                self._send(502, str(e))
+                return
+            self._send(r.status_code, r.text)
+        else:
+            self._send(404, "Not found")
+
+
+class ControlApi:
+    """Local HTTP control API for a CoolingPadService (ThreadingHTTPServer on its own thread)."""
+    def __init__(self, service: CoolingPadService, host="127.0.0.1", port=API_PORT, verbose=False):
+        self.httpd = ThreadingHTTPServer((host, port), ControlApiHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = service
+        self.httpd.verbose = verbose
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless ESP32 cooling pad service")
+    parser.add_argument("--target", default="", help="pad URL / IP, or serial port with --link SERIAL")
+    parser.add_argument("--link", default="HTTP", choices=LINK_TYPES)
+    parser.add_argument("--scan", action="store_true", help="look for the pad on the local /24 first")
+    parser.add_argument("--api-host", default="127.0.0.1")
+    parser.add_argument("--api-port", type=int, default=API_PORT)
+    parser.add_argument("--record", metavar="FILE", help="record the session to this file")
+    parser.add_argument("--pid", type=float, metavar="TARGET_C", help="host-side fan control toward this lm35 temperature")
+    parser.add_argument("--precool", type=float, metavar="TEMP_C",
+                        help="full fan (from AUTO) before the forecast reaches this lm35 temperature")
+    parser.add_argument("--filter", action="append", metavar="CHANNEL=SPEC",
+                        help="sample filter, e.g. lm35=kalman, dist=median:7, lux=ewma:2 or lux=off (repeatable)")
+    parser.add_argument("--curve", metavar="PROFILE", help="host-side fan control from this fan-curve profile")
+    parser.add_argument("--profiles", metavar="FILE", default=PROFILE_PATH, help="fan-curve profile file")
+    parser.add_argument("--rules", metavar="FILE", help="alarm rules file (see rules.py), on top of the defaults")
+    parser.add_argument("--auto-table", metavar="LOW,MED,CM", default=",".join(f"{v:g}" for v in AUTO_TABLE),
+                        help="the pad's AUTO thresholds for the fan-mismatch check, or off")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every sample")
+    args = parser.parse_args()
+    try:
+        filters = parse_filter_args(args.filter)
+        profiles = ProfileStore(args.profiles)
+        if args.curve:
+            profiles.get(args.curve)
+        rules = RuleEngine.load(args.rules) if args.rules else None
+        auto_table = parse_auto_table(args.auto_table)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    events = Queue()
+    svc = CoolingPadService(events, filters=filters, profiles=profiles, rules=rules, auto_table=auto_table)
+    target = args.target
+    if args.scan:
+        target, msg = scan_for_pad()
+        print(f"[SVC] {msg}")
+    if target:
+        try:
+            print(f"[SVC] {args.link} link to {svc.connect(args.link, target)}")
+        except (ValueError, OSError, ImportError) as e:
+            parser.error(str(e))
+    if args.record:
+        svc.recorder = SessionRecorder(args.record)
+        print(f"[SVC] Recording to {args.record}")
+    if args.pid is not None:
+        if not target:
+            parser.error("--pid needs a target")
+        svc.start_fan_control(args.pid)
+        print(f"[SVC] Host fan control toward {args.pid:.1f} °C")
+    elif args.curve:
+        if not target:
+            parser.error("--curve needs a target")
+        svc.start_curve_control(args.curve)
+        print(f"[SVC] Fan curve {args.curve}")
+    if args.precool is not None:
+        svc.set_precool(args.precool)
+        print(f"[SVC] Pre-cooling before {args.precool:.1f} °C")
+
+    svc.start()
+    api = ControlApi(svc, args.api_host, args.api_port, args.verbose).start()
+    print(f"[SVC] Control API on {api.base_url}")
+
+    was_online = None
+    try:
+        while True:
+            try:
+                item = events.get(timeout=1.0)
+            except Empty:
+                continue
+            kind = item[0]
+            if kind == "status":
+                print(f"[SVC] {item[1]}")
+            elif kind == "offline" and was_online is not False:
+                print(f"[SVC] offline: {item[1]}")
+            elif kind in ("status_data", "status_batch") and was_online is not True:
+                print(f"[SVC] online ({svc.link_mode}) {svc.target_label()}")
+            if kind in ("status_data", "status_batch"):
+                was_online = True
+                if args.verbose:
+                    d = svc.latest()
+                    print(f"  seq={d['devSeq']} {d['mode']} lm35={d['lm35']:.1f} fan={d['fanDuty']}")
+            elif kind == "offline":
+                was_online = False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+        svc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+
+SESSION_FORMAT = "coolingpad-session"
+SESSION_VERSION = 1
+
+REPLAY_SPEEDS = {"1x": 1.0, "10x": 10.0, "100x": 100.0, "MAX": None}
+
+
+class SessionRecorder:
+    """
+    Records raw /status payloads to a JSON-lines session file:
+    - first line is a header, then one {"t": ..., "status": {...}} per sample
+    - t is seconds since the recording started (monotonic clock); backfilled
+      samples are written with age_s so they land where they were taken
+    Safe to call write() from the poll thread while the UI closes it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.count = 0
+        self.t0 = time.monotonic()
+        self.f = open(path, "w", encoding="utf-8")
+        header = {"format": SESSION_FORMAT, "version": SESSION_VERSION, "started": time.time()}
+        self.f.write(json.dumps(header) + "\n")
+
+    def write(self, data: dict, t=None, age_s=0.0):
+        if t is None:
+            t = time.monotonic() - self.t0 - age_s
+        line = json.dumps({"t": round(t, 4), "status": data}, separators=(",", ":"))
+        with self.lock:
+            if self.f is None:
+                return
+            self.f.write(line + "\n")
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+def load_session(path: str):
+    """Read a session file into (times, payloads). Raises ValueError on a foreign file."""
+    times = []
+    payloads = []
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != SESSION_FORMAT:
+            raise ValueError(f"{path} is not a cooling pad session file")
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            times.append(float(rec["t"]))
+            payloads.append(rec["status"])
+    return times, payloads
+
+
+class SessionReplay:
+    """
+    Streams a recorded session into the UI queue in place of _poll_loop:
+    - items are ("status_data", data, t) with the recorded timestamp
+    - speed 1x / 10x / 100x, or None = as fast as the UI drains the queue
+    - pause / resume / seek / speed changes take effect immediately
+    A seek puts ("replay_seek", t) first so the UI can drop its history;
+    the end of the session is signalled with ("replay_done", sent).
+    With a FilterStage, the whole session is filtered once up front (vectorized),
+    so every payload carries data["filtered"] and seeks need no filter warm-up;
+    likewise an AnomalyDetector marks data["anomalies"] and a RuleEngine data["alarms"]
+    on load.
+    """
+    def __init__(self, path: str, out_queue, speed=1.0, max_pending=256, filters=None, anomalies=None,
+                 rules=None):
+        self.path = path
+        self.times, self.payloads = load_session(path)
+        if filters is not None and self.payloads:
+            filters.process_batch(list(zip(self.payloads, self.times)))
+        if anomalies is not None:
+            for data, t in zip(self.payloads, self.times):
+                onsets = anomalies.update(data, t)
+                if onsets:
+                    data["anomalies"] = [list(a) for a in onsets]
+        if rules is not None:
+            for data, t in zip(self.payloads, self.times):
+                rules.update("replay", data, t)
+                data["alarms"] = list(rules.active("replay"))
+        self.duration = self.times[-1] if self.times else 0.0
+        self.out_queue = out_queue
+        self.max_pending = max_pending
+
+        self.cond = threading.Condition()
+        self.speed = speed
+        self.paused = False
+        self.stopped = False
+        self.idx = 0
+        self.sent = 0
+        self._anchor_t = 0.0
+        self._anchor_wall = 0.0
+        self.thread = None
+
+    def _reanchor(self):
+        self._anchor_t = self.times[self.idx] if self.idx < len(self.times) else self.duration
+        self._anchor_wall = time.monotonic()
+
+    def start(self):
+        with self.cond:
+            self._reanchor()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def pause(self):
+        with self.cond:
+            self.paused = True
+            self.cond.notify_all()
+
+    def resume(self):
+        with self.cond:
+            self.paused = False
+            self._reanchor()
+            self.cond.notify_all()
+
+    def set_speed(self, speed):
+        with self.cond:
+            self.speed = speed
+            self._reanchor()
+            self.cond.notify_all()
+
+    def seek(self, t: float):
+        with self.cond:
+            self.idx = bisect_left(self.times, t)
+            self._reanchor()
+            self.out_queue.put(("replay_seek", t))
+            self.cond.notify_all()
+
+    def position(self) -> float:
+        i = self.idx
+        return self.times[i - 1] if i > 0 else 0.0
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if self.paused and not self.stopped:
+                    self.cond.wait()
+                    continue
+                if self.stopped or self.idx >= len(self.times):
+                    break
+
+                i = self.idx
+                t = self.times[i]
+                if self.speed is not None:
+                    delay = self._anchor_wall + (t - self._anchor_t) / self.speed - time.monotonic()
+                    if delay > 0:
+                        self.cond.wait(min(delay, 0.25))
+                        continue
+                elif self.out_queue.qsize() >= self.max_pending:
+                    self.cond.wait(0.002)
+                    continue
+
+                # put under the lock so a concurrent seek can't reorder samples
+                self.idx = i + 1
+                self.out_queue.put(("status_data", self.payloads[i], t))
+                self.sent += 1
+
+        if not self.stopped:
+            self.out_queue.put(("replay_done", self.sent))
@@ -0,0 +1,512 @@
+"""
+Local ESP32 cooling pad simulator.
+
+Serves the same HTTP contract as cooling_pad_esp32.ino (/status, /history,
+/events, /udp, /setMode, /fan, /rgb, /buzzer) from a simple thermal model, so the
+dashboard can be developed and benchmarked without hardware:
+
+    python simulator.py --port 8080 --time-scale 10
+
+then CONNECT the dashboard to http://127.0.0.1:8080. With --serial (Linux) the
+same device is also served as framed lines on a pseudo-terminal; pick SERIAL in
+the connect bar and enter the printed /dev/pts path.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import select
+import socket
+import threading
+from collections import deque
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from protocol import (encode_status_frame, encode_history_frames, encode_udp_datagram, encode_serial_status,
+                      BINARY_CONTENT_TYPE, HISTORY_FIELDS)
+
+# Mirrors the firmware constants
+SAMPLE_INTERVAL_MS = 250
+HISTORY_LEN = 240
+HISTORY_MAX_BATCH = 120
+TEMP_LOW = 30.0
+TEMP_MED = 40.0
+TEMP_MAX = 50.0
+LUX_THRESHOLD = 99.0
+
+
+class SimDevice:
+    """
+    Simulated pad: first-order thermal model + firmware control logic.
+    - laptop heat load wanders between idle and gaming bursts
+    - fan duty pulls the LM35 temperature towards ambient
+    - one sample (seq, ms) is taken every SAMPLE_INTERVAL_MS of device time
+      and kept in a HISTORY_LEN ring for /history
+    All public methods are thread-safe.
+    """
+    def __init__(self, seed=None, ambient=26.0):
+        self.rng = random.Random(seed)
+        self.device_id = bytes([0x02]) + bytes(self.rng.getrandbits(8) for _ in range(5))
+        self.lock = threading.Lock()
+        self.sampled = threading.Condition(self.lock)
+
+        self.ambient = ambient
+        self.temp = ambient + 6.0
+        self.load = 0.4
+        self.load_target = 0.4
+        self.dist = 8.0
+        self.pot_raw = 1800.0
+        self.lux = 70.0
+
+        self.auto_mode = True
+        self.fan_duty = 0
+        self.remote_fan_override = False
+        self.remote_fan_duty = 0
+        self.remote_rgb_override = False
+        self.remote_rgb_enable = False
+
+        self.ms = 0
+        self.seq = 0
+        self.snapshot = None
+        self.history = deque(maxlen=HISTORY_LEN)
+        self._take_sample()
+
+    # ---------- model ----------
+    def _step_physics(self, dt):
+        rng = self.rng
+        if rng.random() < dt / 40.0:
+            self.load_target = rng.choice((0.15, 0.4, 0.7, 1.0))
+        self.load += (self.load_target - self.load) * min(1.0, dt / 15.0)
+
+        cooling = 0.02 + 0.05 * (self.fan_duty / 255.0)
+        self.temp += (0.6 * self.load - cooling * (self.temp - self.ambient)) * dt
+
+        self.pot_raw = min(4095.0, max(0.0, self.pot_raw + rng.gauss(0.0, 20.0) * math.sqrt(dt)))
+        self.lux = min(400.0, max(0.0, self.lux + rng.gauss(0.0, 3.0) * math.sqrt(dt)))
+
+    def _control(self, lm35, dist):
+        connected = 0 < dist <= 10.0
+        laptop_present = 0 < dist < 40.0
+        if self.auto_mode:
+            duty = 0
+            if laptop_present:
+                if lm35 < TEMP_LOW:
+                    duty = 0
+                elif lm35 < TEMP_MED:
+                    duty = 140
+                else:
+                    duty = 255
+        else:
+            duty = self.remote_fan_duty if self.remote_fan_override else int(self.pot_raw * 255 / 4095)
+        self.fan_duty = duty
+        return connected
+
+    def _take_sample(self):
+        rng = self.rng
+        lm35 = round(self.temp + rng.gauss(0.0, 0.25), 1)
+        dist = self.dist + rng.gauss(0.0, 1.2)
+        if rng.random() < 0.02:
+            dist += rng.uniform(10.0, 40.0)
+        dist = float(min(80, max(10, round(dist))))
+
+        connected = self._control(lm35, dist)
+        self.seq += 1
+        self.snapshot = {
+            "mode": "AUTO" if self.auto_mode else "MANUAL",
+            "lm35": lm35,
+            "dhtTemp": round(self.ambient + rng.gauss(0.0, 0.1), 1),
+            "dhtHum": round(55.0 + rng.gauss(0.0, 0.5), 1),
+            "dist": dist,
+            "lux": round(self.lux, 1),
+            "fanDuty": self.fan_duty,
+            "connected": connected,
+            "seq": self.seq,
+            "ms": self.ms,
+        }
+        self.history.append(tuple(self.snapshot[k] for k in HISTORY_FIELDS))
+
+    def tick(self):
+        """Advance one sample interval of device time."""
+        with self.lock:
+            self._step_physics(SAMPLE_INTERVAL_MS / 1000.0)
+            self.ms += SAMPLE_INTERVAL_MS
+            self._take_sample()
+            self.sampled.notify_all()
+
+    def advance(self, seconds: float):
+        """Run the model forward without waiting on the wall clock."""
+        for _ in range(int(seconds * 1000 / SAMPLE_INTERVAL_MS)):
+            self.tick()
+
+    def status(self) -> dict:
+        with self.lock:
+            return dict(self.snapshot)
+
+    def wait_sample(self, after_seq: int, timeout: float):
+        """Block until a sample newer than after_seq exists; returns it or None on timeout."""
+        with self.sampled:
+            if self.sampled.wait_for(lambda: self.seq > after_seq, timeout):
+                return dict(self.snapshot)
+            return None
+
+    def history_since(self, since: int) -> dict:
+        """Same payload as the firmware /history handler."""
+        with self.lock:
+            if since > self.seq:
+                since = 0
+            rows = [r for r in self.history if r[0] > since]
+            more = len(rows) > HISTORY_MAX_BATCH
+            return {
+                "last": self.seq,
+                "more": more,
+                "fields": list(HISTORY_FIELDS),
+                "samples": rows[:HISTORY_MAX_BATCH],
+            }
+
+    # ---------- commands (same semantics as the firmware handlers) ----------
+    def set_mode(self, auto: bool):
+        with self.lock:
+            if self.auto_mode != auto and auto:
+                self.remote_fan_override = False
+                self.remote_rgb_override = False
+            self.auto_mode = auto
+
+    def set_fan(self, duty=None):
+        with self.lock:
+            if duty is None:
+                self.remote_fan_override = False
+            else:
+                self.remote_fan_duty = max(0, min(255, int(duty)))
+                self.remote_fan_override = True
+
+    def set_rgb(self, enable=None):
+        with self.lock:
+            if enable is None:
+                self.remote_rgb_override = False
+            else:
+                self.remote_rgb_override = True
+                self.remote_rgb_enable = enable
+
+
+def run_command(dev: SimDevice, route: str, args: dict):
+    """Control endpoints shared by HTTP and the serial link -> (code, text)."""
+    if route == "/setMode":
+        m = args.get("mode", "").upper()
+        if not m:
+            return 400, "Missing mode param"
+        if m in ("AUTO", "MANUAL"):
+            dev.set_mode(m == "AUTO")
+            return 200, f"OK {m}"
+        return 400, "Unknown mode"
+    if route == "/fan":
+        if "release" in args:
+            dev.set_fan(None)
+            return 200, "Fan override released"
+        if "duty" not in args:
+            return 400, "Missing duty param (0-255)"
+        try:
+            dev.set_fan(int(args["duty"]))
+        except ValueError:
+            dev.set_fan(0)
+        return 200, "Fan duty set"
+    if route == "/rgb":
+        st = args.get("state", "").upper()
+        if "release" in args:
+            dev.set_rgb(None)
+            return 200, "RGB override released"
+        if st in ("ON", "OFF"):
+            dev.set_rgb(st == "ON")
+            return 200, f"RGB {st}"
+        return 400, "Missing state param (ON/OFF)"
+    if route == "/buzzer":
+        if "pattern" in args:
+            return 200, "Beep pattern started"
+        if args.get("state", "").upper() in ("ON", "OFF"):
+            return 200, f"Buzzer {args['state'].upper()}"
+        return 400, "Provide pattern or state param"
+    return 404, "Not found"
+
+
+def parse_request(path: str):
+    url = urlparse(path)
+    return url.path, {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+
+
+class SimRequestHandler(BaseHTTPRequestHandler):
+    server_version = "CoolingPadSim/1.0"
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without this every keep-alive
+    # request waits out the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, code, body, content_type="text/plain"):
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _event(self, snap: dict):
+        self._chunk(f"id: {snap['seq']}\nevent: status\ndata: {json.dumps(snap, separators=(',', ':'))}\n\n")
+
+    def _stream_events(self, args):
+        """SSE like the firmware: chunked, Last-Event-ID resumes from the history ring."""
+        dev = self.server.device
+        try:
+            rate_ms = max(SAMPLE_INTERVAL_MS, int(args.get("rate_ms", SAMPLE_INTERVAL_MS)))
+        except ValueError:
+            rate_ms = SAMPLE_INTERVAL_MS
+        last_id = self.headers.get("Last-Event-ID", "")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self._chunk("retry: 2000\n\n")
+            last_seq, last_ms = 0, None
+            if last_id.isdigit():
+                batch = dev.history_since(int(last_id))
+                for row in batch["samples"]:
+                    snap = dict(zip(batch["fields"], row))
+                    self._event(snap)
+                    last_seq, last_ms = snap["seq"], snap["ms"]
+            else:
+                last_seq = dev.status()["seq"] - 1
+
+            while not self.server.stop_event.is_set():
+                snap = dev.wait_sample(last_seq, 1.0)
+                if snap is None:
+                    continue
+                last_seq = snap["seq"]
+                if last_ms is None or snap["ms"] - last_ms >= rate_ms:
+                    self._event(snap)
+                    last_ms = snap["ms"]
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        route, args = parse_request(self.path)
+        dev = self.server.device
+
+        binary = args.get("fmt") == "bin" or BINARY_CONTENT_TYPE in self.headers.get("Accept", "")
+
+        if self.server.stream_only and route != "/events":
+            self._send(404, "Not found")
+        elif route == "/events" and self.server.stream_address is not None:
+            # like the firmware: port 80 points at the stream port
+            host, port = self.server.stream_address[:2]
+            query = urlparse(self.path).query
+            self.send_response(307)
+            self.send_header("Location", f"http://{host}:{port}/events" + (f"?{query}" if query else ""))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif route == "/events":
+            self._stream_events(args)
+        elif route == "/status":
+            if binary:
+                self._send(200, encode_status_frame(dev.status()), BINARY_CONTENT_TYPE)
+            else:
+                self._send(200, json.dumps(dev.status(), separators=(",", ":")), "application/json")
+        elif route == "/history":
+            try:
+                since = int(args.get("since", "0"))
+            except ValueError:
+                since = 0
+            batch = dev.history_since(since)
+            if binary:
+                fields = batch["fields"]
+                samples = [dict(zip(fields, row)) for row in batch["samples"]]
+                self._send(200, encode_history_frames(samples, batch["last"], batch["more"]), BINARY_CONTENT_TYPE)
+            else:
+                self._send(200, json.dumps(batch, separators=(",", ":")), "application/json")
+        elif route == "/udp":
+            if "off" in args:
+                self.server.udp_target = None
+                self._send(200, "UDP push off")
+            elif not args.get("port", "").isdigit() or not 0 < int(args["port"]) < 65536:
+                self._send(400, "Missing port param")
+            else:
+                port = int(args["port"])
+                self.server.udp_target = (args.get("host", self.client_address[0]), port)
+                body = {"id": dev.device_id.hex(), "port": port}
+                self._send(200, json.dumps(body), "application/json")
+        else:
+            code, text = run_command(dev, route, args)
+            self._send(code, text)
+
+
+class SerialSim:
+    """
+    USB serial stand-in on a Linux pseudo-terminal:
+    - `port` is the pty slave, opened by the dashboard like /dev/ttyUSB0
+    - each sample goes out as "@json*CS" between firmware-style debug lines
+    - "!/path?query tag" commands are answered with "#code/tag text" (no tag: "#code text")
+    Output is dropped while nobody has the port open.
+    """
+    def __init__(self, device: SimDevice):
+        import tty
+        self.device = device
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self._read_commands, daemon=True)
+        self.thread.start()
+
+    def _write(self, data: bytes):
+        try:
+            os.write(self.master, data)
+        except (BlockingIOError, OSError):
+            pass
+
+    def send_sample(self, snap: dict):
+        self._write(f"LM35: {snap['lm35']:.1f} C | Dist: {snap['dist']:.0f} cm | FanDuty: {snap['fanDuty']}\r\n"
+                    .encode())
+        self._write(encode_serial_status(snap))
+
+    def _read_commands(self):
+        buf = b""
+        while not self.stop_flag:
+            ready, _, _ = select.select([self.master], [], [], 0.2)
+            if not ready:
+                continue
+            try:
+                buf += os.read(self.master, 256)
+            except (BlockingIOError, OSError):
+                continue
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                line = line.strip().decode("utf-8", "replace")
+                if line.startswith("!"):
+                    cmd, _, tag = line[1:].partition(" ")
+                    code, text = run_command(self.device, *parse_request(cmd))
+                    self._write(f"#{code}/{tag} {text}\r\n".encode() if tag else f"#{code} {text}\r\n".encode())
+
+    def close(self):
+        self.stop_flag = True
+        self.thread.join(timeout=1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class Simulator:
+    """
+    HTTP server + sample clock around a SimDevice. time_scale > 1 runs device time faster.
+    With `stream_port` set, /events lives on its own server like the pad's port 81 and
+    /events on `port` answers 307 to it; otherwise both share one server.
+    """
+    def __init__(self, host="127.0.0.1", port=8080, time_scale=1.0, seed=None, verbose=False, serial=False,
+                 stream_port=None):
+        self.device = SimDevice(seed=seed)
+        self.serial = SerialSim(self.device) if serial else None
+        self.time_scale = time_scale
+        self.stop_event = threading.Event()
+        self.stream_httpd = None
+        if stream_port is not None:
+            self.stream_httpd = self._server(host, stream_port, verbose, stream_only=True)
+        self.httpd = self._server(host, port, verbose)
+        self.httpd.stream_address = self.stream_httpd.server_address if self.stream_httpd else None
+        self.httpd.udp_target = None
+        self.udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _server(self, host, port, verbose, stream_only=False):
+        httpd = ThreadingHTTPServer((host, port), SimRequestHandler)
+        httpd.daemon_threads = True
+        httpd.device = self.device
+        httpd.verbose = verbose
+        httpd.stop_event = self.stop_event
+        httpd.stream_only = stream_only
+        httpd.stream_address = None
+        return httpd
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _clock_loop(self):
+        interval = SAMPLE_INTERVAL_MS / 1000.0 / self.time_scale
+        next_t = time.monotonic()
+        while not self.stop_event.is_set():
+            self.device.tick()
+            if self.serial is not None:
+                self.serial.send_sample(self.device.status())
+            target = self.httpd.udp_target
+            if target is not None:
+                try:
+                    self.udp_sock.sendto(encode_udp_datagram(self.device.device_id, self.device.status()), target)
+                except OSError:
+                    pass
+            next_t += interval
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                next_t = time.monotonic()
+
+    @property
+    def servers(self):
+        return [self.httpd] + ([self.stream_httpd] if self.stream_httpd is not None else [])
+
+    def start(self):
+        threading.Thread(target=self._clock_loop, daemon=True).start()
+        for httpd in self.servers:
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for httpd in self.servers:
+            httpd.shutdown()
+            httpd.server_close()
+        self.udp_sock.close()
+        if self.serial is not None:
+            self.serial.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 cooling pad simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="device seconds per wall second")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--serial", action="store_true", help="also serve the pad on a pseudo-terminal (Linux)")
+    parser.add_argument("--stream-port", type=int, default=None,
+                        help="serve /events on its own port (the pad uses 81), /events on --port redirects there")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    sim = Simulator(args.host, args.port, args.time_scale, args.seed, args.verbose, args.serial,
+                    args.stream_port).start()
+    print(f"[SIM] Cooling pad simulator on {sim.base_url} (time x{args.time_scale:g})")
+    if sim.stream_httpd is not None:
+        print(f"[SIM] Event stream on port {sim.stream_httpd.server_address[1]}")
+    if sim.serial is not None:
+        print(f"[SIM] Serial link on {sim.serial.port}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+from collections import deque
+
+import numpy as np
+
+
+class SlidingExtrema:
+    """
+    Sliding-window min/max over (t, value) samples:
+    - monotonic deques, amortized O(1) per push
+    - samples older than `window_s` behind the newest are expired
+    """
+    def __init__(self, window_s: float):
+        self.window_s = window_s
+        self._min_q = deque()
+        self._max_q = deque()
+
+    def push(self, t: float, v: float):
+        q = self._min_q
+        while q and q[-1][1] >= v:
+            q.pop()
+        q.append((t, v))
+
+        q = self._max_q
+        while q and q[-1][1] <= v:
+            q.pop()
+        q.append((t, v))
+
+        self.expire(t - self.window_s)
+
+    def expire(self, t_min: float):
+        for q in (self._min_q, self._max_q):
+            while q and q[0][0] < t_min:
+                q.popleft()
+
+    def clear(self):
+        self._min_q.clear()
+        self._max_q.clear()
+
+    def min(self):
+        return self._min_q[0][1] if self._min_q else None
+
+    def max(self):
+        return self._max_q[0][1] if self._max_q else None
+
+
+class HysteresisLimits:
+    """
+    Axis limits with hysteresis:
+    - grow when the data leaves the current band
+    - shrink only when the band is much wider than the data needs
+    update() returns True when the limits moved (caller should rescale/redraw).
+    """
+    def __init__(self, pad: float, min_span: float = 2.0, shrink: float = 0.35):
+        self.pad = pad
+        self.min_span = min_span
+        self.shrink = shrink
+        self.lo = None
+        self.hi = None
+
+    def reset(self):
+        self.lo = None
+        self.hi = None
+
+    def update(self, data_lo, data_hi) -> bool:
+        if data_lo is None or data_hi is None:
+            return False
+
+        target_span = max(self.min_span, (data_hi - data_lo) + 2 * self.pad)
+        if self.lo is not None:
+            inside = self.lo <= data_lo and data_hi <= self.hi
+            if inside and (self.hi - self.lo) * self.shrink <= target_span:
+                return False
+
+        mid = (data_lo + data_hi) / 2
+        self.lo = mid - target_span / 2
+        self.hi = mid + target_span / 2
+        return True
+
+
+class TelemetryStore:
+    """
+    Columnar sample history on preallocated NumPy arrays:
+    - append is amortized O(1) (capacity doubles, expired head compacted lazily)
+    - samples older than `history_s` are dropped by binary search, not pop(0)
+    - window lookups use searchsorted on the timestamp column
+    column() returns views; they are only valid until the next append.
+    """
+    def __init__(self, columns, history_s: float, capacity: int = 1024):
+        self.columns = ("t",) + tuple(columns)
+        self.history_s = history_s
+        self._cols = {c: np.empty(capacity, dtype=np.float64) for c in self.columns}
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def clear(self):
+        self._head = 0
+        self._tail = 0
+
+    def _make_room(self):
+        cap = len(self._cols["t"])
+        n = self._tail - self._head
+        if self._head and n <= cap // 2:
+            for c, arr in self._cols.items():
+                arr[:n] = arr[self._head:self._tail]
+        else:
+            for c, arr in self._cols.items():
+                grown = np.empty(cap * 2, dtype=np.float64)
+                grown[:n] = arr[self._head:self._tail]
+                self._cols[c] = grown
+        self._head = 0
+        self._tail = n
+
+    def append(self, t: float, **values):
+        if self._tail == len(self._cols["t"]):
+            self._make_room()
+
+        i = self._tail
+        self._cols["t"][i] = t
+        for c in self.columns[1:]:
+            self._cols[c][i] = values.get(c, np.nan)
+        self._tail = i + 1
+
+        t_col = self._cols["t"]
+        if t - t_col[self._head] > self.history_s:
+            self._head += int(np.searchsorted(t_col[self._head:self._tail], t - self.history_s, side="left"))
+
+    def column(self, name: str):
+        return self._cols[name][self._head:self._tail]
+
+    def last(self, name: str):
+        if self._tail == self._head:
+            return None
+        return float(self._cols[name][self._tail - 1])
+
+    def index_at(self, t: float) -> int:
+        """First index (into column views) with timestamp >= t."""
+        return int(np.searchsorted(self.column("t"), t, side="left"))
+
+
+class DeviceClock:
+    """
+    Maps the device's (seq, millis) stamps onto the plot time base:
+    - a repeated seq is a duplicate (observe() returns None, nothing new to draw)
+    - a jump in seq counts the samples missed between two reads
+    - seq / millis going backwards (reboot, millis wrap) re-anchors the clock
+      so plot time keeps increasing
+    Host receive time is only used to anchor the first sample after a reset.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.last_seq = None
+        self.last_ms = None
+        self.last_t = None
+        self._t_base = 0.0
+        self._ms_base = 0
+        self.received = 0
+        self.duplicates = 0
+        self.missed = 0
+        self.restarts = 0
+
+    def observe(self, seq: int, ms: int, host_t: float):
+        """Returns the sample's plot time, or None for a duplicate."""
+        if self.last_seq is not None:
+            if seq == self.last_seq:
+                self.duplicates += 1
+                return None
+            if seq < self.last_seq or ms < self.last_ms:
+                self.restarts += 1
+                self._anchor(ms, max(host_t, self.last_t))
+            else:
+                self.missed += seq - self.last_seq - 1
+        else:
+            self._anchor(ms, host_t if self.last_t is None else max(host_t, self.last_t))
+
+        self.last_seq = seq
+        self.last_ms = ms
+        self.received += 1
+        self.last_t = self._t_base + (ms - self._ms_base) / 1000.0
+        return self.last_t
+
+    def _anchor(self, ms, t):
+        self._ms_base = ms
+        self._t_base = t
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "python_dashboard"))     # host_sensors; its app.py must not shadow ours
+
+from session import SessionRecorder  # noqa: E402
+from simulator import SimDevice, SAMPLE_INTERVAL_MS  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def recording():
+    """Ten minutes of SimDevice in AUTO, one sample per 250 ms: (times, payloads)."""
+    dt = SAMPLE_INTERVAL_MS / 1000.0
+    dev = SimDevice(seed=4)
+    dev.advance(60)
+    times, payloads = [], []
+    for i in range(int(600 / dt)):
+        dev.tick()
+        times.append(i * dt)
+        payloads.append(dev.status())
+    return times, payloads
+
+
+@pytest.fixture
+def session_file(recording, tmp_path):
+    """`recording` as a session file (dashboard / service --record format)."""
+    path = str(tmp_path / "session.jsonl")
+    rec = SessionRecorder(path)
+    for t, data in zip(*recording):
+        rec.write(data, t)
+    rec.close()
+    return path
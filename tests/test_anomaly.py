@@ -0,0 +1,89 @@
+"""AnomalyDetector: channel checks and the fan check against the pad's AUTO table."""
+import pytest
+
+from anomaly import AnomalyDetector, RollingStats, FAN_MISMATCH_S, ANOMALY_MIN_SAMPLES
+from policy import parse_auto_table
+
+DT = 0.25
+
+
+def run(det, lm35, duty, seconds=2 * FAN_MISMATCH_S, dist=20.0):
+    kinds = []
+    for i in range(int(seconds / DT)):
+        data = {"mode": "AUTO", "lm35": lm35, "dist": dist, "fanDuty": duty}
+        kinds += [k for ch, k, _ in det.update(data, i * DT) if ch == "fanDuty"]
+    return kinds
+
+
+def test_firmware_table():
+    assert run(AnomalyDetector(), 35.0, 140) == []
+    assert run(AnomalyDetector(), 35.0, 0) == ["fan"]
+
+
+def test_tuned_table():
+    # a pad flashed with TEMP_LOW 36: fan off at 35 °C is right, 140 is not
+    det = AnomalyDetector(auto_table=(36.0, 44.0, 40.0))
+    assert run(det, 35.0, 0) == []
+    assert run(AnomalyDetector(auto_table=(36.0, 44.0, 40.0)), 35.0, 140) == ["fan"]
+    # presence distance moved out to 60 cm
+    assert run(AnomalyDetector(auto_table=(30.0, 40.0, 60.0)), 35.0, 140, dist=50.0) == []
+
+
+def test_check_off_without_table():
+    det = AnomalyDetector(auto_table=None)
+    assert run(det, 35.0, 0) == []
+    assert run(det, 45.0, 140) == []
+
+
+def test_parse_auto_table():
+    assert parse_auto_table("32,42,45") == (32.0, 42.0, 45.0)
+    assert parse_auto_table(" OFF ") is None
+    for bad in ("32,42", "42,32,40", "a,b,c", "30,40,0"):
+        with pytest.raises(ValueError):
+            parse_auto_table(bad)
+
+
+def feed(det, values, key="lm35", start=0.0):
+    found = []
+    for i, v in enumerate(values):
+        found += det.update({key: v}, start + i * DT)
+    return found
+
+
+def test_rolling_stats_large_offset():
+    st = RollingStats(10.0)
+    for i in range(100):
+        st.push(i * 0.1, 1e9 + (i % 2))
+    assert st.mean() == pytest.approx(1e9 + 0.5)
+    assert st.std() == pytest.approx(0.5)
+    st.push(100.0, 1e9)     # everything before t = 90 expires
+    assert len(st) == 1
+
+
+def test_spike_reported_once_and_kept_out_of_stats():
+    det = AnomalyDetector()
+    base = [35.0 + 0.1 * (i % 3) for i in range(ANOMALY_MIN_SAMPLES + 5)]
+    assert feed(det, base) == []
+    found = feed(det, [60.0, 60.0, 35.1], start=len(base) * DT)
+    # one onset; the spike doesn't also count as a jump there and back
+    assert [(ch, k) for ch, k, _ in found] == [("lm35", "spike")]
+    assert det.counts == {"lm35.spike": 1}
+
+
+def test_lasting_level_change_restarts_stats():
+    det = AnomalyDetector()
+    feed(det, [35.0 + 0.1 * (i % 3) for i in range(ANOMALY_MIN_SAMPLES)])
+    found = feed(det, [50.0] * (2 * ANOMALY_MIN_SAMPLES), start=100.0)
+    assert [k for _, k, _ in found] == ["spike"]
+    assert not det.monitors["lm35"].active
+
+
+def test_dropout_range_and_flatline():
+    det = AnomalyDetector()
+    assert [k for _, k, _ in feed(det, [0.0], key="dhtTemp")] == ["dropout"]
+    assert [k for _, k, _ in feed(det, [200.0], key="dist")] == ["range"]
+    flat = feed(det, [20.0] * int(130 / DT), key="dist", start=1.0)
+    assert [k for _, k, _ in flat] == ["flatline"]
+    det.reset()
+    assert det.update({"dist": 20.0}, 500.0) == []
+    assert det.total() == 3
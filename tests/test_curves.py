@@ -0,0 +1,95 @@
+"""Fan-curve preview on a short simulated session, and its vectorized FanCommandLimiter."""
+import random
+
+import numpy as np
+import pytest
+
+import curves
+from control import FanCommandLimiter
+from curves import BUILTIN_PROFILES, FanCurve, LimiterArray, preview
+from policy import SessionTrace
+
+
+@pytest.fixture
+def trace(recording):
+    return SessionTrace(*recording)
+
+
+def pad_duties(limiters, pad, t, want):
+    """FanCommandLimiter.update() per curve; None keeps the duty on the pad."""
+    for k, lim in enumerate(limiters):
+        out = lim.update(t, float(want[k]))
+        if out is not None:
+            pad[k] = out
+    return pad
+
+
+@pytest.mark.parametrize("cfg", [
+    {},
+    {"deadband": 0, "max_step_per_s": 5.0, "min_interval_s": 1.0, "refresh_s": 3.0},
+    {"deadband": 40, "max_step_per_s": 200.0, "min_interval_s": 0.0, "refresh_s": 10.0},
+])
+def test_limiter_array_matches_limiter(cfg):
+    rng = random.Random(9)
+    n = 6
+    arr = LimiterArray(n, FanCommandLimiter(**cfg))
+    limiters = [FanCommandLimiter(**cfg) for _ in range(n)]
+    pad = [np.nan] * n
+    t = 0.0
+    for _ in range(3000):
+        t += rng.choice((0.25, 0.25, 0.7, 2.0, 5.0))
+        want = np.array([rng.choice((0.0, 255.0, rng.uniform(0, 255), round(rng.uniform(0, 255))))
+                         for _ in range(n)])
+        got = arr.update(t, want)
+        pad = pad_duties(limiters, pad, t, want)
+        np.testing.assert_array_equal(got, pad)
+        np.testing.assert_array_equal(arr.sent_t, [lim.sent_t for lim in limiters])
+
+
+def test_preview_limiter_matches_limiter(trace, monkeypatch):
+    """Inside preview(): every sample, the vectorized rules give what FanCommandLimiter sends."""
+    checked = []
+
+    class Checked(LimiterArray):
+        def __init__(self, n, limiter=None):
+            super().__init__(n, limiter)
+            self.scalar = [FanCommandLimiter() for _ in range(n)]
+            self.pad = [np.nan] * n
+
+        def update(self, t, duty):
+            got = super().update(t, duty)
+            self.pad = pad_duties(self.scalar, self.pad, t, duty)
+            np.testing.assert_array_equal(got, self.pad)
+            checked.append(t)
+            return got
+
+    monkeypatch.setattr(curves, "LimiterArray", Checked)
+    profiles = [FanCurve.from_dict(d, name) for name, d in BUILTIN_PROFILES.items()]
+    preview(trace, profiles)
+    assert len(checked) == len(trace.t)
+
+
+def test_preview_smoke(trace):
+    profiles = [FanCurve.from_dict(d, name) for name, d in BUILTIN_PROFILES.items()]
+    profiles += [FanCurve([(0, 255)], name="full"), FanCurve([(0, 0)], name="off")]
+    res = preview(trace, profiles)
+    for key in ("fan_on_pct", "mean_duty", "peak_c", "switches_h"):
+        assert res[key].shape == (len(profiles),)
+        assert np.all(np.isfinite(res[key]))
+    assert np.all((res["fan_on_pct"] >= 0) & (res["fan_on_pct"] <= 100))
+    assert np.all((res["mean_duty"] >= 0) & (res["mean_duty"] <= 255))
+    full, off = len(profiles) - 2, len(profiles) - 1
+    assert res["fan_on_pct"][full] == pytest.approx(100.0)
+    assert res["mean_duty"][full] == pytest.approx(255.0)
+    assert res["fan_on_pct"][off] == 0.0
+    # more fan, cooler pad
+    assert res["peak_c"][full] < res["peak_c"][off]
+    assert res["switches_h"][full] == 0.0
+
+
+def test_cli_runs(session_file, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["curves.py", session_file, "--profiles", str(tmp_path / "profiles.json"),
+                                     "--profile", "quiet", "--profile", "firmware"])
+    curves.main()
+    out = capsys.readouterr().out
+    assert "quiet" in out and "firmware" in out
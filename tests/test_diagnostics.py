@@ -0,0 +1,162 @@
+"""HttpStats histograms, PipelineTracer trace export and the StallWatchdog, no Tk needed."""
+import gc
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from diagnostics import HttpStats, LatencyHistogram, PipelineTracer, StallWatchdog
+
+
+def test_histogram_small_values_exact():
+    h = LatencyHistogram()
+    for us in range(1, 11):
+        h.record(us)
+    assert [h.percentile(p) for p in (10, 50, 90, 100)] == [1, 5, 9, 10]
+    assert h.mean() == 5.5
+    h.record(-3)                    # clock went backwards: counted as 0
+    assert (h.count, h.percentile(0)) == (11, 0)
+
+
+def test_histogram_relative_error_and_top_bucket():
+    h = LatencyHistogram(limit_us=10_000_000)
+    for ms in range(1, 1001):
+        h.record(ms * 1000)
+    for p, want_us in ((50, 500_000), (90, 900_000), (99, 990_000)):
+        assert h.percentile(p) == pytest.approx(want_us, rel=0.03)
+    assert h.percentile(100) == h.max_us == 1_000_000
+    h.record(60_000_000)            # beyond the limit: top bucket, exact max
+    assert h.max_us == 60_000_000
+    assert h.counts[h.top] == 1
+    h.reset()
+    assert (h.count, h.percentile(50), h.mean()) == (0, 0, 0.0)
+
+
+def test_http_stats_per_endpoint():
+    stats = HttpStats()
+    for i in range(1, 101):
+        stats.record(f"/history?since={i}", i * 1000, status=200, new_connections=int(i == 1),
+                     bytes_in=100, bytes_out=50)
+    stats.record("/status", 2_000_000, timeout=True)
+    stats.record("/status", 30_000, status=503)
+    stats.record("/status", 40_000, status=None)        # connection error, no response
+    snap = stats.snapshot()
+    assert list(snap) == ["/history", "/status"]
+
+    hist = snap["/history"]
+    assert (hist["requests"], hist["errors"], hist["timeouts"]) == (100, 0, 0)
+    assert (hist["new_connections"], hist["reused_connections"]) == (1, 99)
+    assert (hist["bytes_in"], hist["bytes_out"]) == (10_000, 5_000)
+    assert hist["p50_ms"] == pytest.approx(50, rel=0.03)
+    assert hist["p90_ms"] == pytest.approx(90, rel=0.03)
+    assert hist["p99_ms"] == pytest.approx(99, rel=0.03)
+    assert hist["max_ms"] == 100.0
+
+    st = snap["/status"]
+    assert (st["requests"], st["errors"], st["timeouts"]) == (3, 2, 1)
+    assert st["max_ms"] == 2000.0
+    stats.reset()
+    assert stats.snapshot() == {}
+
+
+def test_tracer_chrome_trace(tmp_path):
+    tracer = PipelineTracer()
+    t0 = tracer.t0_ns
+    tracer.span("http", t0 + 1_000_000, t0 + 4_000_000, 7)
+    tracer.span("decode", t0 + 4_000_000, t0 + 4_250_000, 7)
+
+    def worker():
+        tracer.span("queue", t0 + 4_250_000, t0 + 6_250_000)
+
+    th = threading.Thread(target=worker, name="poller")
+    th.start()
+    th.join()
+    tracer.span("e2e", t0 + 1_000_000, t0 + 9_000_000, 7)
+
+    path = tmp_path / "trace.json"
+    assert tracer.write_chrome_trace(str(path)) == 4
+    trace = json.loads(path.read_text())
+    assert trace["displayTimeUnit"] == "ms"
+    meta = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert {e["tid"] for e in meta} == {e["tid"] for e in spans}
+    # live threads are named, a thread that has since exited falls back to its ident
+    assert {e["args"]["name"] for e in meta} == {threading.current_thread().name, str(th.ident)}
+    assert all(e["pid"] == os.getpid() and e["cat"] == "pipeline" for e in spans)
+    assert [(e["name"], e["ts"], e["dur"], e.get("args")) for e in spans] == [
+        ("http", 1000.0, 3000.0, {"seq": 7}),
+        ("decode", 4000.0, 250.0, {"seq": 7}),
+        ("queue", 4250.0, 2000.0, None),
+        ("e2e", 1000.0, 8000.0, {"seq": 7}),
+    ]
+
+    summary = tracer.summary()
+    assert list(summary) == ["http", "decode", "queue", "e2e"]
+    assert (summary["http"]["count"], summary["http"]["max_ms"]) == (1, 3.0)
+
+
+def test_tracer_disabled_and_capacity(tmp_path):
+    off = PipelineTracer(enabled=False)
+    off.span("http", 0, 1000)
+    assert off.summary() == {}
+    assert off.write_chrome_trace(str(tmp_path / "off.json")) == 0
+
+    tracer = PipelineTracer(capacity=3)
+    for i in range(5):
+        tracer.span("ui", i * 1000, i * 1000 + 500, i)
+    assert [e[3] for e in tracer.events] == [2, 3, 4]
+    assert tracer.summary()["ui"]["count"] == 5        # the histogram keeps everything
+    tracer.reset()
+    assert tracer.summary() == {} and not tracer.events
+
+
+class FakeRoot:
+    """Just enough of Tk for the watchdog: after() callbacks, run on the calling (main) thread."""
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, fn):
+        self.pending.append((time.perf_counter() + ms / 1000.0, fn))
+
+    def run(self, seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            now = time.perf_counter()
+            due = [p for p in self.pending if p[0] <= now]
+            self.pending = [p for p in self.pending if p[0] > now]
+            for _, fn in due:
+                fn()
+            time.sleep(0.002)
+
+
+def blocking_handler(seconds):
+    time.sleep(seconds)
+
+
+def test_watchdog_fires_above_threshold():
+    stalls = []
+    root = FakeRoot()
+    dog = StallWatchdog(threshold_ms=150, interval_ms=50, on_stall=stalls.append).attach(root)
+    try:
+        root.run(0.3)
+        blocking_handler(0.08)          # a hiccup well under the threshold
+        root.run(0.3)
+        assert stalls == []
+
+        blocking_handler(0.5)
+        root.run(0.3)
+        assert len(stalls) == 1
+        stall = stalls[0]
+        assert stall.duration_ms >= 150
+        assert stall.samples >= 1
+        assert stall.culprit().startswith("test_diagnostics.py:")
+        assert stall.culprit().endswith(" blocking_handler")
+        assert "UI loop blocked" in stall.format()
+        assert dog.worst is stall and list(dog.stalls) == [stall]
+        assert dog.lateness.max_us >= 150_000
+    finally:
+        dog.stop()
+        dog.thread.join(timeout=1.0)
+    assert dog._on_gc not in gc.callbacks
@@ -0,0 +1,128 @@
+"""PidController / FanCommandLimiter rules, alone and closed-loop on SimDevice at accelerated time."""
+import random
+
+import pytest
+
+from control import FanCommandLimiter, HostFanControl, PidController
+from simulator import SimDevice, SAMPLE_INTERVAL_MS, run_command
+
+DT = SAMPLE_INTERVAL_MS / 1000.0
+
+
+def test_integrator_holds_while_saturated():
+    pid = PidController(kp=40.0, ki=1.5, kd=0.0, setpoint=38.0)
+    t = 0.0
+    for _ in range(400):                     # 100 s at 12 °C over: P alone saturates
+        t += DT
+        assert pid.update(t, 50.0) == 255.0
+    assert pid.integral == 0.0
+    # just below the setpoint the output leaves saturation at once, no wound-up integral to bleed off
+    assert pid.update(t + DT, 37.5) == 0.0
+
+
+def test_integrator_clamped_to_output_range():
+    pid = PidController(kp=0.0, ki=10.0, kd=0.0, setpoint=38.0)
+    t = 0.0
+    for _ in range(1000):
+        t += DT
+        pid.update(t, 40.0)
+        assert 0.0 <= pid.integral <= 255.0
+    # stops one step short of crossing the limit rather than overshooting it
+    assert pid.output == pytest.approx(255.0, abs=10.0 * 2.0 * DT)
+    for _ in range(1000):
+        t += DT
+        pid.update(t, 30.0)
+        assert 0.0 <= pid.integral <= 255.0
+    assert pid.output == pytest.approx(0.0, abs=10.0 * 8.0 * DT)
+
+
+def test_limiter_deadband():
+    lim = FanCommandLimiter(deadband=10, max_step_per_s=1000.0, min_interval_s=1.0, refresh_s=30.0)
+    assert lim.update(0.0, 100.0) == 100
+    assert lim.update(5.0, 109.0) is None
+    assert lim.update(6.0, 91.4) is None
+    assert lim.update(7.0, 110.0) == 110
+    # full off / full on are reachable from inside the deadband
+    lim.reset()
+    assert lim.update(0.0, 5.0) == 5
+    assert lim.update(2.0, 0.0) == 0
+    assert lim.update(4.0, 250.0) == 250
+    assert lim.update(6.0, 255.0) == 255
+
+
+def test_limiter_slew_rate():
+    lim = FanCommandLimiter(deadband=0, max_step_per_s=40.0, min_interval_s=4.0, refresh_s=30.0)
+    assert lim.update(0.0, 0.0) == 0
+    assert lim.update(4.0, 255.0) == 160         # 40 / s over 4 s
+    assert lim.update(10.0, 255.0) == 255        # 6 s -> 240 more allowed
+    assert lim.update(14.0, 0.0) == 95
+    assert lim.update(15.0, 0.0) is None
+    assert lim.update(18.0, 0.0) == 0
+
+
+def test_limiter_min_interval_and_refresh():
+    lim = FanCommandLimiter(deadband=10, max_step_per_s=1000.0, min_interval_s=4.0, refresh_s=30.0)
+    assert lim.update(0.0, 100.0) == 100
+    assert lim.update(3.9, 200.0) is None        # too soon, however big the change
+    assert lim.update(4.0, 200.0) == 200
+    for t in (10.0, 20.0, 33.9):
+        assert lim.update(t, 200.0) is None
+    assert lim.update(34.0, 200.0) == 200        # refresh of an unchanged value
+    assert lim.update(64.0, 203.0) == 203        # refresh sends the new (small) value
+    assert lim.commands == 4
+    # clock went backwards: treat as fresh
+    assert lim.update(1.0, 50.0) == 50
+
+
+def test_limiter_output_range():
+    rng = random.Random(3)
+    lim = FanCommandLimiter()
+    t = 0.0
+    for _ in range(5000):
+        t += rng.uniform(0.0, 6.0)
+        out = lim.update(t, rng.uniform(-300.0, 600.0))
+        if out is not None:
+            assert isinstance(out, int) and 0 <= out <= 255
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_closed_loop_on_simulator(seed):
+    """Host control of SimDevice in MANUAL for an hour of device time, every rule checked on the way."""
+    dev = SimDevice(seed=seed)
+    dev.advance(60)
+    run_command(dev, "/setMode", {"mode": "MANUAL"})
+    ctl = HostFanControl(target_c=38.0)
+    lim = ctl.limiter
+    sent = []
+    pending = None
+    worst = over_s = 0.0
+    for i in range(int(3600 / DT)):
+        t = i * DT
+        dev.tick()
+        snap = dev.status()
+        if pending is not None:
+            run_command(dev, "/fan", {"duty": str(pending)})
+            pending = None
+        pending = ctl.update(t, snap["lm35"])
+        assert 0.0 <= ctl.pid.integral <= 255.0
+        if pending is not None:
+            sent.append((t, pending))
+        if t > 600.0:
+            worst = max(worst, dev.temp - ctl.target_c)
+            over_s += DT if dev.temp - ctl.target_c > 2.0 else 0.0
+
+    assert sent
+    assert len(sent) == lim.commands
+    for (t0, d0), (t1, d1) in zip(sent, sent[1:]):
+        gap = t1 - t0
+        assert isinstance(d1, int) and 0 <= d1 <= 255
+        assert gap >= lim.min_interval_s - 1e-9
+        assert abs(d1 - d0) <= lim.max_step_per_s * gap + 0.5
+        if gap < lim.refresh_s:
+            assert d1 != d0
+            assert abs(d1 - d0) >= lim.deadband or d1 in (0, 255)
+    # never silent for longer than the refresh period
+    assert max(t1 - t0 for (t0, _), (t1, _) in zip(sent, sent[1:])) < lim.refresh_s + DT + 1e-9
+    # after settling, load bursts push the pad only briefly past the target
+    assert worst < 3.5
+    assert over_s < 60.0
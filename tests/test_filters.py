@@ -0,0 +1,101 @@
+"""Vectorized apply() / process_batch() against sample-by-sample update() / process()."""
+import math
+
+import numpy as np
+import pytest
+
+from filters import EwmaFilter, FilterStage, KalmanFilter1D, MedianFilter, make_filter, parse_filter_args
+
+FILTERS = [
+    lambda: EwmaFilter(1.5),
+    lambda: MedianFilter(1),
+    lambda: MedianFilter(5),
+    lambda: MedianFilter(6),
+    lambda: KalmanFilter1D(),
+    lambda: KalmanFilter1D(0.5, 0.01),
+]
+
+
+def signal(n, seed=0, start=0.0):
+    """Noisy step with spikes, NaN dropouts (some at the start) and jittered / stalled / backwards dt."""
+    rng = np.random.default_rng(seed)
+    dt = rng.choice([0.25, 0.25, 0.24, 0.26, 0.5, 3.0, 0.0], size=n)
+    t = start + np.cumsum(dt)
+    t[n // 3] -= 0.1                    # host clock stepped back: dt clamps to 0
+    x = 30.0 + 5.0 * (np.arange(n) > n // 2) + rng.normal(0.0, 0.3, n)
+    x[rng.random(n) < 0.05] += 8.0
+    x[rng.random(n) < 0.1] = math.nan
+    x[:2] = math.nan
+    x[n // 4:n // 4 + 12] = math.nan    # a dropout longer than any window
+    return t, x
+
+
+def loop(f, t, x):
+    return np.array([f.update(float(ti), float(xi)) for ti, xi in zip(t, x)])
+
+
+@pytest.mark.parametrize("make", FILTERS)
+def test_apply_matches_update(make):
+    t, x = signal(500)
+    a, b = make(), make()
+    np.testing.assert_allclose(a.apply(t, x), loop(b, t, x), rtol=1e-9, atol=1e-9, equal_nan=True)
+    assert a.y == pytest.approx(b.y, rel=1e-9)
+
+
+@pytest.mark.parametrize("make", FILTERS)
+def test_state_carries_over_between_applies(make):
+    t, x = signal(400, seed=1)
+    chunked, ref = make(), make()
+    got = []
+    for lo, hi in ((0, 1), (1, 3), (3, 150), (150, 151), (151, 400)):
+        got.append(chunked.apply(t[lo:hi], x[lo:hi]))
+    np.testing.assert_allclose(np.concatenate(got), loop(ref, t, x), rtol=1e-9, atol=1e-9, equal_nan=True)
+    # and mixing the two paths: update() after apply() picks up the same state
+    t2, x2 = signal(50, seed=2, start=float(t[-1]))
+    np.testing.assert_allclose(loop(chunked, t2, x2), loop(ref, t2, x2), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("make", FILTERS)
+def test_all_nan_and_empty_batches(make):
+    f = make()
+    assert np.isnan(f.apply([0.0, 0.25], [math.nan, math.nan])).all()
+    assert len(f.apply([], [])) == 0
+    f.apply([0.5], [31.0])
+    assert f.apply([0.75, 1.0], [math.nan, math.nan]).tolist() == [f.y, f.y]
+
+
+def test_stage_batch_matches_process():
+    t, lm35 = signal(300, seed=3)
+    _, dist = signal(300, seed=4)
+    samples = []
+    for i, ti in enumerate(t.tolist()):
+        d = {"lm35": None if math.isnan(lm35[i]) else float(lm35[i]), "connected": i % 7 != 0}
+        if i % 5:
+            d["dist"] = float(dist[i])     # a channel missing from some samples
+        samples.append((d, ti))
+    specs = {"lm35": "kalman", "dist": "median:5", "connected": "median:3", "lux": "ewma"}
+
+    batch = [(dict(d), ti) for d, ti in samples]
+    live = [(dict(d), ti) for d, ti in samples]
+    a, b = FilterStage(specs), FilterStage(specs)
+    a.process_batch(batch[:120])
+    a.process_batch(batch[120:])
+    for d, ti in live:
+        b.process(d, ti)
+    for (raw, _), (da, _), (db, _) in zip(samples, batch, live):
+        assert da["filtered"].keys() == db["filtered"].keys() == raw.keys()
+        for c in da["filtered"]:
+            assert da["filtered"][c] == pytest.approx(db["filtered"][c], rel=1e-9, abs=1e-9, nan_ok=True)
+        assert {k: v for k, v in da.items() if k != "filtered"} == raw      # raw values untouched
+
+
+def test_filter_specs():
+    assert isinstance(make_filter("median:7"), MedianFilter) and make_filter("median:7").n == 7
+    assert make_filter("kalman:0.1:0.2").r == 0.2
+    for bad in ("boxcar", "ewma:0", "median:x", "median:0", "kalman:1:2:3"):
+        with pytest.raises(ValueError):
+            make_filter(bad)
+    specs = parse_filter_args(["lm35=ewma:3", "lux=off"])
+    assert specs["lm35"] == "ewma:3" and "lux" not in specs
+    with pytest.raises(ValueError):
+        parse_filter_args(["lm35"])
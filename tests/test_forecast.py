@@ -0,0 +1,36 @@
+"""ThermalForecaster: readiness read from the model tuple alone, thresholds already crossed."""
+from control import ThermalForecaster
+
+
+def feed(fc, seconds, start=30.0, rate=0.05, dt=0.25):
+    for i in range(int(seconds / dt)):
+        fc.update(i * dt, start + rate * i * dt, 25.0)
+
+
+def test_ready_needs_half_a_window():
+    fc = ThermalForecaster(window_s=30.0)
+    feed(fc, 10.0)
+    assert fc.model is not None and not fc.ready
+    feed(fc, 20.0)
+    assert fc.ready
+
+
+def test_ready_only_looks_at_the_model():
+    fc = ThermalForecaster(window_s=30.0)
+    feed(fc, 20.0)
+    assert fc.ready
+    # what another thread can see halfway through reset(): the old model, an empty window
+    fc.window.clear()
+    assert fc.ready
+    fc.reset()
+    assert fc.model is None and not fc.ready
+
+
+def test_time_to():
+    fc = ThermalForecaster(window_s=30.0)
+    feed(fc, 20.0, start=30.0, rate=0.05)
+    temp = fc.model[1]
+    assert fc.time_to(temp - 1.0) == 0.0                # already past it
+    eta = fc.time_to(temp + 1.0)
+    assert eta is not None and 0.0 < eta <= fc.horizon_s
+    assert fc.time_to(temp + 100.0) is None             # beyond the horizon
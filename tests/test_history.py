@@ -0,0 +1,85 @@
+"""/history backfill after a link outage, against the in-process Simulator."""
+import time
+from queue import Queue, Empty
+
+import pytest
+import requests
+
+import service
+from service import CoolingPadService
+from simulator import HISTORY_MAX_BATCH, SAMPLE_INTERVAL_MS, Simulator
+
+
+@pytest.fixture
+def sim():
+    # device time only moves when the test ticks it
+    sim = Simulator(port=0, seed=6, time_scale=1e-6).start()
+    yield sim
+    sim.stop()
+
+
+def batches(events, timeout=3.0, until=None):
+    """status_batch items off the queue until `until(batches)` holds (or the timeout)."""
+    out = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not (until and until(out)):
+        try:
+            item = events.get(timeout=0.05)
+        except Empty:
+            continue
+        assert item[0] != "status_data"         # history polling delivers batches only
+        if item[0] == "status_batch":
+            out.append(item[1])
+    return out
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_outage_backfilled_once(sim, monkeypatch, binary):
+    monkeypatch.setattr(service, "USE_EVENT_STREAM", False)
+    monkeypatch.setattr(service, "USE_BINARY_FRAMES", binary)
+    monkeypatch.setattr(service, "HISTORY_POLL_INTERVAL_MS", 50)
+    monkeypatch.setattr(service, "POLL_MAX_INTERVAL_MS", 100)
+    for _ in range(4):
+        sim.device.tick()
+    last = sim.device.status()["seq"]
+
+    events = Queue()
+    svc = CoolingPadService(events)
+    down = False
+    http_get = svc.http.get
+
+    def get(path, timeout=None):
+        if down:
+            raise requests.ConnectionError("link down")
+        return http_get(path, timeout)
+
+    svc.http.get = get
+    svc.connect("HTTP", sim.base_url)
+    svc.start()
+    try:
+        first = batches(events, until=lambda b: b)
+        seen = [d["seq"] for batch in first for d, _ in batch]
+        assert seen == list(range(1, last + 1))
+
+        down = True
+        time.sleep(0.3)
+        assert (svc.online, svc.last_error) == (False, "link down")
+        missing = list(range(last + 1, last + 1 + HISTORY_MAX_BATCH + 30))
+        for _ in missing:
+            sim.device.tick()
+        down = False
+
+        got = batches(events, until=lambda b: sum(len(x) for x in b) >= len(missing))
+        seqs = [d["seq"] for batch in got for d, _ in batch]
+        assert seqs == missing                  # each missed sample once, in order
+        assert len(got[0]) == HISTORY_MAX_BATCH  # first batch said "more", the rest followed
+        assert batches(events, timeout=0.3) == []
+
+        # plotted on device time: exactly one sample interval apart across both batches
+        ts = [t for batch in first + got for _, t in batch]
+        steps = {round(b - a, 6) for a, b in zip(ts, ts[1:])}
+        assert steps == {SAMPLE_INTERVAL_MS / 1000.0}
+        assert svc.device_clock.missed == 0 and svc.device_clock.duplicates == 0
+    finally:
+        svc.stop_flag = True
+        svc.thread.join(timeout=2.0)
@@ -0,0 +1,151 @@
+"""host_sensors readers against a fake procfs / sysfs tree."""
+import os
+
+import pytest
+
+from host_sensors import CpuLoadReader, CpuTempReader, HostSensorSampler, find_cpu_zone
+
+
+def stat_line(user, nice, system, idle, iowait=0, irq=0, softirq=0, steal=0):
+    return (f"cpu  {user} {nice} {system} {idle} {iowait} {irq} {softirq} {steal} 0 0\n"
+            f"cpu0 {user} {nice} {system} {idle} {iowait} {irq} {softirq} {steal} 0 0\n"
+            "intr 12345 0 0\nctxt 999\n")
+
+
+def rewrite(path, text):
+    """In place (same inode), like the kernel regenerating the file; an open fd sees it."""
+    with open(path, "r+") as f:
+        f.seek(0)
+        f.write(text)
+        f.truncate()
+
+
+@pytest.fixture
+def proc(tmp_path):
+    root = tmp_path / "proc"
+    root.mkdir()
+    (root / "stat").write_text(stat_line(100, 0, 50, 850))
+    return root
+
+
+def add_zone(sys_root, n, kind, milli=None):
+    zone = sys_root / "class" / "thermal" / f"thermal_zone{n}"
+    zone.mkdir(parents=True)
+    (zone / "type").write_text(kind + "\n")
+    if milli is not None:
+        (zone / "temp").write_text(f"{milli}\n")
+    return zone
+
+
+def test_load_from_tick_deltas(proc):
+    reader = CpuLoadReader(str(proc))
+    assert reader.read() is None                        # no previous sample yet
+    rewrite(proc / "stat", stat_line(140, 0, 70, 870, iowait=20))
+    # +100 ticks, of which idle + iowait +40 -> 60 % busy
+    assert reader.read() == pytest.approx(60.0)
+    rewrite(proc / "stat", stat_line(140, 0, 70, 970))
+    assert reader.read() == pytest.approx(0.0)
+    reader.close()
+
+
+def test_load_reuses_one_fd(proc):
+    reader = CpuLoadReader(str(proc)).open()
+    fd = reader.fd
+    reader.read()
+    rewrite(proc / "stat", stat_line(200, 0, 100, 900))
+    assert reader.read() == pytest.approx(75.0)
+    assert reader.fd == fd
+    reader.close()
+    assert reader.fd is None
+
+
+def test_load_counter_wraparound(proc):
+    reader = CpuLoadReader(str(proc))
+    reader.read()
+    # counters went backwards (wrap / reset): no bogus value, the new totals become the base
+    rewrite(proc / "stat", stat_line(10, 0, 5, 85))
+    assert reader.read() is None
+    rewrite(proc / "stat", stat_line(10, 0, 5, 85))
+    assert reader.read() is None                         # no ticks elapsed
+    rewrite(proc / "stat", stat_line(30, 0, 5, 165))
+    assert reader.read() == pytest.approx(20.0)
+
+
+def test_load_bad_and_missing_file(tmp_path, proc):
+    with pytest.raises(OSError):
+        CpuLoadReader(str(tmp_path / "nowhere")).read()
+    rewrite(proc / "stat", "intr 1 2 3\n")
+    with pytest.raises(ValueError):
+        CpuLoadReader(str(proc)).read()
+
+
+def test_zone_selection_by_type(tmp_path):
+    sys_root = tmp_path / "sys"
+    add_zone(sys_root, 0, "acpitz", 45000)
+    add_zone(sys_root, 1, "iwlwifi_1", 40000)
+    pkg = add_zone(sys_root, 2, "x86_pkg_temp", 61500)
+    assert find_cpu_zone(str(sys_root)) == str(pkg)
+    reader = CpuTempReader(str(sys_root))
+    assert reader.available
+    assert reader.read() == 61.5
+
+
+def test_zone_fallbacks(tmp_path):
+    sys_root = tmp_path / "sys"
+    assert find_cpu_zone(str(sys_root)) is None
+    reader = CpuTempReader(str(sys_root))
+    assert not reader.available and reader.read() is None
+
+    wifi = add_zone(sys_root, 0, "iwlwifi_1", 40000)
+    assert find_cpu_zone(str(sys_root)) == str(wifi)     # no CPU type: first zone
+    acpi = add_zone(sys_root, 1, "acpitz", 45000)
+    assert find_cpu_zone(str(sys_root)) == str(acpi)
+    # a zone whose type can't be read is skipped
+    broken = sys_root / "class" / "thermal" / "thermal_zone2"
+    (broken / "type").mkdir(parents=True)
+    assert find_cpu_zone(str(sys_root)) == str(acpi)
+
+
+def test_temp_reread_through_pread(tmp_path):
+    zone = add_zone(tmp_path / "sys", 0, "x86_pkg_temp", 50000)
+    reader = CpuTempReader(zone=str(zone))
+    assert reader.read() == 50.0
+    fd = reader.fd
+    rewrite(zone / "temp", "71250\n")
+    assert reader.read() == 71.25
+    assert reader.fd == fd
+    reader.close()
+
+
+def test_sampler_drops_failing_readers(tmp_path, proc):
+    sys_root = tmp_path / "sys"
+    zone = add_zone(sys_root, 0, "x86_pkg_temp", 55000)
+    sampler = HostSensorSampler(lambda *a: None, proc_root=str(proc), sys_root=str(sys_root))
+    assert sampler.sample() == (None, 55.0)
+    rewrite(proc / "stat", stat_line(150, 0, 50, 900))
+    assert sampler.sample() == (pytest.approx(50.0), 55.0)
+
+    rewrite(zone / "temp", "garbage\n")
+    load, temp = sampler.sample()
+    assert temp is None and sampler.temp is None
+    rewrite(zone / "temp", "56000\n")
+    assert sampler.sample()[1] is None                   # stays off once it failed
+
+    os.remove(proc / "stat")
+    sampler.load.close()                                 # next read reopens the (gone) file
+    assert sampler.sample() == (None, None)
+    assert sampler.load is None
+
+
+def test_sampler_without_proc_or_zones(tmp_path):
+    sampler = HostSensorSampler(lambda *a: None, proc_root=str(tmp_path / "proc"), sys_root=str(tmp_path / "sys"))
+    assert sampler.sample() == (None, None)
+    assert sampler.load is None
+
+
+def test_unreadable_temp_file(tmp_path):
+    zone = add_zone(tmp_path / "sys", 0, "x86_pkg_temp")
+    (zone / "temp").mkdir()                              # opens, but every read fails
+    sampler = HostSensorSampler(lambda *a: None, proc_root=str(tmp_path), sys_root=str(tmp_path / "sys"))
+    assert sampler.sample() == (None, None)
+    assert sampler.temp is None
@@ -0,0 +1,36 @@
+"""AUTO policy replay and ranking on a short simulated session."""
+import numpy as np
+import pytest
+
+import policy
+from policy import PolicyGrid, SessionTrace, rank, replay
+
+
+@pytest.fixture
+def trace(recording):
+    return SessionTrace(*recording)
+
+
+def test_grid_replay_smoke(trace):
+    grid = PolicyGrid([26.0, policy.TEMP_LOW], [policy.TEMP_MED, 44.0], [20.0, policy.LAPTOP_PRESENT_CM],
+                      [policy.TEMP_MAX])
+    res = replay(trace, grid)
+    assert res["fan_on_pct"].shape == (len(grid),)
+    order, cost = rank(res)
+    assert sorted(order.tolist()) == list(range(len(grid)))
+    assert np.all(np.diff(cost[order]) >= 0)
+    # the firmware's own policy replayed on its own recording: close to what was recorded
+    k = int(np.flatnonzero((grid.low == policy.TEMP_LOW) & (grid.med == policy.TEMP_MED)
+                           & (grid.present == policy.LAPTOP_PRESENT_CM))[0])
+    recorded_on = 100.0 * float(np.mean(trace.duty > 0))
+    assert res["fan_on_pct"][k] == pytest.approx(recorded_on, abs=3.0)
+    assert res["mean_duty"][k] == pytest.approx(float(np.mean(trace.duty)), rel=0.05)
+
+
+def test_cli_runs(session_file, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["policy.py", session_file, "--low", "28,30", "--med", "40",
+                                     "--present", "40", "--max", "50", "--top", "3"])
+    policy.main()
+    out = capsys.readouterr().out
+    assert "2 policies" in out
+    assert "<- firmware" in out
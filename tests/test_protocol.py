@@ -0,0 +1,71 @@
+"""Binary /status, /history and UDP frames: round trips and the errors a bad buffer raises."""
+import pytest
+
+from protocol import (
+    HISTORY_HEADER, STATUS_FRAME, UDP_DATAGRAM, decode_history_frames, decode_status_frame, decode_udp_datagram,
+    encode_history_frames, encode_status_frame, encode_udp_datagram,
+)
+
+STATUS = {
+    "mode": "AUTO", "lm35": 36.5, "dhtTemp": 27.25, "dhtHum": 48.5, "dist": 12.0, "lux": 310.0,
+    "fanDuty": 180, "connected": True, "seq": 1234, "ms": 987654,
+}
+
+
+def sample(seq, **kw):
+    return dict(STATUS, seq=seq, ms=1000 * seq, **kw)
+
+
+def test_status_round_trip():
+    assert decode_status_frame(encode_status_frame(STATUS)) == STATUS
+    manual = dict(STATUS, mode="MANUAL", connected=False)
+    assert decode_status_frame(encode_status_frame(manual)) == manual
+
+
+def test_history_round_trip():
+    samples = [sample(s) for s in (5, 6, 8)]
+    last, more, got = decode_history_frames(encode_history_frames(samples, 8, True))
+    assert (last, more, got) == (8, True, samples)
+    assert decode_history_frames(encode_history_frames([], 8, False)) == (8, False, [])
+
+
+def test_udp_round_trip():
+    device_id = bytes.fromhex("24a1600000ff")
+    buf = encode_udp_datagram(device_id, STATUS)
+    assert len(buf) == UDP_DATAGRAM.size
+    assert decode_udp_datagram(buf) == (device_id.hex(), STATUS)
+
+
+def test_wrong_version_rejected():
+    frame = bytearray(encode_status_frame(STATUS))
+    frame[0] = 2
+    with pytest.raises(ValueError, match="version 2"):
+        decode_status_frame(bytes(frame))
+    batch = bytearray(encode_history_frames([STATUS], 1234, False))
+    batch[0] = 0
+    with pytest.raises(ValueError, match="version 0"):
+        decode_history_frames(bytes(batch))
+
+
+def test_truncated_status_frame():
+    frame = encode_status_frame(STATUS)
+    for n in (0, 1, STATUS_FRAME.size - 1):
+        with pytest.raises(ValueError, match="Truncated"):
+            decode_status_frame(frame[:n])
+
+
+def test_truncated_history():
+    batch = encode_history_frames([sample(1), sample(2)], 2, False)
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_history_frames(batch[:HISTORY_HEADER.size - 1])
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_history_frames(batch[:-1])
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_history_frames(batch[:HISTORY_HEADER.size + STATUS_FRAME.size])
+
+
+def test_foreign_datagrams():
+    buf = encode_udp_datagram(bytes(6), STATUS)
+    for bad in (buf[:-1], buf + b"\0", b"XX" + buf[2:], buf[:2] + b"\x02" + buf[3:], b""):
+        with pytest.raises(ValueError):
+            decode_udp_datagram(bad)
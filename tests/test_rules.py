@@ -0,0 +1,234 @@
+"""Rules engine: parsing, hysteresis (also under not), for_s / clear_s, overrides, incremental updates."""
+import json
+import random
+import re
+
+import pytest
+
+from rules import DEFAULT_RULES, RULE_HIGH_TEMP, RULE_OVERTEMP, RULE_RGB, Rule, RuleEngine, RuleSet
+
+
+def drive(engine, values, device="pad", key="lm35", t0=0.0, dt=1.0, extra=None):
+    """Feed one channel's values; returns the rule's raised state after each sample."""
+    out = []
+    for i, v in enumerate(values):
+        engine.update(device, dict(extra or {}, **{key: v}), t0 + i * dt)
+        out.append(engine.active(device))
+    return out
+
+
+def states(engine, values, name="r", **kw):
+    return [name in a for a in drive(engine, values, **kw)]
+
+
+@pytest.mark.parametrize("when, err", [
+    ("lm35 >", "ends too early"),
+    ("lm35 > > 3", "Expected a value"),
+    ("(lm35 > 3", "ends too early"),
+    ("(lm35 > 3 lux", "Missing )"),
+    ("lm35 > 3)", "Unexpected"),
+    ("> 3", "Expected a channel"),
+    ("lm35 > 3 and", "ends too early"),
+    ("lm35 $ 3", "Unexpected"),
+    ("lm35 > 3 lux", "Unexpected"),
+])
+def test_parse_errors(when, err):
+    with pytest.raises(ValueError, match=re.escape(err)):
+        Rule({"name": "r", "when": when})
+
+
+@pytest.mark.parametrize("spec, err", [
+    ({"when": "lm35 > 1"}, "without a name"),
+    ({"name": "r"}, "when"),
+    ({"name": "r", "when": "lm35 > 1", "severity": "panic"}, "severity"),
+    ({"name": "r", "when": "lm35 > 1", "hysteresis": -1}, ">= 0"),
+    ({"name": "r", "when": "lm35 > 1", "color": "red"}, "unknown field"),
+    ({"name": "r", "when": "lm35 > 1", "action": "/reboot"}, "not a pad command"),
+])
+def test_bad_rules(spec, err):
+    with pytest.raises(ValueError, match=err):
+        Rule(spec)
+
+
+def test_duplicate_names():
+    with pytest.raises(ValueError, match="twice"):
+        RuleSet([{"name": "r", "when": "lm35 > 1"}, {"name": "r", "when": "lux < 2"}])
+
+
+def test_expressions():
+    rule = Rule({"name": "r", "when": "not (lm35 > 40 or lux < 10) and mode == AUTO and connected"})
+    assert rule.channels == ("connected", "lm35", "lux", "mode")
+    vals = {"lm35": 35.0, "lux": 50.0, "mode": "AUTO", "connected": 1}
+    assert rule.cond(vals, 0)
+    assert not rule.cond(dict(vals, lm35=41.0), 0)
+    assert not rule.cond(dict(vals, lux=5.0), 0)
+    assert not rule.cond(dict(vals, mode="MANUAL"), 0)
+    assert not rule.cond(dict(vals, connected=0.4), 0)      # a median-filtered flag
+    # a non-numeric value fails every comparison (a not around it turns that into true)
+    assert not Rule({"name": "q", "when": "lm35 > 40"}).cond({"lm35": None}, 0)
+    assert rule.cond(dict(vals, lm35=None), 0)
+
+
+def test_hysteresis():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50", "hysteresis": 1.0}])
+    got = states(engine, [49.0, 50.5, 49.5, 49.1, 49.0, 50.0, 50.1])
+    assert got == [False, True, True, True, False, False, True]
+
+
+def test_hysteresis_below():
+    engine = RuleEngine([{"name": "r", "when": "lux < 100", "hysteresis": 5.0}])
+    got = states(engine, [120, 99, 104, 105, 101, 99], key="lux")
+    assert got == [False, True, True, False, False, True]
+
+
+def test_hysteresis_under_not():
+    # not (lm35 < 40) behaves like lm35 >= 40: raise at 40, let go below 39
+    negated = RuleEngine([{"name": "r", "when": "not (lm35 < 40)", "hysteresis": 1.0}])
+    plain = RuleEngine([{"name": "r", "when": "lm35 >= 40", "hysteresis": 1.0}])
+    temps = [38.0, 39.5, 40.0, 39.5, 39.0, 38.9, 39.5, 40.5, 40.9, 41.0]
+    expected = [False, False, True, True, True, False, False, True, True, True]
+    assert states(negated, temps) == expected
+    assert states(plain, temps) == expected
+    # double negation is the comparison itself
+    twice = RuleEngine([{"name": "r", "when": "not not lm35 >= 40", "hysteresis": 1.0}])
+    assert states(twice, temps) == expected
+
+
+def test_for_s_and_clear_s():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50", "for_s": 3.0, "clear_s": 2.0}])
+    temps = [51, 51, 51, 51, 49, 51, 49, 49, 49, 49]
+    #        t=0 raised at t=3,   blip,    clears at t=8 (2 s after the t=6 drop)
+    assert states(engine, temps) == [False, False, False, True, True, True, True, True, False, False]
+
+
+def test_for_s_reset_by_a_short_dip():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50", "for_s": 2.0}])
+    assert states(engine, [51, 51, 49, 51, 51, 51]) == [False, False, False, False, False, True]
+
+
+def test_for_s_runs_without_new_values():
+    # an unchanged channel doesn't trigger a re-evaluation, but a running for_s does
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50", "for_s": 2.0}])
+    assert states(engine, [51, 51, 51]) == [False, False, True]
+
+
+def test_events_and_actions():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50", "severity": "alarm", "message": "hot {lm35:.1f}",
+                          "action": "/buzzer?state=ON", "clear_action": "/buzzer?state=OFF"}])
+    assert engine.update("pad", {"lm35": 49.0}, 0.0) == []
+    (ev,) = engine.update("pad", {"lm35": 51.25}, 1.0)
+    assert ev == {"t": 1.0, "device": "pad", "rule": "r", "state": "raised", "severity": "alarm",
+                  "message": "hot 51.2", "action": "/buzzer?state=ON"}
+    (ev,) = engine.update("pad", {"lm35": 40.0}, 2.0)
+    assert (ev["state"], ev["action"]) == ("cleared", "/buzzer?state=OFF")
+
+
+def test_filtered_values_win():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50"}])
+    engine.update("pad", {"lm35": 55.0, "filtered": {"lm35": 48.0}}, 0.0)
+    assert engine.active("pad") == ()
+    engine.update("pad", {"lm35": 45.0, "filtered": {"lm35": 50.5}}, 1.0)
+    assert engine.active("pad") == ("r",)
+
+
+def test_device_overrides():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50"}, {"name": "q", "when": "lux < 10"}],
+                        {"desk": {"r": {"when": "lm35 > 45"}, "q": {"enabled": False}}})
+    sample = {"lm35": 47.0, "lux": 5.0}
+    engine.update("desk", sample, 0.0)
+    engine.update("lab", sample, 0.0)
+    assert engine.active("desk") == ("r",)
+    assert engine.active("lab") == ("q",)
+    # devices without overrides share one compiled set
+    engine.update("office", sample, 0.0)
+    assert engine.states["office"].ruleset is engine.states["lab"].ruleset is engine.base
+    with pytest.raises(ValueError, match="no rule"):
+        RuleEngine([{"name": "r", "when": "lm35 > 50"}], {"desk": {"nope": {"enabled": False}}})
+
+
+def test_devices_keep_separate_state():
+    engine = RuleEngine([{"name": "r", "when": "lm35 > 50", "for_s": 1.0}])
+    engine.update("a", {"lm35": 51.0}, 0.0)
+    engine.update("b", {"lm35": 40.0}, 0.0)
+    engine.update("a", {"lm35": 51.0}, 1.0)
+    engine.update("b", {"lm35": 51.0}, 1.0)
+    assert engine.active("a") == ("r",)
+    assert engine.active("b") == ()
+    engine.reset()
+    assert engine.active("a") == ()
+
+
+def test_incremental_by_channel():
+    specs = [{"name": "t", "when": "lm35 > 50"},
+             {"name": "l", "when": "lux < 10"},
+             {"name": "both", "when": "lm35 > 40 and lux < 50"}]
+    rs = RuleSet(specs)
+    assert rs.by_channel == {"lm35": [0, 2], "lux": [1, 2]}
+    engine = RuleEngine(specs)
+    engine.update("pad", {"lm35": 45.0, "lux": 30.0}, 0.0)
+    assert engine.evaluated == 3
+    engine.update("pad", {"lm35": 45.0, "lux": 30.0}, 1.0)     # nothing changed
+    assert engine.evaluated == 3
+    engine.update("pad", {"lm35": 46.0, "lux": 30.0}, 2.0)     # lm35 only
+    assert engine.evaluated == 5
+    engine.update("pad", {"lux": 5.0}, 3.0)                    # lm35 missing: its rules keep state
+    assert engine.evaluated == 7
+    assert set(engine.active("pad")) == {"l", "both"}
+    assert engine.samples == 4
+
+
+def test_incremental_matches_full_evaluation():
+    rng = random.Random(5)
+    specs = list(DEFAULT_RULES) + [
+        {"name": "a", "when": "dhtHum > 60 or not (lux > 50)", "hysteresis": 2.0, "for_s": 1.0},
+        {"name": "b", "when": "lm35 > 38 and mode == MANUAL", "hysteresis": 0.5, "clear_s": 2.0},
+    ]
+    engine = RuleEngine(specs)
+    rs = RuleSet(specs)
+    active = [False] * len(rs.rules)
+    since = [None] * len(rs.rules)
+    vals = {"lm35": 40.0, "lux": 60.0, "dhtHum": 50.0, "mode": "AUTO", "connected": 1}
+    for i in range(3000):
+        t = i * 0.25
+        ch = rng.choice(("lm35", "lux", "dhtHum", "mode", "connected", None))
+        if ch == "mode":
+            vals["mode"] = rng.choice(("AUTO", "MANUAL"))
+        elif ch == "connected":
+            vals["connected"] = rng.choice((0, 1))
+        elif ch is not None:
+            vals[ch] = round(vals[ch] + rng.uniform(-3.0, 3.0), 1)
+        engine.update("pad", dict(vals), t)
+        # reference: every rule, every sample
+        for k, rule in enumerate(rs.rules):
+            if rule.cond(vals, 1 if active[k] else 0) == active[k]:
+                since[k] = None
+                continue
+            since[k] = t if since[k] is None else since[k]
+            if t - since[k] >= (rule.clear_s if active[k] else rule.for_s):
+                active[k] = not active[k]
+                since[k] = None
+        assert engine.active("pad") == tuple(r.name for r, a in zip(rs.rules, active) if a)
+    assert engine.evaluated < engine.samples * len(rs.rules)
+
+
+def test_load_merges_into_defaults(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "rules": [{"name": RULE_OVERTEMP, "when": "lm35 > 48"},
+                  {"name": RULE_RGB, "enabled": False},
+                  {"name": "humid", "when": "dhtHum > 80", "severity": "info"}],
+        "devices": {"pad": {RULE_HIGH_TEMP: {"hysteresis": 2.0}}},
+    }))
+    engine = RuleEngine.load(str(path))
+    by_name = {s["name"]: s for s in engine.specs}
+    assert by_name[RULE_OVERTEMP]["when"] == "lm35 > 48"
+    assert by_name[RULE_OVERTEMP]["hysteresis"] == 1.0          # kept from the default
+    assert [r.name for r in engine.base.rules] == [RULE_OVERTEMP, RULE_HIGH_TEMP, "humid"]
+    assert engine.sets["pad"].rules[1].hysteresis == 2.0
+
+    path.write_text("[]")
+    with pytest.raises(ValueError):
+        RuleEngine.load(str(path))
+    path.write_text(json.dumps({"rules": [{"when": "lm35 > 1"}]}))
+    with pytest.raises(ValueError, match="name"):
+        RuleEngine.load(str(path))
@@ -0,0 +1,100 @@
+"""CoolingPadService without a link thread, and its ControlApi over loopback."""
+import math
+import os
+import subprocess
+import sys
+
+import requests
+
+import service
+from protocol import HISTORY_FIELDS, decode_history_frames, decode_status_frame
+from service import ControlApi, CoolingPadService
+
+
+def warming_rows(n, seq0=1, ms0=10_000):
+    """Pad heating toward 42 °C from 30 °C, one row per 250 ms (a /history batch)."""
+    rows = []
+    for i in range(n):
+        rows.append({"seq": seq0 + i, "ms": ms0 + 250 * i, "mode": "AUTO",
+                     "lm35": 42.0 - 12.0 * math.exp(-i / 400.0), "dhtTemp": 26.0, "dhtHum": 40.0,
+                     "dist": 8.0, "lux": 120.0, "fanDuty": 128, "connected": True})
+    return rows
+
+
+def test_connect_resets_per_target_state():
+    svc = CoolingPadService()
+    svc.connect("HTTP", "10.0.0.5")
+    svc._handle_history((warming_rows(480), False))
+    assert svc.device_clock.last_seq == 480
+    assert svc.filters.filters["lm35"].y is not None
+    assert svc.forecaster.ready
+    assert svc.rules.states
+    assert svc.latest()["devSeq"] == 480
+    assert svc.latest()["ms"] >= 0          # backfilled from before the service started
+    api_seq = svc.api_seq
+
+    assert svc.connect("HTTP", "10.0.0.6") == "http://10.0.0.6"
+    clk = svc.device_clock
+    assert (clk.last_seq, clk.received, clk.missed) == (None, 0, 0)
+    assert all(f.y is None for f in svc.filters.filters.values())
+    assert svc.forecaster.model is None and svc.forecast_state() is None
+    assert svc.alarm_state()["active"] == {}
+    assert svc.latest() is None
+    assert svc.api_seq == api_seq
+
+    # the new pad starts its own seq / ms from scratch: no restart, no gap against the old one
+    svc._handle_history((warming_rows(4, seq0=1, ms0=500), False))
+    assert (svc.device_clock.received, svc.device_clock.restarts, svc.device_clock.missed) == (4, 0, 0)
+    assert svc.history_since(api_seq)["samples"][0][0] == api_seq + 1
+
+
+def test_service_imports_no_gui():
+    code = ("import sys, service; "
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('tkinter', '_tkinter', 'matplotlib', 'PIL')))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60,
+                         cwd=os.path.dirname(os.path.abspath(service.__file__)))
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == "[]"
+
+
+def test_control_api_routes():
+    svc = CoolingPadService()
+    api = ControlApi(svc, port=0).start()
+    base = api.base_url
+    try:
+        r = requests.get(f"{base}/status", timeout=2)
+        assert r.status_code == 503
+        assert requests.get(f"{base}/fan?duty=10", timeout=2).status_code == 503     # no target yet
+        assert requests.get(f"{base}/connect?link=CAN&target=x", timeout=2).status_code == 400
+        assert requests.get(f"{base}/connect?target=", timeout=2).status_code == 400
+        r = requests.get(f"{base}/connect?link=HTTP&target=10.0.0.5", timeout=2)
+        assert (r.status_code, r.text) == (200, "OK HTTP http://10.0.0.5")
+
+        svc._handle_history((warming_rows(3, seq0=41), False))
+        r = requests.get(f"{base}/status", timeout=2)
+        assert r.headers["Content-Type"] == "application/json"
+        status = r.json()
+        assert (status["seq"], status["devSeq"], status["devMs"]) == (3, 43, 10_500)
+        assert status["mode"] == "AUTO" and "filtered" in status
+        assert decode_status_frame(requests.get(f"{base}/status?fmt=bin", timeout=2).content)["seq"] == 3
+
+        batch = requests.get(f"{base}/history?since=1", timeout=2).json()
+        assert batch["fields"] == list(HISTORY_FIELDS)
+        assert (batch["last"], batch["more"]) == (3, False)
+        assert [row[0] for row in batch["samples"]] == [2, 3]
+        last, more, samples = decode_history_frames(
+            requests.get(f"{base}/history?since=0&fmt=bin", timeout=2).content)
+        assert (last, more, [s["seq"] for s in samples]) == (3, False, [1, 2, 3])
+
+        stats = requests.get(f"{base}/stats", timeout=2).json()
+        assert (stats["link"], stats["target"], stats["online"]) == ("poll", "http://10.0.0.5", True)
+        assert stats["clock"] == {"seq": 43, "received": 3, "missed": 0, "duplicates": 0, "restarts": 0}
+        assert stats["forecast"] is None
+        assert requests.get(f"{base}/precool?at=40", timeout=2).json() is None
+        assert svc.precool_c == 40.0
+        assert requests.get(f"{base}/precool?at=hot", timeout=2).status_code == 400
+        assert requests.get(f"{base}/alarms", timeout=2).json().keys() == {"active", "recent"}
+        assert requests.get(f"{base}/pid?target=warm", timeout=2).status_code == 400
+        assert requests.get(f"{base}/nope", timeout=2).status_code == 404
+    finally:
+        api.stop()
@@ -0,0 +1,159 @@
+"""SseStream parsing, and resume after a reconnect against the Simulator's stream port."""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Empty
+
+import pytest
+import requests
+
+from service import CoolingPadService
+from simulator import Simulator
+from transport import SseStream, SseUnavailable
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Plays `server.chunks` as a chunked text/event-stream, then closes."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.path == "/plain":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in self.server.chunks:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+            time.sleep(0.005)
+        self.wfile.write(b"0\r\n\r\n")
+        self.close_connection = True
+
+
+@pytest.fixture
+def scripted():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    httpd.daemon_threads = True
+    httpd.requests = []
+    httpd.chunks = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_multiline_data_and_comments(scripted):
+    scripted.chunks = [
+        b": keepalive\n\n",
+        b"retry: 1500\n\n",
+        b"id: 7\nevent: status\ndata: {\"a\":\ndata: 1}\n\n",
+        b": ping\r\n\r\nid: 8\r\ndata:no space\r\n\r\n",      # CRLF lines, no space after the colon
+        b"data: split ac",                                      # one event over three chunks
+        b"ross chunks\nid",
+        b": 9\n\n",
+        b"id: 10\n\n",                                          # no data: not an event
+        b"event: note\ndata: \ndata: second\n\n",               # empty first data line kept
+    ]
+    url = f"http://127.0.0.1:{scripted.server_address[1]}/events"
+    stream = SseStream(requests.Session(), url)
+    stream.last_id = 3
+    assert list(stream.events()) == [
+        ("status", '{"a":\n1}', "7"),
+        ("message", "no space", "8"),
+        ("message", "split across chunks", "9"),
+        ("note", "\nsecond", None),
+    ]
+    assert stream.retry_ms == 1500
+    assert stream.last_id == "9"
+    assert scripted.requests[0]["Last-Event-ID"] == "3"
+    assert scripted.requests[0]["Accept"] == "text/event-stream"
+
+
+def test_not_an_event_stream(scripted):
+    stream = SseStream(requests.Session(), f"http://127.0.0.1:{scripted.server_address[1]}/plain")
+    with pytest.raises(SseUnavailable):
+        list(stream.events())
+
+
+@pytest.fixture
+def sim():
+    sim = Simulator(port=0, seed=5, time_scale=8.0, stream_port=0).start()
+    yield sim
+    sim.stop()
+
+
+def take(events, n):
+    out = []
+    for item in events:
+        out.append(item)
+        if len(out) == n:
+            break
+    return out
+
+
+def test_redirect_and_resume_without_duplicates(sim):
+    r = requests.get(f"{sim.base_url}/events?rate_ms=250", allow_redirects=False, timeout=2)
+    stream_port = sim.stream_httpd.server_address[1]
+    assert r.status_code == 307
+    assert r.headers["Location"] == f"http://127.0.0.1:{stream_port}/events?rate_ms=250"
+    assert requests.get(f"http://127.0.0.1:{stream_port}/status", timeout=2).status_code == 404
+
+    stream = SseStream(requests.Session(), f"{sim.base_url}/events?rate_ms=250")
+    first = take(stream.events(), 5)
+    assert stream.retry_ms == 2000
+    time.sleep(0.3)                 # the pad keeps sampling while we're away
+    second = take(stream.events(), 10)
+
+    seqs = [int(eid) for _, _, eid in first + second]
+    assert seqs == list(range(seqs[0], seqs[0] + 15))
+    assert sim.device.status()["seq"] > seqs[4] + 2         # the resume did replay missed samples
+
+
+def test_service_stream_resumes_from_device_seq(sim):
+    events = Queue()
+    svc = CoolingPadService(events)
+    url = svc.connect("HTTP", sim.base_url)
+
+    def consume(n):
+        got = []
+
+        def run():
+            svc.suspended = False
+            svc._consume_stream(url)
+
+        th = threading.Thread(target=run, daemon=True)
+        th.start()
+        deadline = time.monotonic() + 5.0
+        while len(got) < n and time.monotonic() < deadline:
+            try:
+                item = events.get(timeout=0.5)
+            except Empty:
+                continue
+            if item[0] == "status_data":
+                got.append(item[1]["seq"])
+        svc.suspended = True        # the stream loop ends at its next event
+        th.join(timeout=2.0)
+        assert not th.is_alive()
+        while not events.empty():
+            item = events.get()
+            if item[0] == "status_data":
+                got.append(item[1]["seq"])
+        return got
+
+    first = consume(4)
+    time.sleep(0.3)
+    second = consume(6)
+    seqs = first + second
+    assert seqs == list(range(seqs[0], seqs[0] + len(seqs)))
+    clk = svc.device_clock
+    assert (clk.duplicates, clk.missed, clk.restarts) == (0, 0, 0)
+    assert svc.link_mode == "stream"
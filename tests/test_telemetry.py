@@ -0,0 +1,69 @@
+"""DeviceClock: gaps, duplicates, restarts and the host-time anchor."""
+import pytest
+
+from telemetry import DeviceClock
+
+
+def test_in_order():
+    clock = DeviceClock()
+    assert clock.observe(10, 5000, 100.0) == 100.0
+    assert clock.observe(11, 5250, 100.9) == pytest.approx(100.25)     # device time, not host time
+    assert clock.observe(12, 5500, 101.0) == pytest.approx(100.5)
+    assert (clock.received, clock.missed, clock.duplicates, clock.restarts) == (3, 0, 0, 0)
+    assert (clock.last_seq, clock.last_ms) == (12, 5500)
+
+
+def test_gap_counts_missed():
+    clock = DeviceClock()
+    clock.observe(1, 0, 0.0)
+    assert clock.observe(5, 1000, 3.0) == pytest.approx(1.0)
+    clock.observe(6, 1250, 3.1)
+    clock.observe(20, 4750, 6.0)
+    assert clock.missed == 3 + 13
+    assert clock.received == 4
+
+
+def test_duplicate_dropped():
+    clock = DeviceClock()
+    clock.observe(1, 0, 0.0)
+    assert clock.observe(1, 0, 0.7) is None
+    assert clock.observe(1, 0, 1.4) is None
+    assert clock.observe(2, 250, 1.5) == pytest.approx(0.25)
+    assert (clock.received, clock.duplicates, clock.missed) == (2, 2, 0)
+
+
+def test_restart_reanchors():
+    clock = DeviceClock()
+    clock.observe(500, 125000, 50.0)
+    last = clock.observe(501, 125250, 50.2)
+    # reboot: seq and millis start over; plot time keeps increasing from the host clock
+    t = clock.observe(1, 300, 60.0)
+    assert t == 60.0 and t > last
+    assert clock.observe(2, 550, 60.1) == pytest.approx(60.25)
+    assert (clock.restarts, clock.missed) == (1, 0)
+
+
+def test_restart_never_goes_back_in_time():
+    clock = DeviceClock()
+    clock.observe(1, 0, 10.0)
+    clock.observe(2, 30000, 10.5)          # device says 30 s later: plot t = 40
+    t = clock.observe(1, 100, 12.0)        # reboot while the host clock lags behind
+    assert t == pytest.approx(40.0)
+    assert clock.restarts == 1
+
+
+def test_millis_backwards_alone_is_a_restart():
+    clock = DeviceClock()
+    clock.observe(7, 9000, 5.0)
+    assert clock.observe(8, 100, 6.0) == 6.0
+    assert clock.restarts == 1
+    assert clock.missed == 0
+
+
+def test_reset():
+    clock = DeviceClock()
+    clock.observe(1, 0, 0.0)
+    clock.observe(3, 500, 1.0)
+    clock.reset()
+    assert (clock.received, clock.missed, clock.last_seq) == (0, 0, None)
+    assert clock.observe(100, 99000, 7.0) == 7.0           # anchored afresh on host time
@@ -0,0 +1,203 @@
+"""Serial framing and SerialLink over a pseudo-terminal (os.openpty), no pad needed."""
+import os
+import select
+import threading
+import time
+import tty
+
+import pytest
+
+from protocol import encode_serial_status
+from simulator import SerialSim, SimDevice
+from transport import SerialFrameParser, SerialLink
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo-terminal")
+
+STATUS = {"mode": "AUTO", "lm35": 36.5, "fanDuty": 128, "seq": 7}
+
+
+@pytest.fixture
+def pty_pair():
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    yield master, slave
+    for fd in (master, slave):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def pump(master, slave, parser, chunks):
+    """Write each chunk to the pad side, read it on the host side, feed the parser."""
+    events = []
+    for chunk in chunks:
+        os.write(master, chunk)
+        got = b""
+        while len(got) < len(chunk):
+            ready, _, _ = select.select([slave], [], [], 1.0)
+            assert ready, "pty read timed out"
+            got += os.read(slave, 4096)
+        events += parser.feed(got)
+    return events
+
+
+def test_status_frame_and_reply(pty_pair):
+    parser = SerialFrameParser()
+    events = pump(*pty_pair, parser, [
+        b"[WiFi] status = 3\r\n",
+        encode_serial_status(STATUS),
+        b"#200/12 Fan duty set\r\n",
+        b"#404 Not found\r\n",
+    ])
+    assert events == [("status", STATUS), ("reply", 200, "Fan duty set", "12"), ("reply", 404, "Not found", None)]
+    assert (parser.frames, parser.bad_frames, parser.text_lines) == (1, 0, 1)
+
+
+def test_checksum_rejected(pty_pair):
+    parser = SerialFrameParser()
+    good = encode_serial_status(STATUS)
+    cs = good.rstrip(b"\r\n")[-2:]
+    bad_cs = good.replace(b"*" + cs, b"*%02X" % (int(cs, 16) ^ 0x01))
+    mangled = good.replace(b"36.5", b"36.6")        # payload hit by a debug print, checksum unchanged
+    events = pump(*pty_pair, parser, [bad_cs, mangled, b"@{\"lm35\":1}\r\n", b"@{not json*00\r\n", good])
+    assert events == [("status", STATUS)]
+    assert parser.bad_frames == 4
+    assert parser.frames == 1
+
+
+def test_partial_frames_across_reads(pty_pair):
+    parser = SerialFrameParser()
+    data = encode_serial_status(STATUS) + b"#200/3 OK AUTO\r\n" + encode_serial_status(dict(STATUS, seq=8))
+    chunks = [data[i:i + 5] for i in range(0, len(data), 5)]
+    events = pump(*pty_pair, parser, chunks)
+    assert events == [("status", STATUS), ("reply", 200, "OK AUTO", "3"), ("status", dict(STATUS, seq=8))]
+    assert parser.bad_frames == 0
+
+
+def test_runaway_line_dropped(pty_pair):
+    parser = SerialFrameParser(max_line=64)
+    junk = b"x" * 50
+    events = pump(*pty_pair, parser, [junk, junk, junk])
+    assert events == []
+    assert parser.bad_frames >= 1
+    assert len(parser.buf) <= parser.max_line
+    # a runaway that got cut loses its tail up to the next newline; later frames parse again
+    events = pump(*pty_pair, parser, [b"tail\r\n", encode_serial_status({"lm35": 30.0})])
+    assert events == [("status", {"lm35": 30.0})]
+
+
+def wait_for(pred, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_command_round_trip_with_simulator():
+    sim = SerialSim(SimDevice(seed=1))
+    got = []
+    link = SerialLink(sim.port, got.append).open()
+    try:
+        reply = link.request("/setMode?mode=MANUAL")
+        assert (reply.status_code, reply.text) == (200, "OK MANUAL")
+        reply = link.request("/fan?duty=200")
+        assert reply.status_code == 200
+        sim.device.tick()
+        assert sim.device.status()["fanDuty"] == 200
+        assert link.request("/nope").status_code == 404
+        sim.send_sample(sim.device.status())
+        assert wait_for(lambda: got)
+        assert got[0]["fanDuty"] == 200
+        assert link.parser.text_lines >= 1          # the debug line next to the frame
+    finally:
+        link.close()
+        sim.close()
+
+
+class FakePad:
+    """Pad end of a pty that answers commands through `answer(path, tag) -> bytes`."""
+    def __init__(self, answer):
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self.slave = slave
+        self.answer = answer
+        self.commands = []
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        buf = b""
+        while not self.stop_flag:
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if not ready:
+                continue
+            buf += os.read(self.master, 256)
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                path, _, tag = line.decode()[1:].partition(" ")
+                self.commands.append((path, tag))
+                os.write(self.master, self.answer(path, tag))
+
+    def write(self, data: bytes):
+        os.write(self.master, data)
+
+    def close(self):
+        self.stop_flag = True
+        self.thread.join(timeout=1.0)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def test_late_reply_not_taken_for_next_command():
+    tags = []
+
+    def answer(path, tag):
+        tags.append(tag)
+        if path == "/slow":
+            return b""          # answered late, below
+        return b"#200/%s %s\r\n" % (tag.encode(), path.encode())
+
+    pad = FakePad(answer)
+    link = SerialLink(pad.port, lambda data: None).open()
+    try:
+        with pytest.raises(TimeoutError):
+            link.request("/slow", timeout=0.2)
+        pad.write(b"#200/%s slow\r\n" % tags[0].encode())
+        reply = link.request("/fan?duty=10")
+        assert reply.text == "/fan?duty=10"
+        assert tags[0] != tags[1]
+        assert link.stale_replies == 1
+
+        pad.write(b"#200 untagged\r\n")
+        assert link.request("/rgb?mode=OFF").text == "/rgb?mode=OFF"
+        assert link.stale_replies == 2
+    finally:
+        link.close()
+        pad.close()
+
+
+def test_status_callback_error_keeps_reader_alive():
+    pad = FakePad(lambda path, tag: b"#200/%s ok\r\n" % tag.encode())
+    got = []
+
+    def on_status(data):
+        if data["seq"] == 1:
+            raise KeyError("boom")
+        got.append(data["seq"])
+
+    link = SerialLink(pad.port, on_status).open()
+    try:
+        pad.write(encode_serial_status({"seq": 1}) + encode_serial_status({"seq": 2}))
+        assert wait_for(lambda: got == [2])
+        assert link.thread.is_alive()
+        assert link.error is None
+        assert "KeyError" in link.callback_error
+        assert link.request("/fan?duty=1").status_code == 200
+    finally:
+        link.close()
+        pad.close()
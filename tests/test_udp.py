@@ -0,0 +1,86 @@
+"""UdpReceiver on loopback: per-pad DeviceClock counts and demultiplexing by device ID."""
+import json
+import socket
+import time
+
+import pytest
+import requests
+
+from protocol import encode_udp_datagram
+from simulator import Simulator
+from transport import UdpReceiver
+
+PAD_A = bytes.fromhex("24a160000001")
+PAD_B = bytes.fromhex("24a160000002")
+
+
+def status(seq, ms):
+    return {"mode": "AUTO", "lm35": 35.5, "fanDuty": 90, "connected": True, "seq": seq, "ms": ms}
+
+
+def wait_for(pred, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def receiver():
+    got = []
+    rx = UdpReceiver(lambda dev, data, t: got.append((dev, data["seq"], t)), port=0, host="127.0.0.1",
+                     host_time=lambda: 100.0).start()
+    rx.got = got
+    yield rx
+    rx.stop()
+
+
+def test_gap_duplicate_and_restart_per_pad(receiver):
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # A: 1, 2, (3 lost), 4, 4 again, then a reboot back to seq 1; B: a clean 1..3 interleaved
+    sends = [(PAD_A, 1, 1000), (PAD_B, 1, 500), (PAD_A, 2, 1250), (PAD_B, 2, 750), (PAD_A, 4, 1750),
+             (PAD_A, 4, 1750), (PAD_B, 3, 1000), (PAD_A, 1, 20)]
+    try:
+        for dev, seq, ms in sends:
+            tx.sendto(encode_udp_datagram(dev, status(seq, ms)), ("127.0.0.1", receiver.port))
+            time.sleep(0.005)       # keep loopback ordering independent of the receiver's pace
+        tx.sendto(b"not a pad", ("127.0.0.1", receiver.port))
+        assert wait_for(lambda: receiver.datagrams == len(sends) + 1)
+    finally:
+        tx.close()
+
+    a, b = receiver.devices[PAD_A.hex()], receiver.devices[PAD_B.hex()]
+    assert (a.missed, a.duplicates, a.restarts) == (1, 1, 1)
+    assert (b.missed, b.duplicates, b.restarts) == (0, 0, 0)
+    assert receiver.malformed == 1
+    assert set(receiver.last_seen) == {PAD_A.hex(), PAD_B.hex()}
+
+    per_pad = {}
+    for dev, seq, t in receiver.got:
+        per_pad.setdefault(dev, []).append((seq, t))
+    assert per_pad[PAD_B.hex()] == [(1, 100.0), (2, 100.25), (3, 100.5)]
+    # the duplicate is not delivered; the reboot re-anchors on the host clock, never going back
+    assert per_pad[PAD_A.hex()] == [(1, 100.0), (2, 100.25), (4, 100.75), (1, 100.75)]
+
+
+def test_simulator_udp_subscribe_validates_port():
+    sim = Simulator(port=0, seed=2).start()
+    try:
+        for bad in ("", "abc", "0", "70000", "-5"):
+            r = requests.get(f"{sim.base_url}/udp", params={"port": bad}, timeout=2)
+            assert r.status_code == 400, bad
+        assert requests.get(f"{sim.base_url}/udp", timeout=2).status_code == 400
+        assert sim.httpd.udp_target is None
+
+        rx = UdpReceiver(port=0, host="127.0.0.1").start()
+        try:
+            r = requests.get(f"{sim.base_url}/udp", params={"port": rx.port}, timeout=2)
+            assert r.status_code == 200
+            assert json.loads(r.text) == {"id": sim.device.device_id.hex(), "port": rx.port}
+            assert wait_for(lambda: sim.device.device_id.hex() in rx.devices)
+        finally:
+            rx.stop()
+    finally:
+        sim.stop()
@@ -0,0 +1,284 @@
+import json
+import socket
+import threading
+import time
+
+from protocol import decode_udp_datagram, serial_checksum, UDP_PORT, SERIAL_BAUD
+from telemetry import DeviceClock
+
+
+class SseUnavailable(Exception):
+    """The device answered but does not serve an event stream."""
+
+
+class SseStream:
+    """
+    Server-Sent Events reader on a requests.Session:
+    - parses a chunked text/event-stream incrementally into (event, data, id)
+    - sends `last_id` as Last-Event-ID so a reconnect resumes where it stopped
+    - keeps the server's retry: hint in `retry_ms`
+    A read timeout ends the stream like a dropped connection.
+    """
+    def __init__(self, session, url: str, connect_timeout=2.0, read_timeout=5.0):
+        self.session = session
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.last_id = None
+        self.retry_ms = 2000
+
+    def events(self):
+        headers = {"Accept": "text/event-stream", "Cache-Control": "no-cache"}
+        if self.last_id is not None:
+            headers["Last-Event-ID"] = str(self.last_id)
+
+        r = self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout)
+        try:
+            ctype = r.headers.get("Content-Type", "")
+            if r.status_code == 404 or (r.status_code == 200 and not ctype.startswith("text/event-stream")):
+                raise SseUnavailable(f"HTTP {r.status_code} {ctype}".strip())
+            r.raise_for_status()
+
+            buf = b""
+            event, data, eid = "message", [], None
+            for chunk in r.iter_content(chunk_size=None):
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for raw in lines:
+                    line = raw.rstrip(b"\r").decode("utf-8", "replace")
+                    if not line:
+                        if data:
+                            if eid is not None:
+                                self.last_id = eid
+                            yield event, "\n".join(data), eid
+                        event, data, eid = "message", [], None
+                        continue
+                    if line.startswith(":"):
+                        continue
+                    field, _, value = line.partition(":")
+                    if value.startswith(" "):
+                        value = value[1:]
+                    if field == "data":
+                        data.append(value)
+                    elif field == "event":
+                        event = value
+                    elif field == "id":
+                        eid = value
+                    elif field == "retry" and value.isdigit():
+                        self.retry_ms = int(value)
+        finally:
+            r.close()
+
+
+class UdpReceiver:
+    """
+    Receives status datagrams pushed by any number of pads:
+    - one socket and one thread, recvfrom_into a preallocated buffer
+    - demultiplexed by device ID, one DeviceClock per pad for loss / duplicate counts
+    - on_sample(device_id, data, t) is called (on the receiver thread) per new sample
+    `host_time` should be the caller's plot clock so device time anchors onto it.
+    """
+    def __init__(self, on_sample=None, port=UDP_PORT, host="0.0.0.0", host_time=time.monotonic,
+                 rcvbuf=1 << 20):
+        self.on_sample = on_sample
+        self.host_time = host_time
+        self.devices = {}
+        self.last_seen = {}
+        self.datagrams = 0
+        self.malformed = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.5)
+        self.stop_flag = False
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.sock.getsockname()[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_flag = True
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        self.sock.close()
+
+    def _run(self):
+        buf = bytearray(256)
+        view = memoryview(buf)
+        devices = self.devices
+        while not self.stop_flag:
+            try:
+                n, _ = self.sock.recvfrom_into(buf)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            self.datagrams += 1
+            try:
+                device_id, data = decode_udp_datagram(view[:n])
+            except ValueError:
+                self.malformed += 1
+                continue
+
+            clock = devices.get(device_id)
+            if clock is None:
+                clock = devices[device_id] = DeviceClock()
+            now = self.host_time()
+            self.last_seen[device_id] = now
+            t = clock.observe(data["seq"], data["ms"], now)
+            if t is not None and self.on_sample is not None:
+                self.on_sample(device_id, data, t)
+
+
+class SerialFrameParser:
+    """
+    Splits the serial byte stream into lines and keeps the framed ones:
+    - "@{json}*CS" status frame, checked against its XOR checksum -> ("status", dict)
+    - "#<code>[/<tag>] <text>" command reply -> ("reply", code, text, tag or None)
+    - anything else is firmware debug output and only counted
+    Partial lines carry over between feed() calls; a runaway line is dropped.
+    """
+    def __init__(self, max_line=1024):
+        self.max_line = max_line
+        self.buf = bytearray()
+        self.frames = 0
+        self.bad_frames = 0
+        self.text_lines = 0
+
+    def feed(self, data: bytes):
+        self.buf += data
+        events = []
+        while True:
+            i = self.buf.find(b"\n")
+            if i < 0:
+                if len(self.buf) > self.max_line:
+                    self.buf.clear()
+                    self.bad_frames += 1
+                return events
+            line = bytes(self.buf[:i]).rstrip(b"\r")
+            del self.buf[:i + 1]
+            ev = self._parse_line(line)
+            if ev is not None:
+                events.append(ev)
+
+    def _parse_line(self, line: bytes):
+        if line.startswith(b"@"):
+            star = line.rfind(b"*")
+            try:
+                if star < 0 or int(line[star + 1:], 16) != serial_checksum(line[1:star]):
+                    raise ValueError("checksum")
+                data = json.loads(line[1:star])
+            except ValueError:
+                self.bad_frames += 1
+                return None
+            self.frames += 1
+            return ("status", data)
+
+        if line.startswith(b"#"):
+            head, _, text = line[1:].decode("utf-8", "replace").partition(" ")
+            code, _, tag = head.partition("/")
+            if code.isdigit():
+                return ("reply", int(code), text, tag or None)
+
+        self.text_lines += 1
+        return None
+
+
+class SerialReply:
+    """Enough of a requests.Response for the command workers (status_code, text)."""
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+
+class SerialLink:
+    """
+    USB serial link to the pad:
+    - reader thread feeds SerialFrameParser; status frames go to on_status(data)
+    - request(path) writes "!path tag" and waits for the "#code/tag text" reply,
+      one command in flight at a time; replies with another tag (late answers to a
+      command that already timed out) are dropped and counted in `stale_replies`
+    - an exception in on_status is recorded in `callback_error` and the reader goes on
+    pyserial is imported on open() so the Wi-Fi dashboard doesn't need it.
+    """
+    def __init__(self, port: str, on_status, baudrate=SERIAL_BAUD, host_time=time.monotonic):
+        self.port = port
+        self.baudrate = baudrate
+        self.on_status = on_status
+        self.host_time = host_time
+        self.parser = SerialFrameParser()
+        self.ser = None
+        self.error = None
+        self.callback_error = None
+        self.last_status = None
+        self.stop_flag = False
+        self.thread = None
+
+        self.cmd_lock = threading.Lock()
+        self.reply_cond = threading.Condition()
+        self._reply = None
+        self._tag = 0
+        self._waiting = None
+        self.stale_replies = 0
+
+    def open(self):
+        import serial
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.stop_flag = True
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        if self.ser is not None:
+            self.ser.close()
+
+    def request(self, path: str, timeout=1.2) -> SerialReply:
+        with self.cmd_lock:
+            with self.reply_cond:
+                self._tag = self._tag % 9999 + 1
+                tag = self._waiting = str(self._tag)
+                self._reply = None
+            self.ser.write(b"!%s %s\n" % (path.encode("utf-8"), tag.encode()))
+            with self.reply_cond:
+                try:
+                    if not self.reply_cond.wait_for(lambda: self._reply is not None, timeout):
+                        raise TimeoutError(f"No serial reply to {path}")
+                    return self._reply
+                finally:
+                    self._waiting = None
+
+    def _run(self):
+        while not self.stop_flag:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except OSError as e:
+                # pyserial's SerialException is an OSError (cable pulled, port gone)
+                self.error = str(e)
+                break
+            if not data:
+                continue
+            for ev in self.parser.feed(data):
+                if ev[0] == "status":
+                    self.last_status = self.host_time()
+                    try:
+                        self.on_status(ev[1])
+                    except Exception as e:
+                        # a broken consumer must not take the link down with it
+                        self.callback_error = f"{type(e).__name__}: {e}"
+                    continue
+                with self.reply_cond:
+                    if ev[3] is None or ev[3] != self._waiting:
+                        self.stale_replies += 1
+                        continue
+                    self._reply = SerialReply(ev[1], ev[2])
+                    self.reply_cond.notify_all()